@@ -0,0 +1,9 @@
+"""
+VRIDDHI Matching Benchmarks
+
+Offline, in-process measurements of the matching engine on synthetic
+listings (no database, no Qdrant, no network).
+
+Usage:
+    python -m benchmarks.matching_suite --sizes 1000 10000 100000
+"""
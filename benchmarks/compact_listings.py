@@ -0,0 +1,113 @@
+"""
+VRIDDHI MATCHING BENCHMARKS - Dict vs Compact Listings
+
+Purpose: Measure memory and matching speed of normalized listings as
+nested dicts (normalize_and_validate_v2) versus the slotted compact form
+(schema/compact_listing.py) on large candidate sets.
+
+Measured:
+- Memory: tracemalloc bytes held by the candidate set
+- Speed: per-candidate time of listing_matches_v2, MatchPlan.matches and
+  MatchPlan.filter (numeric prune mask + matches) for each representation
+- Agreement: every mode must return the same matches
+
+Usage:
+    python -m benchmarks.compact_listings
+    python -m benchmarks.compact_listings --candidates 100000 --queries 5
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic import make_candidates, make_queries
+from matching.listing_matcher_v2 import listing_matches_v2
+from matching.match_plan import compile_match_plan
+from schema.compact_listing import compact_listing
+
+
+def _measure_memory(build: Callable[[], List[Any]]) -> (int, List[Any]):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+def _time(fn: Callable[[], List[int]]) -> (float, List[int]):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(candidates: int, queries: int, seed: int = 42) -> Dict[str, Any]:
+    dict_bytes, dict_listings = _measure_memory(lambda: make_candidates(candidates, seed))
+    compact_bytes, compact_listings = _measure_memory(lambda: [compact_listing(c) for c in dict_listings])
+
+    modes = {
+        "listing_matches_v2 / dict": lambda A, plan: [i for i, B in enumerate(dict_listings) if listing_matches_v2(A, B)],
+        "listing_matches_v2 / compact": lambda A, plan: [i for i, B in enumerate(compact_listings) if listing_matches_v2(A, B)],
+        "plan.matches / dict": lambda A, plan: [i for i, B in enumerate(dict_listings) if plan.matches(B)],
+        "plan.matches / compact": lambda A, plan: [i for i, B in enumerate(compact_listings) if plan.matches(B)],
+        "plan.filter / dict": lambda A, plan: _filtered(plan, dict_listings),
+        "plan.filter / compact": lambda A, plan: _filtered(plan, compact_listings),
+    }
+    timings = {name: 0.0 for name in modes}
+    matches = 0
+    for A in make_queries(queries):
+        plan = compile_match_plan(A)
+        reference = None
+        for name, mode in modes.items():
+            elapsed, result = _time(lambda: mode(A, plan))
+            timings[name] += elapsed
+            if reference is None:
+                reference = result
+            assert result == reference, f"{name} disagrees with listing_matches_v2"
+        matches += len(reference)
+
+    return {
+        "candidates": candidates,
+        "queries": queries,
+        "matches": matches,
+        "dict_bytes": dict_bytes,
+        "compact_bytes": compact_bytes,
+        "us_per_candidate": {
+            name: total / (candidates * queries) * 1e6 for name, total in timings.items()
+        },
+    }
+
+
+def _filtered(plan, listings: List[Any]) -> List[int]:
+    mask = plan.prune_mask(listings)
+    return [i for i, B in enumerate(listings) if mask[i] and plan.matches(B)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dict vs compact listing benchmark")
+    parser.add_argument("--candidates", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    report = run(args.candidates, args.queries, args.seed)
+
+    print(f"\n{'=' * 60}")
+    print(f"Compact listings: {report['candidates']} candidates x {report['queries']} queries "
+          f"({report['matches']} matches)")
+    print(f"{'=' * 60}")
+    print(f"Memory (dict):    {report['dict_bytes'] / 1e6:8.1f} MB "
+          f"({report['dict_bytes'] / report['candidates']:.0f} B/listing)")
+    print(f"Memory (compact): {report['compact_bytes'] / 1e6:8.1f} MB "
+          f"({report['compact_bytes'] / report['candidates']:.0f} B/listing, "
+          f"{report['compact_bytes'] / report['dict_bytes']:.0%} of dict)")
+    print()
+    for name, us in report["us_per_candidate"].items():
+        print(f"  {name:32s} {us:7.2f} µs/candidate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+VRIDDHI MATCHING BENCHMARKS - Matching Hot-Path Suite
+
+Purpose: Performance baseline for the matching hot path, to catch
+regressions the correctness suites (tests/test_matching_logic.py,
+tests/regression/matching_robustness) cannot see.
+
+Timed per corpus size (synthetic product / service / mutual listings,
+benchmarks/synthetic.make_corpus), every query against every candidate:
+- listing_matches_v2
+- all_required_items_match          (query items vs candidate items)
+- evaluate_min / max / range_constraints
+                                    (query item / other bounds vs candidate
+                                     item / self ranges, pre-extracted)
+- evaluate_similarity
+
+Each with implication disabled (implies_fn=None, exact equality) and
+stubbed (stub_implies: a fixed lookup table, no WordNet / network), so the
+numbers measure the engine, not the lexical backends. The numeric
+evaluators take no implies_fn and run once ("disabled").
+
+Results (ns per call, best of --repeat runs, plus the number of positive
+results as a determinism check) are written to --output and compared
+with the stored baseline: a benchmark regresses when it is more than
+--tolerance slower, and fails when its result count changed. Exit code 1
+on either. Baselines are machine specific; refresh on the reference
+machine with --update-baseline.
+
+Usage:
+    python -m benchmarks.matching_suite
+    python -m benchmarks.matching_suite --sizes 1000 10000 --queries 3
+    python -m benchmarks.matching_suite --update-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from benchmarks.synthetic import make_corpus
+from matching.item_array_matchers import all_required_items_match
+from matching.item_matchers import _extract_candidate_ranges
+from matching.listing_matcher_v2 import listing_matches_v2
+from matching.numeric_constraints import (
+    evaluate_max_constraints,
+    evaluate_min_constraints,
+    evaluate_range_constraints,
+)
+from matching.similarity_scorer import evaluate_similarity
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results", "matching_suite.json")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baselines", "matching_suite.json")
+
+SIZES = [1000, 10000, 100000]
+
+# Allowed slowdown before a benchmark counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Candidate value → required values it implies (stand-in for semantic_implies)
+STUB_IMPLICATIONS = {
+    "refurbished": {"used"},
+    "smartphone": {"phone"},
+    "grooming": {"pet care"},
+    "walk in": {"at home"},
+}
+
+
+def stub_implies(candidate: str, required: str) -> bool:
+    """Exact equality plus a fixed implication table (constant cost)."""
+    return candidate == required or required in STUB_IMPLICATIONS.get(candidate, ())
+
+
+IMPLIES_MODES = {
+    "disabled": None,
+    "stubbed": stub_implies,
+}
+
+# Benchmarks that never call implies_fn (timed in the first mode only)
+IMPLIES_INDEPENDENT = frozenset({
+    "evaluate_min_constraints",
+    "evaluate_max_constraints",
+    "evaluate_range_constraints",
+})
+
+
+# ============================================================================
+# WORKLOADS
+# ============================================================================
+
+def _numeric_pairs(queries: List[Dict[str, Any]],
+                   candidates: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    (required constraints, candidate ranges) pairs of the same intent:
+    items for product / service (M-09 to M-11), other → self for mutual
+    (M-14 to M-16). Ranges are extracted once, outside the timed loop.
+    """
+    ranges: Dict[str, List[Dict[str, Any]]] = {}
+    for B in candidates:
+        if B["items"]:
+            ranges.setdefault(B["intent"], []).extend(_extract_candidate_ranges(item) for item in B["items"])
+        else:
+            ranges.setdefault(B["intent"], []).append(_extract_candidate_ranges(B["self"]))
+    pairs = []
+    for A in queries:
+        for required in (A["items"] or [A["other"]]):
+            pairs.extend((required, candidate_ranges) for candidate_ranges in ranges.get(A["intent"], []))
+    return pairs
+
+
+def _workloads(queries: List[Dict[str, Any]], candidates: List[Dict[str, Any]],
+               implies_fn: Optional[Callable]) -> Dict[str, Tuple[int, Callable[[], int]]]:
+    """name → (calls, fn returning the number of positive results)."""
+    item_pairs = [
+        (A["items"], B["items"])
+        for A in queries if A["items"]
+        for B in candidates if B["items"] and B["intent"] == A["intent"]
+    ]
+    numeric_pairs = _numeric_pairs(queries, candidates)
+    calls = len(queries) * len(candidates)
+
+    return {
+        "listing_matches_v2": (calls, lambda: sum(
+            listing_matches_v2(A, B, implies_fn) for A in queries for B in candidates)),
+        "all_required_items_match": (len(item_pairs), lambda: sum(
+            all_required_items_match(required, offered, implies_fn) for required, offered in item_pairs)),
+        "evaluate_min_constraints": (len(numeric_pairs), lambda: sum(
+            evaluate_min_constraints(required["min"], ranges) for required, ranges in numeric_pairs)),
+        "evaluate_max_constraints": (len(numeric_pairs), lambda: sum(
+            evaluate_max_constraints(required["max"], ranges) for required, ranges in numeric_pairs)),
+        "evaluate_range_constraints": (len(numeric_pairs), lambda: sum(
+            evaluate_range_constraints(required["range"], ranges) for required, ranges in numeric_pairs)),
+        "evaluate_similarity": (calls, lambda: sum(
+            evaluate_similarity(A, B, implies_fn).is_similar_match for A in queries for B in candidates)),
+    }
+
+
+def _best_of(fn: Callable[[], int], repeat: int) -> Tuple[float, int]:
+    best, hits = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+        assert hits is None or result == hits, "non-deterministic benchmark result"
+        hits = result
+    return best, hits
+
+
+# ============================================================================
+# RUN / COMPARE
+# ============================================================================
+
+def run(sizes: Iterable[int] = SIZES, queries: int = 5, repeat: int = 3, seed: int = 42,
+        only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run the suite; results[size]["<benchmark>/<implies mode>"]."""
+    query_listings = make_corpus(queries, seed + 1, side="query")
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in sizes:
+        candidates = make_corpus(size, seed)
+        size_results = results[str(size)] = {}
+        for mode_index, (mode, implies_fn) in enumerate(IMPLIES_MODES.items()):
+            for name, (calls, fn) in _workloads(query_listings, candidates, implies_fn).items():
+                if (only and name not in only) or (mode_index and name in IMPLIES_INDEPENDENT):
+                    continue
+                elapsed, hits = _best_of(fn, repeat)
+                size_results[f"{name}/{mode}"] = {
+                    "calls": calls,
+                    "hits": hits,
+                    "ns_per_call": round(elapsed / calls * 1e9, 1) if calls else 0.0,
+                }
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "queries": queries,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Per benchmark present in both: ratio = current / baseline ns per call.
+
+    status: "ok", "faster", "regression" (ratio > 1 + tolerance) or
+    "changed" (different result count: the workload or the verdicts changed).
+    """
+    rows = []
+    for size, benchmarks in report["results"].items():
+        for key, current in benchmarks.items():
+            reference = baseline.get("results", {}).get(size, {}).get(key)
+            if reference is None:
+                continue
+            ratio = current["ns_per_call"] / reference["ns_per_call"] if reference["ns_per_call"] else 1.0
+            if current["hits"] != reference["hits"] or current["calls"] != reference["calls"]:
+                status = "changed"
+            elif ratio > 1 + tolerance:
+                status = "regression"
+            elif ratio < 1 - tolerance:
+                status = "faster"
+            else:
+                status = "ok"
+            rows.append({"size": size, "benchmark": key, "ratio": ratio, "status": status,
+                         "ns_per_call": current["ns_per_call"], "baseline_ns": reference["ns_per_call"]})
+    return rows
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Matching hot-path benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", help="benchmark names to run (default: all)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write the results as the new baseline instead of comparing")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.queries, args.repeat, args.seed, args.only)
+    _write_json(args.output, report)
+
+    print(f"\n{'=' * 72}")
+    print(f"Matching suite: {args.queries} queries, best of {args.repeat} → {args.output}")
+    print(f"{'=' * 72}")
+    for size, benchmarks in report["results"].items():
+        print(f"\n  {size} candidates")
+        for key, row in benchmarks.items():
+            print(f"    {key:40s} {row['ns_per_call'] / 1e3:9.2f} µs/call  ({row['hits']}/{row['calls']})")
+
+    if args.update_baseline:
+        _write_json(args.baseline, report)
+        print(f"\nBaseline updated: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} (run with --update-baseline)")
+        return
+
+    with open(args.baseline) as f:
+        rows = compare(report, json.load(f), args.tolerance)
+    print(f"\nAgainst baseline (tolerance {args.tolerance:.0%}):")
+    for row in rows:
+        if row["status"] != "ok":
+            print(f"  {row['status'].upper():10s} {row['size']:>7} {row['benchmark']:40s} "
+                  f"{row['ratio']:6.2f}x  ({row['baseline_ns'] / 1e3:.2f} → {row['ns_per_call'] / 1e3:.2f} µs)")
+    failed = [row for row in rows if row["status"] in ("regression", "changed")]
+    print(f"\n{len(rows)} compared, {len(failed)} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
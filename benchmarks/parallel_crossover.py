@@ -0,0 +1,126 @@
+"""
+VRIDDHI MATCHING BENCHMARKS - In-Process vs Process-Pool Crossover
+
+Purpose: Find the candidate-set size above which the process-pool backend
+(matching/parallel_matcher.py) beats in-process evaluation, to set
+PARALLEL_MATCH_MIN_CANDIDATES.
+
+Measured per candidate-set size (mean over queries):
+- in-process: MatchPlan prune mask + matches, SimilarTopK over non-matches
+- pool:       ParallelMatcher.match + ParallelMatcher.top_similar
+  (pool started once beforehand, as in the server)
+
+semantic_implies does WordNet / Wikidata lookups; --implies-us simulates
+that per-call cost with a busy loop (0 = exact string equality only).
+Requires the "fork" start method so workers inherit the setting.
+
+Usage:
+    python -m benchmarks.parallel_crossover
+    python -m benchmarks.parallel_crossover --workers 4 --implies-us 20
+"""
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+from benchmarks.synthetic import make_candidates, make_queries
+from matching.match_plan import compile_match_plan
+from matching.parallel_matcher import MATCH_WORKERS, ParallelMatcher
+from matching.similarity_scorer import SimilarTopK
+
+SIZES = [50, 100, 200, 500, 1000, 2000, 5000]
+
+# Simulated cost of one implies_fn call (µs), inherited by forked workers
+_IMPLIES_COST_US = 0.0
+
+
+def costly_implies(candidate: str, required: str) -> bool:
+    """Exact match plus a busy wait standing in for lexical lookups."""
+    if _IMPLIES_COST_US:
+        deadline = time.perf_counter() + _IMPLIES_COST_US / 1e6
+        while time.perf_counter() < deadline:
+            pass
+    return candidate == required
+
+
+def _in_process(A: Dict[str, Any], candidates: List[Dict[str, Any]], k: int, min_score: float):
+    plan = compile_match_plan(A, implies_fn=costly_implies)
+    mask = plan.prune_mask(candidates)
+    flags = [bool(mask[i]) and plan.matches(B) for i, B in enumerate(candidates)]
+    top_k = SimilarTopK(A, k, min_score, costly_implies)
+    for i, B in enumerate(candidates):
+        if not flags[i]:
+            top_k.offer(B, i)
+    return flags, [(s.similarity_score, i) for s, i in top_k.results()]
+
+
+def _pooled(matcher: ParallelMatcher, A: Dict[str, Any], candidates: List[Dict[str, Any]],
+            k: int, min_score: float):
+    flags = matcher.match(A, candidates, costly_implies)
+    positions = [i for i, flag in enumerate(flags) if not flag]
+    similar = matcher.top_similar(A, candidates, k, min_score, costly_implies, positions=positions)
+    return flags, [(s.similarity_score, i) for s, i in similar]
+
+
+def run(workers: int, queries: int, k: int = 10, min_score: float = 0.7,
+        sizes: List[int] = SIZES) -> List[Dict[str, Any]]:
+    matcher = ParallelMatcher(workers=workers, min_candidates=0, start_method="fork")
+    matcher.start()
+    rows = []
+    try:
+        query_listings = make_queries(queries)
+        _pooled(matcher, query_listings[0], make_candidates(workers), k, min_score)  # warm up workers
+        for size in sizes:
+            candidates = make_candidates(size)
+            local_total = pooled_total = 0.0
+            for A in query_listings:
+                start = time.perf_counter()
+                expected = _in_process(A, candidates, k, min_score)
+                local_total += time.perf_counter() - start
+
+                start = time.perf_counter()
+                result = _pooled(matcher, A, candidates, k, min_score)
+                pooled_total += time.perf_counter() - start
+                assert result == expected, "pool disagrees with in-process evaluation"
+            rows.append({
+                "candidates": size,
+                "in_process_ms": local_total / queries * 1e3,
+                "pool_ms": pooled_total / queries * 1e3,
+            })
+    finally:
+        matcher.shutdown()
+    return rows
+
+
+def main() -> None:
+    global _IMPLIES_COST_US
+    parser = argparse.ArgumentParser(description="In-process vs process-pool matching crossover")
+    parser.add_argument("--workers", type=int, default=MATCH_WORKERS)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--implies-us", type=float, default=0.0,
+                        help="simulated cost of one implies_fn call in µs")
+    args = parser.parse_args()
+    _IMPLIES_COST_US = args.implies_us
+
+    rows = run(args.workers, args.queries)
+
+    print(f"\n{'=' * 60}")
+    print(f"Parallel crossover: {args.workers} workers, implies_fn {args.implies_us:g} µs/call")
+    print(f"{'=' * 60}")
+    print(f"  {'candidates':>10}  {'in-process':>12}  {'pool':>12}  {'speedup':>8}")
+    crossover = None
+    for row in rows:
+        speedup = row["in_process_ms"] / row["pool_ms"]
+        if crossover is None and speedup > 1.0:
+            crossover = row["candidates"]
+        print(f"  {row['candidates']:>10}  {row['in_process_ms']:>9.1f} ms  "
+              f"{row['pool_ms']:>9.1f} ms  {speedup:>7.2f}x")
+    print()
+    if crossover is None:
+        print("Pool never faster at these sizes - keep in-process evaluation")
+    else:
+        print(f"Crossover: ~{crossover} candidates (PARALLEL_MATCH_MIN_CANDIDATES)")
+
+
+if __name__ == "__main__":
+    main()
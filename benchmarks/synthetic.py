@@ -0,0 +1,191 @@
+"""
+VRIDDHI MATCHING BENCHMARKS - Synthetic Listings
+
+Purpose: Deterministic OLD-schema listings (what listing_matches_v2
+consumes) for benchmarks. Vocabularies are small on purpose so that a
+realistic share of candidates passes the intent/domain/type gates.
+
+make_corpus mixes product, service and mutual listings in the proportions
+of testing/test_data/*_pairs.json (40 / 40 / 100 pairs), with the shapes
+of those pairs: service items carry a categorical service kind and
+price / experience bounds, mutual listings have no items and match on
+category plus other → self preferences.
+
+Locations are "global" by default so that matching never geocodes.
+"""
+
+import random
+from typing import Any, Dict, List
+
+DOMAINS = ["technology & electronics", "home & furniture", "vehicles", "fashion"]
+ITEM_TYPES = ["smartphone", "laptop", "tablet", "sofa", "car", "jacket"]
+BRANDS = ["apple", "samsung", "dell", "lenovo", "ikea", "toyota"]
+COLORS = ["black", "white", "silver", "blue"]
+CONDITIONS = ["new", "used", "refurbished"]
+LANGUAGES = ["hindi", "english", "tamil"]
+CITIES = ["mumbai", "delhi", "bangalore", "pune"]
+
+SERVICE_DOMAINS = ["pets & animals", "personal services", "education & learning", "home services"]
+SERVICE_TYPES = ["grooming", "tutoring", "plumbing", "alteration", "cleaning", "photography"]
+SERVICE_KINDS = ["at home", "online", "walk in"]
+MUTUAL_CATEGORIES = ["travel", "fitness", "music", "transportation"]
+GENDERS = ["male", "female"]
+
+# Share of each intent in make_corpus (testing/test_data pair counts)
+INTENT_MIX = (("product", 40), ("service", 40), ("mutual", 100))
+
+
+def _item(rng: random.Random, exact: bool) -> Dict[str, Any]:
+    price = rng.randrange(5000, 150000, 500)
+    storage = rng.choice([64, 128, 256, 512])
+    item = {
+        "type": rng.choice(ITEM_TYPES),
+        "categorical": {"brand": rng.choice(BRANDS), "color": rng.choice(COLORS)},
+        "min": {},
+        "max": {},
+        "range": {},
+    }
+    if exact:
+        item["categorical"]["condition"] = rng.choice(CONDITIONS)
+        item["range"] = {"price": [price, price], "storage": [storage, storage]}
+    else:
+        item["max"] = {"price": price}
+        item["min"] = {"storage": storage}
+    return item
+
+
+def make_listing(rng: random.Random, subintent: str, global_location: bool = True) -> Dict[str, Any]:
+    """One product listing; sellers state exact values, buyers bounds."""
+    seller = subintent == "sell"
+    return {
+        "intent": "product",
+        "subintent": subintent,
+        "reasoning": "",
+        "domain": rng.sample(DOMAINS, rng.randint(1, 2)),
+        "category": [],
+        "items": [_item(rng, exact=seller) for _ in range(rng.randint(1, 3) if seller else 1)],
+        "itemexclusions": [],
+        "locationexclusions": [],
+        "other": {
+            "categorical": {} if seller else {"language": rng.choice(LANGUAGES)},
+            "min": {}, "max": {}, "range": {},
+            "otherexclusions": [],
+        },
+        "self": {
+            "categorical": {"language": rng.choice(LANGUAGES)} if seller else {},
+            "min": {"rating": round(rng.uniform(2.5, 5.0), 1)} if seller else {},
+            "max": {}, "range": {},
+            "selfexclusions": [],
+        },
+        "location": "" if global_location else rng.choice(CITIES),
+        "locationmode": "global" if global_location else "explicit",
+    }
+
+
+def _service_item(rng: random.Random, exact: bool) -> Dict[str, Any]:
+    price = rng.randrange(300, 5000, 100)
+    item = {
+        "type": rng.choice(SERVICE_TYPES),
+        "categorical": {"service_type": rng.choice(SERVICE_KINDS)},
+        "min": {},
+        "max": {},
+        "range": {},
+    }
+    if exact:
+        item["range"] = {"price": [price, price]}
+    else:
+        item["max"] = {"price": price}
+    return item
+
+
+def make_service_listing(rng: random.Random, subintent: str, global_location: bool = True) -> Dict[str, Any]:
+    """One service listing; providers state a price and experience."""
+    provider = subintent == "provide"
+    experience = rng.randint(0, 15)
+    return {
+        "intent": "service",
+        "subintent": subintent,
+        "reasoning": "",
+        "domain": [rng.choice(SERVICE_DOMAINS)],
+        "category": [],
+        "items": [_service_item(rng, exact=provider)],
+        "itemexclusions": [],
+        "locationexclusions": [],
+        "other": {
+            "categorical": {},
+            "min": {} if provider else {"experience": rng.randint(0, 5)},
+            "max": {}, "range": {},
+            "otherexclusions": [],
+        },
+        "self": {
+            "categorical": {"language": rng.choice(LANGUAGES)},
+            "min": {}, "max": {},
+            "range": {"experience": [experience, experience]} if provider else {},
+            "selfexclusions": [],
+        },
+        "location": "" if global_location else rng.choice(CITIES),
+        "locationmode": "global" if global_location else "explicit",
+    }
+
+
+def make_mutual_listing(rng: random.Random, global_location: bool = True) -> Dict[str, Any]:
+    """One mutual (connect) listing: category + preferences about the other party."""
+    age = rng.randint(18, 60)
+    return {
+        "intent": "mutual",
+        "subintent": "connect",
+        "reasoning": "",
+        "domain": [],
+        "category": [rng.choice(MUTUAL_CATEGORIES)],
+        "items": [],
+        "itemexclusions": [],
+        "locationexclusions": [],
+        "other": {
+            "categorical": {"gender": rng.choice(GENDERS)} if rng.random() < 0.5 else {},
+            "min": {}, "max": {},
+            "range": {"age": [age - 5, age + 10]} if rng.random() < 0.5 else {},
+            "otherexclusions": [],
+        },
+        "self": {
+            "categorical": {"gender": rng.choice(GENDERS)},
+            "min": {}, "max": {},
+            "range": {"age": [age, age]},
+            "selfexclusions": [],
+        },
+        "location": "" if global_location else rng.choice(CITIES),
+        "locationmode": "global" if global_location else "explicit",
+    }
+
+
+def make_candidates(n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """n seller listings."""
+    rng = random.Random(seed)
+    return [make_listing(rng, "sell") for _ in range(n)]
+
+
+def make_queries(n: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """n buyer listings."""
+    rng = random.Random(seed)
+    return [make_listing(rng, "buy") for _ in range(n)]
+
+
+def make_corpus(n: int, seed: int = 42, side: str = "candidate") -> List[Dict[str, Any]]:
+    """
+    n listings of all intents (INTENT_MIX).
+
+    side="candidate": sellers / providers; side="query": buyers / seekers.
+    Mutual listings are symmetric (connect).
+    """
+    rng = random.Random(seed)
+    intents = [intent for intent, _ in INTENT_MIX]
+    weights = [weight for _, weight in INTENT_MIX]
+    query = side == "query"
+    listings = []
+    for intent in rng.choices(intents, weights, k=n):
+        if intent == "product":
+            listings.append(make_listing(rng, "buy" if query else "sell"))
+        elif intent == "service":
+            listings.append(make_service_listing(rng, "seek" if query else "provide"))
+        else:
+            listings.append(make_mutual_listing(rng))
+    return listings
@@ -0,0 +1,187 @@
+"""
+Content-addressed embedding store.
+
+Vectors are keyed by sha256(model name + embedding text), so identical
+content (re-posts, no-op updates, retried batches) is encoded once per
+model and shared by every process using the same store file.
+
+Disabled by default. The store keeps at most EMBEDDING_STORE_MAX_ENTRIES
+vectors; the least recently used ones are evicted beyond that.
+
+Singleton pattern — one store shared across the app.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+from array import array
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Reuse stored vectors instead of re-encoding (1=enabled)
+ENABLE_EMBEDDING_STORE = os.environ.get("ENABLE_EMBEDDING_STORE", "0") == "1"
+
+# Default: project root, independent of the working directory
+EMBEDDING_STORE_PATH = os.environ.get(
+    "EMBEDDING_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "embedding_store.db")
+)
+
+# Vectors kept; least recently used ones are evicted beyond this
+EMBEDDING_STORE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_STORE_MAX_ENTRIES", "200000"))
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    """Content address of an embedding: sha256(model name + NUL + text)."""
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    SQLite-backed vector store.
+
+    Table:
+        embeddings(key, model, dim, vector, created_at, used_at) — vectors
+        as float32 blobs, used_at refreshed on every hit
+    """
+
+    def __init__(self, db_path: str = EMBEDDING_STORE_PATH, max_entries: int = EMBEDDING_STORE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_embeddings_used_at ON embeddings (used_at);
+        """)
+        # Upper bound of the stored count, recounted before evicting
+        self._stored = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        # Stats
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+
+    # ------------------------------------------------------------------
+    # Vectors
+    # ------------------------------------------------------------------
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Return {key: vector} for stored keys (marked as used)."""
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET used_at = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [now] + [key for key, _ in rows]
+                    )
+        return found
+
+    def put_many(self, model_name: str, items: Sequence[Tuple[str, Sequence[float]]]) -> None:
+        """Store (key, vector) pairs, evicting least recently used vectors past max_entries."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, model_name, len(vec), array("f", vec).tobytes(), now, now) for key, vec in items]
+            )
+            self._stored += len(items)
+            if self._stored > self.max_entries:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete the least recently used vectors beyond max_entries (lock held)."""
+        self._stored = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._stored - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY used_at LIMIT ?)", (excess,)
+        )
+        self._stored -= excess
+        self._evicted += excess
+
+    def encode(self, model, model_name: str, texts: Sequence[str], batch_size: int = 64) -> List[List[float]]:
+        """
+        Vectors for texts, encoding only those not already stored.
+
+        Misses are encoded in ONE model.encode() call (duplicates within
+        the batch are encoded once) and written back to the store.
+        """
+        keys = [embedding_key(model_name, t) for t in texts]
+        found = self.get_many(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        self._hits += len(keys) - sum(1 for k in keys if k in missing)
+        self._misses += len(missing)
+
+        if missing:
+            vectors = model.encode(list(missing.values()), batch_size=batch_size, convert_to_tensor=False)
+            encoded = [
+                (key, vec.tolist() if hasattr(vec, "tolist") else list(vec))
+                for key, vec in zip(missing.keys(), vectors)
+            ]
+            self.put_many(model_name, encoded)
+            found.update(encoded)
+
+        return [found[key] for key in keys]
+
+    def get_stats(self) -> Dict:
+        """Get store statistics."""
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self._hits + self._misses
+        return {
+            "stored_vectors": stored,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evicted": self._evicted,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Singleton
+# ═══════════════════════════════════════════════════════════════════
+
+_embedding_store: Optional[EmbeddingStore] = None
+
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """Get singleton EmbeddingStore (None when ENABLE_EMBEDDING_STORE=0)."""
+    global _embedding_store
+    if not ENABLE_EMBEDDING_STORE:
+        return None
+    if _embedding_store is None:
+        _embedding_store = EmbeddingStore()
+    return _embedding_store
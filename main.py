@@ -6,6 +6,7 @@ import uuid
 import json
 from openai import OpenAI
 import asyncio
+import time
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -94,10 +95,19 @@ log = get_logger(__name__)
 
 # Import project modules
 from schema.schema_normalizer_v2 import normalize_and_validate_v2
-from pipeline.ingestion_pipeline import IngestionClients, ingest_listing
-from pipeline.retrieval_service import RetrievalClients, retrieve_candidates
-from matching.listing_matcher_v2 import listing_matches_v2
-from matching.similarity_scorer import evaluate_similarity
+from schema.compact_listing import plain_listing
+from pipeline.ingestion_pipeline import IngestionClients, ingest_listing, insert_to_qdrant, generate_embedding
+from pipeline.retrieval_service import RetrievalClients, retrieve_candidates, retrieve_candidate_rows
+from pipeline.listing_cache import get_listing_cache
+from pipeline.ingestion_queue import ENABLE_ASYNC_INGESTION, QueueFullError, get_ingestion_queue
+from pipeline.percolator import load_stored_queries, percolate_listing, store_query
+from pipeline.match_maintenance import ENABLE_MATCH_MAINTENANCE, get_match_maintainer
+from matching.stored_query_index import ENABLE_PERCOLATION
+from matching.listing_matcher_v2 import listing_matches_v2, match_candidates_bidirectional
+from matching.match_plan import compile_match_plan, get_predicate_stats
+from matching.similarity_scorer import SimilarTopK, compute_bonus_attributes, materialize_similarity
+from matching.parallel_matcher import ENABLE_PARALLEL_MATCHING, get_parallel_matcher
+from matching.match_profiler import MatchProfile, current_profile, get_profile_totals
 from embedding.embedding_builder import build_embedding_text
 from canonicalization.orchestrator import canonicalize_listing
 
@@ -206,6 +216,43 @@ async def initialize_services():
                      synonyms=len(data.get("synonym_registry", {})),
                      paths=len(data.get("concept_paths", {})))
 
+            # Matching worker processes (clean forkserver / spawn children, ontology snapshot)
+            if ENABLE_PARALLEL_MATCHING:
+                if get_parallel_matcher().min_candidates <= 0:
+                    log.warning("Parallel matching enabled but PARALLEL_MATCH_MIN_CANDIDATES is not set "
+                                "(measure it with benchmarks/parallel_crossover.py); matching in-process",
+                                emoji="warning")
+                else:
+                    get_parallel_matcher().start()
+                    log.info("Parallel matching pool started", emoji="sync",
+                             workers=get_parallel_matcher().workers,
+                             min_candidates=get_parallel_matcher().min_candidates)
+
+            # Listing cache change-feed poller (picks up writes from other workers)
+            if get_listing_cache().start_polling(ingestion_clients.supabase):
+                log.info("Listing cache change-feed polling started", emoji="sync")
+
+            # Stored queries for prospective matching of new listings
+            if ENABLE_PERCOLATION:
+                try:
+                    loaded = await asyncio.to_thread(load_stored_queries, ingestion_clients.supabase)
+                    log.info("Stored query index loaded", emoji="success", queries=loaded)
+                except Exception as e:
+                    log.warning("Could not load stored queries", emoji="warning", error=str(e))
+
+            # Incremental match maintenance (listing_changes feed, migration 006)
+            if ENABLE_MATCH_MAINTENANCE:
+                maintainer = get_match_maintainer(implies_fn=semantic_implies, clients=ingestion_clients)
+                maintainer.on_change = get_listing_cache().invalidate_many
+                if maintainer.start(ingestion_clients.supabase):
+                    log.info("Match maintenance started", emoji="sync")
+
+            # Asynchronous ingestion workers (queued /ingest + /store-listing writes)
+            if ENABLE_ASYNC_INGESTION:
+                get_ingestion_queue().start(ingestion_clients, on_ingested=on_queue_ingested)
+                log.info("Ingestion queue workers started", emoji="sync",
+                         **get_ingestion_queue().get_stats())
+
             is_initialized = True
             log.info("ALL clients initialized successfully", emoji="success")
         else:
@@ -245,6 +292,14 @@ async def shutdown_event():
     """Cleanup on server shutdown."""
     log.info("FastAPI server shutting down...", emoji="stop")
 
+    get_listing_cache().stop_polling()
+    if ENABLE_ASYNC_INGESTION:
+        get_ingestion_queue().stop()
+    if ENABLE_MATCH_MAINTENANCE:
+        get_match_maintainer().stop()
+    if ENABLE_PARALLEL_MATCHING:
+        get_parallel_matcher().shutdown()
+
     # Shutdown observability
     if _use_grafana_cloud:
         shutdown_grafana_cloud()
@@ -253,6 +308,45 @@ async def shutdown_event():
 
     log.info("Server shutdown complete", emoji="success")
 
+def enqueue_ingestion(listing: Dict[str, Any], user_id: Optional[str], match_id: Optional[str] = None) -> Dict[str, str]:
+    """Queue a normalized listing for asynchronous ingestion (429 when full)."""
+    try:
+        return get_ingestion_queue().enqueue(listing, user_id=user_id, match_id=match_id)
+    except QueueFullError as e:
+        log.warning("Ingestion queue full", emoji="warning", error=str(e))
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+
+def percolate_new_listing(listing_id: str, listing: Dict[str, Any], user_id: Optional[str]) -> List[str]:
+    """Match a newly stored listing against stored queries (never raises)."""
+    if not ENABLE_PERCOLATION:
+        return []
+    try:
+        match_ids = percolate_listing(
+            ingestion_clients.supabase, listing_id, listing,
+            user_id=user_id, implies_fn=semantic_implies
+        )
+        if match_ids:
+            log.info("Stored queries matched new listing", emoji="success",
+                     listing_id=listing_id, count=len(match_ids))
+        return match_ids
+    except Exception as e:
+        log.warning("Percolation failed", emoji="warning", listing_id=listing_id, error=str(e))
+        return []
+
+
+def cache_new_listing(listing_id: str, listing: Dict[str, Any], user_id: Optional[str]) -> None:
+    """Write a newly stored listing through to the listing cache (no-op when disabled)."""
+    get_listing_cache().put({"listing_id": listing_id, "user_id": user_id, "data": listing})
+
+
+def on_queue_ingested(jobs: List[Dict[str, Any]]) -> None:
+    """Queued listings written: cache them, then percolate them."""
+    for job in jobs:
+        cache_new_listing(job["listing_id"], job["listing"], job["user_id"])
+        percolate_new_listing(job["listing_id"], job["listing"], job["user_id"])
+
+
 def check_service_health():
     """Helper to check if services are ready."""
     if init_error:
@@ -260,25 +354,7 @@ def check_service_health():
     if not is_initialized:
         raise HTTPException(status_code=503, detail="Service is still starting up (loading models). Please try again in 30 seconds.")
 
-def semantic_implies(candidate_val: str, required_val: str) -> bool:
-    """
-    Check if candidate_val implies required_val.
-
-    Uses multiple strategies:
-    1. Exact match (after canonicalization with BabelNet enrichment)
-    1.5. Curated synonyms (laptop/notebook, cleaning/housekeeping)
-    2. WordNet hierarchy check (is required_val an ancestor?)
-    2.5. WordNet synset overlap (true synonyms)
-    3. Morphological matching (same stem - plumber/plumbing)
-    4. BabelNet exact synonym check
-
-    With BabelNet enrichment during canonicalization, synonyms like
-    tutor/coach should already have the same concept_id.
-    """
-    c, r = candidate_val.lower().strip(), required_val.lower().strip()
-    if c == r:
-        return True
-
+def _implies_curated(c: str, r: str) -> bool:
     # Strategy 1.5: Curated synonyms (common synonyms not in same WordNet synset)
     # These are semantically identical but WordNet has them in different synsets
     CURATED_SYNONYMS = {
@@ -292,7 +368,10 @@ def semantic_implies(candidate_val: str, required_val: str) -> bool:
     for syn_group in CURATED_SYNONYMS:
         if c in syn_group and r in syn_group:
             return True
+    return False
+
 
+def _implies_wikidata(c: str, r: str) -> bool:
     # Strategy 1.6: Wikidata hierarchy check (dynamic, not hardcoded)
     # Uses P31 (instance of) and P279 (subclass of) to check if candidate is a type of required
     # Example: dentist is a type of doctor, iphone is a type of smartphone
@@ -304,7 +383,10 @@ def semantic_implies(candidate_val: str, required_val: str) -> bool:
     except Exception:
         # Wikidata may timeout or fail - continue to other strategies
         pass
+    return False
+
 
+def _implies_wordnet_hierarchy(c: str, r: str) -> bool:
     # Strategy 2: WordNet hierarchy check (is required_val an ancestor of candidate_val?)
     try:
         from canonicalization.orchestrator import _get_categorical_resolver
@@ -313,7 +395,10 @@ def semantic_implies(candidate_val: str, required_val: str) -> bool:
             return True
     except Exception:
         pass
+    return False
+
 
+def _implies_wordnet_synset(c: str, r: str) -> bool:
     # Strategy 2.5: WordNet synonym check (are they in the same synset?)
     # Handles cases like laptop/notebook, cleaning/housekeeping
     try:
@@ -335,7 +420,10 @@ def semantic_implies(candidate_val: str, required_val: str) -> bool:
                 return True
     except Exception:
         pass
+    return False
+
 
+def _implies_morphology(c: str, r: str) -> bool:
     # Strategy 3: Morphological matching (shared root)
     # Handles cases like plumber/plumbing, cleaning/cleaner
     try:
@@ -374,7 +462,10 @@ def semantic_implies(candidate_val: str, required_val: str) -> bool:
                         return True
     except Exception:
         pass
+    return False
+
 
+def _implies_babelnet(c: str, r: str) -> bool:
     # Strategy 4: BabelNet EXACT synonym check
     # Only matches if candidate is an EXACT synonym of required
     # (no partial word matching to avoid false positives like "doctor" matching "dental doctor")
@@ -398,9 +489,88 @@ def semantic_implies(candidate_val: str, required_val: str) -> bool:
                 return True
     except Exception:
         pass
+    return False
+
 
+# semantic_implies strategies, in order (name → check on lowercased values)
+IMPLIES_STRATEGIES = [
+    ("curated", _implies_curated),
+    ("wikidata", _implies_wikidata),
+    ("wordnet_hierarchy", _implies_wordnet_hierarchy),
+    ("wordnet_synset", _implies_wordnet_synset),
+    ("morphology", _implies_morphology),
+    ("babelnet", _implies_babelnet),
+]
+
+
+def semantic_implies(candidate_val: str, required_val: str) -> bool:
+    """
+    Check if candidate_val implies required_val.
+
+    Uses multiple strategies:
+    1. Exact match (after canonicalization with BabelNet enrichment)
+    1.5. Curated synonyms (laptop/notebook, cleaning/housekeeping)
+    2. WordNet hierarchy check (is required_val an ancestor?)
+    2.5. WordNet synset overlap (true synonyms)
+    3. Morphological matching (same stem - plumber/plumbing)
+    4. BabelNet exact synonym check
+
+    With BabelNet enrichment during canonicalization, synonyms like
+    tutor/coach should already have the same concept_id.
+
+    Inside a profiled evaluation (matching/match_profiler.py) each
+    strategy's calls, hits and time are recorded to the active profile.
+    """
+    c, r = candidate_val.lower().strip(), required_val.lower().strip()
+    profile = current_profile()
+    if profile is None:
+        if c == r:
+            return True
+        for _, strategy in IMPLIES_STRATEGIES:
+            if strategy(c, r):
+                return True
+        return False
+
+    # Profile mode (?profile=true): time every strategy
+    start = time.perf_counter_ns()
+    hit = c == r
+    profile.record_implies("exact", time.perf_counter_ns() - start, hit)
+    if hit:
+        return True
+    for name, strategy in IMPLIES_STRATEGIES:
+        start = time.perf_counter_ns()
+        hit = strategy(c, r)
+        profile.record_implies(name, time.perf_counter_ns() - start, hit)
+        if hit:
+            return True
     return False
 
+
+def _log_parallel_errors(candidate_rows: List[Dict[str, Any]]) -> None:
+    for position, error in get_parallel_matcher().last_errors:
+        log.warning("Error matching listing", emoji="warning",
+                    listing_id=candidate_rows[position]["listing_id"], error=error)
+
+
+def _parallel_match(query: Dict[str, Any], candidate_rows: List[Dict[str, Any]],
+                    candidate_datas: List[Dict[str, Any]]) -> List[bool]:
+    """Boolean match flags from the process pool (errors logged per listing)."""
+    flags = get_parallel_matcher().match(query, candidate_datas, implies_fn=semantic_implies)
+    _log_parallel_errors(candidate_rows)
+    return flags
+
+
+def _parallel_top_similar(query: Dict[str, Any], candidate_rows: List[Dict[str, Any]],
+                          candidate_datas: List[Dict[str, Any]], positions: List[int]):
+    """Top-K similar (SimilarityScore, position) pairs from the process pool."""
+    results = get_parallel_matcher().top_similar(
+        query, candidate_datas, SIMILAR_MATCH_MAX_RESULTS, SIMILAR_MATCH_MIN_SCORE,
+        implies_fn=semantic_implies, positions=positions
+    )
+    _log_parallel_errors(candidate_rows)
+    return results
+
+
 class ListingRequest(BaseModel):
     listing: Dict[str, Any]
     user_id: Optional[str] = None  # Required for /ingest, optional for /search
@@ -419,6 +589,8 @@ class DualQueryRequest(BaseModel):
 class SearchAndMatchRequest(BaseModel):
     query: str
     user_id: str
+    bidirectional: bool = False  # Also check the candidate's requirements (M-18 to M-22)
+    profile: bool = False  # Return per-rule rejection counters and stage timings
 
 class StoreListingRequest(BaseModel):
     query: str
@@ -429,6 +601,7 @@ class SearchMatchDirectRequest(BaseModel):
     """Request model for /search-and-match-direct endpoint (bypasses GPT)."""
     listing_json: Dict[str, Any]  # Pre-formatted listing JSON (NEW schema format)
     user_id: str
+    profile: bool = False  # Return per-rule rejection counters and stage timings
 
 @app.get("/")
 def read_root():
@@ -465,8 +638,19 @@ async def ingest_endpoint(request: ListingRequest):
         # 2. Normalize
         listing_old = normalize_and_validate_v2(canonical_listing)
 
-        # 3. Ingest with user_id
+        # 3. Ingest with user_id (queued when async ingestion is enabled)
+        if ENABLE_ASYNC_INGESTION:
+            job = enqueue_ingestion(listing_old, request.user_id)
+            return {
+                "status": "accepted",
+                "listing_id": job["listing_id"],
+                "job_id": job["job_id"],
+                "message": "Listing normalized and queued for ingestion"
+            }
+
         listing_id, _ = ingest_listing(ingestion_clients, listing_old, user_id=request.user_id, verbose=True)
+        cache_new_listing(listing_id, listing_old, request.user_id)
+        percolate_new_listing(listing_id, listing_old, request.user_id)
 
         return {
             "status": "success",
@@ -480,6 +664,37 @@ async def ingest_endpoint(request: ListingRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ingest/status/{job_id}")
+def ingest_status_endpoint(job_id: str):
+    """Status of an asynchronously queued ingestion job."""
+    if not ENABLE_ASYNC_INGESTION:
+        raise HTTPException(status_code=404, detail="Asynchronous ingestion is disabled")
+    status = get_ingestion_queue().get_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job: {job_id}")
+    return status
+
+
+@app.get("/ingest/queue")
+def ingest_queue_endpoint():
+    """Ingestion queue depth and worker statistics."""
+    if not ENABLE_ASYNC_INGESTION:
+        return {"enabled": False}  # never open (create) the queue file
+    return {
+        "enabled": True,
+        **get_ingestion_queue().get_stats()
+    }
+
+@app.get("/match/predicate-stats")
+def predicate_stats_endpoint():
+    """Observed rejection rate and cost per intent/predicate (adaptive match order)."""
+    return get_predicate_stats().get_stats()
+
+@app.get("/match/profile-stats")
+def profile_stats_endpoint():
+    """Rejecting rule, stage and implies-strategy totals of profiled searches."""
+    return get_profile_totals().get_stats()
+
 @app.post("/search")
 async def search_endpoint(request: ListingRequest, limit: int = 10):
     check_service_health()
@@ -758,15 +973,21 @@ async def search_and_match_endpoint(request: SearchAndMatchRequest):
     Flow:
     1. Extract structured JSON from natural language query (GPT)
     2. Search database for matching listings (Qdrant + SQL)
-    3. Boolean match each candidate (listing_matches_v2)
+    3. Boolean match each candidate (compiled listing_matches_v2 plan)
     4. Store EVERYTHING in matches table (query + results)
     5. Return matches and query_json
 
     This endpoint ALWAYS stores search history (even if 0 matches found).
 
+    With bidirectional=True, both directions are evaluated in one pass over
+    the candidates; matched_listings carry a "reciprocal" flag and
+    reciprocal matches come first.
+
     Input:
         - query: Natural language query
         - user_id: User performing the search
+        - bidirectional: Optional, check candidates' requirements too
+        - profile: Optional, return rejecting rule / timing counters ("profile")
 
     Output:
         - match_id: UUID of matches table entry
@@ -793,69 +1014,93 @@ async def search_and_match_endpoint(request: SearchAndMatchRequest):
 
         # Step 4: Search database for candidates
         log.info("Searching database...", emoji="filter")
-        candidate_ids = retrieve_candidates(
+        candidate_rows = retrieve_candidate_rows(
             retrieval_clients,
             normalized_query,
             limit=100,
             verbose=True
         )
 
-        log.info("Found candidates", emoji="data", count=len(candidate_ids))
+        log.info("Found candidates", emoji="data", count=len(candidate_rows))
 
         # Step 4: Boolean match each candidate
         matched_listings = []
         matched_user_ids = []
         matched_listing_ids = []
 
-        # Track similar listings (when enabled)
+        # Track similar listings (when enabled); bounded top-K first, materialized after
         similar_listings = []
-
-        if candidate_ids:
-            # Fetch candidates from Supabase
-            intent = normalized_query.get("intent")
-            table_name = f"{intent}_listings"
-
-            log.info("Fetching candidates from table", emoji="search", table=table_name)
-
-            for listing_id in candidate_ids:
+        # Explain / profile mode: rejecting rule and timings per candidate
+        match_profile = MatchProfile() if request.profile else None
+        similar_top_k = SimilarTopK(normalized_query, SIMILAR_MATCH_MAX_RESULTS,
+                                    SIMILAR_MATCH_MIN_SCORE, implies_fn=semantic_implies,
+                                    profiler=match_profile)
+
+        # Bidirectional: one pass over the candidates, reciprocal first
+        reciprocity = {}
+        if request.bidirectional and candidate_rows:
+            bidirectional_rows = match_candidates_bidirectional(
+                normalized_query,
+                candidate_rows,
+                implies_fn=semantic_implies
+            )
+            reciprocity = {row["listing_id"]: row["reciprocal"] for row in bidirectional_rows}
+            candidate_rows = bidirectional_rows + [
+                row for row in candidate_rows if row["listing_id"] not in reciprocity
+            ]
+            log.info("Bidirectional matching", emoji="match", forward=len(reciprocity),
+                     reciprocal=sum(reciprocity.values()))
+
+        similar_positions = []  # process-pool backend: scored after the loop
+        parallel = (ENABLE_PARALLEL_MATCHING and not request.bidirectional and match_profile is None
+                    and get_parallel_matcher().should_parallelize(len(candidate_rows)))
+        if candidate_rows:
+            candidate_datas = [row.get("data") or {} for row in candidate_rows]
+            if parallel:
+                # Boolean match in the worker processes (flags in candidate order)
+                match_flags = _parallel_match(normalized_query, candidate_rows, candidate_datas)
+            elif not request.bidirectional and match_profile is None:
+                # Compile the query once; the plan only reads the candidate
+                match_plan = compile_match_plan(normalized_query, implies_fn=semantic_implies)
+                # Numeric constraints for all candidates at once (prunes before string/implication checks)
+                numeric_mask = match_plan.prune_mask(candidate_datas)
+            for position, candidate_row in enumerate(candidate_rows):
+                listing_id = candidate_row["listing_id"]
                 try:
-                    # Fetch from Supabase
-                    response = ingestion_clients.supabase.table(table_name).select("*").eq("id", listing_id).execute()
-
-                    if response.data and len(response.data) > 0:
-                        candidate_row = response.data[0]
+                    # Candidate data comes from the Qdrant payload
+                    # (batched Supabase fallback inside retrieve_candidate_rows)
+                    if candidate_row.get("data"):
                         candidate_data = candidate_row["data"]
                         candidate_user_id = candidate_row.get("user_id")
 
-                        # Boolean match
-                        is_match = listing_matches_v2(
-                            normalized_query,
-                            candidate_data,
-                            implies_fn=semantic_implies
-                        )
+                        # Boolean match (already evaluated in bidirectional mode)
+                        if request.bidirectional:
+                            is_match = listing_id in reciprocity
+                        elif parallel:
+                            is_match = match_flags[position]
+                        elif match_profile is not None:
+                            match_profile.candidate_id = listing_id
+                            is_match = listing_matches_v2(normalized_query, candidate_data, semantic_implies,
+                                                          profiler=match_profile)
+                        else:
+                            is_match = bool(numeric_mask[position]) and match_plan.matches(candidate_data)
 
                         if is_match:
                             # Exact match - compute bonus attributes if similar matching enabled
                             if ENABLE_SIMILAR_MATCHING:
-                                similarity_result = evaluate_similarity(
-                                    normalized_query,
-                                    candidate_data,
-                                    implies_fn=semantic_implies,
-                                    min_score=SIMILAR_MATCH_MIN_SCORE
-                                )
                                 matched_listings.append({
                                     "listing_id": listing_id,
                                     "user_id": candidate_user_id,
-                                    "data": candidate_data,
+                                    "data": plain_listing(candidate_data),
                                     "match_type": "exact",
                                     "similarity_score": 1.0,
-                                    "bonus_attributes": similarity_result.bonus_attributes
+                                    "bonus_attributes": compute_bonus_attributes(normalized_query, candidate_data)
                                 })
                             else:
                                 matched_listings.append({
                                     "listing_id": listing_id,
                                     "user_id": candidate_user_id,
-                                    "data": candidate_data
+                                    "data": plain_listing(candidate_data)
                                 })
 
                             if candidate_user_id:
@@ -863,36 +1108,42 @@ async def search_and_match_endpoint(request: SearchAndMatchRequest):
                             matched_listing_ids.append(listing_id)
 
                         elif ENABLE_SIMILAR_MATCHING:
-                            # Not an exact match - evaluate for similarity
-                            similarity_result = evaluate_similarity(
-                                normalized_query,
-                                candidate_data,
-                                implies_fn=semantic_implies,
-                                min_score=SIMILAR_MATCH_MIN_SCORE
-                            )
-
-                            if similarity_result.is_similar_match:
-                                similar_listings.append({
-                                    "listing_id": listing_id,
-                                    "user_id": candidate_user_id,
-                                    "data": candidate_data,
-                                    "match_type": "similar",
-                                    "similarity_score": similarity_result.similarity_score,
-                                    "satisfied_constraints": similarity_result.satisfied_constraints,
-                                    "unsatisfied_constraints": similarity_result.unsatisfied_constraints,
-                                    "smart_message": similarity_result.smart_message,
-                                    "recommendation": similarity_result.recommendation,
-                                    "bonus_attributes": similarity_result.bonus_attributes
-                                })
+                            # Not an exact match - score against the current top-K (explanations below)
+                            if parallel:
+                                similar_positions.append(position)
+                            else:
+                                similar_top_k.offer(candidate_data, position)
 
                 except Exception as e:
-                    log.warning("Error fetching/matching listing", emoji="warning",
+                    log.warning("Error matching listing", emoji="warning",
                                 listing_id=listing_id, error=str(e))
                     continue
 
-        # Sort similar listings by score (highest first) and limit
-        similar_listings.sort(key=lambda x: x["similarity_score"], reverse=True)
-        similar_listings = similar_listings[:SIMILAR_MATCH_MAX_RESULTS]
+        # Top-K similar listings (highest score first), explanations for those only
+        if parallel:
+            similar_results = _parallel_top_similar(normalized_query, candidate_rows, candidate_datas,
+                                                    similar_positions)
+        else:
+            similar_results = similar_top_k.results()
+        for similarity_score, position in similar_results:
+            candidate_row = candidate_rows[position]
+            similarity_result = materialize_similarity(normalized_query, candidate_row["data"], similarity_score)
+            similar_listings.append({
+                "listing_id": candidate_row["listing_id"],
+                "user_id": candidate_row.get("user_id"),
+                "data": plain_listing(candidate_row["data"]),
+                "match_type": "similar",
+                "similarity_score": similarity_result.similarity_score,
+                "satisfied_constraints": similarity_result.satisfied_constraints,
+                "unsatisfied_constraints": similarity_result.unsatisfied_constraints,
+                "smart_message": similarity_result.smart_message,
+                "recommendation": similarity_result.recommendation,
+                "bonus_attributes": similarity_result.bonus_attributes
+            })
+
+        if request.bidirectional:
+            for matched in matched_listings:
+                matched["reciprocal"] = reciprocity[matched["listing_id"]]
 
         # Step 5: Store query as a listing and create match records
         has_matches = len(matched_listings) > 0
@@ -903,6 +1154,13 @@ async def search_and_match_endpoint(request: SearchAndMatchRequest):
         query_listing_id, _ = ingest_listing(ingestion_clients, normalized_query, user_id=request.user_id, verbose=True)
         log.info("Query stored as listing", emoji="success", listing_id=query_listing_id)
 
+        # Keep the query as a standing request for listings stored later
+        if ENABLE_PERCOLATION:
+            try:
+                store_query(ingestion_clients.supabase, query_listing_id, normalized_query, user_id=request.user_id)
+            except Exception as e:
+                log.warning("Error storing query for prospective matching", emoji="warning", error=str(e))
+
         # Insert one match record per matched listing
         match_ids = []
         if has_matches:
@@ -915,7 +1173,7 @@ async def search_and_match_endpoint(request: SearchAndMatchRequest):
                     "user_b_id": matched.get("user_id") or request.user_id,
                     "match_score": 1.0,
                     "match_type": normalized_query.get("intent", "service"),
-                    "is_bidirectional": False,
+                    "is_bidirectional": matched.get("reciprocal", False),
                     "status": "pending"
                 }
                 try:
@@ -936,7 +1194,7 @@ async def search_and_match_endpoint(request: SearchAndMatchRequest):
         else:
             message = "No matches found. Your listing has been stored for future matching."
 
-        return {
+        response = {
             "status": "success",
             "listing_id": query_listing_id,
             "match_ids": match_ids,
@@ -951,6 +1209,10 @@ async def search_and_match_endpoint(request: SearchAndMatchRequest):
             "similar_listings": similar_listings,
             "message": message
         }
+        if match_profile is not None:
+            match_profile.export("/search-and-match")
+            response["profile"] = match_profile.to_dict()
+        return response
 
     except HTTPException:
         raise
@@ -967,7 +1229,7 @@ async def search_and_match_direct_endpoint(request: SearchMatchDirectRequest):
     Flow:
     1. Accept pre-formatted JSON directly (skip GPT extraction)
     2. Search database for matching listings (Qdrant + SQL)
-    3. Boolean match each candidate (listing_matches_v2)
+    3. Boolean match each candidate (compiled listing_matches_v2 plan)
     4. If ENABLE_SIMILAR_MATCHING: evaluate similarity for near-matches
     5. Return matches (does NOT store search history)
 
@@ -976,6 +1238,7 @@ async def search_and_match_direct_endpoint(request: SearchMatchDirectRequest):
     Input:
         - listing_json: Complete listing JSON (NEW schema format)
         - user_id: User performing the search
+        - profile: Optional, return rejecting rule / timing counters ("profile")
 
     Output:
         - has_matches: True/False
@@ -993,7 +1256,7 @@ async def search_and_match_direct_endpoint(request: SearchMatchDirectRequest):
         normalized_query = normalize_and_validate_v2(canonical_query)
 
         # Step 2: Search database for candidates
-        candidate_ids = retrieve_candidates(
+        candidate_rows = retrieve_candidate_rows(
             retrieval_clients,
             normalized_query,
             limit=100,
@@ -1005,51 +1268,66 @@ async def search_and_match_direct_endpoint(request: SearchMatchDirectRequest):
         matched_user_ids = []
         seen_user_ids = set()  # Track unique user_ids to avoid duplicates
 
-        # Track similar listings (when enabled)
+        # Track similar listings (when enabled); bounded top-K first, materialized after
         similar_listings = []
+        # Explain / profile mode: rejecting rule and timings per candidate
+        match_profile = MatchProfile() if request.profile else None
+        similar_top_k = SimilarTopK(normalized_query, SIMILAR_MATCH_MAX_RESULTS,
+                                    SIMILAR_MATCH_MIN_SCORE, implies_fn=semantic_implies,
+                                    profiler=match_profile)
+
+        candidate_datas = [row.get("data") or {} for row in candidate_rows]
+        similar_positions = []  # process-pool backend: scored after the loop
+        parallel = (ENABLE_PARALLEL_MATCHING and match_profile is None
+                    and get_parallel_matcher().should_parallelize(len(candidate_rows)))
+        if parallel:
+            # Boolean match in the worker processes (flags in candidate order)
+            match_flags = _parallel_match(normalized_query, candidate_rows, candidate_datas)
+        else:
+            # Compile the query once; the plan only reads the candidate
+            match_plan = compile_match_plan(normalized_query, implies_fn=semantic_implies)
+            # Numeric constraints for all candidates at once (prunes before string/implication checks)
+            numeric_mask = match_plan.prune_mask(candidate_datas)
 
-        intent = normalized_query.get("intent")
-        table_name = f"{intent}_listings"
-
-        for listing_id in candidate_ids:
+        for position, candidate_row in enumerate(candidate_rows):
+            listing_id = candidate_row["listing_id"]
             try:
-                # Fetch candidate listing from database
-                response = ingestion_clients.supabase.table(table_name).select("*").eq("id", listing_id).execute()
-
-                if response.data and len(response.data) > 0:
-                    row = response.data[0]
-                    candidate_data = row.get("data")
-                    candidate_user_id = row.get("user_id")
+                # Candidate data comes from the Qdrant payload
+                # (batched Supabase fallback inside retrieve_candidate_rows)
+                if candidate_row.get("data"):
+                    candidate_data = candidate_row["data"]
+                    candidate_user_id = candidate_row.get("user_id")
 
                     # Skip if we've already matched this user
                     if candidate_user_id in seen_user_ids:
                         continue
 
                     # Run boolean match
-                    is_match = listing_matches_v2(normalized_query, candidate_data, implies_fn=semantic_implies)
+                    if parallel:
+                        is_match = match_flags[position]
+                    elif match_profile is not None:
+                        match_profile.candidate_id = listing_id
+                        is_match = listing_matches_v2(normalized_query, candidate_data, semantic_implies,
+                                                      profiler=match_profile)
+                    else:
+                        is_match = bool(numeric_mask[position]) and match_plan.matches(candidate_data)
 
                     if is_match:
                         # Exact match - compute bonus attributes if similar matching enabled
                         if ENABLE_SIMILAR_MATCHING:
-                            similarity_result = evaluate_similarity(
-                                normalized_query,
-                                candidate_data,
-                                implies_fn=semantic_implies,
-                                min_score=SIMILAR_MATCH_MIN_SCORE
-                            )
                             matched_listings.append({
                                 "listing_id": listing_id,
                                 "user_id": candidate_user_id,
-                                "data": candidate_data,
+                                "data": plain_listing(candidate_data),
                                 "match_type": "exact",
                                 "similarity_score": 1.0,
-                                "bonus_attributes": similarity_result.bonus_attributes
+                                "bonus_attributes": compute_bonus_attributes(normalized_query, candidate_data)
                             })
                         else:
                             matched_listings.append({
                                 "listing_id": listing_id,
                                 "user_id": candidate_user_id,
-                                "data": candidate_data
+                                "data": plain_listing(candidate_data)
                             })
 
                         if candidate_user_id:
@@ -1057,36 +1335,38 @@ async def search_and_match_direct_endpoint(request: SearchMatchDirectRequest):
                             seen_user_ids.add(candidate_user_id)  # Mark as seen
 
                     elif ENABLE_SIMILAR_MATCHING:
-                        # Not an exact match - evaluate for similarity
-                        similarity_result = evaluate_similarity(
-                            normalized_query,
-                            candidate_data,
-                            implies_fn=semantic_implies,
-                            min_score=SIMILAR_MATCH_MIN_SCORE
-                        )
-
-                        if similarity_result.is_similar_match:
-                            similar_listings.append({
-                                "listing_id": listing_id,
-                                "user_id": candidate_user_id,
-                                "data": candidate_data,
-                                "match_type": "similar",
-                                "similarity_score": similarity_result.similarity_score,
-                                "satisfied_constraints": similarity_result.satisfied_constraints,
-                                "unsatisfied_constraints": similarity_result.unsatisfied_constraints,
-                                "smart_message": similarity_result.smart_message,
-                                "recommendation": similarity_result.recommendation,
-                                "bonus_attributes": similarity_result.bonus_attributes
-                            })
+                        # Not an exact match - score against the current top-K (explanations below)
+                        if parallel:
+                            similar_positions.append(position)
+                        else:
+                            similar_top_k.offer(candidate_data, position)
 
             except Exception as e:
-                log.warning("Error fetching/matching listing", emoji="warning",
+                log.warning("Error matching listing", emoji="warning",
                             listing_id=listing_id, error=str(e))
                 continue
 
-        # Sort similar listings by score (highest first) and limit
-        similar_listings.sort(key=lambda x: x["similarity_score"], reverse=True)
-        similar_listings = similar_listings[:SIMILAR_MATCH_MAX_RESULTS]
+        # Top-K similar listings (highest score first), explanations for those only
+        if parallel:
+            similar_results = _parallel_top_similar(normalized_query, candidate_rows, candidate_datas,
+                                                    similar_positions)
+        else:
+            similar_results = similar_top_k.results()
+        for similarity_score, position in similar_results:
+            candidate_row = candidate_rows[position]
+            similarity_result = materialize_similarity(normalized_query, candidate_row["data"], similarity_score)
+            similar_listings.append({
+                "listing_id": candidate_row["listing_id"],
+                "user_id": candidate_row.get("user_id"),
+                "data": plain_listing(candidate_row["data"]),
+                "match_type": "similar",
+                "similarity_score": similarity_result.similarity_score,
+                "satisfied_constraints": similarity_result.satisfied_constraints,
+                "unsatisfied_constraints": similarity_result.unsatisfied_constraints,
+                "smart_message": similarity_result.smart_message,
+                "recommendation": similarity_result.recommendation,
+                "bonus_attributes": similarity_result.bonus_attributes
+            })
 
         has_matches = len(matched_listings) > 0
         match_count = len(matched_listings)
@@ -1102,7 +1382,7 @@ async def search_and_match_direct_endpoint(request: SearchMatchDirectRequest):
         else:
             message = "No matches found"
 
-        return {
+        response = {
             "status": "success",
             "has_matches": has_matches,
             "match_count": match_count,
@@ -1114,6 +1394,10 @@ async def search_and_match_direct_endpoint(request: SearchMatchDirectRequest):
             "similar_listings": similar_listings,
             "message": message
         }
+        if match_profile is not None:
+            match_profile.export("/search-and-match-direct")
+            response["profile"] = match_profile.to_dict()
+        return response
 
     except HTTPException:
         raise
@@ -1134,9 +1418,10 @@ async def store_listing_endpoint(request: StoreListingRequest):
     4. Store in appropriate listings table (with user_id and optional match_id)
     5. Generate embedding
     6. Store embedding in Qdrant
-    7. Return listing_id and extracted_json
+    7. Match against stored /search-and-match queries (matches rows)
+    8. Return listing_id and extracted_json
 
-    This endpoint ONLY stores. It does NOT search or match.
+    This endpoint does NOT search existing listings.
 
     Input:
         - query: Natural language query
@@ -1162,14 +1447,29 @@ async def store_listing_endpoint(request: StoreListingRequest):
         canonical_store = canonicalize_listing(extracted_json)
         normalized_listing = normalize_and_validate_v2(canonical_store)
 
-        # Step 2: Ingest (stores in Supabase + Qdrant)
-        listing_id = str(uuid.uuid4())
-
         # Get intent for table selection
         intent = normalized_listing.get("intent")
         if not intent:
             raise ValueError("Listing missing 'intent' field")
 
+        # Async mode: acknowledge now, workers write Supabase + Qdrant
+        if ENABLE_ASYNC_INGESTION:
+            job = enqueue_ingestion(normalized_listing, request.user_id, request.match_id)
+            return {
+                "status": "accepted",
+                "listing_id": job["listing_id"],
+                "job_id": job["job_id"],
+                "user_id": request.user_id,
+                "query": request.query,
+                "extracted_json": extracted_json,
+                "intent": intent,
+                "match_id": request.match_id,
+                "message": "Listing queued for storage. Poll /ingest/status/{job_id} for progress."
+            }
+
+        # Step 2: Ingest (stores in Supabase + Qdrant)
+        listing_id = str(uuid.uuid4())
+
         table_name = f"{intent}_listings"
 
         # Prepare data with user_id and match_id
@@ -1185,37 +1485,24 @@ async def store_listing_endpoint(request: StoreListingRequest):
         log.info("Stored in Supabase", emoji="success", listing_id=listing_id)
 
         # Step 3: Generate and store embedding in Qdrant
+        # (payload carries user_id + listing so searches skip Supabase)
         embedding_text = build_embedding_text(normalized_listing)
-        embedding = ingestion_clients.embedding_model.encode(embedding_text).tolist()
-
-        # Select Qdrant collection
-        collection_name = f"{intent}_vectors"
-
-        # Build payload
-        payload = {
-            "listing_id": listing_id,
-            "intent": intent
-        }
-
-        if intent in ["product", "service"]:
-            payload["domain"] = normalized_listing.get("domain", [])
-        elif intent == "mutual":
-            payload["category"] = normalized_listing.get("category", [])
-
-        # Store in Qdrant
-        from qdrant_client.models import PointStruct
-        point = PointStruct(
-            id=listing_id,
-            vector=embedding,
-            payload=payload
-        )
-
-        log.info("Storing embedding in collection...", emoji="vector", collection=collection_name)
-        ingestion_clients.qdrant.upsert(
-            collection_name=collection_name,
-            points=[point]
+        embedding = generate_embedding(ingestion_clients.embedding_model, embedding_text)
+
+        log.info("Storing embedding in collection...", emoji="vector", collection=f"{intent}_vectors")
+        insert_to_qdrant(
+            ingestion_clients.qdrant,
+            listing_id,
+            normalized_listing,
+            embedding,
+            user_id=request.user_id,
+            is_new=True
         )
         log.info("Stored in Qdrant", emoji="success")
+        cache_new_listing(listing_id, normalized_listing, request.user_id)
+
+        # Step 4: Notify stored queries this listing satisfies
+        prospective_match_ids = percolate_new_listing(listing_id, normalized_listing, request.user_id)
 
         return {
             "status": "success",
@@ -1225,6 +1512,7 @@ async def store_listing_endpoint(request: StoreListingRequest):
             "extracted_json": extracted_json,
             "intent": intent,
             "match_id": request.match_id,
+            "prospective_match_ids": prospective_match_ids,
             "message": f"Listing stored successfully. It will be visible to future searches."
         }
 
@@ -1,2 +1,11 @@
-from matching.listing_matcher_v2 import listing_matches_v2
-from matching.similarity_scorer import evaluate_similarity, SimilarityResult
+from matching.listing_matcher_v2 import listing_matches_v2, match_candidates_bidirectional
+from matching.match_plan import MatchPlan, compile_match_plan
+from matching.similarity_scorer import (
+    evaluate_similarity,
+    evaluate_similarity_batch,
+    SimilarTopK,
+    materialize_similarity,
+    score_similarity,
+    SimilarityResult,
+    SimilarityScore,
+)
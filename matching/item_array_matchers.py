@@ -22,8 +22,13 @@ Matching Semantics:
 - Failure: any required item without valid candidate → FAIL
 """
 
-from typing import List, Dict, Set, Any, Callable
-from matching.item_matchers import item_matches, ImplicationFn
+from typing import List, Dict, Set, Any, Callable, Optional, Tuple
+from matching.item_matchers import (
+    item_matches,
+    match_item_categorical,
+    match_item_numeric,
+    ImplicationFn,
+)
 
 
 # ============================================================================
@@ -66,6 +71,11 @@ we have
         - Keys are NOT extracted (only values)
         - Already normalized by Phase 2.1 (lowercase, trimmed)
     """
+    # Compact listings (schema/compact_listing.py) carry the flattened set
+    precomputed = getattr(item, "flat_values", None)
+    if precomputed is not None:
+        return precomputed
+
     values = set()
 
     def extract_strings(obj: Any) -> None:
@@ -184,6 +194,77 @@ def violates_item_exclusions(
     return False
 
 
+# ============================================================================
+# CANDIDATE ITEM INDEX (BY TYPE)
+# ============================================================================
+
+class CandidateItemIndex:
+    """
+    Candidate items grouped by type, built once per candidate listing.
+
+    - by_type: type → positions in candidate_items (original order)
+    - Flatten(candidate) for M-12 computed at most once per item
+    - implies_fn(candidate_type, required_type) evaluated once per
+      distinct type pair
+
+    A required item then only visits same-type candidates plus the
+    candidate types that imply its type (M-07), instead of all of them.
+
+    linear_only: some candidate has no (hashable) type; callers fall back
+    to the plain scan so errors surface exactly as before.
+    """
+
+    __slots__ = ("items", "by_type", "linear_only", "_values", "_implied")
+
+    def __init__(self, candidate_items: List[Dict[str, Any]]):
+        self.items = candidate_items
+        self.by_type: Dict[str, List[int]] = {}
+        self.linear_only = False
+        self._values: Dict[int, Set[str]] = {}
+        self._implied: Dict[Tuple[str, str], bool] = {}
+        try:
+            for position, item in enumerate(candidate_items):
+                if "type" not in item:
+                    self.linear_only = True
+                    break
+                self.by_type.setdefault(item["type"], []).append(position)
+        except TypeError:  # unhashable type / non-dict item
+            self.linear_only = True
+
+    def values(self, position: int) -> Set[str]:
+        """Flatten(candidate_items[position]), cached."""
+        values = self._values.get(position)
+        if values is None:
+            values = self._values[position] = flatten_item_values(self.items[position])
+        return values
+
+    def same_type(self, required_type: str) -> List[int]:
+        """Positions whose type equals required_type."""
+        return self.by_type.get(required_type, [])
+
+    def implied_types(self, required_type: str, implies_fn: ImplicationFn = None) -> List[int]:
+        """
+        Positions of OTHER types that imply required_type (M-07 fallback).
+
+        Only called when no same-type candidate matched, so implies_fn
+        runs once per distinct candidate type at most.
+        """
+        if implies_fn is None:
+            return []
+        positions: List[int] = []
+        for candidate_type, group in self.by_type.items():
+            if candidate_type == required_type:
+                continue
+            key = (candidate_type, required_type)
+            implied = self._implied.get(key)
+            if implied is None:
+                implied = self._implied[key] = bool(implies_fn(candidate_type, required_type))
+            if implied:
+                positions.extend(group)
+        positions.sort()
+        return positions
+
+
 # ============================================================================
 # REQUIRED ITEM MATCHING (SINGLE)
 # ============================================================================
@@ -191,7 +272,8 @@ def violates_item_exclusions(
 def required_item_has_match(
     required_item: Dict[str, Any],
     candidate_items: List[Dict[str, Any]],
-    implies_fn: ImplicationFn = None
+    implies_fn: ImplicationFn = None,
+    index: Optional[CandidateItemIndex] = None
 ) -> bool:
     """
     Check if a single required item has at least one valid matching candidate.
@@ -211,6 +293,8 @@ and also the thing is
         required_item: Single required item from A.items
         candidate_items: All candidate items from B.items
         implies_fn: Optional term implication function (passed to item_matches)
+        index: Optional CandidateItemIndex over candidate_items (built here
+               if omitted); only same-type / implied-type candidates are visited
 
     Returns:
         True if at least one valid candidate found, False otherwise
@@ -250,7 +334,42 @@ and also the thing is
     if not candidate_items:
         return False
 
-    # Try to find at least one valid candidate
+    if index is None:
+        index = CandidateItemIndex(candidate_items)
+    if index.linear_only or "type" not in required_item:
+        return _scan_candidates(required_item, candidate_items, implies_fn)
+
+    required_type = required_item["type"]
+    try:
+        same_type = index.same_type(required_type)
+    except TypeError:  # unhashable required type
+        return _scan_candidates(required_item, candidate_items, implies_fn)
+
+    required_exclusions = required_item.get("itemexclusions", [])
+
+    def valid(position: int) -> bool:
+        # M-12: exclusions against the cached Flatten(candidate)
+        if required_exclusions:
+            candidate_values = index.values(position)
+            if any(exclusion in candidate_values for exclusion in required_exclusions):
+                return False
+        # M-08 to M-11 (type already established by the index)
+        candidate_item = candidate_items[position]
+        return (match_item_categorical(required_item, candidate_item, implies_fn)
+                and match_item_numeric(required_item, candidate_item))
+
+    # M-07: same-type candidates first, then types that imply the required type
+    if any(valid(position) for position in same_type):
+        return True
+    return any(valid(position) for position in index.implied_types(required_type, implies_fn))
+
+
+def _scan_candidates(
+    required_item: Dict[str, Any],
+    candidate_items: List[Dict[str, Any]],
+    implies_fn: ImplicationFn = None
+) -> bool:
+    """Plain O(candidates) scan (items without a usable type)."""
     for candidate_item in candidate_items:
         # M-12: Check exclusions FIRST (cheap, strict)
         if violates_item_exclusions(required_item, candidate_item):
@@ -364,8 +483,10 @@ def all_required_items_match(
         return False
 
     # Check each required item has at least one valid match
+    # (one type index over the candidates, shared by all required items)
+    index = CandidateItemIndex(candidate_items)
     for required_item in required_items:
-        if not required_item_has_match(required_item, candidate_items, implies_fn):
+        if not required_item_has_match(required_item, candidate_items, implies_fn, index):
             # This required item has no valid match → FAIL immediately
             return False
 
@@ -357,6 +357,11 @@ def _extract_candidate_ranges(candidate_item: Item) -> Dict[str, Range]:
     """
     from matching.numeric_constraints import NEGATIVE_INFINITY, POSITIVE_INFINITY
 
+    # Compact listings (schema/compact_listing.py) carry the extracted ranges
+    precomputed = getattr(candidate_item, "numeric_ranges", None)
+    if precomputed is not None:
+        return precomputed
+
     candidate_min = candidate_item.get("min", {})
     candidate_max = candidate_item.get("max", {})
     candidate_range = candidate_item.get("range", {})
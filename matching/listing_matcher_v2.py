@@ -24,10 +24,12 @@ Author: Claude (Execution Engine V2)
 Date: 2026-01-13
 """
 
-from typing import Callable, Dict, List, Optional, Any
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Any, Tuple
 from matching.item_array_matchers import all_required_items_match
-from matching.other_self_matchers import match_other_to_self
+from matching.other_self_matchers import match_other_to_self, match_self_to_other
 from matching.location_matcher_v2 import match_location_v2
+from matching.match_profiler import diagnose_items, diagnose_location, diagnose_other_self
 
 # ============================================================================
 # TYPE ALIASES
@@ -35,6 +37,8 @@ from matching.location_matcher_v2 import match_location_v2
 
 ImplicationFn = Callable[[str, str], bool]
 
+log = logging.getLogger(__name__)
+
 
 # ============================================================================
 # PRIMARY FUNCTION
@@ -42,7 +46,8 @@ ImplicationFn = Callable[[str, str], bool]
 
 def listing_matches_v2(A: Dict[str, Any],
                        B: Dict[str, Any],
-                       implies_fn: Optional[ImplicationFn] = None) -> bool:
+                       implies_fn: Optional[ImplicationFn] = None,
+                       profiler: Optional[Any] = None) -> bool:
     """
     Determine if listing B satisfies listing A's requirements (V2).
 
@@ -67,6 +72,8 @@ def listing_matches_v2(A: Dict[str, Any],
         A: Required listing (requester's requirements) - transformed to OLD format
         B: Candidate listing (candidate's offering) - transformed to OLD format
         implies_fn: Optional term implication function for categorical matching
+        profiler: Optional MatchProfile (matching/match_profiler.py); records
+                  the rejecting rule and per-stage timing for B
 
     Returns:
         True if B satisfies ALL A's constraints, False otherwise
@@ -74,7 +81,26 @@ def listing_matches_v2(A: Dict[str, Any],
     Raises:
         TypeError: If required fields are missing (programmer error)
     """
-
+    if profiler is None:
+        return _listing_matches_v2(A, B, implies_fn, None)
+
+    stages = profiler.start_match()
+    matched = None
+    try:
+        matched = _listing_matches_v2(A, B, implies_fn, stages)
+        return matched
+    finally:
+        profiler.finish_match(stages, matched)
+
+
+def _listing_matches_v2(A: Dict[str, Any],
+                        B: Dict[str, Any],
+                        implies_fn: Optional[ImplicationFn],
+                        stages: Optional[Any]) -> bool:
+    """
+    Body of listing_matches_v2. stages (MatchStages, profile mode only)
+    is lapped after each stage and told the rule that rejected B.
+    """
     # ========================================================================
     # STEP 1: INTENT GATE (M-01, M-02, M-03, M-04)
     # ========================================================================
@@ -83,6 +109,8 @@ def listing_matches_v2(A: Dict[str, Any],
     # Semantics: A.intent = B.intent
     # Both listings must have the same intent type
     if A["intent"] != B["intent"]:
+        if stages is not None:
+            stages.reject("intent", "M-01")
         return False  # Intent mismatch
 
     # M-02, M-03: SubIntent Rules (depends on intent type)
@@ -94,6 +122,8 @@ def listing_matches_v2(A: Dict[str, Any],
         # Semantics: A.subintent ≠ B.subintent
         # For product/service: buyer/seller, seeker/provider must be inverse
         if A["subintent"] == B["subintent"]:
+            if stages is not None:
+                stages.reject("intent", "M-02")
             return False  # Same subintent (both buyers or both sellers)
 
     elif intent == "mutual":
@@ -101,12 +131,17 @@ def listing_matches_v2(A: Dict[str, Any],
         # Semantics: A.subintent = B.subintent
         # For mutual: both must be "connect"
         if A["subintent"] != B["subintent"]:
+            if stages is not None:
+                stages.reject("intent", "M-03")
             return False  # Different subintent
 
     else:
         # Unknown intent type (should never happen if schema normalized)
         raise TypeError(f"Unknown intent type: {intent}")
 
+    if stages is not None:
+        stages.lap("intent")
+
     # ========================================================================
     # STEP 2: DOMAIN / CATEGORY GATE (M-05, M-06)
     # ========================================================================
@@ -116,6 +151,8 @@ def listing_matches_v2(A: Dict[str, Any],
         # Semantics: A.domain ∩ B.domain ≠ ∅
         # At least one common domain required
         if not _has_intersection(A["domain"], B["domain"]):
+            if stages is not None:
+                stages.reject("scope", "M-05")
             return False  # No common domain
 
     elif intent == "mutual":
@@ -123,8 +160,13 @@ def listing_matches_v2(A: Dict[str, Any],
         # Semantics: A.category ∩ B.category ≠ ∅
         # At least one common category required
         if not _has_intersection(A["category"], B["category"]):
+            if stages is not None:
+                stages.reject("scope", "M-06")
             return False  # No common category
 
+    if stages is not None:
+        stages.lap("scope")
+
     # ========================================================================
     # STEP 3: ITEMS MATCHING (M-07 to M-12 via Phase 2.4)
     # ========================================================================
@@ -138,7 +180,11 @@ def listing_matches_v2(A: Dict[str, Any],
         # Uses: all_required_items_match() from Phase 2.4
         # Enforces: M-07 to M-12 (type, categorical, numeric, exclusions)
         if not all_required_items_match(A["items"], B["items"], implies_fn):
+            if stages is not None:
+                stages.reject("items", diagnose_items, A["items"], B["items"], implies_fn)
             return False  # Items requirements not satisfied
+        if stages is not None:
+            stages.lap("items")
 
     # ========================================================================
     # STEP 4: OTHER → SELF CONSTRAINTS (M-13 to M-17 via Phase 2.5)
@@ -148,7 +194,11 @@ def listing_matches_v2(A: Dict[str, Any],
     # Uses: match_other_to_self() from Phase 2.5
     # Enforces: M-13 to M-17 (categorical, numeric, otherexclusions)
     if not match_other_to_self(A["other"], B["self"], implies_fn):
+        if stages is not None:
+            stages.reject("other_self", diagnose_other_self, A["other"], B["self"], implies_fn)
         return False  # Other/self requirements not satisfied
+    if stages is not None:
+        stages.lap("other_self")
 
     # ========================================================================
     # STEP 5: LOCATION CONSTRAINTS (M-23 to M-28 via Phase 2.6 V2)
@@ -157,7 +207,11 @@ def listing_matches_v2(A: Dict[str, Any],
     # V2 Change: Use simplified location matching
     # Check if B.location matches A.location requirements
     if not _match_location_v2(A, B):
+        if stages is not None:
+            stages.reject("location", diagnose_location, A, B)
         return False  # Location requirements not satisfied
+    if stages is not None:
+        stages.lap("location")
 
     # ========================================================================
     # ALL CONSTRAINTS SATISFIED
@@ -166,10 +220,107 @@ def listing_matches_v2(A: Dict[str, Any],
     return True
 
 
+# ============================================================================
+# BIDIRECTIONAL MODE (M-29)
+# ============================================================================
+
+def reverse_other_self_match(A: Dict[str, Any],
+                             B: Dict[str, Any],
+                             implies_fn: Optional[ImplicationFn] = None) -> bool:
+    """
+    M-18 to M-22: B.other requirements satisfied by A.self (ReverseMatch(B,A)).
+
+    match_self_to_other() reads the required side from a self-shaped
+    object (with "selfexclusions"), so B.other is passed in that shape.
+    """
+    B_other = B["other"]
+    required = {
+        "categorical": B_other["categorical"],
+        "min": B_other["min"],
+        "max": B_other["max"],
+        "range": B_other["range"],
+        "selfexclusions": B_other["otherexclusions"],
+    }
+    return match_self_to_other(A["self"], required, implies_fn)
+
+
+def listing_matches_bidirectional(A: Dict[str, Any],
+                                  B: Dict[str, Any],
+                                  implies_fn: Optional[ImplicationFn] = None) -> Tuple[bool, bool]:
+    """
+    Evaluate both directions for one pair.
+
+    Returns:
+        (forward, reverse): forward = listing_matches_v2(A, B);
+        reverse = M-18 to M-22 (only evaluated when forward passes)
+    """
+    if not listing_matches_v2(A, B, implies_fn):
+        return False, False
+    return True, reverse_other_self_match(A, B, implies_fn)
+
+
+def match_candidates_bidirectional(A: Dict[str, Any],
+                                   candidates: Iterable[Dict[str, Any]],
+                                   implies_fn: Optional[ImplicationFn] = None,
+                                   require_reciprocal: bool = False) -> List[Dict[str, Any]]:
+    """
+    Bidirectional match over a candidate set in one pass.
+
+    Candidate data is loaded once and implication results are memoized
+    across candidates and both directions.
+
+    Args:
+        A: Requester listing (transformed to OLD format)
+        candidates: Candidate rows ({"data": listing, ...}, e.g. from
+            retrieve_candidate_rows)
+        implies_fn: Optional term implication function
+        require_reciprocal: Drop forward-only matches (M-29 for mutual)
+
+    Returns:
+        Forward matches as copies of the candidate rows with "reciprocal"
+        set, reciprocal matches first (candidate order kept otherwise).
+        A candidate whose evaluation raises is logged and left out.
+    """
+    cached_implies = _memoize_implies(implies_fn) if implies_fn else None
+
+    reciprocal = []
+    forward_only = []
+    for row in candidates:
+        B = row.get("data")
+        if not B:
+            continue
+        try:
+            forward, reverse = listing_matches_bidirectional(A, B, cached_implies)
+        except Exception as e:
+            log.warning("Error matching listing %s bidirectionally: %s", row.get("listing_id"), e)
+            continue
+        if not forward:
+            continue
+        if reverse:
+            reciprocal.append(dict(row, reciprocal=True))
+        elif not require_reciprocal:
+            forward_only.append(dict(row, reciprocal=False))
+
+    return reciprocal + forward_only
+
+
 # ============================================================================
 # INTERNAL HELPER FUNCTIONS
 # ============================================================================
 
+def _memoize_implies(implies_fn: ImplicationFn) -> ImplicationFn:
+    """Wrap implies_fn with a per-pass result cache."""
+    results: Dict[Tuple[str, str], bool] = {}
+
+    def cached(candidate_val: str, required_val: str) -> bool:
+        key = (candidate_val, required_val)
+        if key not in results:
+            results[key] = implies_fn(candidate_val, required_val)
+        return results[key]
+
+    return cached
+
+
 def _has_intersection(list_a: List[str], list_b: List[str]) -> bool:
     """
     Check if two lists have at least one common element.
@@ -0,0 +1,286 @@
+"""
+VRIDDHI MATCHING SYSTEM - VECTORIZED LOCATION ENGINE
+Phase 2.6b
+
+Purpose: Evaluate the location rules (M-23 to M-28, near_me / explicit)
+for MANY candidates at once
+Scope: Pruning only - survivors still go through match_location_v2 /
+       MatchPlan.matches for the exact (scalar) verdict
+
+match_location_v2 resolves the query's point and geocodes every excluded
+name again for every candidate, then computes one scalar haversine at a
+time. LocationQuery resolves the query side ONCE (required point,
+exclusion points) and classifies a whole candidate batch:
+
+- Candidate points come from precomputed coordinates only (set by
+  canonicalization); candidates without them are never decided here, so
+  a batch never geocodes candidate names
+- GeoGrid buckets the batch's points into LOCATION_GRID_CELL_DEG cells;
+  a cell whose every point is certainly inside (or outside) the radius
+  is decided from one distance to its center, only points in boundary
+  cells get an exact haversine (NumPy, vectorized)
+- Exclusion points are checked against the in-range candidates in one
+  (candidates x exclusions) distance matrix
+
+Verdicts per candidate: MATCH / NO_MATCH (same result as
+match_location_v2) or UNDECIDED (route / target_only modes, missing
+coordinates, candidate-side exclusions, distances within
+DISTANCE_EPSILON_KM of a threshold). Query points are only resolved
+(geocoded) once some candidate in a batch has coordinates.
+
+Usage:
+    query = LocationQuery(A["location"], A["locationmode"], A["locationexclusions"])
+    verdicts = query.verdicts(candidates)   # np.int8: 1 / 0 / -1
+    keep = verdicts != NO_MATCH
+"""
+
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from matching.location_matcher_v2 import (
+    DEFAULT_MAX_DISTANCE_KM,
+    _extract_location_name,
+    _get_canonical_name,
+    _get_coordinates,
+)
+from services.external.geocoding_service import get_geocoding_service
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Prune candidates by location in MatchPlan.prune_mask (1=enabled)
+ENABLE_LOCATION_PRUNING = os.environ.get("ENABLE_LOCATION_PRUNING", "1") == "1"
+
+# Grid cell size in degrees (0.25° ≈ 28 km of latitude)
+LOCATION_GRID_CELL_DEG = float(os.environ.get("LOCATION_GRID_CELL_DEG", "0.25"))
+
+# Distances this close to a threshold are left to the scalar matcher
+DISTANCE_EPSILON_KM = 1e-6
+
+EARTH_RADIUS_KM = 6371.0
+
+MATCH, NO_MATCH, UNDECIDED = 1, 0, -1
+
+
+# ============================================================================
+# DISTANCES
+# ============================================================================
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Haversine distance in km; same formula as GeocodingService, broadcast over arrays."""
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    delta_lat = np.radians(np.subtract(lat2, lat1))
+    delta_lng = np.radians(np.subtract(lng2, lng1))
+
+    a = (
+        np.sin(delta_lat / 2) ** 2 +
+        np.cos(lat1_rad) * np.cos(lat2_rad) *
+        np.sin(delta_lng / 2) ** 2
+    )
+    a = np.clip(a, 0.0, 1.0)
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class GeoGrid:
+    """
+    Points bucketed into cell_deg x cell_deg lat/lng cells.
+
+    Every point of a cell lies within cell_radius_km of the cell center
+    (meridian leg <= half a cell, parallel leg <= half a cell at cos <= 1),
+    so by the triangle inequality a cell is entirely inside a radius when
+    d(center) + cell_radius_km <= radius, entirely outside when
+    d(center) - cell_radius_km > radius.
+    """
+
+    __slots__ = ("lat", "lng", "cell_of_point", "center_lat", "center_lng", "cell_radius_km")
+
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, cell_deg: float = LOCATION_GRID_CELL_DEG):
+        self.lat = lat
+        self.lng = lng
+        cells = np.stack([np.floor(lat / cell_deg), np.floor(lng / cell_deg)], axis=1)
+        unique_cells, self.cell_of_point = np.unique(cells, axis=0, return_inverse=True)
+        self.cell_of_point = self.cell_of_point.reshape(-1)
+        self.center_lat = (unique_cells[:, 0] + 0.5) * cell_deg
+        self.center_lng = (unique_cells[:, 1] + 0.5) * cell_deg
+        self.cell_radius_km = EARTH_RADIUS_KM * math.radians(cell_deg)
+
+    def within(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        """
+        Per point: MATCH (d <= radius), NO_MATCH (d > radius) or UNDECIDED
+        (within DISTANCE_EPSILON_KM of radius).
+        """
+        center_distance = haversine_km(lat, lng, self.center_lat, self.center_lng)
+        cell_state = np.full(center_distance.shape, UNDECIDED, dtype=np.int8)
+        cell_state[center_distance + self.cell_radius_km < radius_km - DISTANCE_EPSILON_KM] = MATCH
+        cell_state[center_distance - self.cell_radius_km > radius_km + DISTANCE_EPSILON_KM] = NO_MATCH
+
+        state = cell_state[self.cell_of_point]
+        boundary = np.flatnonzero(state == UNDECIDED)
+        if boundary.size:
+            distance = haversine_km(lat, lng, self.lat[boundary], self.lng[boundary])
+            exact = np.full(boundary.size, UNDECIDED, dtype=np.int8)
+            exact[distance < radius_km - DISTANCE_EPSILON_KM] = MATCH
+            exact[distance > radius_km + DISTANCE_EPSILON_KM] = NO_MATCH
+            state[boundary] = exact
+        return state
+
+
+# ============================================================================
+# CANDIDATE BATCH
+# ============================================================================
+
+def _is_point(coords: Any) -> bool:
+    return (isinstance(coords, dict) and type(coords.get("lat")) in (int, float)
+            and type(coords.get("lng")) in (int, float))
+
+
+def _candidate_point(location: Any) -> Optional[Tuple[float, float]]:
+    """Precomputed (lat, lng) of a candidate location, or None (never geocodes)."""
+    if not isinstance(location, dict) or not _is_point(location.get("coordinates")):
+        return None
+    return location["coordinates"]["lat"], location["coordinates"]["lng"]
+
+
+def _normalized_mode(mode: Any) -> Optional[str]:
+    """As match_location_v2 normalizes modes; None where it would raise."""
+    if not mode:
+        return "near_me"
+    return mode.lower().strip() if isinstance(mode, str) else None
+
+
+# ============================================================================
+# LOCATION QUERY
+# ============================================================================
+
+class LocationQuery:
+    """
+    Query side of match_location_v2, resolved once per search.
+
+    verdicts(candidates) classifies a batch of candidate listings
+    (location, locationmode, locationexclusions).
+    """
+
+    def __init__(
+        self,
+        required_location: Any,
+        required_mode: Any,
+        required_exclusions: List[str],
+        max_distance_km: float = DEFAULT_MAX_DISTANCE_KM,
+        cell_deg: float = LOCATION_GRID_CELL_DEG
+    ):
+        self.required_location = required_location
+        self.required_mode = _normalized_mode(required_mode)
+        self.required_exclusions = required_exclusions or []
+        self.max_distance_km = max_distance_km
+        self.cell_deg = cell_deg
+
+        self.required_name = _extract_location_name(required_location)
+        # Only the near_me / explicit path (match_location_simple) is decided here
+        self.decidable = self.required_mode not in (None, "global", "route", "target_only")
+
+        self._resolved = False
+        self._point: Optional[Tuple[float, float]] = None
+        self._exclusion_lat = np.empty(0)
+        self._exclusion_lng = np.empty(0)
+
+    def _resolve(self) -> None:
+        """Required point and exclusion points (geocoded at most once each)."""
+        if self._resolved:
+            return
+        geocoding = get_geocoding_service()
+        self._resolved = True
+        coords = _get_coordinates(self.required_location, geocoding)
+        points = [_get_coordinates(name, geocoding) for name in self.required_exclusions]
+        points = [p for p in points if p is not None]
+        if coords is None or not _is_point(coords) or not all(_is_point(p) for p in points):
+            return  # undecided: the scalar path geocodes / raises as before
+        self._point = (coords["lat"], coords["lng"])
+        self._exclusion_lat = np.array([p["lat"] for p in points], dtype=float)
+        self._exclusion_lng = np.array([p["lng"] for p in points], dtype=float)
+
+    def verdicts(self, candidates: List[Any]) -> np.ndarray:
+        """np.int8 per candidate: MATCH / NO_MATCH / UNDECIDED."""
+        verdicts = np.full(len(candidates), UNDECIDED, dtype=np.int8)
+        if not self.decidable or not candidates:
+            return verdicts
+
+        rows, lat, lng = [], [], []
+        for i, B in enumerate(candidates):
+            try:
+                candidate_mode = _normalized_mode(B.get("locationmode", "near_me"))
+                point = _candidate_point(B.get("location", ""))
+            except Exception:
+                continue  # malformed: the scalar path raises for it
+            if candidate_mode == "global":
+                verdicts[i] = MATCH
+            elif candidate_mode in (None, "route"):
+                continue
+            elif not self.required_name:
+                verdicts[i] = MATCH  # no location requirement
+            elif point is not None:
+                rows.append(i)
+                lat.append(point[0])
+                lng.append(point[1])
+
+        if not rows:
+            return verdicts
+        self._resolve()
+        if self._point is None:
+            return verdicts  # scalar path falls back to names
+
+        rows = np.asarray(rows, dtype=np.intp)
+        lat = np.asarray(lat, dtype=float)
+        lng = np.asarray(lng, dtype=float)
+        state = GeoGrid(lat, lng, self.cell_deg).within(*self._point, self.max_distance_km)
+        verdicts[rows[state == NO_MATCH]] = NO_MATCH
+
+        in_range = np.flatnonzero(state == MATCH)
+        if not in_range.size:
+            return verdicts
+
+        # Exclusions (M-28): any excluded point within DEFAULT_MAX_DISTANCE_KM rejects
+        excluded = np.zeros(in_range.size, dtype=bool)
+        ambiguous = np.zeros(in_range.size, dtype=bool)
+        if self._exclusion_lat.size:
+            distance = haversine_km(
+                lat[in_range, None], lng[in_range, None],
+                self._exclusion_lat[None, :], self._exclusion_lng[None, :]
+            )
+            excluded = (distance < DEFAULT_MAX_DISTANCE_KM - DISTANCE_EPSILON_KM).any(axis=1)
+            ambiguous = (np.abs(distance - DEFAULT_MAX_DISTANCE_KM) <= DISTANCE_EPSILON_KM).any(axis=1)
+
+        exclusions = self.required_exclusions
+        for j, row in enumerate(rows[in_range]):
+            B = candidates[row]
+            location = B.get("location", "")
+            try:
+                name = _extract_location_name(location)
+                canonical = _get_canonical_name(location)
+                canonical_excluded = bool(canonical) and canonical.lower() in exclusions
+            except Exception:
+                continue
+            if excluded[j] or name in exclusions or canonical_excluded:
+                verdicts[row] = NO_MATCH
+            elif not ambiguous[j] and not B.get("locationexclusions"):
+                verdicts[row] = MATCH  # candidate-side exclusions need the scalar check
+        return verdicts
+
+    def prune_mask(self, candidates: List[Any]) -> np.ndarray:
+        """False ⇒ match_location_v2 is False for that candidate."""
+        return self.verdicts(candidates) != NO_MATCH
+
+
+def compile_location_query(A: Dict[str, Any]) -> Optional[LocationQuery]:
+    """LocationQuery for a normalized query; None when A's mode is global."""
+    query = LocationQuery(
+        A.get("location", ""),
+        A.get("locationmode", "near_me"),
+        A.get("locationexclusions", [])
+    )
+    return None if query.required_mode == "global" else query
@@ -0,0 +1,610 @@
+"""
+PHASE 2.7b: COMPILED MATCH PLANS
+
+listing_matches_v2(A, B) re-reads the query A for every candidate B:
+set(A.domain), A.items, A.other, location fields, exclusion sets.
+compile_match_plan(A) does that work ONCE per search and returns an
+immutable MatchPlan whose predicates only touch B:
+
+- Precomputed frozensets (domain/category, exclusions)
+- Interned strings for A's keys and values
+- Ordered predicate closures (canon order: intent → domain/category →
+  items → other→self → location); vacuous stages are dropped
+- Pre-resolved implication closures: one per required value, memoizing
+  implies_fn(candidate, required) across the candidates of the search
+
+Results are identical to listing_matches_v2 (same rules, same
+primitives for candidate-side validation). implies_fn must be a pure
+function of its two arguments for the memo to be valid.
+
+Predicate order (MATCH_PREDICATE_ORDER):
+- "canonical" (default): canon order, no profiling (audits;
+  compile_match_plan(..., order="canonical") pins a single plan).
+- "adaptive": the intent gate stays first (M-01 to M-04 decide whether
+  the other rules apply at all); the independent checks after it are
+  ordered by cost / rejection rate observed per (intent, stage), so the
+  cheapest, most selective check runs first. Every Nth candidate is
+  profiled: its stages are timed up to the first rejection, so a
+  profiled candidate never runs a stage (location geocoding,
+  implications) that matches() would have skipped.
+The boolean result is the same in both orders; only which programmer
+error surfaces first for malformed candidates can differ.
+
+Usage:
+    plan = compile_match_plan(normalized_query, implies_fn=semantic_implies)
+    mask = plan.prune_mask([row["data"] for row in candidate_rows])
+    for row, keep in zip(candidate_rows, mask):
+        if keep and plan.matches(row["data"]):
+            ...
+
+prune_mask runs the numeric constraints for all candidates at once
+(matching/numeric_columns.py) and, for candidates with coordinates, the
+distance / exclusion rules (matching/location_engine.py), so candidates
+that fail them skip the string and implication checks.
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from matching.item_array_matchers import CandidateItemIndex, all_required_items_match, flatten_item_values
+from matching.item_matchers import _extract_candidate_ranges
+from matching.location_engine import ENABLE_LOCATION_PRUNING, LocationQuery, compile_location_query
+from matching.location_matcher_v2 import match_location_v2
+from matching.numeric_columns import numeric_prune_mask
+from matching.numeric_constraints import (
+    _validate_range,
+    range_contains,
+    ranges_overlap,
+    satisfies_max_constraint,
+    satisfies_min_constraint,
+)
+from matching.other_self_matchers import (
+    _extract_numeric_range,
+    flatten_categorical_values,
+    match_other_to_self,
+)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# "canonical" (canon order, pinned) or "adaptive" (cost / rejection-rate order)
+MATCH_PREDICATE_ORDER = os.environ.get("MATCH_PREDICATE_ORDER", "canonical").lower()
+
+# Profile every Nth candidate; samples per stage before it is reordered
+MATCH_ORDER_SAMPLE_EVERY = int(os.environ.get("MATCH_ORDER_SAMPLE_EVERY", "20"))
+MATCH_ORDER_MIN_SAMPLES = int(os.environ.get("MATCH_ORDER_MIN_SAMPLES", "200"))
+
+CANONICAL_STAGES = ("intent", "scope", "items", "other_self", "location")
+
+# Bundle listings with at least this many items are type-indexed per candidate
+ITEM_INDEX_MIN_ITEMS = int(os.environ.get("ITEM_INDEX_MIN_ITEMS", "4"))
+
+
+# ============================================================================
+# TYPE ALIASES
+# ============================================================================
+
+ImplicationFn = Callable[[str, str], bool]
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# ============================================================================
+# IMPLICATION CLOSURES
+# ============================================================================
+
+class _ImplicationCache:
+    """
+    Per-plan memo of implies_fn(candidate, required).
+
+    Without implies_fn the canon default is exact equality.
+    """
+
+    __slots__ = ("implies_fn", "results")
+
+    def __init__(self, implies_fn: Optional[ImplicationFn]):
+        self.implies_fn = implies_fn
+        self.results: Dict[Tuple[str, str], bool] = {}
+
+    def for_required(self, required_value: str) -> Callable[[Any], bool]:
+        """Closure candidate_value -> implies(candidate_value, required_value)."""
+        implies_fn = self.implies_fn
+        if implies_fn is None:
+            return lambda candidate_value: candidate_value == required_value
+
+        results = self.results
+
+        def implied(candidate_value):
+            key = (candidate_value, required_value)
+            try:
+                return results[key]
+            except KeyError:
+                result = results[key] = implies_fn(candidate_value, required_value)
+                return result
+            except TypeError:  # unhashable candidate value
+                return implies_fn(candidate_value, required_value)
+
+        return implied
+
+
+# ============================================================================
+# STAGE COMPILERS
+# ============================================================================
+
+def _compile_intent(A: Dict[str, Any]):
+    """M-01 to M-04."""
+    intent = _intern(A["intent"])
+
+    if intent == "product" or intent == "service":
+        subintent = _intern(A["subintent"])
+
+        def intent_gate(B):
+            return B["intent"] == intent and B["subintent"] != subintent
+
+    elif intent == "mutual":
+        subintent = _intern(A["subintent"])
+
+        def intent_gate(B):
+            return B["intent"] == intent and B["subintent"] == subintent
+
+    else:
+        def intent_gate(B):
+            if B["intent"] != intent:
+                return False
+            raise TypeError(f"Unknown intent type: {intent}")
+
+    return intent_gate
+
+
+def _compile_scope(A: Dict[str, Any]):
+    """M-05 (domain) / M-06 (category) intersection."""
+    field = "category" if A["intent"] == "mutual" else "domain"
+    required = frozenset(_intern(v) for v in A[field])
+
+    def scope_gate(B):
+        return not required.isdisjoint(B[field])
+
+    return scope_gate
+
+
+def _compile_numeric(required_item: Dict[str, Any]) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    """
+    M-09 to M-11 over candidate ranges. Returns None when the required
+    side is not well-formed (the plan then defers to the primitives so
+    errors surface exactly as in listing_matches_v2).
+    """
+    required_min = required_item.get("min", {})
+    required_max = required_item.get("max", {})
+    required_range = required_item.get("range", {})
+    if not all(isinstance(d, dict) for d in (required_min, required_max, required_range)):
+        return None
+    if not all(isinstance(v, (int, float)) for v in list(required_min.values()) + list(required_max.values())):
+        return None
+    try:
+        for r in required_range.values():
+            _validate_range(r, "range_a")
+    except (TypeError, ValueError):
+        return None
+
+    mins = tuple((_intern(k), v) for k, v in required_min.items())
+    maxs = tuple((_intern(k), v) for k, v in required_max.items())
+    ranges = tuple((_intern(k), tuple(r)) for k, r in required_range.items())
+    if not mins and not maxs and not ranges:
+        return lambda candidate_ranges: True
+
+    def numeric(candidate_ranges):
+        for key, threshold in mins:
+            if key not in candidate_ranges:
+                return False
+            if not satisfies_min_constraint(threshold, candidate_ranges[key]):
+                return False
+        for key, threshold in maxs:
+            if key not in candidate_ranges:
+                return False
+            if not satisfies_max_constraint(threshold, candidate_ranges[key]):
+                return False
+        for key, required in ranges:
+            if key not in candidate_ranges:
+                return False
+            if not ranges_overlap(required, candidate_ranges[key]):
+                return False
+        return True
+
+    return numeric
+
+
+def _compile_required_item(required_item: Dict[str, Any], cache: _ImplicationCache) -> Optional[Predicate]:
+    """
+    Closure over candidate items for one required item (M-07 to M-12).
+    None when the item shape needs the generic path.
+    """
+    if "type" not in required_item:
+        return None
+    categorical = required_item.get("categorical", {})
+    if not isinstance(categorical, dict):
+        categorical = {}
+    numeric = _compile_numeric(required_item)
+    if numeric is None:
+        return None
+
+    required_type = _intern(required_item["type"])
+    type_implied = cache.for_required(required_type) if cache.implies_fn is not None else None
+    categorical_checks = tuple((_intern(k), cache.for_required(_intern(v))) for k, v in categorical.items())
+    exclusions = tuple(required_item.get("itemexclusions", []) or ())
+
+    def candidate_ok(candidate_item):
+        # M-12: exclusions (checked before item_matches, as in required_item_has_match)
+        if exclusions:
+            values = flatten_item_values(candidate_item)
+            for exclusion in exclusions:
+                if exclusion in values:
+                    return False
+        # M-07: type
+        if "type" not in candidate_item:
+            raise KeyError("Candidate item missing 'type' field (programmer error)")
+        candidate_type = candidate_item["type"]
+        if candidate_type != required_type:
+            if type_implied is None or not type_implied(candidate_type):
+                return False
+        # M-08: categorical subset
+        if categorical_checks:
+            candidate_categorical = candidate_item.get("categorical", {})
+            if not isinstance(candidate_categorical, dict):
+                candidate_categorical = {}
+            for key, implied in categorical_checks:
+                if key not in candidate_categorical:
+                    return False
+                if not implied(candidate_categorical[key]):
+                    return False
+        # M-09 to M-11
+        return numeric(_extract_candidate_ranges(candidate_item))
+
+    def required_item_matches(candidate_items, index):
+        if index is None:
+            return any(candidate_ok(candidate_item) for candidate_item in candidate_items)
+        # Type-indexed: same-type candidates, then types implying required_type
+        if any(candidate_ok(candidate_items[position]) for position in index.same_type(required_type)):
+            return True
+        if type_implied is None:
+            return False
+        implied = index.implied_types(required_type, lambda candidate_type, _: type_implied(candidate_type))
+        return any(candidate_ok(candidate_items[position]) for position in implied)
+
+    return required_item_matches
+
+
+def _compile_items(A: Dict[str, Any], cache: _ImplicationCache):
+    """M-07 to M-12 for product/service; None when vacuous or mutual."""
+    if A["intent"] not in ("product", "service"):
+        return None
+    required_items = A["items"]
+    if not required_items:
+        return None
+
+    compiled = [_compile_required_item(item, cache) for item in required_items]
+    if any(c is None for c in compiled):
+        implies_fn = cache.implies_fn
+
+        def items_generic(B):
+            return all_required_items_match(required_items, B["items"], implies_fn)
+
+        return items_generic
+
+    compiled = tuple(compiled)
+
+    def match_items(candidate_items):
+        if not isinstance(candidate_items, list):
+            raise TypeError(f"candidate_items must be list, got {type(candidate_items).__name__}")
+        if not candidate_items:
+            return False
+        index = None
+        if len(candidate_items) >= ITEM_INDEX_MIN_ITEMS:
+            index = CandidateItemIndex(candidate_items)
+            if index.linear_only:
+                index = None
+        for required_item_matches in compiled:
+            if not required_item_matches(candidate_items, index):
+                return False
+        return True
+
+    def items_gate(B):
+        return match_items(B["items"])
+
+    return items_gate
+
+
+def _compile_other_self(A: Dict[str, Any], cache: _ImplicationCache):
+    """M-13 to M-17: A.other satisfied by B.self."""
+    other = A["other"]
+    try:
+        categorical = tuple((_intern(k), cache.for_required(_intern(v))) for k, v in other["categorical"].items())
+        mins = tuple(other["min"].items())
+        maxs = tuple(other["max"].items())
+        ranges = tuple((k, tuple(r)) for k, r in other["range"].items())
+        exclusions = frozenset(other["otherexclusions"])
+        if not all(isinstance(v, (int, float)) for _, v in mins + maxs):
+            raise TypeError("non-numeric threshold")
+        for _, r in ranges:
+            _validate_range(r, "outer")
+    except (AttributeError, KeyError, TypeError, ValueError):
+        implies_fn = cache.implies_fn
+
+        def other_self_generic(B):
+            return match_other_to_self(other, B["self"], implies_fn)
+
+        return other_self_generic
+
+    def other_self_gate(B):
+        return match_self(B["self"])
+
+    def match_self(self_obj):
+        if categorical:
+            self_categorical = self_obj["categorical"]
+        for attr, implied in categorical:
+            if attr not in self_categorical:
+                return False
+            if not implied(self_categorical[attr]):
+                return False
+        for attr, required_min in mins:
+            candidate_range = _extract_numeric_range(self_obj, attr)
+            if candidate_range is None or not satisfies_min_constraint(required_min, candidate_range):
+                return False
+        for attr, required_max in maxs:
+            candidate_range = _extract_numeric_range(self_obj, attr)
+            if candidate_range is None or not satisfies_max_constraint(required_max, candidate_range):
+                return False
+        for attr, required_range in ranges:
+            candidate_range = _extract_numeric_range(self_obj, attr)
+            if candidate_range is None or not range_contains(candidate_range, required_range):
+                return False
+        if exclusions and not exclusions.isdisjoint(flatten_categorical_values(self_obj["categorical"])):
+            return False
+        return True
+
+    return other_self_gate
+
+
+def _compile_location(A: Dict[str, Any]):
+    """M-23 to M-28 (V2); None when A's mode is global (always passes)."""
+    required_location = A.get("location", "")
+    required_mode = A.get("locationmode", "near_me")
+    required_exclusions = A.get("locationexclusions", [])
+
+    normalized_mode = required_mode.lower().strip() if required_mode else "near_me"
+    if normalized_mode == "global":
+        return None
+
+    def location_gate(B):
+        return match_location_v2(
+            required_location,
+            required_mode,
+            required_exclusions,
+            B.get("location", ""),
+            B.get("locationmode", "near_me"),
+            B.get("locationexclusions", [])
+        )
+
+    return location_gate
+
+
+# ============================================================================
+# PREDICATE STATISTICS
+# ============================================================================
+
+class PredicateStats:
+    """
+    Per-(intent, stage) rejection rate and cost, from profiled candidates.
+
+    Counts are halved once a stage reaches `window` samples so the order
+    follows traffic changes.
+    """
+
+    def __init__(self, min_samples: int = MATCH_ORDER_MIN_SAMPLES, window: int = 10000):
+        self.min_samples = min_samples
+        self.window = window
+        self._lock = threading.Lock()
+        # (intent, stage) -> [samples, rejections, total_ns]
+        self._stats: Dict[Tuple[str, str], List[float]] = {}
+
+    def record(self, intent: str, observations: Sequence[Tuple[str, bool, int]]) -> None:
+        """observations: (stage, rejected, elapsed_ns) for one candidate."""
+        with self._lock:
+            for stage, rejected, elapsed_ns in observations:
+                entry = self._stats.get((intent, stage))
+                if entry is None:
+                    entry = self._stats[(intent, stage)] = [0, 0, 0]
+                entry[0] += 1
+                entry[1] += rejected
+                entry[2] += elapsed_ns
+                if entry[0] >= self.window:
+                    entry[0] /= 2
+                    entry[1] /= 2
+                    entry[2] /= 2
+
+    def order(self, intent: str, stages: Sequence[str]) -> List[str]:
+        """
+        Stages by ascending expected cost per rejection (cost / rejection
+        rate). Stages without enough samples keep their canon position
+        relative to each other, after the ranked ones.
+        """
+        with self._lock:
+            snapshot = {stage: list(self._stats.get((intent, stage), (0, 0, 0))) for stage in stages}
+        ranked, unranked = [], []
+        for position, stage in enumerate(stages):
+            samples, rejections, total_ns = snapshot[stage]
+            if samples < self.min_samples:
+                unranked.append(stage)
+                continue
+            rejection_rate = rejections / samples
+            cost = total_ns / samples
+            rank = cost / rejection_rate if rejection_rate > 0 else float("inf")
+            ranked.append((rank, position, stage))
+        return [stage for _, _, stage in sorted(ranked)] + unranked
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def get_stats(self) -> Dict:
+        """Rejection rate and mean cost per intent/stage."""
+        with self._lock:
+            items = sorted(self._stats.items())
+        stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (intent, stage), (samples, rejections, total_ns) in items:
+            stats.setdefault(intent, {})[stage] = {
+                "samples": int(samples),
+                "rejection_rate": round(rejections / samples, 4) if samples else 0.0,
+                "mean_us": round(total_ns / samples / 1000, 3) if samples else 0.0,
+            }
+        return {"order_mode": MATCH_PREDICATE_ORDER, "stages": stats}
+
+
+# ============================================================================
+# MATCH PLAN
+# ============================================================================
+
+class MatchPlan:
+    """
+    Compiled form of listing_matches_v2(A, ·) for one query A.
+
+    stages: ((name, predicate), ...) in evaluation order.
+    """
+
+    __slots__ = ("query", "stages", "_names", "_predicates", "_stats", "_sample_every", "_seen",
+                 "_location_query")
+
+    def __init__(self, query: Dict[str, Any], stages: Tuple[Tuple[str, Predicate], ...],
+                 stats: Optional[PredicateStats] = None,
+                 sample_every: int = MATCH_ORDER_SAMPLE_EVERY,
+                 location_query: Optional[LocationQuery] = None):
+        self.query = query
+        self.stages = stages
+        self._names = tuple(name for name, _ in stages)
+        self._predicates = tuple(predicate for _, predicate in stages)
+        self._stats = stats if sample_every > 0 else None
+        self._sample_every = sample_every
+        self._seen = 0
+        self._location_query = location_query
+
+    def matches(self, B: Dict[str, Any]) -> bool:
+        """Same result as listing_matches_v2(A, B)."""
+        if self._stats is not None:
+            self._seen += 1
+            if self._seen % self._sample_every == 0:
+                return self._profiled_matches(B)
+        for predicate in self._predicates:
+            if not predicate(B):
+                return False
+        return True
+
+    __call__ = matches
+
+    def _profiled_matches(self, B: Dict[str, Any]) -> bool:
+        """
+        matches() with each stage timed, up to the first rejection: the
+        same stages run as in matches(), so profiling adds no work.
+        Stages after a rejection collect no sample from this candidate.
+        """
+        perf_counter_ns = time.perf_counter_ns
+        observations = []
+        result = True
+        for name, predicate in self.stages:
+            start = perf_counter_ns()
+            passed = predicate(B)
+            observations.append((name, not passed, perf_counter_ns() - start))
+            if not passed:
+                result = False
+                break
+        if len(observations) > 1 and observations[0][0] == "intent":
+            self._stats.record(self.query["intent"], observations[1:])
+        return result
+
+    def prune_mask(self, candidates: List[Dict[str, Any]]):
+        """
+        Columnar numeric pre-filter (M-09 to M-11, M-14 to M-16), plus
+        vectorized distance / exclusion checks for candidates with
+        coordinates (M-23 to M-28, matching/location_engine.py).
+
+        False entries can never match; True entries still need matches().
+        """
+        mask = numeric_prune_mask(self.query, candidates)
+        if self._location_query is not None and mask.any():
+            mask &= self._location_query.prune_mask(candidates)
+        return mask
+
+    def filter(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Candidates (listings) that satisfy the plan, in order.
+
+        The intent and scope gates run first (two set lookups), the
+        numeric mask only over their survivors.
+        """
+        gates = [predicate for name, predicate in self.stages if name in ("intent", "scope")]
+        survivors = [B for B in candidates if all(gate(B) for gate in gates)]
+        mask = self.prune_mask(survivors)
+        return [B for B, keep in zip(survivors, mask) if keep and self.matches(B)]
+
+
+def compile_match_plan(A: Dict[str, Any], implies_fn: Optional[ImplicationFn] = None,
+                       order: Optional[str] = None) -> MatchPlan:
+    """
+    Compile a normalized query (OLD format) into a MatchPlan.
+
+    Args:
+        A: Required listing (requester) - transformed by schema_normalizer_v2
+        implies_fn: Optional term implication function (pure)
+        order: "adaptive" or "canonical" (default: MATCH_PREDICATE_ORDER)
+
+    Returns:
+        MatchPlan; plan.matches(B) == listing_matches_v2(A, B, implies_fn)
+    """
+    cache = _ImplicationCache(implies_fn)
+
+    stages: List[Tuple[str, Predicate]] = [("intent", _compile_intent(A))]
+    if A["intent"] in ("product", "service", "mutual"):
+        stages.append(("scope", _compile_scope(A)))
+
+        items = _compile_items(A, cache)
+        if items is not None:
+            stages.append(("items", items))
+
+        stages.append(("other_self", _compile_other_self(A, cache)))
+
+        location = _compile_location(A)
+        if location is not None:
+            stages.append(("location", location))
+
+    location_query = None
+    if ENABLE_LOCATION_PRUNING and any(stage[0] == "location" for stage in stages):
+        location_query = compile_location_query(A)
+
+    if (order or MATCH_PREDICATE_ORDER) != "adaptive":
+        return MatchPlan(A, tuple(stages), location_query=location_query)
+
+    # Intent gate first; the independent stages by observed cost / rejection
+    stats = get_predicate_stats()
+    by_name = {stage[0]: stage for stage in stages[1:]}
+    ordered = [stages[0]] + [by_name[name] for name in stats.order(A["intent"], list(by_name))]
+    return MatchPlan(A, tuple(ordered), stats=stats, location_query=location_query)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Singleton
+# ═══════════════════════════════════════════════════════════════════
+
+_predicate_stats: Optional[PredicateStats] = None
+
+
+def get_predicate_stats() -> PredicateStats:
+    """Get singleton PredicateStats (shared by all adaptive plans)."""
+    global _predicate_stats
+    if _predicate_stats is None:
+        _predicate_stats = PredicateStats()
+    return _predicate_stats
@@ -0,0 +1,441 @@
+"""
+PHASE 2.10: MATCH EXPLAIN / PROFILE MODE
+
+When a search returns nothing it is not visible which canon rule
+rejected the candidates or where the time went. A MatchProfile, passed
+as profiler= to listing_matches_v2 / evaluate_similarity (and
+SimilarTopK), records per candidate:
+
+- The rejecting rule (M-01 ... M-28): the stage that failed, refined by a
+  diagnosis pass that runs only after the stage failed (never timed).
+  listing_matches_v2 reports it through MatchStages hooks (lap / reject)
+  in its own body, so there is one M-01..M-28 pipeline
+- Elapsed time per stage (intent, scope, items, other_self, location;
+  tier1 + the Tier 2 stages for similarity scoring)
+- Elapsed time, calls and hits per semantic_implies strategy: implies_fn
+  reports to the profile active in the current context (current_profile)
+
+Aggregated counters are returned with the search response (to_dict) and
+exported (export): added to the process-wide ProfileTotals served at
+GET /match/profile-stats and logged as one structured line.
+
+Overhead when off: listing_matches_v2 does one `is None` check per
+stage, scoring one per candidate; semantic_implies does one ContextVar
+lookup.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from matching.item_array_matchers import violates_item_exclusions
+from matching.item_matchers import match_item_categorical, match_item_type, _extract_candidate_ranges
+from matching.location_matcher_v2 import _is_location_in_exclusions
+from matching.numeric_constraints import (
+    evaluate_max_constraints,
+    evaluate_min_constraints,
+    evaluate_range_constraints,
+)
+from matching.other_self_matchers import match_other_to_self
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Per-candidate records kept in a profile (counters are always complete)
+MATCH_PROFILE_MAX_RECORDS = 200
+
+# Rule reported for a failed stage when no finer diagnosis applies
+STAGE_RULES = {
+    "items": "M-07..M-12",
+    "other_self": "M-13..M-17",
+    "location": "M-23..M-28",
+}
+
+
+# ============================================================================
+# ACTIVE PROFILE (for implies_fn strategy timing)
+# ============================================================================
+
+_active_profile: ContextVar[Optional["MatchProfile"]] = ContextVar("active_match_profile", default=None)
+
+
+def current_profile() -> Optional["MatchProfile"]:
+    """Profile of the evaluation running in this context (None when off)."""
+    return _active_profile.get()
+
+
+# ============================================================================
+# PROFILE
+# ============================================================================
+
+class _StageClock:
+    """Lap timer: lap(stage) adds the time since the previous lap."""
+
+    __slots__ = ("laps", "_last")
+
+    def __init__(self):
+        self.laps: Dict[str, int] = {}
+        self._last = time.perf_counter_ns()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter_ns()
+        self.laps[stage] = self.laps.get(stage, 0) + now - self._last
+        self._last = now
+
+    def skip(self) -> None:
+        """Exclude the time since the last lap (diagnosis)."""
+        self._last = time.perf_counter_ns()
+
+
+class MatchStages(_StageClock):
+    """
+    Stage hooks of one profiled listing_matches_v2 call.
+
+    The matcher laps each stage that passed and calls reject() for the
+    one that failed; rule stays None when B matched.
+    """
+
+    __slots__ = ("rule", "token")
+
+    def __init__(self, token):
+        super().__init__()
+        self.rule: Optional[str] = None
+        self.token = token
+
+    def reject(self, stage: str, rule: Any, *args) -> None:
+        """
+        Lap the failed stage; rule is a rule id or a diagnose_* function
+        called with args (its time is not counted).
+        """
+        self.lap(stage)
+        self.rule = rule(*args) if callable(rule) else rule
+        self.skip()
+
+
+class MatchProfile:
+    """
+    Profile of one search (not thread-safe; one per request).
+
+    Set candidate_id before evaluating a candidate to label its record.
+    """
+
+    def __init__(self, max_records: int = MATCH_PROFILE_MAX_RECORDS):
+        self.max_records = max_records
+        self.candidate_id: Any = None
+        self.candidates = 0
+        self.matched = 0
+        self.errors = 0
+        self.rejections: Counter = Counter()
+        self.stage_ns: Dict[str, int] = defaultdict(int)
+        self.stage_calls: Counter = Counter()
+        self.implies: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])  # calls, hits, ns
+        self.similarity: Counter = Counter()
+        self.similarity_rejections: Counter = Counter()
+        self.similarity_stage_ns: Dict[str, int] = defaultdict(int)
+        self.records: List[Dict[str, Any]] = []
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def clock(self) -> _StageClock:
+        return _StageClock()
+
+    def activate(self):
+        """Make this the current_profile(); returns the token for deactivate."""
+        return _active_profile.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        _active_profile.reset(token)
+
+    def start_match(self) -> MatchStages:
+        """Stage hooks for one candidate; activates this profile until finish_match."""
+        return MatchStages(_active_profile.set(self))
+
+    def finish_match(self, stages: MatchStages, matched: Optional[bool]) -> None:
+        _active_profile.reset(stages.token)
+        self.record_match(matched, stages.rule, stages.laps)
+
+    def record_implies(self, strategy: str, elapsed_ns: int, hit: bool) -> None:
+        stats = self.implies[strategy]
+        stats[0] += 1
+        stats[1] += hit
+        stats[2] += elapsed_ns
+
+    def _record(self, kind: str, outcome: str, rule: Optional[str], laps: Dict[str, int]) -> None:
+        if len(self.records) < self.max_records:
+            self.records.append({
+                "candidate": self.candidate_id,
+                "kind": kind,
+                "outcome": outcome,
+                "rule": rule,
+                "stages_ms": {stage: round(ns / 1e6, 4) for stage, ns in laps.items()},
+            })
+
+    def record_match(self, matched: Optional[bool], rule: Optional[str], laps: Dict[str, int]) -> None:
+        """matched=None: the matcher raised (programmer error in the data)."""
+        self.candidates += 1
+        if matched is None:
+            self.errors += 1
+        elif matched:
+            self.matched += 1
+        else:
+            self.rejections[rule] += 1
+        for stage, ns in laps.items():
+            self.stage_ns[stage] += ns
+            self.stage_calls[stage] += 1
+        outcome = "error" if matched is None else ("match" if matched else "rejected")
+        self._record("match", outcome, rule, laps)
+
+    def record_similarity(self, outcome: str, rule: Optional[str], laps: Dict[str, int]) -> None:
+        """outcome: exact / similar / below_min_score / pruned / tier1_rejected / error."""
+        self.similarity[outcome] += 1
+        if rule:
+            self.similarity_rejections[rule] += 1
+        for stage, ns in laps.items():
+            self.similarity_stage_ns[stage] += ns
+        self._record("similarity", outcome, rule, laps)
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def to_dict(self, include_records: bool = True) -> Dict[str, Any]:
+        result = {
+            "candidates": self.candidates,
+            "matched": self.matched,
+            "errors": self.errors,
+            "rejections": dict(self.rejections.most_common()),
+            "stages": {
+                stage: {
+                    "calls": self.stage_calls[stage],
+                    "total_ms": round(ns / 1e6, 3),
+                    "avg_us": round(ns / 1e3 / self.stage_calls[stage], 2) if self.stage_calls[stage] else 0.0,
+                }
+                for stage, ns in self.stage_ns.items()
+            },
+            "implies": {
+                strategy: {"calls": calls, "hits": hits, "total_ms": round(ns / 1e6, 3)}
+                for strategy, (calls, hits, ns) in self.implies.items()
+            },
+            "similarity": {
+                "outcomes": dict(self.similarity),
+                "rejections": dict(self.similarity_rejections.most_common()),
+                "stages_ms": {stage: round(ns / 1e6, 3) for stage, ns in self.similarity_stage_ns.items()},
+            },
+        }
+        if include_records:
+            result["per_candidate"] = self.records
+        return result
+
+    def export(self, endpoint: str) -> None:
+        """Add to the process-wide totals and log the counters."""
+        get_profile_totals().add(self)
+        from src.utils.logging import get_logger
+        get_logger(__name__).info(
+            "Match profile", emoji="data", endpoint=endpoint,
+            candidates=self.candidates, matched=self.matched, errors=self.errors,
+            rejections=dict(self.rejections),
+            stage_ms={stage: round(ns / 1e6, 3) for stage, ns in self.stage_ns.items()},
+            implies_ms={strategy: round(ns / 1e6, 3) for strategy, (_, _, ns) in self.implies.items()},
+            similarity=dict(self.similarity),
+        )
+
+
+class ProfileTotals:
+    """Process-wide sums of exported profiles (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.profiles = 0
+            self.candidates = 0
+            self.matched = 0
+            self.errors = 0
+            self.rejections: Counter = Counter()
+            self.stage_ns: Counter = Counter()
+            self.implies_calls: Counter = Counter()
+            self.implies_hits: Counter = Counter()
+            self.implies_ns: Counter = Counter()
+            self.similarity: Counter = Counter()
+            self.similarity_rejections: Counter = Counter()
+
+    def add(self, profile: MatchProfile) -> None:
+        with self._lock:
+            self.profiles += 1
+            self.candidates += profile.candidates
+            self.matched += profile.matched
+            self.errors += profile.errors
+            self.rejections.update(profile.rejections)
+            self.stage_ns.update(profile.stage_ns)
+            for strategy, (calls, hits, ns) in profile.implies.items():
+                self.implies_calls[strategy] += calls
+                self.implies_hits[strategy] += hits
+                self.implies_ns[strategy] += ns
+            self.similarity.update(profile.similarity)
+            self.similarity_rejections.update(profile.similarity_rejections)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "profiles": self.profiles,
+                "candidates": self.candidates,
+                "matched": self.matched,
+                "errors": self.errors,
+                "rejections": dict(self.rejections.most_common()),
+                "stage_ms": {stage: round(ns / 1e6, 3) for stage, ns in self.stage_ns.items()},
+                "implies": {
+                    strategy: {
+                        "calls": self.implies_calls[strategy],
+                        "hits": self.implies_hits[strategy],
+                        "total_ms": round(self.implies_ns[strategy] / 1e6, 3),
+                    }
+                    for strategy in self.implies_calls
+                },
+                "similarity": {
+                    "outcomes": dict(self.similarity),
+                    "rejections": dict(self.similarity_rejections.most_common()),
+                },
+            }
+
+
+# ============================================================================
+# RULE DIAGNOSIS (after a stage failed)
+# ============================================================================
+
+def _item_progress(required_item: Dict[str, Any], candidate_item: Dict[str, Any],
+                   implies_fn: Optional[Callable]) -> (int, Optional[str]):
+    """(checks passed, failing rule) of one candidate item, in matcher order."""
+    if violates_item_exclusions(required_item, candidate_item):
+        return 0, "M-12"
+    if not match_item_type(required_item, candidate_item, implies_fn):
+        return 1, "M-07"
+    if not match_item_categorical(required_item, candidate_item, implies_fn):
+        return 2, "M-08"
+    candidate_ranges = _extract_candidate_ranges(candidate_item)
+    if not evaluate_min_constraints(required_item.get("min", {}), candidate_ranges):
+        return 3, "M-09"
+    if not evaluate_max_constraints(required_item.get("max", {}), candidate_ranges):
+        return 4, "M-10"
+    if not evaluate_range_constraints(required_item.get("range", {}), candidate_ranges):
+        return 5, "M-11"
+    return 6, None
+
+
+def diagnose_items(required_items: List[Dict[str, Any]], candidate_items: List[Dict[str, Any]],
+                   implies_fn: Optional[Callable] = None) -> str:
+    """
+    Rule that rejected B.items: for the first required item without a
+    match, the rule at which the closest candidate item failed.
+    """
+    if not candidate_items:
+        return "M-07"
+    try:
+        for required_item in required_items:
+            best = (-1, STAGE_RULES["items"])
+            for candidate_item in candidate_items:
+                progress = _item_progress(required_item, candidate_item, implies_fn)
+                if progress[1] is None:
+                    break  # this required item has a match
+                best = max(best, progress, key=lambda p: p[0])
+            else:
+                return best[1]
+    except Exception:
+        pass
+    return STAGE_RULES["items"]
+
+
+def diagnose_other_self(other: Dict[str, Any], self_obj: Dict[str, Any],
+                        implies_fn: Optional[Callable] = None) -> str:
+    """Rule that rejected B.self: first of M-13 .. M-17 that fails alone."""
+    empty = {"categorical": {}, "min": {}, "max": {}, "range": {}, "otherexclusions": []}
+    try:
+        for rule, key in (("M-13", "categorical"), ("M-14", "min"), ("M-15", "max"),
+                          ("M-16", "range"), ("M-17", "otherexclusions")):
+            if not match_other_to_self({**empty, key: other[key]}, self_obj, implies_fn):
+                return rule
+    except Exception:
+        pass
+    return STAGE_RULES["other_self"]
+
+
+def diagnose_location(A: Dict[str, Any], B: Dict[str, Any]) -> str:
+    """Rule that rejected B.location: exclusions, else the mode rule."""
+    try:
+        if _is_location_in_exclusions(B.get("location", ""), A.get("locationexclusions", [])):
+            return "M-23"
+        if _is_location_in_exclusions(A.get("location", ""), B.get("locationexclusions", [])):
+            return "M-24"
+        modes = {str(A.get("locationmode") or "near_me").lower(), str(B.get("locationmode") or "near_me").lower()}
+        if "route" in modes:
+            return "M-27"
+        if "target_only" in modes:
+            return "M-26"
+        return "M-25"
+    except Exception:
+        return STAGE_RULES["location"]
+
+
+def tier1_rule(results: List[Any], intent: str) -> Optional[str]:
+    """Rule of the failed Tier 1 result of the similarity scorer."""
+    for r in results:
+        if not r.passed:
+            if r.field_name == "subintent":
+                return "M-03" if intent == "mutual" else "M-02"
+            return {"intent": "M-01", "domain": "M-05", "category": "M-06"}.get(r.field_name, r.field_name)
+    return None
+
+
+# ============================================================================
+# PROFILED SIMILARITY SCORING
+# ============================================================================
+
+def profiled_similarity(profile: MatchProfile, A: Dict[str, Any],
+                        score_fn: Callable[[_StageClock], Any]) -> Any:
+    """
+    Run score_fn(clock) (score_similarity / SimilarTopK stages) and record
+    the outcome: exact, similar, below_min_score, pruned (upper bound,
+    score_fn returned None) or tier1_rejected with its rule.
+    """
+    clock = profile.clock()
+    token = profile.activate()
+    outcome, rule = "error", None
+    try:
+        scored = score_fn(clock)
+        if scored is None:
+            outcome = "pruned"
+        elif not scored.tier1_passed:
+            outcome, rule = "tier1_rejected", tier1_rule(scored.results, A.get("intent", ""))
+        elif scored.is_exact_match:
+            outcome = "exact"
+        elif scored.is_similar_match:
+            outcome = "similar"
+        else:
+            outcome = "below_min_score"
+        return scored
+    finally:
+        _active_profile.reset(token)
+        profile.record_similarity(outcome, rule, clock.laps)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Singleton
+# ═══════════════════════════════════════════════════════════════════
+
+_profile_totals: Optional[ProfileTotals] = None
+
+
+def get_profile_totals() -> ProfileTotals:
+    """Get singleton ProfileTotals (sums of exported profiles)."""
+    global _profile_totals
+    if _profile_totals is None:
+        _profile_totals = ProfileTotals()
+    return _profile_totals
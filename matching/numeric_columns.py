@@ -0,0 +1,323 @@
+"""
+VRIDDHI MATCHING SYSTEM - COLUMNAR NUMERIC CONSTRAINTS
+Phase 2.2b
+
+Purpose: Evaluate numeric constraints for MANY candidates at once
+Scope: Pruning only - survivors still go through listing_matches_v2 /
+       MatchPlan.matches for the exact (scalar) verdict
+
+Layout:
+- One row per candidate (other→self) or per candidate item (items)
+- Per attribute: lo / hi float64 columns; unbounded sides are ±inf
+  (min[k] → [v, +∞], max[k] → [-∞, v], same priority as the scalar
+  extractors)
+- present: attribute exists for the row (missing → constraint FAILS)
+- valid: the row's range passed _validate_range; invalid rows are never
+  pruned (the scalar path raises for them, so it must see them)
+
+Implements (vectorized, same OVERLAP / SUBSET semantics as Phase 2.2):
+- M-09, M-14: required_min <= candidate_max
+- M-10, M-15: candidate_min <= required_max
+- M-11:       ranges_overlap(required, candidate)
+- M-16:       range_contains(candidate, required)
+
+numeric_prune_mask(A, candidates) combines them into one boolean mask:
+False means B cannot satisfy A (a numeric requirement fails for every
+candidate item / for B.self); True means "run the full check".
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from matching.numeric_constraints import NEGATIVE_INFINITY, POSITIVE_INFINITY, Range, _validate_range
+from matching.other_self_matchers import _extract_numeric_range
+
+
+# ============================================================================
+# COLUMN STORE
+# ============================================================================
+
+Column = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]  # lo, hi, present, valid
+
+# Exact types the fast path accepts without _validate_range
+_FLOATS = (int, float)
+
+
+class NumericColumns:
+    """
+    Candidate ranges laid out per attribute.
+
+    rows[i] is a dict attr -> Range for row i, or None when the row could
+    not be extracted (kept by every mask). Columns are built lazily, only
+    for attributes some requirement asks about.
+    """
+
+    __slots__ = ("rows", "size", "unknown", "_columns")
+
+    def __init__(self, rows: List[Optional[Dict[str, Range]]]):
+        self.rows = rows
+        self.size = len(rows)
+        self.unknown = np.fromiter((r is None for r in rows), dtype=bool, count=self.size)
+        self._columns: Dict[str, Column] = {}
+
+    def column(self, attr: str) -> Column:
+        cached = self._columns.get(attr)
+        if cached is not None:
+            return cached
+
+        lo = np.full(self.size, np.nan)
+        hi = np.full(self.size, np.nan)
+        present = np.zeros(self.size, dtype=bool)
+        valid = np.ones(self.size, dtype=bool)
+
+        # Collect in Python lists, scatter into the arrays once
+        rows, los, his, invalid = [], [], [], []
+        for i, ranges in enumerate(self.rows):
+            if ranges is None:
+                continue
+            value = ranges.get(attr)
+            if value is None:
+                continue
+            if (type(value) is tuple and len(value) == 2 and type(value[0]) in _FLOATS
+                    and type(value[1]) in _FLOATS and value[0] <= value[1]):
+                rows.append(i)
+                los.append(value[0])
+                his.append(value[1])
+                continue
+            try:
+                _validate_range(value, "candidate_range")
+            except (TypeError, ValueError):
+                invalid.append(i)
+                continue
+            rows.append(i)
+            los.append(value[0])
+            his.append(value[1])
+
+        if rows:
+            lo[rows] = los
+            hi[rows] = his
+            present[rows] = True
+        if invalid:
+            present[invalid] = True
+            valid[invalid] = False
+
+        cached = self._columns[attr] = (lo, hi, present, valid)
+        return cached
+
+    def all_rows(self) -> np.ndarray:
+        return np.ones(self.size, dtype=bool)
+
+
+def _self_ranges(candidate: Any, attrs: Iterable[str]) -> Optional[Dict[str, Range]]:
+    """B.self ranges for attrs (other_self priority: range > min > max)."""
+    try:
+        self_obj = candidate["self"]
+        ranges = {}
+        for attr in attrs:
+            candidate_range = _extract_numeric_range(self_obj, attr)
+            if candidate_range is not None:
+                ranges[attr] = candidate_range
+        return ranges
+    except Exception:
+        return None
+
+
+def build_self_columns(candidates: List[Any], attrs: Iterable[str]) -> NumericColumns:
+    """One row per candidate listing, from B.self."""
+    attrs = list(attrs)
+    return NumericColumns([_self_ranges(c, attrs) for c in candidates])
+
+
+def _item_ranges(item: Any, attrs: Iterable[str]) -> Dict[str, Range]:
+    """
+    M-30 ranges of one candidate item, restricted to attrs.
+
+    Same priority as _extract_candidate_ranges (range > min > max >
+    numeric categorical).
+    """
+    candidate_min = item.get("min", {})
+    candidate_max = item.get("max", {})
+    candidate_range = item.get("range", {})
+    candidate_categorical = item.get("categorical", {})
+    ranges = {}
+    for attr in attrs:
+        if isinstance(candidate_range, dict) and attr in candidate_range:
+            ranges[attr] = tuple(candidate_range[attr])
+        elif isinstance(candidate_min, dict) and attr in candidate_min:
+            ranges[attr] = (candidate_min[attr], POSITIVE_INFINITY)
+        elif isinstance(candidate_max, dict) and attr in candidate_max:
+            ranges[attr] = (NEGATIVE_INFINITY, candidate_max[attr])
+        elif isinstance(candidate_categorical, dict) and attr in candidate_categorical:
+            try:
+                value = float(candidate_categorical[attr])
+                ranges[attr] = (value, value)
+            except (ValueError, TypeError):
+                pass
+    return ranges
+
+
+def build_item_columns(candidates: List[Any], attrs: Iterable[str]) -> Tuple[NumericColumns, np.ndarray, np.ndarray]:
+    """
+    One row per candidate ITEM, from B.items (M-30 extraction of attrs).
+
+    Returns:
+        (columns, owner, unknown_listing): owner[j] is the candidate index
+        of item row j; unknown_listing marks listings whose items could not
+        be laid out (never pruned).
+    """
+    attrs = list(attrs)
+    rows: List[Optional[Dict[str, Range]]] = []
+    owner: List[int] = []
+    unknown_listing = np.zeros(len(candidates), dtype=bool)
+    for i, candidate in enumerate(candidates):
+        try:
+            items = candidate["items"]
+            if not isinstance(items, list):
+                raise TypeError("items must be list")
+            item_rows = [_item_ranges(item, attrs) for item in items]
+        except Exception:
+            unknown_listing[i] = True
+            continue
+        rows.extend(item_rows)
+        owner.extend([i] * len(item_rows))
+    return NumericColumns(rows), np.asarray(owner, dtype=np.intp), unknown_listing
+
+
+# ============================================================================
+# VECTORIZED CONSTRAINTS
+# ============================================================================
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+def _is_valid_range(value: Any) -> bool:
+    try:
+        _validate_range(value, "required")
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def evaluate_min_columns(required_min: Dict[str, float], columns: NumericColumns) -> np.ndarray:
+    """M-09 / M-14: required_min <= candidate_max, for every row."""
+    mask = columns.all_rows()
+    for key, threshold in required_min.items():
+        if not _is_number(threshold):
+            continue  # scalar path raises; leave it to the scalar path
+        _, hi, present, valid = columns.column(key)
+        with np.errstate(invalid="ignore"):
+            mask &= present & ((threshold <= hi) | ~valid)
+    return mask | columns.unknown
+
+
+def evaluate_max_columns(required_max: Dict[str, float], columns: NumericColumns) -> np.ndarray:
+    """M-10 / M-15: candidate_min <= required_max, for every row."""
+    mask = columns.all_rows()
+    for key, threshold in required_max.items():
+        if not _is_number(threshold):
+            continue
+        lo, _, present, valid = columns.column(key)
+        with np.errstate(invalid="ignore"):
+            mask &= present & ((lo <= threshold) | ~valid)
+    return mask | columns.unknown
+
+
+def evaluate_range_columns(required_ranges: Dict[str, Range], columns: NumericColumns) -> np.ndarray:
+    """M-11: ranges_overlap(required, candidate), for every row."""
+    mask = columns.all_rows()
+    for key, required in required_ranges.items():
+        if not _is_valid_range(required):
+            continue
+        required_min, required_max = required
+        lo, hi, present, valid = columns.column(key)
+        with np.errstate(invalid="ignore"):
+            mask &= present & (((required_min <= hi) & (lo <= required_max)) | ~valid)
+    return mask | columns.unknown
+
+
+def evaluate_range_contains_columns(required_ranges: Dict[str, Range], columns: NumericColumns) -> np.ndarray:
+    """M-16: range_contains(candidate, required), for every row."""
+    mask = columns.all_rows()
+    for key, required in required_ranges.items():
+        if not _is_valid_range(required):
+            continue
+        required_min, required_max = required
+        lo, hi, present, valid = columns.column(key)
+        with np.errstate(invalid="ignore"):
+            mask &= present & (((required_min <= lo) & (hi <= required_max)) | ~valid)
+    return mask | columns.unknown
+
+
+# ============================================================================
+# LISTING-LEVEL MASKS
+# ============================================================================
+
+def _constraint_dict(obj: Any, key: str) -> Dict[str, Any]:
+    value = obj.get(key, {}) if isinstance(obj, Mapping) else {}
+    return value if isinstance(value, dict) else {}
+
+
+def item_numeric_mask(required_items: List[Dict[str, Any]], candidates: List[Any]) -> np.ndarray:
+    """
+    M-09 to M-11 per listing: for EVERY required item with numeric
+    constraints, SOME candidate item satisfies them.
+    """
+    mask = np.ones(len(candidates), dtype=bool)
+    numeric_items = [
+        r for r in required_items
+        if isinstance(r, Mapping) and (r.get("min") or r.get("max") or r.get("range"))
+    ]
+    if not numeric_items or not candidates:
+        return mask
+
+    attrs = set()
+    for required_item in numeric_items:
+        for key in ("min", "max", "range"):
+            attrs.update(_constraint_dict(required_item, key))
+    columns, owner, unknown_listing = build_item_columns(candidates, attrs)
+    for required_item in numeric_items:
+        item_ok = evaluate_min_columns(_constraint_dict(required_item, "min"), columns)
+        item_ok &= evaluate_max_columns(_constraint_dict(required_item, "max"), columns)
+        item_ok &= evaluate_range_columns(_constraint_dict(required_item, "range"), columns)
+
+        listing_ok = np.zeros(len(candidates), dtype=bool)
+        np.logical_or.at(listing_ok, owner, item_ok)
+        mask &= listing_ok
+    return mask | unknown_listing
+
+
+def other_self_numeric_mask(other: Dict[str, Any], candidates: List[Any]) -> np.ndarray:
+    """M-14 to M-16 per listing: B.self against A.other numeric constraints."""
+    required_min = _constraint_dict(other, "min")
+    required_max = _constraint_dict(other, "max")
+    required_range = _constraint_dict(other, "range")
+    if not (required_min or required_max or required_range) or not candidates:
+        return np.ones(len(candidates), dtype=bool)
+
+    columns = build_self_columns(candidates, set(required_min) | set(required_max) | set(required_range))
+    mask = evaluate_min_columns(required_min, columns)
+    mask &= evaluate_max_columns(required_max, columns)
+    mask &= evaluate_range_contains_columns(required_range, columns)
+    return mask
+
+
+def numeric_prune_mask(A: Dict[str, Any], candidates: List[Any]) -> np.ndarray:
+    """
+    Boolean mask over candidates: False ⇒ listing_matches_v2(A, B) is False.
+
+    Args:
+        A: Required listing (requester) - transformed by schema_normalizer_v2
+        candidates: Candidate listings (OLD format)
+
+    Returns:
+        np.ndarray of bool, one entry per candidate
+    """
+    mask = np.ones(len(candidates), dtype=bool)
+    if A.get("intent") in ("product", "service") and isinstance(A.get("items"), list):
+        mask &= item_numeric_mask(A["items"], candidates)
+    if isinstance(A.get("other"), Mapping):
+        mask &= other_self_numeric_mask(A["other"], candidates)
+    return mask
@@ -0,0 +1,287 @@
+"""
+PHASE 2.9: PROCESS-POOL MATCHING BACKEND
+
+Boolean matching and similarity scoring of a candidate set is pure
+Python; with a few hundred candidates per search it is CPU-bound and the
+GIL runs it on one core. ParallelMatcher spreads candidate evaluation
+over worker processes:
+
+- Candidates are shipped in contiguous chunks of match features (free
+  text dropped, see MATCH_FEATURE_EXCLUDE); each chunk carries the query
+  once and compiles its own MatchPlan
+- Results come back per chunk and are merged in rank (candidate) order:
+  match flags by position, similar matches as per-chunk SimilarTopK
+  merged into the global top-K (same ties as the in-process path)
+- Workers are started from a clean process ("forkserver", else
+  "spawn"), never forked from the server: a forked worker would inherit
+  its threads, HTTP sockets and SQLite connections. All workers are
+  started by start() (warm-up tasks), not on the first search
+- Ontology state (synonym registry, concept paths, condition ontology)
+  is loaded once per worker from a snapshot passed to the worker
+  initializer. Workers see the state of the resolver when the pool was
+  started (restart() picks up later ontology updates)
+
+Below PARALLEL_MATCH_MIN_CANDIDATES the pickling / IPC overhead exceeds
+the gain. The crossover depends on the host and on implies_fn cost, so
+there is no default: measure it with benchmarks/parallel_crossover.py;
+while it is unset (0) every candidate set is evaluated in-process.
+
+implies_fn must be picklable (a module-level function) and, like for
+MatchPlan, a pure function of its two arguments.
+
+Usage:
+    matcher = get_parallel_matcher()
+    if matcher.should_parallelize(len(candidates)):
+        flags = matcher.match(normalized_query, candidates, implies_fn)
+        similar = matcher.top_similar(normalized_query, candidates, k, min_score, implies_fn)
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from matching.match_plan import compile_match_plan
+from matching.similarity_scorer import SimilarityScore, SimilarTopK
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+ENABLE_PARALLEL_MATCHING = os.environ.get("ENABLE_PARALLEL_MATCHING", "0").lower() in ("1", "true", "yes")
+
+# Worker processes (default: all cores but one)
+MATCH_WORKERS = int(os.environ.get("MATCH_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+
+# Candidate sets smaller than this are evaluated in-process
+# (0 = not measured yet: never parallelize, see benchmarks/parallel_crossover.py)
+PARALLEL_MATCH_MIN_CANDIDATES = int(os.environ.get("PARALLEL_MATCH_MIN_CANDIDATES", "0"))
+
+# Candidates per task (0 = split evenly across the workers)
+PARALLEL_MATCH_CHUNK_SIZE = int(os.environ.get("PARALLEL_MATCH_CHUNK_SIZE", "0"))
+
+# "forkserver" where available, else "spawn" ("fork" copies the server's
+# threads and open connections into every worker)
+MATCH_POOL_START_METHOD = os.environ.get(
+    "MATCH_POOL_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn",
+)
+
+# Listing fields never read by listing_matches_v2 / the similarity scorer
+MATCH_FEATURE_EXCLUDE = frozenset({"reasoning"})
+
+
+# ============================================================================
+# WORKER SIDE
+# ============================================================================
+
+def ontology_snapshot() -> Optional[Dict[str, Any]]:
+    """
+    Synonym registry and concept paths of the loaded categorical resolver.
+
+    None when the resolver was never loaded in this process (workers then
+    load the static condition ontology on first use, as the parent would).
+    """
+    orchestrator = sys.modules.get("canonicalization.orchestrator")
+    resolver = getattr(orchestrator, "_categorical_resolver", None) if orchestrator else None
+    if resolver is None:
+        return None
+    return {
+        "synonym_registry": dict(resolver._synonym_registry),
+        "concept_paths": dict(resolver._concept_paths),
+    }
+
+
+def _init_worker(snapshot: Optional[Dict[str, Any]]) -> None:
+    """Pool initializer: load the ontology snapshot once per worker."""
+    if snapshot is None:
+        return  # forked: the parent's resolver is already in memory
+    from canonicalization.orchestrator import _get_categorical_resolver
+    resolver = _get_categorical_resolver()  # static condition ontology
+    resolver._synonym_registry.update(snapshot.get("synonym_registry", {}))
+    resolver._concept_paths.update(snapshot.get("concept_paths", {}))
+
+
+def _warm_up(_: int) -> int:
+    """No-op task: makes the pool start its worker processes."""
+    return os.getpid()
+
+
+def _match_chunk(task: Tuple[Dict[str, Any], int, List[Dict[str, Any]], Optional[Callable]]):
+    """Boolean match flags for one chunk; errors as (position, message)."""
+    query, start, chunk, implies_fn = task
+    plan = compile_match_plan(query, implies_fn=implies_fn)
+    mask = plan.prune_mask(chunk)
+    flags: List[bool] = []
+    errors: List[Tuple[int, str]] = []
+    for offset, candidate in enumerate(chunk):
+        try:
+            flags.append(bool(mask[offset]) and plan.matches(candidate))
+        except Exception as e:
+            flags.append(False)
+            errors.append((start + offset, str(e)))
+    return flags, errors
+
+
+def _similar_chunk(task: Tuple[Dict[str, Any], List[Tuple[int, Dict[str, Any]]], int, float, Optional[Callable]]):
+    """Chunk-local top-k similar matches as (SimilarityScore, position)."""
+    query, chunk, k, min_score, implies_fn = task
+    top_k = SimilarTopK(query, k, min_score, implies_fn)
+    errors: List[Tuple[int, str]] = []
+    for position, candidate in chunk:
+        try:
+            top_k.offer(candidate, position)
+        except Exception as e:
+            errors.append((position, str(e)))
+    return top_k.results(), errors
+
+
+# ============================================================================
+# PARENT SIDE
+# ============================================================================
+
+def match_features(candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """Candidate listing without the fields the matchers never read."""
+    return {k: v for k, v in candidate.items() if k not in MATCH_FEATURE_EXCLUDE}
+
+
+def _chunks(items: Sequence[Any], size: int) -> Iterable[Tuple[int, Sequence[Any]]]:
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+class ParallelMatcher:
+    """
+    Process pool for candidate evaluation (started lazily, shared).
+
+    errors from the last call are kept in last_errors as
+    (candidate position, message) so callers can log them like the
+    in-process loop does.
+    """
+
+    def __init__(self, workers: int = MATCH_WORKERS,
+                 min_candidates: int = PARALLEL_MATCH_MIN_CANDIDATES,
+                 chunk_size: int = PARALLEL_MATCH_CHUNK_SIZE,
+                 start_method: str = MATCH_POOL_START_METHOD):
+        self.workers = max(1, workers)
+        self.min_candidates = min_candidates
+        self.chunk_size = chunk_size
+        self.start_method = start_method
+        self.last_errors: List[Tuple[int, str]] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Pool lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> ProcessPoolExecutor:
+        """Start the pool and its workers (idempotent); ontology is captured now."""
+        with self._lock:
+            if self._pool is None:
+                snapshot = None if self.start_method == "fork" else ontology_snapshot()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(snapshot,),
+                )
+                # ProcessPoolExecutor starts workers on submit: start them all now
+                list(self._pool.map(_warm_up, range(self.workers)))
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def restart(self) -> None:
+        """Restart the workers (e.g. after the ontology was updated)."""
+        self.shutdown()
+        self.start()
+
+    def should_parallelize(self, candidate_count: int) -> bool:
+        return self.workers > 1 and self.min_candidates > 0 and candidate_count >= self.min_candidates
+
+    def _chunk_size(self, count: int) -> int:
+        if self.chunk_size > 0:
+            return self.chunk_size
+        return max(1, -(-count // self.workers))
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def match(self, query: Dict[str, Any], candidates: Sequence[Dict[str, Any]],
+              implies_fn: Optional[Callable] = None) -> List[bool]:
+        """
+        listing_matches_v2(query, candidate) for every candidate.
+
+        Returns:
+            One flag per candidate, in candidate order (False on error,
+            see last_errors)
+        """
+        self.last_errors = []
+        if not candidates:
+            return []
+        pool = self.start()
+        features = [match_features(c) for c in candidates]
+        tasks = [
+            (query, start, list(chunk), implies_fn)
+            for start, chunk in _chunks(features, self._chunk_size(len(features)))
+        ]
+        flags: List[bool] = []
+        for chunk_flags, errors in pool.map(_match_chunk, tasks):
+            flags.extend(chunk_flags)
+            self.last_errors.extend(errors)
+        return flags
+
+    def top_similar(self, query: Dict[str, Any], candidates: Sequence[Dict[str, Any]],
+                    k: int, min_score: float = 0.70, implies_fn: Optional[Callable] = None,
+                    positions: Optional[Sequence[int]] = None) -> List[Tuple[SimilarityScore, int]]:
+        """
+        Top-k similar (non-exact) matches, as SimilarTopK over candidates.
+
+        Args:
+            positions: Candidate positions to score (default: all)
+
+        Returns:
+            (SimilarityScore, candidate position) pairs, highest score
+            first, ties in candidate order
+        """
+        self.last_errors = []
+        if positions is None:
+            positions = range(len(candidates))
+        selected = [(position, match_features(candidates[position])) for position in positions]
+        if not selected or k <= 0:
+            return []
+        pool = self.start()
+        tasks = [
+            (query, list(chunk), k, min_score, implies_fn)
+            for _, chunk in _chunks(selected, self._chunk_size(len(selected)))
+        ]
+        merged: List[Tuple[SimilarityScore, int]] = []
+        for chunk_results, errors in pool.map(_similar_chunk, tasks):
+            merged.extend(chunk_results)
+            self.last_errors.extend(errors)
+        merged.sort(key=lambda pair: (-pair[0].similarity_score, pair[1]))
+        return merged[:k]
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Singleton
+# ═══════════════════════════════════════════════════════════════════
+
+_parallel_matcher: Optional[ParallelMatcher] = None
+
+
+def get_parallel_matcher() -> ParallelMatcher:
+    """Get singleton ParallelMatcher (pool started on first use)."""
+    global _parallel_matcher
+    if _parallel_matcher is None:
+        _parallel_matcher = ParallelMatcher()
+    return _parallel_matcher
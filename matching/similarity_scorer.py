@@ -18,6 +18,7 @@ Author: Claude
 Date: 2026-02-21
 """
 
+import heapq
 from typing import Dict, List, Any, Optional, Callable, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
@@ -314,12 +315,17 @@ def _find_matching_item_by_type(
 def _evaluate_items_detailed(
     required_items: List[Dict],
     candidate_items: List[Dict],
-    implies_fn: Optional[Callable] = None
+    implies_fn: Optional[Callable] = None,
+    start_index: int = 0
 ) -> List[ConstraintResult]:
-    """Evaluate all item constraints with detailed results."""
+    """
+    Evaluate all item constraints with detailed results.
+
+    start_index: index of required_items[0] in A.items (field paths).
+    """
     results = []
 
-    for i, req_item in enumerate(required_items):
+    for i, req_item in enumerate(required_items, start_index):
         req_type = _get_type_value(req_item.get("type", ""))
 
         # Find matching candidate by type
@@ -691,7 +697,7 @@ def _evaluate_location_detailed(A: Dict, B: Dict) -> List[ConstraintResult]:
 # BONUS ATTRIBUTES
 # ============================================================================
 
-def _compute_bonus_attributes(A: Dict, B: Dict) -> Dict[str, Any]:
+def compute_bonus_attributes(A: Dict, B: Dict) -> Dict[str, Any]:
     """
     Identify bonus attributes: things B has that A didn't ask for.
     """
@@ -836,42 +842,77 @@ def _generate_recommendation(score: float, unsatisfied: List[ConstraintResult])
 # MAIN SIMILARITY EVALUATION
 # ============================================================================
 
-def evaluate_similarity(
+class SimilarityScore:
+    """
+    Numeric-only similarity result for one candidate (no serialization).
+
+    Keeps the ConstraintResult objects so the full SimilarityResult can be
+    materialized later without re-evaluating: see materialize_similarity.
+    """
+
+    __slots__ = ("similarity_score", "is_exact_match", "is_similar_match",
+                 "tier1_passed", "results")
+
+    def __init__(self, similarity_score: float, is_exact_match: bool,
+                 is_similar_match: bool, tier1_passed: bool,
+                 results: List[ConstraintResult]):
+        self.similarity_score = similarity_score
+        self.is_exact_match = is_exact_match
+        self.is_similar_match = is_similar_match
+        self.tier1_passed = tier1_passed
+        self.results = results
+
+    def __repr__(self) -> str:
+        return (f"SimilarityScore(score={self.similarity_score}, exact={self.is_exact_match}, "
+                f"similar={self.is_similar_match}, tier1={self.tier1_passed})")
+
+
+def score_similarity(
     A: Dict[str, Any],
     B: Dict[str, Any],
     implies_fn: Optional[Callable] = None,
-    min_score: float = 0.70
-) -> SimilarityResult:
+    min_score: float = 0.70,
+    profiler: Optional[Any] = None
+) -> SimilarityScore:
     """
-    Evaluate similarity between two listings.
+    Score B against A: constraint evaluation and weighted score only.
 
-    This is the main entry point for similarity scoring.
+    No to_dict(), bonus attributes or messages - use
+    materialize_similarity for the candidates that are actually returned.
 
     Args:
         A: Required listing (query) - normalized to OLD format
         B: Candidate listing - normalized to OLD format
         implies_fn: Optional term implication function
         min_score: Minimum score for similar match (default 0.70)
+        profiler: Optional MatchProfile (matching/match_profiler.py);
+                  records outcome, rejecting rule and per-stage timing
 
     Returns:
-        SimilarityResult with score, constraints, and messages
+        SimilarityScore (same score / flags as evaluate_similarity)
     """
+    if profiler is not None:
+        from matching.match_profiler import profiled_similarity
+        return profiled_similarity(profiler, A, lambda clock: _score_similarity(A, B, implies_fn, min_score, clock))
+    return _score_similarity(A, B, implies_fn, min_score)
+
+
+def _score_similarity(
+    A: Dict[str, Any],
+    B: Dict[str, Any],
+    implies_fn: Optional[Callable],
+    min_score: float,
+    clock: Optional[Any] = None
+) -> SimilarityScore:
+    """score_similarity; clock.lap(stage) after each stage when profiling."""
     # Evaluate Tier 1 (must match)
     tier1_passed, tier1_results = _evaluate_tier1(A, B)
+    if clock is not None:
+        clock.lap("tier1")
 
     if not tier1_passed:
         # Tier 1 failed - not even similar
-        return SimilarityResult(
-            similarity_score=0.0,
-            is_exact_match=False,
-            is_similar_match=False,
-            tier1_passed=False,
-            satisfied_constraints=[r.to_dict() for r in tier1_results if r.passed],
-            unsatisfied_constraints=[r.to_dict() for r in tier1_results if not r.passed],
-            bonus_attributes={},
-            smart_message="Not a match: fundamental criteria differ (intent, domain, or type).",
-            recommendation="Consider different listings."
-        )
+        return SimilarityScore(0.0, False, False, False, tier1_results)
 
     # Evaluate Tier 2 constraints
     tier2_results = []
@@ -884,6 +925,8 @@ def evaluate_similarity(
             B.get("items", []),
             implies_fn
         ))
+        if clock is not None:
+            clock.lap("items")
 
     # Other→Self matching
     tier2_results.extend(_evaluate_other_self_detailed(
@@ -891,19 +934,62 @@ def evaluate_similarity(
         B.get("self", {}),
         implies_fn
     ))
+    if clock is not None:
+        clock.lap("other_self")
 
     # Location matching
     tier2_results.extend(_evaluate_location_detailed(A, B))
+    if clock is not None:
+        clock.lap("location")
 
-    # Partition results
-    satisfied = [r for r in tier2_results if r.passed]
-    unsatisfied = [r for r in tier2_results if not r.passed]
+    # Check if exact match (all Tier 2 passed)
+    if all(r.passed for r in tier2_results):
+        return SimilarityScore(1.0, True, True, True, tier2_results)
+
+    # Calculate similarity score
+    score = _compute_similarity_score(tier2_results)
+
+    return SimilarityScore(round(score, 3), False, score >= min_score, True, tier2_results)
+
+
+def materialize_similarity(
+    A: Dict[str, Any],
+    B: Dict[str, Any],
+    scored: SimilarityScore
+) -> SimilarityResult:
+    """
+    Build the full SimilarityResult (constraint dicts, bonus attributes,
+    smart message, recommendation) for a scored candidate.
+
+    Args:
+        A: Required listing (query) the candidate was scored against
+        B: Candidate listing
+        scored: Result of score_similarity(A, B, ...)
+
+    Returns:
+        SimilarityResult identical to evaluate_similarity(A, B, ...)
+    """
+    results = scored.results
+    satisfied = [r for r in results if r.passed]
+    unsatisfied = [r for r in results if not r.passed]
+
+    if not scored.tier1_passed:
+        return SimilarityResult(
+            similarity_score=0.0,
+            is_exact_match=False,
+            is_similar_match=False,
+            tier1_passed=False,
+            satisfied_constraints=[r.to_dict() for r in satisfied],
+            unsatisfied_constraints=[r.to_dict() for r in unsatisfied],
+            bonus_attributes={},
+            smart_message="Not a match: fundamental criteria differ (intent, domain, or type).",
+            recommendation="Consider different listings."
+        )
 
     # Compute bonus attributes
-    bonus = _compute_bonus_attributes(A, B)
+    bonus = compute_bonus_attributes(A, B)
 
-    # Check if exact match (all Tier 2 passed)
-    if len(unsatisfied) == 0:
+    if scored.is_exact_match:
         return SimilarityResult(
             similarity_score=1.0,
             is_exact_match=True,
@@ -916,24 +1002,44 @@ def evaluate_similarity(
             recommendation="This listing meets all your criteria."
         )
 
-    # Calculate similarity score
-    score = _compute_similarity_score(tier2_results)
-
-    is_similar = score >= min_score
-
     return SimilarityResult(
-        similarity_score=round(score, 3),
+        similarity_score=scored.similarity_score,
         is_exact_match=False,
-        is_similar_match=is_similar,
+        is_similar_match=scored.is_similar_match,
         tier1_passed=True,
         satisfied_constraints=[r.to_dict() for r in satisfied],
         unsatisfied_constraints=[r.to_dict() for r in unsatisfied],
         bonus_attributes=bonus,
         smart_message=_generate_smart_message(unsatisfied, bonus),
-        recommendation=_generate_recommendation(score, unsatisfied)
+        recommendation=_generate_recommendation(scored.similarity_score, unsatisfied)
     )
 
 
+def evaluate_similarity(
+    A: Dict[str, Any],
+    B: Dict[str, Any],
+    implies_fn: Optional[Callable] = None,
+    min_score: float = 0.70,
+    profiler: Optional[Any] = None
+) -> SimilarityResult:
+    """
+    Evaluate similarity between two listings.
+
+    This is the main entry point for similarity scoring.
+
+    Args:
+        A: Required listing (query) - normalized to OLD format
+        B: Candidate listing - normalized to OLD format
+        implies_fn: Optional term implication function
+        min_score: Minimum score for similar match (default 0.70)
+        profiler: Optional MatchProfile (scoring only, see score_similarity)
+
+    Returns:
+        SimilarityResult with score, constraints, and messages
+    """
+    return materialize_similarity(A, B, score_similarity(A, B, implies_fn, min_score, profiler))
+
+
 def _compute_similarity_score(results: List[ConstraintResult]) -> float:
     """
     Compute weighted similarity score from constraint results.
@@ -951,18 +1057,216 @@ def _compute_similarity_score(results: List[ConstraintResult]) -> float:
     achieved_weight = 0.0
 
     for r in results:
-        weight = CONSTRAINT_WEIGHTS.get(r.constraint_type, 1.0)
+        weight, achieved = _constraint_credit(r)
         total_weight += weight
-
-        if r.passed:
-            achieved_weight += weight
-        elif r.deviation is not None:
-            # Partial credit for close misses
-            partial = _deviation_to_partial_score(r.deviation)
-            achieved_weight += weight * partial
-        # else: no credit for complete miss
+        achieved_weight += achieved
 
     if total_weight == 0:
         return 1.0
 
     return achieved_weight / total_weight
+
+
+def _constraint_credit(r: ConstraintResult) -> Tuple[float, float]:
+    """(weight, achieved weight) of one constraint result."""
+    weight = CONSTRAINT_WEIGHTS.get(r.constraint_type, 1.0)
+    if r.passed:
+        return weight, weight
+    if r.deviation is not None:
+        # Partial credit for close misses
+        return weight, weight * _deviation_to_partial_score(r.deviation)
+    # No credit for complete miss
+    return weight, 0.0
+
+
+# ============================================================================
+# BATCH SCORING
+# ============================================================================
+
+def evaluate_similarity_batch(
+    A: Dict[str, Any],
+    candidates: List[Dict[str, Any]],
+    implies_fn: Optional[Callable] = None,
+    min_score: float = 0.70,
+    k: int = 10
+) -> List[Tuple[int, SimilarityResult]]:
+    """
+    Similar matches of A among candidates, materialized for the top k only.
+
+    Pass 1 scores candidates into a bounded top-k (SimilarTopK); pass 2
+    builds SimilarityResult (dicts, bonus attributes, messages) for the k
+    best non-exact similar matches.
+
+    Args:
+        A: Required listing (query) - normalized to OLD format
+        candidates: Candidate listings - normalized to OLD format
+        implies_fn: Optional term implication function
+        min_score: Minimum score for similar match (default 0.70)
+        k: Maximum number of results
+
+    Returns:
+        (candidate index, SimilarityResult) pairs, highest score first
+    """
+    top_k = SimilarTopK(A, k, min_score, implies_fn)
+    for i, B in enumerate(candidates):
+        top_k.offer(B, i)
+    return [
+        (i, materialize_similarity(A, candidates[i], score))
+        for score, i in top_k.results()
+    ]
+
+
+# ============================================================================
+# TOP-K WITH SCORE UPPER BOUNDS
+# ============================================================================
+
+def _range_count(ranges: Any) -> int:
+    """Range constraints that get evaluated (well-formed [min, max] only)."""
+    if not isinstance(ranges, dict):
+        return 0
+    return sum(1 for r in ranges.values() if isinstance(r, (list, tuple)) and len(r) == 2)
+
+
+def _max_constraints_weight(obj: Dict, exclusions_key: str) -> float:
+    """Total weight of the categorical/min/max/range/exclusion results for obj."""
+    weight = CONSTRAINT_WEIGHTS[ConstraintType.CATEGORICAL] * len(_categorical_to_dict(obj.get("categorical", {})))
+    weight += CONSTRAINT_WEIGHTS[ConstraintType.MIN] * len(obj.get("min", {}))
+    weight += CONSTRAINT_WEIGHTS[ConstraintType.MAX] * len(obj.get("max", {}))
+    weight += CONSTRAINT_WEIGHTS[ConstraintType.RANGE] * _range_count(obj.get("range", {}))
+    if obj.get(exclusions_key):
+        weight += CONSTRAINT_WEIGHTS[ConstraintType.EXCLUSION]
+    return weight
+
+
+class SimilarTopK:
+    """
+    Bounded top-k similar (non-exact) matches for one query A.
+
+    The score is achieved_weight / total_weight over Tier 2 results. The
+    Tier 2 stages (each required item, other→self, location) are
+    evaluated in order; the weight a stage can contribute depends on A
+    only, so after each stage:
+
+        upper_bound = (achieved + remaining) / (total + remaining)
+
+    (every unevaluated constraint present and passed). A candidate is
+    abandoned as soon as the bound is below min_score or cannot beat
+    the current k-th best score (ties keep the earlier candidate, as the
+    stable sort did). Survivors get the exact score and results
+    of score_similarity, so materialize_similarity applies unchanged.
+    """
+
+    # Float slack so the bound never prunes a candidate whose exact
+    # score (summed in another order) equals the threshold
+    _EPSILON = 1e-9
+
+    def __init__(self, A: Dict[str, Any], k: int, min_score: float = 0.70,
+                 implies_fn: Optional[Callable] = None, profiler: Optional[Any] = None):
+        self.A = A
+        self.k = k
+        self.min_score = min_score
+        self.implies_fn = implies_fn
+        self.profiler = profiler  # optional MatchProfile (see score_similarity)
+        self.scored = 0   # candidates offered
+        self.pruned = 0   # abandoned on the upper bound
+        self._heap: List[Tuple[float, int, SimilarityScore, Any]] = []  # (score, -order, ...) min-heap
+        self._stages = self._compile_stages(A, implies_fn)
+        self._max_weight = sum(weight for _, weight, _ in self._stages)
+
+    @staticmethod
+    def _compile_stages(A: Dict[str, Any], implies_fn: Optional[Callable]):
+        """(name, max weight, evaluate(B)) per Tier 2 stage, in score_similarity order."""
+        stages = []
+        if A.get("intent", "") in ("product", "service"):
+            for i, req_item in enumerate(A.get("items", [])):
+                weight = CONSTRAINT_WEIGHTS[ConstraintType.TYPE] + _max_constraints_weight(req_item, "itemexclusions")
+                stages.append(("items", weight, lambda B, req_item=req_item, i=i: _evaluate_items_detailed(
+                    [req_item], B.get("items", []), implies_fn, start_index=i)))
+
+        other = A.get("other", {})
+        stages.append(("other_self", _max_constraints_weight(other, "otherexclusions"),
+                       lambda B: _evaluate_other_self_detailed(other, B.get("self", {}), implies_fn)))
+
+        location_weight = CONSTRAINT_WEIGHTS[ConstraintType.LOCATION]
+        if A.get("locationmode", "near_me") != "global" and A.get("locationexclusions", []):
+            location_weight += CONSTRAINT_WEIGHTS[ConstraintType.EXCLUSION]
+        stages.append(("location", location_weight, lambda B: _evaluate_location_detailed(A, B)))
+        return stages
+
+    @property
+    def floor(self) -> Optional[float]:
+        """Score a candidate must beat to enter (None until k are held)."""
+        return self._heap[0][0] if len(self._heap) >= self.k else None
+
+    def _hopeless(self, achieved: float, total: float, remaining: float) -> bool:
+        remaining = max(remaining, 0.0)
+        denominator = total + remaining
+        if denominator == 0:
+            return False
+        bound = (achieved + remaining) / denominator + self._EPSILON
+        if bound < self.min_score:
+            return True
+        floor = self.floor
+        return floor is not None and round(bound, 3) <= floor
+
+    def _score(self, B: Dict[str, Any], clock: Optional[Any] = None) -> Optional[SimilarityScore]:
+        """Exact SimilarityScore (Tier 1 failures included), or None once pruned."""
+        tier1_passed, tier1_results = _evaluate_tier1(self.A, B)
+        if clock is not None:
+            clock.lap("tier1")
+        if not tier1_passed:
+            return SimilarityScore(0.0, False, False, False, tier1_results)
+
+        results: List[ConstraintResult] = []
+        achieved = total = 0.0
+        remaining = self._max_weight
+        for name, max_weight, evaluate in self._stages:
+            stage_results = evaluate(B)
+            if clock is not None:
+                clock.lap(name)
+            for r in stage_results:
+                weight, credit = _constraint_credit(r)
+                total += weight
+                achieved += credit
+            results.extend(stage_results)
+            remaining -= max_weight
+            if achieved < total and self._hopeless(achieved, total, remaining):
+                self.pruned += 1
+                return None
+
+        if all(r.passed for r in results):
+            return SimilarityScore(1.0, True, True, True, results)
+        score = _compute_similarity_score(results)
+        return SimilarityScore(round(score, 3), False, score >= self.min_score, True, results)
+
+    def offer(self, B: Dict[str, Any], payload: Any = None) -> Optional[SimilarityScore]:
+        """
+        Score B and keep it if it is among the k best similar matches so far.
+
+        Returns:
+            The SimilarityScore when B was kept, else None
+        """
+        if self.k <= 0:
+            return None
+        order = self.scored
+        self.scored += 1
+        if self.profiler is None:
+            scored = self._score(B)
+        else:
+            from matching.match_profiler import profiled_similarity
+            scored = profiled_similarity(self.profiler, self.A, lambda clock: self._score(B, clock))
+        if scored is None or scored.is_exact_match or not scored.is_similar_match:
+            return None
+
+        entry = (scored.similarity_score, -order, scored, payload)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+        else:
+            return None
+        return scored
+
+    def results(self) -> List[Tuple[SimilarityScore, Any]]:
+        """(SimilarityScore, payload) pairs, highest score first (ties: earliest offered)."""
+        return [(scored, payload) for _, _, scored, payload in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
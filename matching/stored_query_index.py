@@ -0,0 +1,290 @@
+"""
+StoredQueryIndex: Inverted index of standing requests (percolator).
+
+/search-and-match checks a query against listings that already exist.
+The reverse direction — a new listing arriving after the query was
+made — needs the query to be stored and looked up by the listing.
+
+Each stored query A is posted under the keys a listing B must share to
+pass the cheap gates of listing_matches_v2(A, B):
+
+    product/service: (intent, A.subintent, domain, first required item type)
+    mutual:          (intent, A.subintent, category, "*")
+
+Lookup for a new listing B:
+- M-01: same intent
+- M-02: subintent ≠ B.subintent (product/service); M-03: = (mutual)
+- M-05/M-06: one bucket per B.domain / B.category
+- M-07: B's item types, plus indexed types that one of B's types
+  implies (implies_fn is asked per distinct indexed type, never per
+  query); queries without items live under "*"
+
+Only the queries in the matched postings go through the full
+listing_matches_v2 check (categorical, numeric, other→self, location).
+A listing never matches its owner's own stored queries.
+
+Bounded: queries older than STORED_QUERY_TTL_DAYS are dropped on
+lookup, and past STORED_QUERY_MAX_ENTRIES the oldest are evicted.
+
+Singleton pattern — one index shared across the app.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from matching.listing_matcher_v2 import listing_matches_v2
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Percolate new listings against stored /search-and-match queries (1=enabled)
+ENABLE_PERCOLATION = os.environ.get("ENABLE_PERCOLATION", "1") == "1"
+
+# Stored queries stop percolating after this many days (0 = never expire)
+STORED_QUERY_TTL_DAYS = float(os.environ.get("STORED_QUERY_TTL_DAYS", "30"))
+
+# In-memory cap; the oldest stored queries are evicted first
+STORED_QUERY_MAX_ENTRIES = int(os.environ.get("STORED_QUERY_MAX_ENTRIES", "100000"))
+
+ANY_TYPE = "*"
+
+ImplicationFn = Callable[[str, str], bool]
+BucketKey = Tuple[str, str, str]
+
+
+def _scopes(listing: Dict[str, Any]) -> List[str]:
+    """Domain (product/service) or category (mutual) values of a listing."""
+    field = "category" if listing.get("intent") == "mutual" else "domain"
+    return list(listing.get(field) or [])
+
+
+def _type_key(listing: Dict[str, Any]) -> str:
+    """Posting type for a stored query (first required item type, else "*")."""
+    if listing.get("intent") == "mutual":
+        return ANY_TYPE
+    items = listing.get("items") or []
+    return (items[0].get("type") or ANY_TYPE) if items else ANY_TYPE
+
+
+class StoredQueryIndex:
+    """
+    In-memory inverted index of stored queries.
+
+    Postings:
+        {(intent, subintent, scope): {item_type: {query_id, ...}}}
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = STORED_QUERY_TTL_DAYS * 86400,
+        max_entries: int = STORED_QUERY_MAX_ENTRIES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = Lock()
+        # Insertion order = age order (load_stored_queries reads oldest first)
+        self._queries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._postings: Dict[BucketKey, Dict[str, Set[str]]] = {}
+        self._subintents: Dict[str, Set[str]] = {}
+
+        # Stats
+        self._lookups = 0
+        self._candidates = 0
+        self._matches = 0
+        self._expired = 0
+        self._evicted = 0
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def add(
+        self,
+        query_id: str,
+        listing: Dict[str, Any],
+        user_id: Optional[str] = None,
+        created_at: Optional[float] = None
+    ) -> None:
+        """
+        Index a normalized query listing (replaces an existing entry).
+
+        Args:
+            created_at: Unix time the query was stored (default: now)
+        """
+        intent = listing.get("intent")
+        subintent = listing.get("subintent")
+        if not intent or not subintent:
+            return
+        created_at = time.time() if created_at is None else created_at
+        if self._is_expired(created_at, time.time()):
+            return
+
+        with self._lock:
+            self._remove_locked(query_id)
+            type_key = _type_key(listing)
+            for scope in _scopes(listing):
+                bucket = self._postings.setdefault((intent, subintent, scope), {})
+                bucket.setdefault(type_key, set()).add(query_id)
+            self._subintents.setdefault(intent, set()).add(subintent)
+            self._queries[query_id] = {
+                "query_id": query_id, "user_id": user_id, "listing": listing, "created_at": created_at
+            }
+            while self.max_entries > 0 and len(self._queries) > self.max_entries:
+                self._remove_locked(next(iter(self._queries)))
+                self._evicted += 1
+
+    def remove(self, query_id: str) -> None:
+        with self._lock:
+            self._remove_locked(query_id)
+
+    def _remove_locked(self, query_id: str) -> None:
+        entry = self._queries.pop(query_id, None)
+        if entry is None:
+            return
+        listing = entry["listing"]
+        key = (listing["intent"], listing["subintent"])
+        type_key = _type_key(listing)
+        for scope in _scopes(listing):
+            bucket = self._postings.get(key + (scope,))
+            if not bucket or type_key not in bucket:
+                continue
+            bucket[type_key].discard(query_id)
+            if not bucket[type_key]:
+                del bucket[type_key]
+            if not bucket:
+                del self._postings[key + (scope,)]
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and created_at < now - self.ttl_seconds
+
+    def prune_expired(self) -> int:
+        """Drop expired queries; returns how many were dropped."""
+        now = time.time()
+        with self._lock:
+            expired = [q for q, e in self._queries.items() if self._is_expired(e["created_at"], now)]
+            for query_id in expired:
+                self._remove_locked(query_id)
+            self._expired += len(expired)
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    def __contains__(self, query_id: str) -> bool:
+        return query_id in self._queries
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def candidates(self, listing: Dict[str, Any], implies_fn: Optional[ImplicationFn] = None) -> List[Dict[str, Any]]:
+        """
+        Stored queries that listing could satisfy on intent, subintent,
+        domain/category and item type (no full scan).
+        """
+        intent = listing.get("intent")
+        subintent = listing.get("subintent")
+
+        with self._lock:
+            known = self._subintents.get(intent, set())
+            if intent == "mutual":
+                subintents = [subintent] if subintent in known else []
+            else:
+                subintents = [s for s in known if s != subintent]
+
+            listing_types = {item.get("type") for item in listing.get("items") or [] if item.get("type")}
+            implied: Dict[str, bool] = {}
+
+            query_ids: Set[str] = set()
+            for s in subintents:
+                for scope in _scopes(listing):
+                    bucket = self._postings.get((intent, s, scope))
+                    if not bucket:
+                        continue
+                    for type_key, ids in bucket.items():
+                        if type_key == ANY_TYPE or type_key in listing_types:
+                            query_ids |= ids
+                        elif implies_fn and listing_types:
+                            if type_key not in implied:
+                                implied[type_key] = any(implies_fn(t, type_key) for t in listing_types)
+                            if implied[type_key]:
+                                query_ids |= ids
+
+            now = time.time()
+            entries = []
+            for query_id in query_ids:
+                entry = self._queries[query_id]
+                if self._is_expired(entry["created_at"], now):
+                    self._remove_locked(query_id)
+                    self._expired += 1
+                else:
+                    entries.append(entry)
+            self._lookups += 1
+            self._candidates += len(entries)
+        return entries
+
+    def percolate(
+        self,
+        listing_id: str,
+        listing: Dict[str, Any],
+        implies_fn: Optional[ImplicationFn] = None,
+        user_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Stored queries that listing satisfies (listing_matches_v2(query, listing)).
+
+        Args:
+            user_id: Owner of listing; their own stored queries are skipped
+
+        Returns:
+            [{query_id, user_id, listing, created_at}, ...]
+        """
+        matched = []
+        for entry in self.candidates(listing, implies_fn):
+            if entry["query_id"] == listing_id:
+                continue
+            if user_id and entry["user_id"] == user_id:
+                continue
+            try:
+                if listing_matches_v2(entry["listing"], listing, implies_fn=implies_fn):
+                    matched.append(entry)
+            except Exception:
+                continue
+
+        with self._lock:
+            self._matches += len(matched)
+        return matched
+
+    def get_stats(self) -> Dict:
+        """Get index statistics."""
+        with self._lock:
+            return {
+                "stored_queries": len(self._queries),
+                "buckets": len(self._postings),
+                "lookups": self._lookups,
+                "candidates_checked": self._candidates,
+                "matches": self._matches,
+                "expired": self._expired,
+                "evicted": self._evicted,
+                "avg_candidates": round(self._candidates / self._lookups, 2) if self._lookups else 0.0,
+            }
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Singleton
+# ═══════════════════════════════════════════════════════════════════
+
+_stored_query_index: Optional[StoredQueryIndex] = None
+
+
+def get_stored_query_index() -> StoredQueryIndex:
+    """Get singleton StoredQueryIndex."""
+    global _stored_query_index
+    if _stored_query_index is None:
+        _stored_query_index = StoredQueryIndex()
+    return _stored_query_index
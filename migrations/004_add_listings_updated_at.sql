@@ -0,0 +1,88 @@
+-- ============================================================================
+-- Migration 004: Add updated_at to listings tables
+-- Date: 2026-10-18
+-- Purpose: Version stamp + change feed for the in-process listing cache
+--          (pipeline/listing_cache.py polls updated_at > watermark to
+--          invalidate rows written by other workers).
+--
+-- Run this in: Supabase Dashboard > SQL Editor > New Query
+-- ============================================================================
+
+-- ============================================================================
+-- PART 1: Add updated_at columns
+-- ============================================================================
+
+-- Added without a default so existing rows can be backfilled from
+-- created_at (a DEFAULT would stamp them all with the migration time)
+ALTER TABLE product_listings ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE service_listings ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE mutual_listings ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+
+-- Backfill existing rows
+UPDATE product_listings SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE service_listings SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE mutual_listings SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+
+-- New rows
+ALTER TABLE product_listings ALTER COLUMN updated_at SET DEFAULT NOW();
+ALTER TABLE service_listings ALTER COLUMN updated_at SET DEFAULT NOW();
+ALTER TABLE mutual_listings ALTER COLUMN updated_at SET DEFAULT NOW();
+
+-- ============================================================================
+-- PART 2: Indexes for change-feed polling
+-- ============================================================================
+
+-- The poller pages in (updated_at, id) order
+CREATE INDEX IF NOT EXISTS idx_product_updated ON product_listings(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_service_updated ON service_listings(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_mutual_updated ON mutual_listings(updated_at, id);
+
+-- ============================================================================
+-- PART 3: Auto-update trigger for updated_at
+-- ============================================================================
+
+-- Function to auto-update updated_at on row modification
+CREATE OR REPLACE FUNCTION update_listing_timestamp()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_product_listings_updated ON product_listings;
+CREATE TRIGGER trg_product_listings_updated
+    BEFORE UPDATE ON product_listings
+    FOR EACH ROW
+    EXECUTE FUNCTION update_listing_timestamp();
+
+DROP TRIGGER IF EXISTS trg_service_listings_updated ON service_listings;
+CREATE TRIGGER trg_service_listings_updated
+    BEFORE UPDATE ON service_listings
+    FOR EACH ROW
+    EXECUTE FUNCTION update_listing_timestamp();
+
+DROP TRIGGER IF EXISTS trg_mutual_listings_updated ON mutual_listings;
+CREATE TRIGGER trg_mutual_listings_updated
+    BEFORE UPDATE ON mutual_listings
+    FOR EACH ROW
+    EXECUTE FUNCTION update_listing_timestamp();
+
+-- ============================================================================
+-- VERIFICATION QUERIES (Run after migration)
+-- ============================================================================
+
+-- Check columns:
+-- SELECT table_name, column_name, data_type
+-- FROM information_schema.columns
+-- WHERE table_name IN ('product_listings', 'service_listings', 'mutual_listings')
+--   AND column_name = 'updated_at';
+
+-- Check triggers:
+-- SELECT event_object_table, trigger_name FROM information_schema.triggers
+-- WHERE trigger_name LIKE 'trg_%_listings_updated';
+
+-- Sample change-feed query (what the cache poller runs):
+-- SELECT id, updated_at FROM product_listings
+-- WHERE updated_at > NOW() - INTERVAL '1 minute'
+-- ORDER BY updated_at, id LIMIT 1000;
@@ -0,0 +1,40 @@
+-- ============================================================================
+-- Migration 005: Create stored_queries table
+-- Date: 2026-10-18
+-- Purpose: Standing requests for prospective matching. /search-and-match
+--          stores its normalized query here; new listings are matched
+--          against them on ingestion (pipeline/percolator.py), and the
+--          in-process index is rebuilt from this table on startup.
+--
+-- Run this in: Supabase Dashboard > SQL Editor > New Query
+-- ============================================================================
+
+-- ============================================================================
+-- PART 1: Create stored_queries table
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS stored_queries (
+    query_id UUID PRIMARY KEY,          -- = listing id of the stored query
+    user_id UUID,
+    intent TEXT NOT NULL,
+    data JSONB NOT NULL,                -- normalized query (OLD format)
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- ============================================================================
+-- PART 2: Indexes
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_stored_queries_user ON stored_queries(user_id);
+CREATE INDEX IF NOT EXISTS idx_stored_queries_intent ON stored_queries(intent);
+
+-- ============================================================================
+-- VERIFICATION QUERIES (Run after migration)
+-- ============================================================================
+
+-- Check table:
+-- SELECT column_name, data_type FROM information_schema.columns
+-- WHERE table_name = 'stored_queries';
+
+-- Stored queries per intent:
+-- SELECT intent, COUNT(*) FROM stored_queries GROUP BY intent;
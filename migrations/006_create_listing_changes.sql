@@ -0,0 +1,83 @@
+-- ============================================================================
+-- Migration 006: Listing change feed + match lookup indexes
+-- Date: 2026-10-18
+-- Purpose: Incremental match maintenance (pipeline/match_maintenance.py).
+--          UPDATE/DELETE on the listings tables append an event to
+--          listing_changes; the maintenance job consumes the events,
+--          looks up affected matches by listing id and re-evaluates only
+--          those pairs.
+--
+-- Run this in: Supabase Dashboard > SQL Editor > New Query
+-- ============================================================================
+
+-- ============================================================================
+-- PART 1: Create listing_changes table
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS listing_changes (
+    change_id BIGSERIAL PRIMARY KEY,
+    listing_id UUID NOT NULL,
+    intent TEXT NOT NULL,               -- product | service | mutual
+    op TEXT NOT NULL CHECK (op IN ('update', 'delete')),
+    changed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_listing_changes_listing ON listing_changes(listing_id);
+
+-- ============================================================================
+-- PART 2: Change triggers on listings tables
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION log_listing_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO listing_changes (listing_id, intent, op)
+        VALUES (OLD.id, replace(TG_TABLE_NAME, '_listings', ''), 'delete');
+        RETURN OLD;
+    END IF;
+
+    -- Only data changes affect matching (skip updated_at-only touches)
+    IF NEW.data IS DISTINCT FROM OLD.data THEN
+        INSERT INTO listing_changes (listing_id, intent, op)
+        VALUES (NEW.id, replace(TG_TABLE_NAME, '_listings', ''), 'update');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_product_listings_change ON product_listings;
+CREATE TRIGGER trg_product_listings_change
+    AFTER UPDATE OR DELETE ON product_listings
+    FOR EACH ROW
+    EXECUTE FUNCTION log_listing_change();
+
+DROP TRIGGER IF EXISTS trg_service_listings_change ON service_listings;
+CREATE TRIGGER trg_service_listings_change
+    AFTER UPDATE OR DELETE ON service_listings
+    FOR EACH ROW
+    EXECUTE FUNCTION log_listing_change();
+
+DROP TRIGGER IF EXISTS trg_mutual_listings_change ON mutual_listings;
+CREATE TRIGGER trg_mutual_listings_change
+    AFTER UPDATE OR DELETE ON mutual_listings
+    FOR EACH ROW
+    EXECUTE FUNCTION log_listing_change();
+
+-- ============================================================================
+-- PART 3: Indexes for affected-match lookup
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_matches_listing_a ON matches(listing_a_id);
+CREATE INDEX IF NOT EXISTS idx_matches_listing_b ON matches(listing_b_id);
+
+-- ============================================================================
+-- VERIFICATION QUERIES (Run after migration)
+-- ============================================================================
+
+-- Check triggers:
+-- SELECT event_object_table, trigger_name FROM information_schema.triggers
+-- WHERE trigger_name LIKE 'trg_%_listings_change';
+
+-- Pending events:
+-- SELECT op, COUNT(*) FROM listing_changes GROUP BY op;
@@ -0,0 +1,424 @@
+"""
+BULK IMPORT: Streaming, resumable JSONL → Supabase + Qdrant
+
+Responsibilities:
+- Stream a JSONL dump line by line (bounded memory: at most two batches
+  in flight)
+- canonicalize → normalize each listing on a worker pool; the batch's
+  location names are geocoded together first (geocode_many: deduplicated,
+  rate-limited, concurrent), so per-listing canonicalization hits the cache
+- Batched ingest (ingest_batch: bulk insert, one encode, chunked upserts)
+- Checkpoint the byte offset after every batch so a crashed import
+  resumes where it stopped
+- Report throughput (listings/s) and per-stage time
+
+Listing ids come from the record's own id ("listing_id" / "id") or,
+failing that, from a hash of the line's content, and Supabase rows are
+upserted, so re-running a batch after a crash - or importing the same
+record from another dump - does not duplicate it.
+
+Each line may be:
+- {"listing": {...}, "user_id": "..."}   (explicit)
+- {"normalized_query": {...}, ...}       (testing/test_data seed entries)
+- {...}                                  (a bare NEW-schema listing)
+or use --field to pick a top-level key.
+
+Usage:
+    python -m pipeline.bulk_import listings.jsonl --user-id <uuid>
+    python -m pipeline.bulk_import listings.jsonl --batch-size 256 --workers 8
+    python -m pipeline.bulk_import listings.jsonl --skip-canonicalize
+    jq -c '.[]' testing/test_data/seed_listings.json > seed.jsonl
+
+Dependencies: pipeline.ingestion_pipeline, schema.schema_normalizer_v2,
+              canonicalization.orchestrator
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pipeline.ingestion_pipeline import IngestionClients, ingest_batch
+from schema.schema_normalizer_v2 import normalize_and_validate_v2
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_BATCH_SIZE = 128
+DEFAULT_WORKERS = 4
+
+# Namespace for deterministic listing ids (record id or content hash)
+IMPORT_NAMESPACE = uuid.UUID("6f1d7a52-3c1e-4f0a-9a55-5b0c2f0e8d11")
+
+LISTING_FIELDS = ("listing", "normalized_query")
+RECORD_ID_FIELDS = ("listing_id", "id")
+
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+def iter_jsonl(path: str, start_offset: int = 0, start_line: int = 0) -> Iterator[Tuple[int, int, str]]:
+    """
+    Stream (line_no, end_offset, text) from a JSONL file.
+
+    end_offset is the byte offset just past the line, i.e. the checkpoint
+    to resume from once this line is processed. Blank lines are skipped.
+    """
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        line_no = start_line
+        for raw in f:
+            line_no += 1
+            end_offset = f.tell()
+            text = raw.decode("utf-8").strip()
+            if text:
+                yield line_no, end_offset, text
+
+
+def iter_batches(lines: Iterator[Tuple[int, int, str]], batch_size: int) -> Iterator[List[Tuple[int, int, str]]]:
+    batch = []
+    for item in lines:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def extract_record(record: Dict[str, Any], field: Optional[str] = None) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Pull (listing, user_id) out of one JSONL record."""
+    user_id = record.get("user_id")
+    if field:
+        return record[field], user_id
+    for key in LISTING_FIELDS:
+        if isinstance(record.get(key), dict):
+            return record[key], user_id
+    return record, user_id
+
+
+def record_listing_id(record: Dict[str, Any], text: str) -> str:
+    """Deterministic listing id: the record's own id, else a hash of the line."""
+    for key in RECORD_ID_FIELDS:
+        value = record.get(key)
+        if value in (None, ""):
+            continue
+        try:
+            return str(uuid.UUID(str(value)))
+        except ValueError:
+            return str(uuid.uuid5(IMPORT_NAMESPACE, f"id:{value}"))
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(IMPORT_NAMESPACE, f"sha256:{digest}"))
+
+
+# ============================================================================
+# CHECKPOINT
+# ============================================================================
+
+def load_checkpoint(path: str, input_path: str) -> Dict[str, Any]:
+    """Load checkpoint for input_path (fresh state if missing or for another file)."""
+    fresh = {"input": os.path.abspath(input_path), "offset": 0, "line": 0, "ingested": 0, "failed": 0}
+    if not path or not os.path.exists(path):
+        return fresh
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("input") != fresh["input"]:
+        return fresh
+    return state
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    """Atomically write the checkpoint (write + rename)."""
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+class StageTimer:
+    """Thread-safe accumulated seconds per stage."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+
+def _location_names(text: str, field: Optional[str]) -> List[str]:
+    """target_location name / origin / destination of one JSONL line (NEW schema)."""
+    try:
+        listing, _ = extract_record(json.loads(text), field)
+        location = listing.get("target_location")
+    except Exception:
+        return []  # reported by _prepare_one
+    if not isinstance(location, dict):
+        return []
+    return [location[key] for key in ("name", "origin", "destination")
+            if isinstance(location.get(key), str) and location[key]]
+
+
+def prefetch_locations(batch: List[Tuple[int, int, str]], field: Optional[str], timer: StageTimer) -> int:
+    """Geocode every location name of a batch in one geocode_many call. Never raises."""
+    names = [name for _, _, text in batch for name in _location_names(text, field)]
+    if not names:
+        return 0
+    try:
+        from services.external.geocoding_service import get_geocoding_service
+        t0 = time.perf_counter()
+        resolved = get_geocoding_service().geocode_many(names)
+        timer.add("geocode", time.perf_counter() - t0)
+        return len(resolved)
+    except Exception as e:
+        print(f"Warning: location prefetch failed: {e}")
+        return 0
+
+
+def _prepare_one(
+    line_no: int,
+    text: str,
+    field: Optional[str],
+    canonicalize: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]],
+    timer: StageTimer
+) -> Dict[str, Any]:
+    """Parse → canonicalize → normalize one line. Never raises."""
+    try:
+        t0 = time.perf_counter()
+        record = json.loads(text)
+        listing, user_id = extract_record(record, field)
+        listing_id = record_listing_id(record, text)
+        t1 = time.perf_counter()
+        timer.add("parse", t1 - t0)
+
+        if canonicalize is not None:
+            listing = canonicalize(listing)
+        t2 = time.perf_counter()
+        timer.add("canonicalize", t2 - t1)
+
+        normalized = normalize_and_validate_v2(listing)
+        timer.add("normalize", time.perf_counter() - t2)
+
+        return {"line": line_no, "listing": normalized, "user_id": user_id, "listing_id": listing_id}
+    except Exception as e:
+        return {"line": line_no, "error": f"{type(e).__name__}: {e}", "stage": "prepare"}
+
+
+def run_import(
+    input_path: str,
+    clients: IngestionClients,
+    checkpoint_path: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    user_id: Optional[str] = None,
+    field: Optional[str] = None,
+    canonicalize: bool = True,
+    limit: Optional[int] = None,
+    errors_path: Optional[str] = None,
+    verbose: bool = True
+) -> Dict[str, Any]:
+    """
+    Stream input_path through canonicalize → normalize → ingest_batch.
+
+    Args:
+        input_path: JSONL file
+        clients: Initialized IngestionClients
+        checkpoint_path: Checkpoint file (None disables resume)
+        batch_size: Lines per ingest batch
+        workers: Threads for canonicalize/normalize
+        user_id: Default owner for lines without user_id
+        field: Top-level key holding the listing (auto-detected if None)
+        canonicalize: Run canonicalize_listing before normalizing
+        limit: Stop after this many lines (this run)
+        errors_path: JSONL file for failed lines (line, stage, error)
+        verbose: Print per-batch progress
+
+    Returns:
+        Stats dict (lines, ingested, failed, elapsed_s, listings_per_s,
+        stage_seconds, resumed_from_line)
+    """
+    canonicalize_fn = None
+    if canonicalize:
+        from canonicalization.orchestrator import canonicalize_listing
+        canonicalize_fn = canonicalize_listing
+
+    state = load_checkpoint(checkpoint_path, input_path)
+    resumed_from = state["line"]
+    timer = StageTimer()
+
+    lines = iter_jsonl(input_path, state["offset"], state["line"])
+    if limit is not None:
+        lines = itertools.islice(lines, limit)
+
+    errors_file = open(errors_path, "a", encoding="utf-8") if errors_path else None
+    started = time.perf_counter()
+    processed = ingested = failed = 0
+
+    def _prepare_batch(executor, batch):
+        if canonicalize_fn is not None:
+            # Resolve the batch's names (geocode_many runs its own lookups in
+            # parallel) before its listings are canonicalized from the cache
+            prefetch_locations(batch, field, timer)
+        return [
+            executor.submit(_prepare_one, line_no, text, field, canonicalize_fn, timer)
+            for line_no, _, text in batch
+        ]
+
+    def _record_failure(line_no, stage, error):
+        if errors_file:
+            errors_file.write(json.dumps({"line": line_no, "stage": stage, "error": error}) + "\n")
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            batches = iter_batches(lines, batch_size)
+            current = next(batches, None)
+            pending = _prepare_batch(executor, current) if current else None
+
+            while current:
+                # Start preparing the next batch while this one is ingested
+                upcoming = next(batches, None)
+                upcoming_futures = _prepare_batch(executor, upcoming) if upcoming else None
+
+                prepared = [f.result() for f in pending]
+                ready = [p for p in prepared if "listing" in p]
+                for p in prepared:
+                    if "error" in p:
+                        _record_failure(p["line"], p["stage"], p["error"])
+                batch_failed = len(prepared) - len(ready)
+
+                if ready:
+                    t0 = time.perf_counter()
+                    report = ingest_batch(
+                        clients,
+                        [p["listing"] for p in ready],
+                        user_ids=[p["user_id"] or user_id for p in ready],
+                        listing_ids=[p["listing_id"] for p in ready],
+                        idempotent=True,
+                        verbose=False
+                    )
+                    timer.add("ingest", time.perf_counter() - t0)
+                    for p, item in zip(ready, report):
+                        if item["status"] != "success":
+                            batch_failed += 1
+                            _record_failure(p["line"], item["stage"], item["error"])
+
+                processed += len(prepared)
+                failed += batch_failed
+                ingested += len(prepared) - batch_failed
+
+                # Checkpoint past the last line of this batch
+                state.update(
+                    offset=current[-1][1],
+                    line=current[-1][0],
+                    ingested=state["ingested"] + len(prepared) - batch_failed,
+                    failed=state["failed"] + batch_failed
+                )
+                save_checkpoint(checkpoint_path, state)
+                if errors_file:
+                    errors_file.flush()
+
+                if verbose:
+                    elapsed = time.perf_counter() - started
+                    print(f"  line {state['line']}: +{len(prepared) - batch_failed} ingested, "
+                          f"{batch_failed} failed ({processed / elapsed:.1f} listings/s)")
+
+                current, pending = upcoming, upcoming_futures
+    finally:
+        if errors_file:
+            errors_file.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "lines": processed,
+        "ingested": ingested,
+        "failed": failed,
+        "elapsed_s": round(elapsed, 3),
+        "listings_per_s": round(ingested / elapsed, 2) if elapsed > 0 else 0.0,
+        "stage_seconds": {k: round(v, 3) for k, v in timer.seconds.items()},
+        "resumed_from_line": resumed_from,
+    }
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import JSONL listings into Supabase + Qdrant")
+    parser.add_argument("input", help="JSONL file (one listing per line)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <input>.checkpoint.json)")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore and overwrite an existing checkpoint")
+    parser.add_argument("--errors", help="Failed-lines JSONL (default: <input>.errors.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Lines per ingest batch")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Canonicalize/normalize threads")
+    parser.add_argument("--user-id", help="Owner for lines without user_id")
+    parser.add_argument("--field", help="Top-level key holding the listing")
+    parser.add_argument("--skip-canonicalize", action="store_true", help="Input is already canonical")
+    parser.add_argument("--limit", type=int, help="Stop after N lines")
+    parser.add_argument("-q", "--quiet", action="store_true", help="No per-batch progress")
+    args = parser.parse_args(argv)
+
+    checkpoint_path = args.checkpoint or f"{args.input}.checkpoint.json"
+    if args.no_resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    print("=" * 70)
+    print(f"BULK IMPORT: {args.input}")
+    print("=" * 70)
+
+    clients = IngestionClients()
+    try:
+        clients.initialize()
+    except Exception as e:
+        print(f"✗ Initialization failed: {e}")
+        return 1
+
+    stats = run_import(
+        args.input,
+        clients,
+        checkpoint_path=checkpoint_path,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        user_id=args.user_id,
+        field=args.field,
+        canonicalize=not args.skip_canonicalize,
+        limit=args.limit,
+        errors_path=args.errors or f"{args.input}.errors.jsonl",
+        verbose=not args.quiet
+    )
+
+    print()
+    print("=" * 70)
+    print("IMPORT COMPLETE")
+    print("=" * 70)
+    if stats["resumed_from_line"]:
+        print(f"Resumed from line: {stats['resumed_from_line']}")
+    print(f"Lines:      {stats['lines']}")
+    print(f"Ingested:   {stats['ingested']}")
+    print(f"Failed:     {stats['failed']}")
+    print(f"Elapsed:    {stats['elapsed_s']}s ({stats['listings_per_s']} listings/s)")
+    print("Stage time (summed across workers):")
+    for stage, seconds in stats["stage_seconds"].items():
+        print(f"  {stage:<13} {seconds:.3f}s")
+    return 0 if stats["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,7 +18,10 @@ Date: 2026-01-12
 
 import os
 import time
-from typing import Dict, Any, Optional, Tuple
+import json
+import hashlib
+from array import array
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from datetime import datetime
 import uuid
 
@@ -27,6 +30,7 @@ from qdrant_client import QdrantClient
 from qdrant_client.models import PointStruct
 
 from embedding.embedding_builder import build_embedding_text
+from embedding.embedding_store import get_embedding_store
 
 
 # ============================================================================
@@ -53,6 +57,25 @@ EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 # - all-MiniLM-L6-v2: 384
 EMBEDDING_DIM = 1024 if "large" in EMBEDDING_MODEL else 384
 
+# Qdrant payload content (lets retrieval serve candidates without Supabase):
+# - "listing": full normalized listing stored under payload["data"]
+# - "match_features": listing minus free-text fields (smaller payload)
+# - "ids": listing_id/intent/domain only (legacy behaviour)
+QDRANT_PAYLOAD_MODE = os.environ.get("QDRANT_PAYLOAD_MODE", "listing").lower()
+
+# Fields that listing_matches_v2 / evaluate_similarity never read
+NON_MATCH_FIELDS = {"reasoning"}
+
+# Batch ingestion
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "64"))
+QDRANT_UPSERT_BATCH_SIZE = int(os.environ.get("QDRANT_UPSERT_BATCH_SIZE", "256"))
+
+# Skip Qdrant upserts whose vector + payload fingerprint is already stored
+SKIP_UNCHANGED_UPSERTS = os.environ.get("SKIP_UNCHANGED_UPSERTS", "1") == "1"
+
+# Payload keys excluded from the point fingerprint (change on every write)
+VOLATILE_PAYLOAD_KEYS = {"created_at", "point_fingerprint"}
+
 
 # ============================================================================
 # CLIENT INITIALIZATION
@@ -98,6 +121,41 @@ class IngestionClients:
 # SUPABASE INSERTION
 # ============================================================================
 
+def get_table_name(intent: str) -> str:
+    """
+    Map intent to Supabase listings table.
+
+    Raises:
+        ValueError: If intent unknown
+    """
+    if intent == "product":
+        return "product_listings"
+    elif intent == "service":
+        return "service_listings"
+    elif intent == "mutual":
+        return "mutual_listings"
+    raise ValueError(f"Unknown intent: {intent}")
+
+
+def build_supabase_row(
+    listing: Dict[str, Any],
+    listing_id: str,
+    user_id: Optional[str] = None,
+    match_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Build the listings-table row for a normalized listing."""
+    data = {
+        "id": listing_id,
+        "data": listing,  # Store entire listing as JSONB
+        "created_at": datetime.utcnow().isoformat()
+    }
+    if user_id:
+        data["user_id"] = user_id
+    if match_id:
+        data["match_id"] = match_id
+    return data
+
+
 def insert_to_supabase(
     client: Client,
     listing: Dict[str, Any],
@@ -132,23 +190,10 @@ def insert_to_supabase(
         listing_id = str(uuid.uuid4())
 
     # Select table
-    if intent == "product":
-        table_name = "product_listings"
-    elif intent == "service":
-        table_name = "service_listings"
-    elif intent == "mutual":
-        table_name = "mutual_listings"
-    else:
-        raise ValueError(f"Unknown intent: {intent}")
+    table_name = get_table_name(intent)
 
     # Prepare data for insertion
-    data = {
-        "id": listing_id,
-        "data": listing,  # Store entire listing as JSONB
-        "created_at": datetime.utcnow().isoformat()
-    }
-    if user_id:
-        data["user_id"] = user_id
+    data = build_supabase_row(listing, listing_id, user_id)
 
     # Insert
     try:
@@ -169,6 +214,9 @@ def generate_embedding(
     """
     Generate 1024D embedding vector from text.
 
+    Reuses the content-addressed embedding store (model + text hash) when
+    enabled, so identical content is only encoded once per model.
+
     Args:
         model: Sentence transformer model
         text: Input text
@@ -179,7 +227,11 @@ def generate_embedding(
     Raises:
         ValueError: If embedding dimension incorrect
     """
-    embedding = model.encode(text, convert_to_tensor=False)
+    store = get_embedding_store()
+    if store is not None:
+        embedding = store.encode(model, EMBEDDING_MODEL, [text])[0]
+    else:
+        embedding = model.encode(text, convert_to_tensor=False).tolist()
 
     # Verify dimension
     if len(embedding) != EMBEDDING_DIM:
@@ -187,57 +239,137 @@ def generate_embedding(
             f"Embedding dimension mismatch: expected {EMBEDDING_DIM}, got {len(embedding)}"
         )
 
-    return embedding.tolist()
+    return embedding
 
 
 # ============================================================================
 # QDRANT INSERTION
 # ============================================================================
 
-def insert_to_qdrant(
+def listing_content_hash(listing: Dict[str, Any]) -> str:
+    """
+    Stable content hash of a normalized listing.
+
+    Stored in the Qdrant payload as "data_hash" so payload copies can be
+    checked against Supabase (source of truth).
+    """
+    encoded = json.dumps(listing, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def point_fingerprint(vector: List[float], payload: Dict[str, Any]) -> str:
+    """Fingerprint of a Qdrant point: float32 vector bytes + stable payload."""
+    stable = {k: v for k, v in payload.items() if k not in VOLATILE_PAYLOAD_KEYS}
+    encoded = json.dumps(stable, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(array("f", vector).tobytes())
+    digest.update(encoded.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def filter_unchanged_points(
     client: QdrantClient,
+    collection_name: str,
+    points: List[PointStruct],
+    new_ids: Iterable[str] = ()
+) -> List[PointStruct]:
+    """
+    Drop points whose vector and payload are unchanged in Qdrant.
+
+    Returns copies of the points to write, each payload carrying a
+    "point_fingerprint" (the input points are left as they are). The
+    fingerprints already stored are read back in ONE retrieve() call
+    (payload field only, no vectors) for every point except new_ids -
+    ids generated for this write cannot be in Qdrant yet. Points with a
+    matching fingerprint are skipped. On any read error all points are
+    kept.
+    """
+    if not SKIP_UNCHANGED_UPSERTS or not points:
+        return points
+
+    stamped = [
+        PointStruct(
+            id=point.id,
+            vector=point.vector,
+            payload={**point.payload, "point_fingerprint": point_fingerprint(point.vector, point.payload)}
+        )
+        for point in points
+    ]
+
+    new_ids = {str(point_id) for point_id in new_ids}
+    known = [point.id for point in stamped if str(point.id) not in new_ids]
+    if not known:
+        return stamped
+
+    try:
+        existing = client.retrieve(
+            collection_name=collection_name,
+            ids=known,
+            with_payload=["point_fingerprint"],
+            with_vectors=False
+        )
+    except Exception:
+        return stamped
+
+    stored = {str(record.id): (record.payload or {}).get("point_fingerprint") for record in existing}
+    return [p for p in stamped if stored.get(str(p.id)) != p.payload["point_fingerprint"]]
+
+
+def build_match_features(listing: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Project a normalized listing onto the fields the matchers read.
+
+    Drops free-text fields (reasoning) that are never used by
+    listing_matches_v2 or evaluate_similarity.
+    """
+    return {k: v for k, v in listing.items() if k not in NON_MATCH_FIELDS}
+
+
+def get_collection_name(intent: str) -> str:
+    """
+    Map intent to Qdrant collection name (an alias once pipeline.reindex has run).
+
+    Raises:
+        ValueError: If intent unknown
+    """
+    if intent == "product":
+        return "product_vectors"
+    elif intent == "service":
+        return "service_vectors"
+    elif intent == "mutual":
+        return "mutual_vectors"
+    raise ValueError(f"Unknown intent: {intent}")
+
+
+def build_qdrant_payload(
     listing_id: str,
     listing: Dict[str, Any],
-    embedding: list
-) -> None:
+    user_id: Optional[str] = None,
+    payload_mode: Optional[str] = None
+) -> Dict[str, Any]:
     """
-    Insert embedding + payload into appropriate Qdrant collection.
-
-    Collection selection based on intent:
-    - product → product_vectors
-    - service → service_vectors
-    - mutual → mutual_vectors
+    Build the Qdrant point payload for a listing.
 
     Payload structure:
     - listing_id (UUID)
     - intent (string)
     - domain (array, for product/service) OR category (array, for mutual)
     - created_at (unix timestamp)
+    - user_id (owner, when known)
+    - data / data_kind / data_hash (unless payload_mode == "ids")
 
     Args:
-        client: Qdrant client
         listing_id: UUID string
         listing: Normalized listing object
-        embedding: 1024D vector
+        user_id: Optional owner of the listing
+        payload_mode: "listing", "match_features" or "ids"
+                      (defaults to QDRANT_PAYLOAD_MODE)
 
-    Raises:
-        ValueError: If intent unknown or insertion fails
+    Returns:
+        Payload dict
     """
     intent = listing.get("intent")
-    if not intent:
-        raise ValueError("Listing missing 'intent' field")
-
-    # Select collection
-    if intent == "product":
-        collection_name = "product_vectors"
-    elif intent == "service":
-        collection_name = "service_vectors"
-    elif intent == "mutual":
-        collection_name = "mutual_vectors"
-    else:
-        raise ValueError(f"Unknown intent: {intent}")
+    mode = (payload_mode or QDRANT_PAYLOAD_MODE).lower()
 
-    # Build payload
     payload = {
         "listing_id": listing_id,
         "intent": intent,
@@ -250,6 +382,69 @@ def insert_to_qdrant(
     elif intent == "mutual":
         payload["category"] = listing.get("category", [])
 
+    if user_id:
+        payload["user_id"] = user_id
+
+    # Candidate data served straight from the payload at retrieval time
+    if mode == "listing":
+        payload["data"] = listing
+        payload["data_kind"] = "listing"
+    elif mode == "match_features":
+        payload["data"] = build_match_features(listing)
+        payload["data_kind"] = "match_features"
+
+    if mode in ("listing", "match_features"):
+        payload["data_hash"] = listing_content_hash(listing)
+
+    return payload
+
+
+def insert_to_qdrant(
+    client: QdrantClient,
+    listing_id: str,
+    listing: Dict[str, Any],
+    embedding: list,
+    user_id: Optional[str] = None,
+    is_new: bool = False
+) -> bool:
+    """
+    Insert embedding + payload into appropriate Qdrant collection.
+
+    The upsert is skipped when the stored point already has the same
+    vector and payload (see filter_unchanged_points); for a listing_id
+    generated for this insert (is_new) Qdrant is not read first.
+
+    Collection selection based on intent:
+    - product → product_vectors
+    - service → service_vectors
+    - mutual → mutual_vectors
+
+    Payload structure: see build_qdrant_payload()
+
+    Args:
+        client: Qdrant client
+        listing_id: UUID string
+        listing: Normalized listing object
+        embedding: 1024D vector
+        user_id: Optional owner of the listing (stored in payload)
+        is_new: listing_id was just generated (no stored point to compare)
+
+    Returns:
+        True if the point was written, False if skipped as unchanged
+
+    Raises:
+        ValueError: If intent unknown or insertion fails
+    """
+    intent = listing.get("intent")
+    if not intent:
+        raise ValueError("Listing missing 'intent' field")
+
+    # Select collection
+    collection_name = get_collection_name(intent)
+
+    # Build payload
+    payload = build_qdrant_payload(listing_id, listing, user_id=user_id)
+
     # Create point
     point = PointStruct(
         id=listing_id,  # Use listing_id as Qdrant point ID
@@ -257,15 +452,21 @@ def insert_to_qdrant(
         payload=payload
     )
 
+    points = filter_unchanged_points(client, collection_name, [point], new_ids=[listing_id] if is_new else ())
+    if not points:
+        return False
+
     # Upsert (insert or update)
     try:
         client.upsert(
             collection_name=collection_name,
-            points=[point]
+            points=points
         )
     except Exception as e:
         raise ValueError(f"Qdrant insertion failed for {collection_name}: {e}")
 
+    return True
+
 
 # ============================================================================
 # ORCHESTRATION
@@ -302,6 +503,7 @@ def ingest_listing(
     """
     if verbose:
         print(f"Ingesting listing (intent: {listing.get('intent')})")
+    is_new = not listing_id
 
     # Step 1: Insert to Supabase
     if verbose:
@@ -327,7 +529,7 @@ def ingest_listing(
     # Step 4: Insert to Qdrant
     if verbose:
         print("  [4/4] Inserting to Qdrant...")
-    insert_to_qdrant(clients.qdrant, listing_id, listing, embedding)
+    insert_to_qdrant(clients.qdrant, listing_id, listing, embedding, user_id=user_id, is_new=is_new)
     if verbose:
         print(f"        ✓ Inserted to Qdrant")
 
@@ -341,57 +543,190 @@ def ingest_listing(
 def ingest_batch(
     clients: IngestionClients,
     listings: list,
-    verbose: bool = True
-) -> list:
+    user_ids: Optional[List[Optional[str]]] = None,
+    verbose: bool = True,
+    upsert_batch_size: int = QDRANT_UPSERT_BATCH_SIZE,
+    wait: bool = False,
+    listing_ids: Optional[List[str]] = None,
+    match_ids: Optional[List[Optional[str]]] = None,
+    idempotent: bool = False
+) -> List[Dict[str, Any]]:
     """
     Ingest multiple listings in batch.
 
+    Steps:
+    1. Validate intents and assign listing_ids
+    2. One bulk Supabase insert per intent table
+       (falls back to row-by-row inserts to isolate failures)
+    3. One batched encode() call for all inserted listings
+       (vectors already in the embedding store are reused)
+    4. Chunked multi-point Qdrant upserts per collection (wait=False),
+       skipping points whose vector and payload are unchanged
+
     Args:
         clients: Initialized IngestionClients
         listings: List of normalized listing objects
+        user_ids: Optional owners, aligned with listings
         verbose: Print progress messages
+        upsert_batch_size: Points per Qdrant upsert call
+        wait: Wait for Qdrant to apply each upsert
+        listing_ids: Optional pre-assigned ids, aligned with listings
+        match_ids: Optional matches-table references, aligned with listings
+        idempotent: Upsert Supabase rows instead of inserting them
+                    (safe to retry a partially applied batch)
 
     Returns:
-        List of listing_ids
-
-    Raises:
-        ValueError: If any ingestion fails
+        Per-item report, in input order:
+        {index, listing_id, status ("success" | "failed"), stage, error}
+        stage is the step that failed: validate | supabase | embedding | qdrant
     """
+    for name, aligned in (("user_ids", user_ids), ("listing_ids", listing_ids), ("match_ids", match_ids)):
+        if aligned is not None and len(aligned) != len(listings):
+            raise ValueError(f"{name} must be aligned with listings")
+
     if verbose:
         print(f"=" * 70)
         print(f"BATCH INGESTION: {len(listings)} listings")
         print(f"=" * 70)
         print()
 
-    listing_ids = []
-    failed = []
+    report = [
+        {"index": i, "listing_id": None, "status": "pending", "stage": None, "error": None}
+        for i in range(len(listings))
+    ]
+
+    def _fail(i: int, stage: str, error: Exception) -> None:
+        report[i].update(status="failed", stage=stage, error=str(error))
 
-    for i, listing in enumerate(listings, 1):
+    # Step 1: Validate + group by table
+    by_table: Dict[str, List[int]] = {}
+    generated_ids = set()  # never written before: no unchanged-point lookup
+    for i, listing in enumerate(listings):
         try:
-            if verbose:
-                print(f"[{i}/{len(listings)}]")
+            table_name = get_table_name(listing.get("intent"))
+        except Exception as e:
+            _fail(i, "validate", e)
+            continue
+        report[i]["listing_id"] = listing_ids[i] if listing_ids else None
+        if not report[i]["listing_id"]:
+            report[i]["listing_id"] = str(uuid.uuid4())
+            generated_ids.add(report[i]["listing_id"])
+        by_table.setdefault(table_name, []).append(i)
+
+    # Step 2: Bulk Supabase inserts
+    if verbose:
+        print(f"  [1/3] Inserting to Supabase ({len(by_table)} tables)...")
+    inserted: List[int] = []
+    for table_name, indices in by_table.items():
+        rows = [
+            build_supabase_row(
+                listings[i],
+                report[i]["listing_id"],
+                user_ids[i] if user_ids else None,
+                match_ids[i] if match_ids else None
+            )
+            for i in indices
+        ]
 
-            listing_id, _ = ingest_listing(clients, listing, verbose=verbose)
-            listing_ids.append(listing_id)
+        def _write(payload):
+            table = clients.supabase.table(table_name)
+            return (table.upsert(payload) if idempotent else table.insert(payload)).execute()
 
+        try:
+            _write(rows)
+            inserted.extend(indices)
+        except Exception:
+            # Isolate the failing rows
+            for i, row in zip(indices, rows):
+                try:
+                    _write(row)
+                    inserted.append(i)
+                except Exception as e:
+                    _fail(i, "supabase", e)
+    inserted.sort()
+    if verbose:
+        print(f"        ✓ Inserted {len(inserted)} rows")
+
+    # Step 3: One batched encode
+    if verbose:
+        print(f"  [2/3] Generating {len(inserted)} embeddings...")
+    embeddings: Dict[int, list] = {}
+    if inserted:
+        texts = [build_embedding_text(listings[i]) for i in inserted]
+        try:
+            store = get_embedding_store()
+            if store is not None:
+                vectors = store.encode(
+                    clients.embedding_model, EMBEDDING_MODEL, texts, batch_size=EMBEDDING_BATCH_SIZE
+                )
+            else:
+                vectors = clients.embedding_model.encode(
+                    texts, batch_size=EMBEDDING_BATCH_SIZE, convert_to_tensor=False
+                )
+            for i, vector in zip(inserted, vectors):
+                if len(vector) != EMBEDDING_DIM:
+                    _fail(i, "embedding", ValueError(
+                        f"Embedding dimension mismatch: expected {EMBEDDING_DIM}, got {len(vector)}"
+                    ))
+                    continue
+                embeddings[i] = vector.tolist() if hasattr(vector, "tolist") else list(vector)
         except Exception as e:
-            print(f"✗ FAILED: {e}")
-            failed.append((i, listing, e))
-            print()
+            for i in inserted:
+                _fail(i, "embedding", e)
+    if verbose:
+        print(f"        ✓ Generated {len(embeddings)} vectors")
+
+    # Step 4: Chunked Qdrant upserts per collection
+    if verbose:
+        print(f"  [3/3] Upserting to Qdrant (chunks of {upsert_batch_size})...")
+    by_collection: Dict[str, List[int]] = {}
+    for i in embeddings:
+        by_collection.setdefault(get_collection_name(listings[i]["intent"]), []).append(i)
+
+    for collection_name, indices in by_collection.items():
+        for start in range(0, len(indices), upsert_batch_size):
+            chunk = indices[start:start + upsert_batch_size]
+            points = [
+                PointStruct(
+                    id=report[i]["listing_id"],
+                    vector=embeddings[i],
+                    payload=build_qdrant_payload(
+                        report[i]["listing_id"],
+                        listings[i],
+                        user_id=user_ids[i] if user_ids else None
+                    )
+                )
+                for i in chunk
+            ]
+            try:
+                points = filter_unchanged_points(clients.qdrant, collection_name, points, new_ids=generated_ids)
+                if points:
+                    clients.qdrant.upsert(
+                        collection_name=collection_name, points=points, wait=wait
+                    )
+                for i in chunk:
+                    report[i]["status"] = "success"
+            except Exception as e:
+                for i in chunk:
+                    _fail(i, "qdrant", e)
+
+    succeeded = [r for r in report if r["status"] == "success"]
+    failed = [r for r in report if r["status"] == "failed"]
 
     # Summary
     if verbose:
+        print()
         print(f"=" * 70)
         print(f"BATCH COMPLETE")
         print(f"=" * 70)
-        print(f"Success: {len(listing_ids)}/{len(listings)}")
+        print(f"Success: {len(succeeded)}/{len(listings)}")
         if failed:
             print(f"Failed: {len(failed)}")
-            for idx, _, error in failed:
-                print(f"  - Listing {idx}: {error}")
+            for item in failed:
+                print(f"  - Listing {item['index']} [{item['stage']}]: {item['error']}")
         print()
 
-    return listing_ids
+    return report
 
 
 # ============================================================================
@@ -0,0 +1,398 @@
+"""
+INGESTION QUEUE: Durable asynchronous ingestion with a worker pool
+
+Responsibilities:
+- Accept normalized listings and acknowledge them immediately
+  (listing_id + job_id assigned at enqueue time)
+- Persist jobs in a local SQLite queue (survives restarts)
+- Worker threads claim jobs in batches and run ingest_batch()
+  (bulk Supabase write, one encode call, chunked Qdrant upserts)
+- Backpressure: enqueue raises QueueFullError above max_pending
+- Per-job status for polling clients
+
+Job lifecycle: queued → processing → done | failed
+(failed jobs are retried with exponential backoff until max_attempts)
+
+A done job drops its listing body (the listing is in Supabase); done and
+failed jobs are deleted after INGESTION_RETENTION_DAYS, so the queue file
+does not grow with every listing ever ingested.
+
+Claims are a single UPDATE ... RETURNING, so workers in several
+processes sharing the file never claim the same job. A claim holds a
+lease of INGESTION_LEASE_SECONDS; a job whose lease expired (its worker
+crashed) is claimable again, a job still being worked on is not.
+
+Dependencies: pipeline.ingestion_pipeline
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from pipeline.ingestion_pipeline import IngestionClients, ingest_batch
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Route /ingest and /store-listing writes through the queue (1=enabled)
+ENABLE_ASYNC_INGESTION = os.environ.get("ENABLE_ASYNC_INGESTION", "0") == "1"
+
+INGESTION_QUEUE_PATH = os.environ.get("INGESTION_QUEUE_PATH", "ingestion_queue.db")
+INGESTION_WORKERS = int(os.environ.get("INGESTION_WORKERS", "2"))
+INGESTION_BATCH_SIZE = int(os.environ.get("INGESTION_BATCH_SIZE", "32"))
+
+# Backpressure: max queued + processing jobs before enqueue is rejected
+INGESTION_MAX_PENDING = int(os.environ.get("INGESTION_MAX_PENDING", "5000"))
+INGESTION_MAX_ATTEMPTS = int(os.environ.get("INGESTION_MAX_ATTEMPTS", "3"))
+
+# Idle wait between empty polls (seconds)
+INGESTION_POLL_SECONDS = float(os.environ.get("INGESTION_POLL_SECONDS", "0.2"))
+
+# A claimed job is re-claimable once its lease expires (worker crashed)
+INGESTION_LEASE_SECONDS = float(os.environ.get("INGESTION_LEASE_SECONDS", "300"))
+
+# Retry delay after a failed attempt: base * 2^(attempt - 1), capped
+INGESTION_RETRY_BASE_SECONDS = float(os.environ.get("INGESTION_RETRY_BASE_SECONDS", "2"))
+INGESTION_RETRY_MAX_SECONDS = float(os.environ.get("INGESTION_RETRY_MAX_SECONDS", "300"))
+
+# Done / failed jobs are deleted this many days after their last update (0 keeps them)
+INGESTION_RETENTION_DAYS = float(os.environ.get("INGESTION_RETENTION_DAYS", "7"))
+
+# Min seconds between retention sweeps (run by idle workers)
+INGESTION_PURGE_INTERVAL_SECONDS = 3600
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is above its backpressure limit."""
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingestion_jobs (
+    job_id TEXT PRIMARY KEY,
+    listing_id TEXT NOT NULL,
+    user_id TEXT,
+    match_id TEXT,
+    listing TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON ingestion_jobs (status, created_at);
+"""
+
+
+class IngestionQueue:
+    """
+    SQLite-backed ingestion queue with a batching worker pool.
+
+    Lifecycle:
+        1. IngestionQueue(path) — open/create the queue
+        2. start(clients) — start worker threads
+        3. enqueue(listing, user_id) — returns {job_id, listing_id}
+        4. get_status(job_id) — poll
+        5. stop() — drain current batches and stop workers
+    """
+
+    def __init__(
+        self,
+        db_path: str = INGESTION_QUEUE_PATH,
+        max_pending: int = INGESTION_MAX_PENDING,
+        batch_size: int = INGESTION_BATCH_SIZE,
+        max_attempts: int = INGESTION_MAX_ATTEMPTS,
+        lease_seconds: float = INGESTION_LEASE_SECONDS,
+        retry_base_seconds: float = INGESTION_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = INGESTION_RETRY_MAX_SECONDS,
+        retention_days: float = INGESTION_RETENTION_DAYS
+    ):
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.retention_days = retention_days
+
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+        self._workers: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+        self._on_done = None
+        self._on_ingested = None
+
+        # Stats
+        self._processed = 0
+        self._failed = 0
+        self._batches = 0
+        self._purged = 0
+        self._last_purge = 0.0
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def enqueue(
+        self,
+        listing: Dict[str, Any],
+        user_id: Optional[str] = None,
+        match_id: Optional[str] = None,
+        listing_id: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        Persist a normalized listing for asynchronous ingestion.
+
+        Returns:
+            {"job_id", "listing_id"}
+
+        Raises:
+            QueueFullError: If pending jobs >= max_pending
+        """
+        job_id = str(uuid.uuid4())
+        listing_id = listing_id or str(uuid.uuid4())
+        now = time.time()
+
+        with self._lock:
+            pending = self._conn.execute(
+                "SELECT COUNT(*) FROM ingestion_jobs WHERE status IN ('queued', 'processing')"
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFullError(
+                    f"Ingestion queue full ({pending}/{self.max_pending} pending)"
+                )
+            self._conn.execute(
+                "INSERT INTO ingestion_jobs "
+                "(job_id, listing_id, user_id, match_id, listing, status, created_at, updated_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, listing_id, user_id, match_id, json.dumps(listing), now, now, now)
+            )
+
+        self._wakeup.set()
+        return {"job_id": job_id, "listing_id": listing_id}
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return job status (without the listing body), or None if unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, listing_id, status, attempts, error, created_at, updated_at, next_attempt_at "
+                "FROM ingestion_jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("job_id", "listing_id", "status", "attempts", "error", "created_at", "updated_at",
+                "next_attempt_at")
+        return dict(zip(keys, row))
+
+    # ------------------------------------------------------------------
+    # Consumer side
+    # ------------------------------------------------------------------
+
+    def _claim_batch(self) -> List[Dict[str, Any]]:
+        """
+        Atomically move up to batch_size due jobs to 'processing'.
+
+        Due: queued with next_attempt_at reached, or processing with an
+        expired lease (crashed worker). One UPDATE ... RETURNING: SQLite
+        runs it under its write lock, so concurrent claimers (threads or
+        processes) get disjoint jobs.
+        """
+        now = time.time()
+        with self._lock:
+            # Crashed on its last attempt: failed, not claimed again
+            self._conn.execute(
+                "UPDATE ingestion_jobs SET status = 'failed', updated_at = ?, "
+                "error = COALESCE(error, 'lease expired') "
+                "WHERE status = 'processing' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            rows = self._conn.execute(
+                "UPDATE ingestion_jobs SET status = 'processing', attempts = attempts + 1, "
+                "updated_at = ?, lease_until = ? "
+                "WHERE job_id IN ("
+                "  SELECT job_id FROM ingestion_jobs "
+                "  WHERE (status = 'queued' AND next_attempt_at <= ?) "
+                "     OR (status = 'processing' AND lease_until < ?) "
+                "  ORDER BY created_at LIMIT ?"
+                ") RETURNING job_id, listing_id, user_id, match_id, listing, attempts",
+                (now, now + self.lease_seconds, now, now, self.batch_size)
+            ).fetchall()
+            if not rows:
+                return []
+
+        return [
+            {
+                "job_id": r[0],
+                "listing_id": r[1],
+                "user_id": r[2],
+                "match_id": r[3],
+                "listing": json.loads(r[4]),
+                "attempts": r[5],
+            }
+            for r in rows
+        ]
+
+    def retry_delay(self, attempts: int) -> float:
+        """Seconds before a job that failed its attempts-th attempt is retried."""
+        return min(self.retry_max_seconds, self.retry_base_seconds * 2 ** max(0, attempts - 1))
+
+    def _finish(self, jobs: List[Dict[str, Any]], report: List[Dict[str, Any]]) -> None:
+        """Record per-job outcome from an ingest_batch report."""
+        now = time.time()
+        updates = []
+        done_jobs = []
+        for job, item in zip(jobs, report):
+            if item["status"] == "success":
+                updates.append(("done", "done", None, now, now, job["job_id"], job["attempts"]))
+                done_jobs.append(job)
+            elif job["attempts"] < self.max_attempts:
+                updates.append(("queued", "queued", f"[{item['stage']}] {item['error']}", now,
+                                now + self.retry_delay(job["attempts"]), job["job_id"], job["attempts"]))
+            else:
+                updates.append(("failed", "failed", f"[{item['stage']}] {item['error']}", now, now,
+                                job["job_id"], job["attempts"]))
+
+        with self._lock:
+            # attempts guard: a job re-claimed after this worker's lease expired is not overwritten;
+            # done jobs drop the listing body (stored in Supabase now)
+            self._conn.executemany(
+                "UPDATE ingestion_jobs SET status = ?, listing = CASE ? WHEN 'done' THEN '' ELSE listing END, "
+                "error = ?, updated_at = ?, next_attempt_at = ?, "
+                "lease_until = NULL WHERE job_id = ? AND status = 'processing' AND attempts = ?",
+                updates
+            )
+            self._processed += len(done_jobs)
+            self._failed += sum(1 for u in updates if u[0] == "failed")
+            self._batches += 1
+
+        if self._on_done and done_jobs:
+            self._on_done([job["listing_id"] for job in done_jobs])
+        if self._on_ingested and done_jobs:
+            self._on_ingested(done_jobs)
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Delete done / failed jobs older than retention_days. Returns the number deleted."""
+        if self.retention_days <= 0:
+            return 0
+        now = time.time() if now is None else now
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM ingestion_jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (now - self.retention_days * 86400,)
+            ).rowcount
+            self._purged += deleted
+            self._last_purge = now
+        return deleted
+
+    def process_once(self, clients: IngestionClients) -> int:
+        """Claim and ingest one batch. Returns the number of jobs claimed."""
+        jobs = self._claim_batch()
+        if not jobs:
+            return 0
+
+        try:
+            report = ingest_batch(
+                clients,
+                [j["listing"] for j in jobs],
+                user_ids=[j["user_id"] for j in jobs],
+                listing_ids=[j["listing_id"] for j in jobs],
+                match_ids=[j["match_id"] for j in jobs],
+                idempotent=True,
+                verbose=False
+            )
+        except Exception as e:
+            report = [{"status": "failed", "stage": "batch", "error": str(e)} for _ in jobs]
+
+        self._finish(jobs, report)
+        return len(jobs)
+
+    def start(
+        self,
+        clients: IngestionClients,
+        workers: int = INGESTION_WORKERS,
+        on_done=None,
+        on_ingested=None
+    ) -> None:
+        """
+        Start worker threads.
+
+        Args:
+            clients: Initialized IngestionClients (shared by workers)
+            workers: Number of worker threads
+            on_done: Optional callback(listing_ids) after each successful batch
+            on_ingested: Optional callback(jobs) with the ingested jobs
+                (listing_id, user_id, listing, ...) after each batch
+        """
+        if self._workers:
+            return
+        self._on_done = on_done
+        self._on_ingested = on_ingested
+        self._stop_event.clear()
+
+        def _loop():
+            while not self._stop_event.is_set():
+                if self.process_once(clients) == 0:
+                    if time.time() - self._last_purge >= INGESTION_PURGE_INTERVAL_SECONDS:
+                        self.purge()
+                    self._wakeup.wait(INGESTION_POLL_SECONDS)
+                    self._wakeup.clear()
+
+        for n in range(workers):
+            worker = threading.Thread(target=_loop, name=f"ingestion-worker-{n}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop workers after their current batch."""
+        self._stop_event.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+
+    def get_stats(self) -> Dict:
+        """Get queue statistics."""
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM ingestion_jobs GROUP BY status"
+            ).fetchall())
+        return {
+            "queued": counts.get("queued", 0),
+            "processing": counts.get("processing", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "max_pending": self.max_pending,
+            "workers": len(self._workers),
+            "batches": self._batches,
+            "processed_this_run": self._processed,
+            "purged_this_run": self._purged,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Singleton
+# ═══════════════════════════════════════════════════════════════════
+
+_ingestion_queue: Optional[IngestionQueue] = None
+
+
+def get_ingestion_queue() -> IngestionQueue:
+    """Get singleton IngestionQueue instance."""
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        _ingestion_queue = IngestionQueue()
+    return _ingestion_queue
@@ -0,0 +1,380 @@
+"""
+ListingCache: Versioned in-process cache of listing rows.
+
+Hot listings (popular sellers, providers) are retrieved by many searches.
+This cache keeps normalized listing rows keyed by listing_id so the
+candidate loader only goes to Supabase on a miss. It serves the points
+whose payload does not carry the listing, so it is enabled by default
+only under QDRANT_PAYLOAD_MODE=ids (payload-served rows never reach it).
+
+- Bounded LRU (OrderedDict), entries stamped with the row version
+  (updated_at, falling back to created_at) and the time they were cached
+- Listings are held in the compact slotted form (schema/compact_listing.py,
+  LISTING_CACHE_COMPACT), built once per cached row and matched directly
+  by every search that hits it (plain_listing() for JSON)
+- Written through on local inserts (/ingest, /store-listing, queued jobs);
+  such entries carry no version until the poll sees their row, which is
+  kept (and stamps them) when no newer than the time they were cached
+- Invalidated by match maintenance (listing_changes feed) and on a
+  periodic poll of updated_at, so updates from any worker are picked up;
+  the poll watermark is the database's own newest updated_at
+- TTL as a backstop for deletes and missed feed entries
+
+Singleton pattern — one cache shared across the app.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+from threading import Lock
+
+from pipeline.ingestion_pipeline import QDRANT_PAYLOAD_MODE
+from schema.compact_listing import compact_listing
+from src.utils.logging import get_logger
+
+log = get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Max cached rows (0 disables the cache); only rows missing from the Qdrant
+# payload are read through the cache, so it defaults to off unless payloads
+# carry ids only
+LISTING_CACHE_SIZE = int(os.environ.get(
+    "LISTING_CACHE_SIZE", "10000" if QDRANT_PAYLOAD_MODE == "ids" else "0"
+))
+
+# Hold cached listings in the compact slotted form (1=enabled)
+LISTING_CACHE_COMPACT = os.environ.get("LISTING_CACHE_COMPACT", "1") == "1"
+
+# Max age of a cached row in seconds (backstop for deletes)
+LISTING_CACHE_TTL_SECONDS = float(os.environ.get("LISTING_CACHE_TTL_SECONDS", "300"))
+
+# Change-feed poll interval in seconds (0 disables polling)
+LISTING_CACHE_POLL_SECONDS = float(os.environ.get("LISTING_CACHE_POLL_SECONDS", "30"))
+
+# Each poll re-reads this many seconds before the watermark, so rows whose
+# transaction committed after a newer row was seen are still picked up
+LISTING_CACHE_POLL_OVERLAP_SECONDS = 5.0
+
+# Rows per change-feed page (at most the PostgREST max-rows cap, 1000 on Supabase)
+LISTING_CACHE_POLL_PAGE_SIZE = 1000
+
+LISTING_TABLES = ("product_listings", "service_listings", "mutual_listings")
+
+
+def row_version(row: Dict[str, Any]) -> Optional[str]:
+    """Version stamp of a Supabase listing row (updated_at, else created_at)."""
+    return row.get("updated_at") or row.get("created_at")
+
+
+def _parse_version(version: Optional[str]) -> Optional[datetime]:
+    """Postgres timestamptz text as an aware datetime (None if unparseable)."""
+    if not version:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(version).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class ListingCache:
+    """
+    Bounded LRU cache of listing rows with version stamps.
+
+    Cached row format (same as build_candidate_rows):
+        {listing_id, user_id, data, version}; data is a CompactListing
+        when compact
+    """
+
+    def __init__(
+        self,
+        max_entries: int = LISTING_CACHE_SIZE,
+        ttl_seconds: float = LISTING_CACHE_TTL_SECONDS,
+        compact: bool = LISTING_CACHE_COMPACT
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.compact = compact
+        self._lock = Lock()
+
+        # listing_id -> (row, cached_at)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+        # Change feed state (newest updated_at seen, from the database)
+        self._watermark: Optional[str] = None
+        self._poll_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        # Stats
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._polls = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    # ------------------------------------------------------------------
+    # Reads / writes
+    # ------------------------------------------------------------------
+
+    def get(self, listing_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached row, or None on miss/expiry."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(listing_id)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            row, cached_at = entry
+            if self.ttl_seconds > 0 and time.time() - cached_at > self.ttl_seconds:
+                del self._entries[listing_id]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(listing_id)
+            self._hits += 1
+            return row
+
+    def get_many(self, listing_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {listing_id: row} for the cached subset of listing_ids."""
+        found = {}
+        for listing_id in listing_ids:
+            row = self.get(listing_id)
+            if row is not None:
+                found[listing_id] = row
+        return found
+
+    def put(self, row: Dict[str, Any]) -> None:
+        """
+        Cache a listing row.
+
+        Accepts a Supabase row (id, user_id, data, updated_at/created_at) or
+        a candidate row (listing_id, user_id, data).
+        """
+        if not self.enabled:
+            return
+
+        listing_id = row.get("listing_id") or row.get("id")
+        if not listing_id or row.get("data") is None:
+            return
+
+        data = row["data"]
+        if self.compact:
+            try:
+                data = compact_listing(data)
+            except Exception:
+                pass  # not a normalized listing: matching reports it
+
+        cached = {
+            "listing_id": listing_id,
+            "user_id": row.get("user_id"),
+            "data": data,
+            "version": row.get("version") or row_version(row),
+        }
+
+        with self._lock:
+            self._entries[listing_id] = (cached, time.time())
+            self._entries.move_to_end(listing_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, listing_id: str) -> None:
+        """Drop one listing (local write)."""
+        with self._lock:
+            if self._entries.pop(listing_id, None) is not None:
+                self._invalidations += 1
+
+    def invalidate_many(self, listing_ids: Iterable[str]) -> int:
+        """Drop several listings; returns the number actually removed."""
+        removed = 0
+        with self._lock:
+            for listing_id in listing_ids:
+                if self._entries.pop(listing_id, None) is not None:
+                    removed += 1
+            self._invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    # ------------------------------------------------------------------
+    # Change feed
+    # ------------------------------------------------------------------
+
+    def apply_changes(self, changes: Iterable[Dict[str, Any]]) -> int:
+        """
+        Invalidate cached rows that are older than change-feed entries.
+
+        Args:
+            changes: Rows with id and updated_at (or created_at)
+
+        Returns:
+            Number of cached rows invalidated
+        """
+        stale = []
+        with self._lock:
+            for change in changes:
+                listing_id = change.get("id")
+                entry = self._entries.get(listing_id)
+                if entry is None:
+                    continue
+                row, cached_at = entry
+                cached_version = _parse_version(row.get("version"))
+                new_version = _parse_version(row_version(change))
+                if cached_version is None and new_version is not None and new_version.timestamp() <= cached_at:
+                    # Written through: this is the row that was cached
+                    self._entries[listing_id] = (dict(row, version=row_version(change)), cached_at)
+                elif cached_version is None or new_version is None or new_version > cached_version:
+                    stale.append(listing_id)
+        return self.invalidate_many(stale)
+
+    def latest_version(self, supabase) -> Optional[str]:
+        """Newest updated_at across the listing tables (database clock)."""
+        newest = None
+        for table_name in LISTING_TABLES:
+            response = (
+                supabase.table(table_name)
+                .select("updated_at")
+                .order("updated_at", desc=True)
+                .limit(1)
+                .execute()
+            )
+            for row in response.data or []:
+                if _newer(row.get("updated_at"), newest):
+                    newest = row["updated_at"]
+        return newest
+
+    def poll_changes(self, supabase) -> int:
+        """
+        Poll the listing tables for rows written since the last poll.
+
+        Requires the updated_at column (migration 004). The first poll
+        only records the database's newest updated_at. Changed rows are
+        read in (updated_at, id) order, one page at a time until a short page.
+
+        Returns:
+            Number of cached rows invalidated
+        """
+        if self._watermark is None:
+            self._watermark = self.latest_version(supabase)
+            self._polls += 1
+            return 0
+
+        since = _parse_version(self._watermark)
+        if since is not None:
+            since = (since - timedelta(seconds=LISTING_CACHE_POLL_OVERLAP_SECONDS)).isoformat()
+        else:
+            since = self._watermark
+        newest = self._watermark
+        invalidated = 0
+
+        for table_name in LISTING_TABLES:
+            # Oldest first, one page at a time (a bulk write can exceed one
+            # response); each page starts after the (updated_at, id) of the
+            # previous one, so rows sharing a timestamp are not skipped
+            query = supabase.table(table_name).select("id, updated_at").gt("updated_at", since)
+            while True:
+                response = query.order("updated_at").order("id").limit(LISTING_CACHE_POLL_PAGE_SIZE).execute()
+                rows = response.data or []
+                invalidated += self.apply_changes(rows)
+                if not rows:
+                    break
+                last = rows[-1]
+                if _newer(last.get("updated_at"), newest):
+                    newest = last["updated_at"]
+                if len(rows) < LISTING_CACHE_POLL_PAGE_SIZE:
+                    break
+                query = supabase.table(table_name).select("id, updated_at").or_(
+                    f"updated_at.gt.{last['updated_at']},"
+                    f"and(updated_at.eq.{last['updated_at']},id.gt.{last['id']})"
+                )
+
+        self._watermark = newest
+        self._polls += 1
+        return invalidated
+
+    def start_polling(self, supabase, interval_seconds: float = LISTING_CACHE_POLL_SECONDS) -> bool:
+        """Start the background change-feed poller (daemon thread)."""
+        if not self.enabled or interval_seconds <= 0 or self._poll_thread is not None:
+            return False
+
+        self._watermark = None
+        try:
+            self.poll_changes(supabase)
+        except Exception as e:
+            log.warning("Listing cache change feed unavailable, relying on TTL", emoji="warning", error=str(e))
+            return False
+        self._stop_event.clear()
+
+        def _loop():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    self.poll_changes(supabase)
+                except Exception as e:
+                    # DB unavailable: keep the watermark, the TTL bounds staleness
+                    log.warning("Listing cache change-feed poll failed", emoji="warning", error=str(e))
+
+        self._poll_thread = threading.Thread(target=_loop, name="listing-cache-poll", daemon=True)
+        self._poll_thread.start()
+        return True
+
+    def stop_polling(self) -> None:
+        self._stop_event.set()
+        if self._poll_thread is not None:
+            self._poll_thread.join(timeout=5)
+            self._poll_thread = None
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "polls": self._polls,
+            "watermark": self._watermark,
+        }
+
+
+def _newer(version: Optional[str], than: Optional[str]) -> bool:
+    """version is a later timestamp than than (None counts as oldest)."""
+    parsed = _parse_version(version)
+    if parsed is None:
+        return False
+    reference = _parse_version(than)
+    return reference is None or parsed > reference
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Singleton
+# ═══════════════════════════════════════════════════════════════════
+
+_listing_cache: Optional[ListingCache] = None
+
+
+def get_listing_cache() -> ListingCache:
+    """Get singleton ListingCache instance."""
+    global _listing_cache
+    if _listing_cache is None:
+        _listing_cache = ListingCache()
+    return _listing_cache
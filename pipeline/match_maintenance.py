@@ -0,0 +1,398 @@
+"""
+MATCH MAINTENANCE: Incremental upkeep of matches on listing update/delete
+
+Responsibilities:
+- Consume listing change events from listing_changes (written by the
+  triggers in migration 006 on UPDATE/DELETE of the listings tables)
+- Find the affected match rows by listing id (indexed listing_a_id /
+  listing_b_id) and the affected stored queries
+- Re-upsert updated listings into Qdrant (vector + payload; unchanged
+  points are skipped) and delete the points of deleted listings
+- Re-evaluate only those pairs with listing_matches_v2; retract pairs that
+  no longer match and rows whose listing was deleted, in bulk (a pair whose
+  re-evaluation raises is left as is)
+- Re-index updated stored queries; percolate updated listings against the
+  stored query index (item type / domain postings) for new matches
+
+Run it in ONE process (ENABLE_MATCH_MAINTENANCE=1 on a single worker):
+consumed events are deleted from listing_changes by change_id.
+
+Dependencies: supabase-py, qdrant-client
+"""
+
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from qdrant_client.models import PointIdsList
+
+from embedding.embedding_builder import build_embedding_text
+from matching.listing_matcher_v2 import listing_matches_v2
+from matching.stored_query_index import ImplicationFn, StoredQueryIndex, get_stored_query_index
+from pipeline.ingestion_pipeline import (
+    IngestionClients,
+    generate_embedding,
+    get_collection_name,
+    insert_to_qdrant,
+)
+from pipeline.percolator import STORED_QUERIES_TABLE
+from pipeline.retrieval_service import LISTING_TABLES, fetch_listing_rows
+from src.utils.logging import get_logger
+
+log = get_logger(__name__)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Consume listing_changes in a background thread (1=enabled, needs migration 006)
+ENABLE_MATCH_MAINTENANCE = os.environ.get("ENABLE_MATCH_MAINTENANCE", "0") == "1"
+
+# Poll interval in seconds and max events per pass
+MATCH_MAINTENANCE_POLL_SECONDS = float(os.environ.get("MATCH_MAINTENANCE_POLL_SECONDS", "30"))
+MATCH_MAINTENANCE_BATCH_SIZE = int(os.environ.get("MATCH_MAINTENANCE_BATCH_SIZE", "500"))
+
+CHANGES_TABLE = "listing_changes"
+RETRACTED_STATUS = "retracted"
+
+
+def _in_chunks(ids: List[str], size: int = 200) -> Iterable[List[str]]:
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+class MatchMaintainer:
+    """
+    Applies listing change events to matches and stored queries.
+
+    Each pass is bulk: one fetch per intent for listing data, one select
+    per id column for match rows, one update for retractions and one
+    insert for new matches.
+
+    With clients (IngestionClients) set, updated listings are also
+    re-embedded into Qdrant and deleted listings' points are removed.
+    """
+
+    def __init__(
+        self,
+        index: Optional[StoredQueryIndex] = None,
+        implies_fn: Optional[ImplicationFn] = None,
+        batch_size: int = MATCH_MAINTENANCE_BATCH_SIZE,
+        on_change: Optional[Callable[[List[str]], Any]] = None,
+        clients: Optional[IngestionClients] = None
+    ):
+        self.index = index if index is not None else get_stored_query_index()
+        self.implies_fn = implies_fn
+        self.batch_size = batch_size
+        self.on_change = on_change
+        self.clients = clients
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Stats
+        self._passes = 0
+        self._events = 0
+        self._rows_checked = 0
+        self._retracted = 0
+        self._created = 0
+        self._reindexed = 0
+        self._undecided = 0
+
+    # ------------------------------------------------------------------
+    # Event feed
+    # ------------------------------------------------------------------
+
+    def fetch_changes(self, supabase) -> List[Dict[str, Any]]:
+        """Oldest pending change events (change_id, listing_id, intent, op)."""
+        response = (
+            supabase.table(CHANGES_TABLE)
+            .select("change_id, listing_id, intent, op")
+            .order("change_id")
+            .limit(self.batch_size)
+            .execute()
+        )
+        return response.data or []
+
+    def poll_once(self, supabase) -> Dict[str, int]:
+        """Apply one batch of pending events and delete them from the feed."""
+        changes = self.fetch_changes(supabase)
+        if not changes:
+            return {"events": 0}
+        stats = self.apply_changes(supabase, changes)
+        # Only the events applied: a lower change_id committed after this
+        # fetch is still pending
+        for chunk in _in_chunks(sorted(c["change_id"] for c in changes)):
+            supabase.table(CHANGES_TABLE).delete().in_("change_id", chunk).execute()
+        return stats
+
+    # ------------------------------------------------------------------
+    # Maintenance pass
+    # ------------------------------------------------------------------
+
+    def apply_changes(self, supabase, changes: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Re-evaluate matches touched by a batch of change events.
+
+        Returns:
+            Counters for this pass (events, updated, deleted, reindexed,
+            rows_checked, undecided, retracted, created, queries_updated,
+            queries_removed)
+        """
+        # Last event per listing wins
+        latest: Dict[str, Dict[str, Any]] = {}
+        for change in sorted(changes, key=lambda c: c["change_id"]):
+            latest[str(change["listing_id"])] = change
+
+        # Current data of updated listings (missing rows count as deleted)
+        by_intent: Dict[str, List[str]] = defaultdict(list)
+        for listing_id, change in latest.items():
+            if change["op"] != "delete":
+                by_intent[change["intent"]].append(listing_id)
+        current: Dict[str, Dict[str, Any]] = {}
+        for intent, ids in by_intent.items():
+            current.update(fetch_listing_rows(supabase, intent, ids))
+
+        updated = {lid: row for lid, row in current.items() if isinstance(row.get("data"), dict)}
+        deleted = set(latest) - set(updated)
+
+        reindexed = self._sync_vectors(updated, deleted, latest)
+        queries_updated, queries_removed = self._sync_stored_queries(supabase, updated, deleted)
+
+        # Affected match rows, found through the listing id indexes
+        rows = self._fetch_match_rows(supabase, list(latest))
+        rows_checked, undecided, to_retract = self._reevaluate(supabase, rows, updated, deleted)
+
+        if to_retract:
+            for chunk in _in_chunks(sorted(to_retract)):
+                supabase.table("matches").update({"status": RETRACTED_STATUS}).in_("match_id", chunk).execute()
+
+        created = self._percolate_updates(supabase, updated, rows, to_retract)
+
+        if self.on_change:
+            self.on_change(list(latest))
+
+        stats = {
+            "events": len(changes),
+            "updated": len(updated),
+            "deleted": len(deleted),
+            "reindexed": reindexed,
+            "rows_checked": rows_checked,
+            "undecided": undecided,
+            "retracted": len(to_retract),
+            "created": created,
+            "queries_updated": queries_updated,
+            "queries_removed": queries_removed,
+        }
+        self._passes += 1
+        self._events += len(changes)
+        self._rows_checked += rows_checked
+        self._retracted += len(to_retract)
+        self._created += created
+        self._reindexed += reindexed
+        self._undecided += undecided
+        return stats
+
+    def _sync_vectors(self, updated: Dict[str, Dict], deleted: Set[str], latest: Dict[str, Dict]) -> int:
+        """Re-upsert updated listings into Qdrant, delete deleted ones; returns points written."""
+        if self.clients is None or self.clients.qdrant is None:
+            return 0
+
+        written = 0
+        for lid, row in updated.items():
+            listing = row["data"]
+            embedding = generate_embedding(self.clients.embedding_model, build_embedding_text(listing))
+            if insert_to_qdrant(self.clients.qdrant, lid, listing, embedding, user_id=row.get("user_id")):
+                written += 1
+
+        by_collection: Dict[str, List[str]] = defaultdict(list)
+        for lid in deleted:
+            intent = latest[lid].get("intent")
+            if intent in LISTING_TABLES:
+                by_collection[get_collection_name(intent)].append(lid)
+        for collection_name, ids in by_collection.items():
+            self.clients.qdrant.delete(
+                collection_name=collection_name,
+                points_selector=PointIdsList(points=sorted(ids))
+            )
+        return written
+
+    def _sync_stored_queries(self, supabase, updated: Dict[str, Dict], deleted: Set[str]):
+        """Keep stored queries (index + table) in step with their listings."""
+        stored = [lid for lid in updated if lid in self.index]
+        for lid in stored:
+            self.index.add(lid, updated[lid]["data"], user_id=updated[lid].get("user_id"))
+        if stored:
+            supabase.table(STORED_QUERIES_TABLE).upsert([
+                {
+                    "query_id": lid,
+                    "user_id": updated[lid].get("user_id"),
+                    "intent": updated[lid]["data"].get("intent"),
+                    "data": updated[lid]["data"],
+                }
+                for lid in stored
+            ]).execute()
+
+        removed = [lid for lid in deleted if lid in self.index]
+        for lid in removed:
+            self.index.remove(lid)
+        if deleted:
+            for chunk in _in_chunks(sorted(deleted)):
+                supabase.table(STORED_QUERIES_TABLE).delete().in_("query_id", chunk).execute()
+        return len(stored), len(removed)
+
+    def _fetch_match_rows(self, supabase, listing_ids: List[str]) -> List[Dict[str, Any]]:
+        """Non-retracted match rows with either side in listing_ids."""
+        rows: Dict[str, Dict[str, Any]] = {}
+        for column in ("listing_a_id", "listing_b_id"):
+            for chunk in _in_chunks(listing_ids):
+                response = (
+                    supabase.table("matches")
+                    .select("match_id, listing_a_id, listing_b_id, user_a_id, user_b_id, match_type, status")
+                    .in_(column, chunk)
+                    .execute()
+                )
+                for row in response.data or []:
+                    if row.get("status") != RETRACTED_STATUS:
+                        rows[str(row["match_id"])] = row
+        return list(rows.values())
+
+    def _reevaluate(self, supabase, rows, updated, deleted):
+        """Return (pairs re-checked, pairs left undecided, match_ids to retract)."""
+        to_retract: Set[str] = set()
+        data: Dict[str, Dict[str, Any]] = {lid: row["data"] for lid, row in updated.items()}
+
+        # Load the unchanged side of each pair (one fetch per intent)
+        missing: Dict[str, Set[str]] = defaultdict(set)
+        for row in rows:
+            for side in ("listing_a_id", "listing_b_id"):
+                lid = str(row[side])
+                if lid not in data and lid not in deleted:
+                    missing[row.get("match_type") or ""].add(lid)
+        for intent, ids in missing.items():
+            intents = [intent] if intent in LISTING_TABLES else list(LISTING_TABLES)
+            for candidate_intent in intents:
+                for lid, listing_row in fetch_listing_rows(supabase, candidate_intent, sorted(ids)).items():
+                    data[lid] = listing_row["data"]
+
+        cache: Dict = {}
+        implies = self._cached_implies(cache)
+        checked = undecided = 0
+        for row in rows:
+            a, b = str(row["listing_a_id"]), str(row["listing_b_id"])
+            if a not in data or b not in data:
+                to_retract.add(str(row["match_id"]))
+                continue
+            checked += 1
+            try:
+                still_matches = listing_matches_v2(data[a], data[b], implies_fn=implies)
+            except Exception as e:
+                # Unknown, not a non-match: keep the row
+                undecided += 1
+                log.warning("Match re-evaluation failed, match kept", emoji="warning",
+                            match_id=row["match_id"], error=str(e))
+                continue
+            if not still_matches:
+                to_retract.add(str(row["match_id"]))
+        return checked, undecided, to_retract
+
+    def _percolate_updates(self, supabase, updated, rows, to_retract) -> int:
+        """Insert matches between updated listings and stored queries they now satisfy."""
+        active_pairs = {
+            (str(r["listing_a_id"]), str(r["listing_b_id"]))
+            for r in rows if str(r["match_id"]) not in to_retract
+        }
+        cache: Dict = {}
+        implies = self._cached_implies(cache)
+
+        new_rows = []
+        for lid, listing_row in updated.items():
+            listing = listing_row["data"]
+            for hit in self.index.percolate(lid, listing, implies_fn=implies, user_id=listing_row.get("user_id")):
+                if (hit["query_id"], lid) in active_pairs:
+                    continue
+                new_rows.append({
+                    "listing_a_id": hit["query_id"],
+                    "listing_b_id": lid,
+                    "user_a_id": hit["user_id"],
+                    "user_b_id": listing_row.get("user_id"),
+                    "match_score": 1.0,
+                    "match_type": listing.get("intent", "service"),
+                    "is_bidirectional": False,
+                    "status": "pending",
+                })
+        if new_rows:
+            supabase.table("matches").insert(new_rows).execute()
+        return len(new_rows)
+
+    def _cached_implies(self, cache: Dict) -> Optional[ImplicationFn]:
+        if self.implies_fn is None:
+            return None
+
+        def implies(candidate_val: str, required_val: str) -> bool:
+            key = (candidate_val, required_val)
+            if key not in cache:
+                cache[key] = self.implies_fn(candidate_val, required_val)
+            return cache[key]
+
+        return implies
+
+    # ------------------------------------------------------------------
+    # Background thread
+    # ------------------------------------------------------------------
+
+    def start(self, supabase, interval_seconds: float = MATCH_MAINTENANCE_POLL_SECONDS) -> bool:
+        """Start the maintenance loop (daemon thread)."""
+        if interval_seconds <= 0 or self._thread is not None:
+            return False
+        self._stop_event.clear()
+
+        def _loop():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    while self.poll_once(supabase).get("events", 0) >= self.batch_size:
+                        pass  # backlog: keep draining
+                except Exception as e:
+                    log.error("Match maintenance pass failed", emoji="error", error=str(e))
+
+        self._thread = threading.Thread(target=_loop, name="match-maintenance", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def get_stats(self) -> Dict:
+        """Get maintenance statistics."""
+        return {
+            "passes": self._passes,
+            "events": self._events,
+            "rows_checked": self._rows_checked,
+            "retracted": self._retracted,
+            "created": self._created,
+            "reindexed": self._reindexed,
+            "undecided": self._undecided,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Singleton
+# ═══════════════════════════════════════════════════════════════════
+
+_match_maintainer: Optional[MatchMaintainer] = None
+
+
+def get_match_maintainer(
+    implies_fn: Optional[ImplicationFn] = None,
+    clients: Optional[IngestionClients] = None
+) -> MatchMaintainer:
+    """Get singleton MatchMaintainer (implies_fn / clients apply on first call)."""
+    global _match_maintainer
+    if _match_maintainer is None:
+        _match_maintainer = MatchMaintainer(implies_fn=implies_fn, clients=clients)
+    return _match_maintainer
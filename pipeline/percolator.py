@@ -0,0 +1,123 @@
+"""
+PERCOLATOR: Prospective matching for newly stored listings
+
+Responsibilities:
+- Persist /search-and-match queries to stored_queries and index them
+  (matching/stored_query_index.py)
+- Rebuild the index from stored_queries on startup
+- On each ingestion, match the new listing against the stored queries it
+  could satisfy and write one matches row per hit
+
+Dependencies: supabase-py
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from matching.stored_query_index import ImplicationFn, StoredQueryIndex, get_stored_query_index
+
+
+STORED_QUERIES_TABLE = "stored_queries"
+
+
+def store_query(
+    supabase,
+    query_id: str,
+    listing: Dict[str, Any],
+    user_id: Optional[str] = None,
+    index: Optional[StoredQueryIndex] = None
+) -> None:
+    """
+    Persist a normalized query and add it to the index.
+
+    The index is only updated once the Supabase write succeeded, so this
+    process never percolates a query other processes (and restarts) lack.
+    """
+    if index is None:
+        index = get_stored_query_index()
+    supabase.table(STORED_QUERIES_TABLE).upsert({
+        "query_id": query_id,
+        "user_id": user_id,
+        "intent": listing.get("intent"),
+        "data": listing,
+    }).execute()
+    index.add(query_id, listing, user_id=user_id)
+
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    """Unix time of a Supabase timestamptz string (None if missing / unparsable)."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def load_stored_queries(supabase, index: Optional[StoredQueryIndex] = None, page_size: int = 1000) -> int:
+    """
+    Rebuild the index from stored_queries. Returns queries loaded.
+
+    Expired queries are skipped; rows are read oldest first, so the
+    index's size cap keeps the newest.
+    """
+    if index is None:
+        index = get_stored_query_index()
+    loaded = 0
+    start = 0
+    while True:
+        query = supabase.table(STORED_QUERIES_TABLE).select("query_id, user_id, data, created_at")
+        if index.ttl_seconds > 0:
+            cutoff = datetime.fromtimestamp(time.time() - index.ttl_seconds, timezone.utc).isoformat()
+            query = query.gte("created_at", cutoff)
+        response = query.order("created_at").order("query_id").range(start, start + page_size - 1).execute()
+        rows = response.data or []
+        for row in rows:
+            if isinstance(row.get("data"), dict):
+                index.add(str(row["query_id"]), row["data"], user_id=row.get("user_id"),
+                          created_at=_parse_timestamp(row.get("created_at")))
+                loaded += 1
+        if len(rows) < page_size:
+            return loaded
+        start += page_size
+
+
+def percolate_listing(
+    supabase,
+    listing_id: str,
+    listing: Dict[str, Any],
+    user_id: Optional[str] = None,
+    implies_fn: Optional[ImplicationFn] = None,
+    index: Optional[StoredQueryIndex] = None
+) -> List[str]:
+    """
+    Match a newly stored listing against stored queries and record hits.
+
+    Match rows mirror /search-and-match: listing_a = stored query,
+    listing_b = new listing. The owner's own stored queries never match.
+
+    Returns:
+        match_ids of the inserted matches rows
+    """
+    if index is None:
+        index = get_stored_query_index()
+    hits = index.percolate(listing_id, listing, implies_fn=implies_fn, user_id=user_id)
+    if not hits:
+        return []
+
+    rows = [
+        {
+            "listing_a_id": hit["query_id"],
+            "listing_b_id": listing_id,
+            "user_a_id": hit["user_id"],
+            "user_b_id": user_id,
+            "match_score": 1.0,
+            "match_type": listing.get("intent", "service"),
+            "is_bidirectional": False,
+            "status": "pending",
+        }
+        for hit in hits
+    ]
+    response = supabase.table("matches").insert(rows).execute()
+    return [r["match_id"] for r in response.data or [] if "match_id" in r]
@@ -0,0 +1,622 @@
+"""
+REINDEX: Zero-downtime re-embedding via shadow collections + aliases
+
+Responsibilities:
+- Stream listings out of Supabase (paginated, per intent table)
+- Batch-encode them with the target embedding model into a shadow
+  collection (e.g. product_vectors__bge_large_20261018T120000) carrying
+  the same payload indexes as scripts/qdrant_setup.py
+- Catch-up passes for listings written while the job ran (updated_at >=
+  last sync) and for listings deleted meanwhile
+- Atomically repoint the alias (product_vectors) at the shadow collection
+- Report progress and throughput
+
+Retrieval and ingestion address product_vectors / service_vectors /
+mutual_vectors by name; after the first reindex those names are Qdrant
+aliases, so the swap is invisible to them.
+
+Two steps, because query embeddings must come from the same model as
+the collection behind the alias:
+
+1. Build (any time, no effect on serving):
+       python -m pipeline.reindex --model BAAI/bge-large-en-v1.5
+   Shadow collections record the model (collection metadata
+   "embedding_model") and the last sync time ("synced_at").
+
+2. Swap (release step of the deploy that sets EMBEDDING_MODEL to the
+   same model; refused when EMBEDDING_MODEL differs):
+       EMBEDDING_MODEL=BAAI/bge-large-en-v1.5 python -m pipeline.reindex --model BAAI/bge-large-en-v1.5 --swap
+   Catches the newest complete shadow collection up, swaps the alias,
+   then runs a final catch-up. A swap is never made when any upsert
+   failed; the old alias keeps serving.
+
+First run on a legacy deployment: an alias cannot take the name of the
+existing physical collection "product_vectors", and Qdrant cannot
+replace a collection with an alias atomically. The swap refuses until
+it is run once with --migrate-legacy (drop + alias creation back to
+back, in a maintenance window); every later swap is a single atomic
+update_collection_aliases call.
+
+Usage:
+    python -m pipeline.reindex --model BAAI/bge-large-en-v1.5
+    python -m pipeline.reindex --model all-MiniLM-L6-v2 --intent product
+    python -m pipeline.reindex --model ... --swap [--drop-old] [--migrate-legacy]
+
+Dependencies: supabase-py, qdrant-client, sentence-transformers
+"""
+
+import argparse
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    PointIdsList,
+    PointStruct,
+    VectorParams,
+)
+
+from embedding.embedding_builder import build_embedding_text
+from embedding.embedding_store import get_embedding_store
+from pipeline.ingestion_pipeline import (
+    EMBEDDING_MODEL,
+    IngestionClients,
+    build_qdrant_payload,
+    get_collection_name,
+    get_table_name,
+    point_fingerprint,
+)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+INTENTS = ("product", "service", "mutual")
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_ENCODE_BATCH = 64
+DEFAULT_UPSERT_BATCH = 256
+
+# Catch-up windows start this much before the recorded sync time, so
+# clock skew between this host and the database never skips a row
+# (re-upserting a few unchanged rows is harmless)
+CATCH_UP_OVERLAP_S = 60
+
+# Payload indexes per intent (same fields as scripts/qdrant_setup.py)
+PAYLOAD_INDEXES = {
+    "product": (("listing_id", "keyword"), ("intent", "keyword"), ("domain", "keyword"), ("created_at", "integer")),
+    "service": (("listing_id", "keyword"), ("intent", "keyword"), ("domain", "keyword"), ("created_at", "integer")),
+    "mutual": (("listing_id", "keyword"), ("intent", "keyword"), ("category", "keyword"), ("created_at", "integer")),
+}
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ============================================================================
+# ALIASES
+# ============================================================================
+
+def resolve_alias(client: QdrantClient, alias_name: str) -> Optional[str]:
+    """Return the collection an alias points to (None if not an alias)."""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == alias_name:
+            return alias.collection_name
+    return None
+
+
+def shadow_collection_name(alias_name: str, model_name: str, stamp: Optional[str] = None) -> str:
+    """product_vectors + BAAI/bge-large-en-v1.5 → product_vectors__bge_large_en_v1_5_<stamp>"""
+    slug = re.sub(r"[^a-z0-9]+", "_", model_name.split("/")[-1].lower()).strip("_")
+    stamp = stamp or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    return f"{alias_name}__{slug}_{stamp}"
+
+
+def is_legacy_collection(client: QdrantClient, alias_name: str) -> bool:
+    """True when alias_name is still a physical collection (never reindexed)."""
+    return resolve_alias(client, alias_name) is None and client.collection_exists(alias_name)
+
+
+def swap_alias(
+    client: QdrantClient,
+    alias_name: str,
+    new_collection: str,
+    migrate_legacy: bool = False
+) -> Optional[str]:
+    """
+    Point alias_name at new_collection.
+
+    Args:
+        migrate_legacy: Allow the one-time, non-atomic replacement of a
+                        physical collection named alias_name
+
+    Returns:
+        The collection previously serving alias_name (None if none)
+
+    Raises:
+        RuntimeError: alias_name is a physical collection and
+                      migrate_legacy is False
+    """
+    previous = resolve_alias(client, alias_name)
+
+    if previous is None and client.collection_exists(alias_name):
+        if not migrate_legacy:
+            raise RuntimeError(
+                f"{alias_name} is a physical collection: run the swap once with "
+                f"--migrate-legacy in a maintenance window"
+            )
+        # One-time cutover: searches fail between the drop and the alias creation
+        client.delete_collection(alias_name)
+        client.update_collection_aliases(change_aliases_operations=[
+            CreateAliasOperation(create_alias=CreateAlias(collection_name=new_collection, alias_name=alias_name))
+        ])
+        return alias_name
+
+    operations = []
+    if previous is not None:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name)))
+    operations.append(
+        CreateAliasOperation(create_alias=CreateAlias(collection_name=new_collection, alias_name=alias_name))
+    )
+    # Delete + create in ONE request: Qdrant applies them atomically
+    client.update_collection_aliases(change_aliases_operations=operations)
+    return previous
+
+
+# ============================================================================
+# SHADOW COLLECTIONS
+# ============================================================================
+
+def create_shadow_collection(client: QdrantClient, intent: str, model_name: str, dim: int) -> str:
+    """Create an empty, indexed shadow collection for intent; returns its name."""
+    shadow = shadow_collection_name(get_collection_name(intent), model_name)
+    client.create_collection(
+        collection_name=shadow,
+        vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+        metadata={"embedding_model": model_name}
+    )
+    # Before any point is written, so filtered searches never scan unindexed data
+    for field_name, field_type in PAYLOAD_INDEXES[intent]:
+        client.create_payload_index(collection_name=shadow, field_name=field_name, field_schema=field_type)
+    return shadow
+
+
+def collection_metadata(client: QdrantClient, collection_name: str) -> Dict[str, Any]:
+    return client.get_collection(collection_name).config.metadata or {}
+
+
+def latest_shadow_collection(client: QdrantClient, intent: str, model_name: str) -> Optional[str]:
+    """Newest complete shadow collection of intent built with model_name."""
+    prefix = f"{get_collection_name(intent)}__"
+    names = sorted(
+        (c.name for c in client.get_collections().collections if c.name.startswith(prefix)),
+        key=lambda name: name.rsplit("_", 1)[-1],
+        reverse=True
+    )
+    for name in names:
+        metadata = collection_metadata(client, name)
+        if metadata.get("embedding_model") == model_name and metadata.get("synced_at"):
+            return name
+    return None
+
+
+# ============================================================================
+# SOURCE
+# ============================================================================
+
+def stream_listing_rows(
+    supabase,
+    intent: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    since: Optional[str] = None,
+    since_column: str = "updated_at"
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream (id, user_id, data) rows of one intent table, page by page.
+
+    Args:
+        since: Only rows with since_column >= since (catch-up pass);
+               updated_at covers both inserts and edits (migration 004)
+    """
+    table_name = get_table_name(intent)
+    start = 0
+    while True:
+        query = supabase.table(table_name).select("id, user_id, data")
+        if since:
+            query = query.gte(since_column, since)
+        response = query.order("id").range(start, start + page_size - 1).execute()
+        rows = response.data or []
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+
+def listing_ids(supabase, intent: str, page_size: int = DEFAULT_PAGE_SIZE) -> set:
+    """Every listing id currently in the intent table."""
+    table_name = get_table_name(intent)
+    ids = set()
+    start = 0
+    while True:
+        response = supabase.table(table_name).select("id").order("id").range(start, start + page_size - 1).execute()
+        rows = response.data or []
+        ids.update(str(row["id"]) for row in rows)
+        if len(rows) < page_size:
+            return ids
+        start += page_size
+
+
+def count_listing_rows(supabase, intent: str) -> Optional[int]:
+    try:
+        response = supabase.table(get_table_name(intent)).select("id", count="exact").limit(1).execute()
+        return response.count
+    except Exception:
+        return None
+
+
+def prune_deleted(
+    client: QdrantClient,
+    supabase,
+    intent: str,
+    collection_name: str,
+    page_size: int = DEFAULT_PAGE_SIZE
+) -> int:
+    """Delete points whose listing no longer exists in Supabase; returns the count."""
+    live = listing_ids(supabase, intent, page_size)
+    stale = []
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name, limit=page_size, offset=offset,
+            with_payload=False, with_vectors=False
+        )
+        stale.extend(r.id for r in records if str(r.id) not in live)
+        if offset is None:
+            break
+    for start in range(0, len(stale), page_size):
+        client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=stale[start:start + page_size]),
+            wait=True
+        )
+    return len(stale)
+
+
+# ============================================================================
+# REINDEX
+# ============================================================================
+
+class ReindexProgress:
+    """Counters + throughput for one collection."""
+
+    def __init__(self, intent: str, total: Optional[int]):
+        self.intent = intent
+        self.total = total
+        self.indexed = 0
+        self.failed = 0
+        self.deleted = 0
+        self.started = time.perf_counter()
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.indexed / elapsed if elapsed > 0 else 0.0
+
+    def line(self) -> str:
+        total = f"/{self.total}" if self.total is not None else ""
+        return (f"  [{self.intent}] {self.indexed}{total} indexed, {self.deleted} deleted, "
+                f"{self.failed} failed ({self.rate:.1f} listings/s)")
+
+
+def _index_rows(
+    client: QdrantClient,
+    model,
+    model_name: str,
+    collection_name: str,
+    rows: List[Dict[str, Any]],
+    progress: ReindexProgress,
+    encode_batch: int
+) -> None:
+    rows = [r for r in rows if isinstance(r.get("data"), dict) and r["data"].get("intent")]
+    if not rows:
+        return
+
+    texts = [build_embedding_text(r["data"]) for r in rows]
+    store = get_embedding_store()
+    if store is not None:
+        vectors = store.encode(model, model_name, texts, batch_size=encode_batch)
+    else:
+        vectors = [
+            v.tolist() if hasattr(v, "tolist") else list(v)
+            for v in model.encode(texts, batch_size=encode_batch, convert_to_tensor=False)
+        ]
+
+    points = []
+    for row, vector in zip(rows, vectors):
+        payload = build_qdrant_payload(str(row["id"]), row["data"], user_id=row.get("user_id"))
+        payload["point_fingerprint"] = point_fingerprint(vector, payload)
+        points.append(PointStruct(id=str(row["id"]), vector=vector, payload=payload))
+
+    try:
+        # wait=True: a failure must be seen here, before the alias is swapped
+        client.upsert(collection_name=collection_name, points=points, wait=True)
+        progress.indexed += len(points)
+    except Exception as e:
+        progress.failed += len(points)
+        print(f"  ✗ upsert failed ({len(points)} points): {e}")
+
+
+def _sync(
+    clients: IngestionClients,
+    intent: str,
+    model,
+    model_name: str,
+    collection_name: str,
+    progress: ReindexProgress,
+    since: Optional[str],
+    page_size: int,
+    encode_batch: int,
+    upsert_batch: int,
+    verbose: bool
+) -> None:
+    """
+    Bring collection_name up to date with Supabase: index every row (or
+    rows updated since `since`), then delete points of removed listings.
+    """
+    if since:
+        since = (datetime.fromisoformat(since) - timedelta(seconds=CATCH_UP_OVERLAP_S)).isoformat()
+
+    batch = []
+    for row in stream_listing_rows(clients.supabase, intent, page_size, since=since):
+        batch.append(row)
+        if len(batch) >= upsert_batch:
+            _index_rows(clients.qdrant, model, model_name, collection_name, batch, progress, encode_batch)
+            batch = []
+            if verbose:
+                print(progress.line())
+    if batch:
+        _index_rows(clients.qdrant, model, model_name, collection_name, batch, progress, encode_batch)
+
+    if since:
+        progress.deleted += prune_deleted(clients.qdrant, clients.supabase, intent, collection_name, page_size)
+
+
+def build_shadow(
+    clients: IngestionClients,
+    intent: str,
+    model,
+    model_name: str,
+    progress: ReindexProgress,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    encode_batch: int = DEFAULT_ENCODE_BATCH,
+    upsert_batch: int = DEFAULT_UPSERT_BATCH,
+    verbose: bool = True
+) -> Optional[str]:
+    """
+    Build one intent's shadow collection (serving is untouched).
+
+    Returns:
+        The shadow collection name, or None when an upsert failed (the
+        incomplete collection is deleted)
+    """
+    dim = model.get_sentence_embedding_dimension()
+    shadow = create_shadow_collection(clients.qdrant, intent, model_name, dim)
+    if verbose:
+        print(f"  [{intent}] shadow collection {shadow} ({dim}D)")
+
+    # Full pass, then catch-up: rows written / deleted while the full pass ran
+    job_start = _utc_now_iso()
+    _sync(clients, intent, model, model_name, shadow, progress, None,
+          page_size, encode_batch, upsert_batch, verbose)
+    catch_up_start = _utc_now_iso()
+    _sync(clients, intent, model, model_name, shadow, progress, job_start,
+          page_size, encode_batch, upsert_batch, verbose)
+
+    if progress.failed:
+        clients.qdrant.delete_collection(shadow)
+        print(f"  [{intent}] ✗ {progress.failed} listings failed, {shadow} deleted")
+        return None
+
+    # synced_at marks the build complete and starts the next catch-up
+    clients.qdrant.update_collection(collection_name=shadow, metadata={"synced_at": catch_up_start})
+    return shadow
+
+
+def swap_shadow(
+    clients: IngestionClients,
+    intent: str,
+    shadow: str,
+    model,
+    model_name: str,
+    progress: ReindexProgress,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    encode_batch: int = DEFAULT_ENCODE_BATCH,
+    upsert_batch: int = DEFAULT_UPSERT_BATCH,
+    drop_old: bool = False,
+    migrate_legacy: bool = False,
+    verbose: bool = True
+) -> Dict[str, Any]:
+    """
+    Catch a built shadow collection up and point the intent's alias at it.
+
+    The alias is left alone when the catch-up had failed upserts.
+
+    Returns:
+        {"swapped": bool, "previous": collection previously serving the alias}
+
+    Raises:
+        ValueError: shadow was built with another model
+    """
+    alias_name = get_collection_name(intent)
+    metadata = collection_metadata(clients.qdrant, shadow)
+    if metadata.get("embedding_model") != model_name:
+        raise ValueError(f"{shadow} was built with {metadata.get('embedding_model')}, not {model_name}")
+
+    catch_up_start = _utc_now_iso()
+    _sync(clients, intent, model, model_name, shadow, progress, metadata.get("synced_at"),
+          page_size, encode_batch, upsert_batch, verbose)
+    if progress.failed:
+        print(f"  [{intent}] ✗ {progress.failed} listings failed, {alias_name} not swapped")
+        return {"swapped": False, "previous": resolve_alias(clients.qdrant, alias_name)}
+
+    previous = swap_alias(clients.qdrant, alias_name, shadow, migrate_legacy=migrate_legacy)
+
+    # Final catch-up: rows that landed in the old collection just before the swap
+    final_start = _utc_now_iso()
+    _sync(clients, intent, model, model_name, shadow, progress, catch_up_start,
+          page_size, encode_batch, upsert_batch, verbose)
+    clients.qdrant.update_collection(collection_name=shadow, metadata={"synced_at": final_start})
+
+    if drop_old and previous and previous != alias_name:
+        clients.qdrant.delete_collection(previous)
+
+    if verbose:
+        print(f"  [{intent}] ✓ {alias_name} → {shadow} (was: {previous or 'none'})")
+    return {"swapped": True, "previous": previous}
+
+
+def reindex_intent(
+    clients: IngestionClients,
+    intent: str,
+    model,
+    model_name: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    encode_batch: int = DEFAULT_ENCODE_BATCH,
+    upsert_batch: int = DEFAULT_UPSERT_BATCH,
+    swap: bool = False,
+    drop_old: bool = False,
+    migrate_legacy: bool = False,
+    shadow: Optional[str] = None,
+    verbose: bool = True
+) -> Dict[str, Any]:
+    """
+    Rebuild one intent's vectors into a shadow collection and, with
+    swap=True, point the alias at it.
+
+    Args:
+        shadow: Swap this already built collection instead of building one
+
+    Returns:
+        Stats dict (alias, collection, previous, swapped, indexed,
+        deleted, failed, listings_per_s, elapsed_s)
+    """
+    alias_name = get_collection_name(intent)
+    if swap and not migrate_legacy and is_legacy_collection(clients.qdrant, alias_name):
+        raise RuntimeError(
+            f"{alias_name} is a physical collection: run the swap once with "
+            f"--migrate-legacy in a maintenance window"
+        )
+
+    progress = ReindexProgress(intent, count_listing_rows(clients.supabase, intent))
+    if shadow is None:
+        shadow = build_shadow(clients, intent, model, model_name, progress,
+                              page_size, encode_batch, upsert_batch, verbose)
+
+    result = {"swapped": False, "previous": resolve_alias(clients.qdrant, alias_name)}
+    if swap and shadow is not None:
+        result = swap_shadow(clients, intent, shadow, model, model_name, progress,
+                             page_size, encode_batch, upsert_batch, drop_old, migrate_legacy, verbose)
+
+    elapsed = time.perf_counter() - progress.started
+    if verbose:
+        print(progress.line())
+
+    return {
+        "alias": alias_name,
+        "collection": shadow,
+        "previous": result["previous"],
+        "swapped": result["swapped"],
+        "indexed": progress.indexed,
+        "deleted": progress.deleted,
+        "failed": progress.failed,
+        "listings_per_s": round(progress.rate, 2),
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-embed listings into shadow collections and swap aliases")
+    parser.add_argument("--model", required=True, help="Target SentenceTransformer model")
+    parser.add_argument("--intent", choices=INTENTS, action="append", help="Limit to intent(s)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--encode-batch", type=int, default=DEFAULT_ENCODE_BATCH)
+    parser.add_argument("--upsert-batch", type=int, default=DEFAULT_UPSERT_BATCH)
+    parser.add_argument("--swap", action="store_true",
+                        help="Deploy step: catch up the newest built shadow collections and swap the aliases")
+    parser.add_argument("--drop-old", action="store_true", help="Delete the previous collection after the swap")
+    parser.add_argument("--migrate-legacy", action="store_true",
+                        help="Allow the one-time, non-atomic replacement of physical *_vectors collections")
+    args = parser.parse_args(argv)
+
+    if args.swap and EMBEDDING_MODEL != args.model:
+        print(f"✗ EMBEDDING_MODEL is {EMBEDDING_MODEL}: swap to {args.model} only from the deploy that sets it")
+        return 1
+
+    print("=" * 70)
+    print(f"REINDEX ({'swap' if args.swap else 'build'}): {args.model}")
+    print("=" * 70)
+
+    clients = IngestionClients()
+    try:
+        clients.initialize()
+    except Exception as e:
+        print(f"✗ Initialization failed: {e}")
+        return 1
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(args.model)
+
+    results = []
+    for intent in args.intent or INTENTS:
+        shadow = None
+        if args.swap:
+            shadow = latest_shadow_collection(clients.qdrant, intent, args.model)
+            if shadow is None:
+                print(f"✗ No complete {intent} shadow collection for {args.model}: build one first")
+                return 1
+        try:
+            results.append(reindex_intent(
+                clients, intent, model, args.model,
+                page_size=args.page_size,
+                encode_batch=args.encode_batch,
+                upsert_batch=args.upsert_batch,
+                swap=args.swap,
+                drop_old=args.drop_old,
+                migrate_legacy=args.migrate_legacy,
+                shadow=shadow
+            ))
+        except RuntimeError as e:
+            print(f"✗ {e}")
+            return 1
+
+    print()
+    print("=" * 70)
+    print("REINDEX COMPLETE")
+    print("=" * 70)
+    for r in results:
+        state = "swapped" if r["swapped"] else "not swapped"
+        print(f"{r['alias']:<16} → {r['collection']} ({state}): {r['indexed']} indexed, "
+              f"{r['deleted']} deleted, {r['failed']} failed, {r['listings_per_s']} listings/s")
+    print()
+    if not args.swap and all(r["collection"] for r in results):
+        print(f"Swap as a release step of the deploy that sets EMBEDDING_MODEL={args.model}:")
+        print(f"  python -m pipeline.reindex --model {args.model} --swap")
+    return 0 if all(r["failed"] == 0 for r in results) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
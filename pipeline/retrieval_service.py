@@ -4,7 +4,8 @@ PHASE 3.4: RETRIEVAL SERVICE (CANDIDATE SELECTION)
 Responsibilities:
 - SQL filtering via Supabase
 - Qdrant vector search with payload filters
-- Return candidate listing_ids ONLY
+- Return candidate listing_ids (or candidate rows served from the
+  Qdrant payload, falling back to one batched Supabase fetch)
 
 NO ranking.
 NO boolean matching.
@@ -19,12 +20,15 @@ Date: 2026-01-12
 """
 
 import os
+import random
 from typing import List, Dict, Any, Optional
 from supabase import create_client, Client
 from qdrant_client import QdrantClient
 from qdrant_client.models import Filter, FieldCondition, MatchAny, MatchValue
 
 from embedding.embedding_builder import build_embedding_text
+from pipeline.ingestion_pipeline import listing_content_hash
+from pipeline.listing_cache import ListingCache, get_listing_cache
 
 
 # ============================================================================
@@ -47,6 +51,26 @@ EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 # Retrieval parameters
 DEFAULT_LIMIT = 100  # Top-k candidates to return
 
+# Fraction of payload-served candidates re-checked against Supabase
+# (data_hash comparison; one batched query per search when any candidate
+# is sampled). Catches payloads a missed re-upsert left stale; 0 disables.
+PAYLOAD_CONSISTENCY_SAMPLE_RATE = float(
+    os.environ.get("PAYLOAD_CONSISTENCY_SAMPLE_RATE", "0.02")
+)
+
+# Intent -> Supabase table / Qdrant collection
+LISTING_TABLES = {
+    "product": "product_listings",
+    "service": "service_listings",
+    "mutual": "mutual_listings",
+}
+# Qdrant alias names (see pipeline/reindex.py): reads follow alias swaps
+COLLECTIONS = {
+    "product": "product_vectors",
+    "service": "service_vectors",
+    "mutual": "mutual_vectors",
+}
+
 
 # ============================================================================
 # CLIENT INITIALIZATION
@@ -226,6 +250,92 @@ def sql_filter_mutual(
 # QDRANT VECTOR SEARCH
 # ============================================================================
 
+def build_candidate_filter(query_listing: Dict[str, Any]) -> Filter:
+    """
+    Build the Qdrant payload filter for a query listing.
+
+    - intent = query intent
+    - product/service: domain intersection (MatchAny)
+    - mutual: category intersection (MatchAny)
+    """
+    intent = query_listing.get("intent")
+    filter_conditions = [
+        FieldCondition(key="intent", match=MatchValue(value=intent))
+    ]
+
+    if intent == "product" or intent == "service":
+        query_domains = query_listing.get("domain", [])
+        if query_domains:
+            # MatchAny: Returns points where field contains ANY of the specified values
+            filter_conditions.append(
+                FieldCondition(key="domain", match=MatchAny(any=query_domains))
+            )
+    elif intent == "mutual":
+        query_categories = query_listing.get("category", [])
+        if query_categories:
+            filter_conditions.append(
+                FieldCondition(key="category", match=MatchAny(any=query_categories))
+            )
+
+    return Filter(must=filter_conditions)
+
+
+def qdrant_search_points(
+    client: QdrantClient,
+    model: "SentenceTransformer",
+    query_listing: Dict[str, Any],
+    limit: int = DEFAULT_LIMIT,
+    with_payload: bool = True
+) -> List[Any]:
+    """
+    Run the filtered vector search and return the scored points.
+
+    Args:
+        client: Qdrant client
+        model: Embedding model
+        query_listing: Normalized query listing
+        limit: Number of candidates to return
+        with_payload: Return point payloads (needed for payload serving)
+
+    Returns:
+        List of ScoredPoint (ordered by vector similarity)
+    """
+    intent = query_listing.get("intent")
+    if intent not in COLLECTIONS:
+        raise ValueError(f"Invalid intent: {intent}")
+
+    # Build query embedding
+    query_text = build_embedding_text(query_listing)
+    query_vector = model.encode(query_text, convert_to_tensor=False).tolist()
+
+    search_response = client.query_points(
+        collection_name=COLLECTIONS[intent],
+        query=query_vector,
+        query_filter=build_candidate_filter(query_listing),
+        limit=limit,
+        with_payload=with_payload
+    )
+    return search_response.points
+
+
+def _extract_listing_ids(
+    points: List[Any],
+    sql_filtered_ids: Optional[List[str]] = None
+) -> List[str]:
+    """Extract listing_ids from scored points, post-filtering by SQL ids."""
+    allowed = set(sql_filtered_ids) if sql_filtered_ids is not None else None
+
+    candidate_ids = []
+    for scored_point in points:
+        listing_id = (scored_point.payload or {}).get("listing_id")
+        if listing_id:
+            # Post-filter by SQL-filtered IDs if provided
+            if allowed is None or listing_id in allowed:
+                candidate_ids.append(listing_id)
+
+    return candidate_ids
+
+
 def qdrant_search_product_service(
     client: QdrantClient,
     model: "SentenceTransformer",
@@ -258,57 +368,10 @@ def qdrant_search_product_service(
     if not intent or intent not in ["product", "service"]:
         raise ValueError(f"Invalid intent: {intent}")
 
-    # Select collection
-    collection_name = "product_vectors" if intent == "product" else "service_vectors"
-
-    # Build query embedding
-    query_text = build_embedding_text(query_listing)
-    query_vector = model.encode(query_text, convert_to_tensor=False).tolist()
-
-    # Build payload filter
-    filter_conditions = []
-
-    # Filter by intent
-    filter_conditions.append(
-        FieldCondition(key="intent", match=MatchValue(value=intent))
-    )
-
-    # Filter by domain (intersection check)
-    query_domains = query_listing.get("domain", [])
-    if query_domains:
-        # MatchAny: Returns points where field contains ANY of the specified values
-        filter_conditions.append(
-            FieldCondition(key="domain", match=MatchAny(any=query_domains))
-        )
-
-    # Optionally filter by SQL-filtered IDs
-    if sql_filtered_ids:
-        # Note: Qdrant doesn't have native "ID IN list" filter
-        # For small lists, we can search and post-filter
-        # For large lists, this is inefficient - would need alternative approach
-        pass  # Post-filter after search
-
-    # Build filter object
-    query_filter = Filter(must=filter_conditions) if filter_conditions else None
-
-    # Search
-    search_response = client.query_points(
-        collection_name=collection_name,
-        query=query_vector,
-        query_filter=query_filter,
-        limit=limit
-    )
-
-    # Extract listing_ids
-    candidate_ids = []
-    for scored_point in search_response.points:
-        listing_id = scored_point.payload.get("listing_id")
-        if listing_id:
-            # Post-filter by SQL-filtered IDs if provided
-            if sql_filtered_ids is None or listing_id in sql_filtered_ids:
-                candidate_ids.append(listing_id)
-
-    return candidate_ids
+    # Note: Qdrant doesn't have native "ID IN list" filter
+    # SQL-filtered IDs are applied as a post-filter after search
+    points = qdrant_search_points(client, model, query_listing, limit=limit)
+    return _extract_listing_ids(points, sql_filtered_ids)
 
 
 def qdrant_search_mutual(
@@ -342,48 +405,135 @@ def qdrant_search_mutual(
     if intent != "mutual":
         raise ValueError(f"Invalid intent for mutual search: {intent}")
 
-    collection_name = "mutual_vectors"
+    points = qdrant_search_points(client, model, query_listing, limit=limit)
+    return _extract_listing_ids(points, sql_filtered_ids)
 
-    # Build query embedding (natural language)
-    query_text = build_embedding_text(query_listing)
-    query_vector = model.encode(query_text, convert_to_tensor=False).tolist()
 
-    # Build payload filter
-    filter_conditions = []
+# ============================================================================
+# CANDIDATE ROWS (PAYLOAD SERVING)
+# ============================================================================
 
-    # Filter by intent
-    filter_conditions.append(
-        FieldCondition(key="intent", match=MatchValue(value="mutual"))
-    )
+def fetch_listing_rows(
+    client: Client,
+    intent: str,
+    listing_ids: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch listing rows from Supabase in ONE batched query.
 
-    # Filter by category (intersection check)
-    query_categories = query_listing.get("category", [])
-    if query_categories:
-        filter_conditions.append(
-            FieldCondition(key="category", match=MatchAny(any=query_categories))
-        )
+    Args:
+        client: Supabase client
+        intent: product | service | mutual
+        listing_ids: Listing ids to fetch
 
-    # Build filter object
-    query_filter = Filter(must=filter_conditions) if filter_conditions else None
+    Returns:
+        Dict listing_id -> row (id, user_id, data, ...); missing ids are absent
+    """
+    if not listing_ids:
+        return {}
 
-    # Search
-    search_response = client.query_points(
-        collection_name=collection_name,
-        query=query_vector,
-        query_filter=query_filter,
-        limit=limit
+    table_name = LISTING_TABLES.get(intent)
+    if not table_name:
+        raise ValueError(f"Unknown intent: {intent}")
+
+    response = (
+        client.table(table_name)
+        .select("*")
+        .in_("id", list(listing_ids))
+        .execute()
     )
+    return {row["id"]: row for row in (response.data or [])}
 
-    # Extract listing_ids
-    candidate_ids = []
-    for scored_point in search_response.points:
-        listing_id = scored_point.payload.get("listing_id")
-        if listing_id:
-            # Post-filter by SQL-filtered IDs if provided
-            if sql_filtered_ids is None or listing_id in sql_filtered_ids:
-                candidate_ids.append(listing_id)
 
-    return candidate_ids
+def _row_from_payload(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Build a candidate row from a point payload, or None if incomplete."""
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        return None
+
+    return {
+        "listing_id": payload.get("listing_id"),
+        "user_id": payload.get("user_id"),
+        "data": data,
+        "data_hash": payload.get("data_hash"),
+        "source": "payload",
+    }
+
+
+def build_candidate_rows(
+    supabase: Client,
+    intent: str,
+    points: List[Any],
+    sql_filtered_ids: Optional[List[str]] = None,
+    consistency_sample_rate: float = PAYLOAD_CONSISTENCY_SAMPLE_RATE,
+    cache: Optional[ListingCache] = None
+) -> List[Dict[str, Any]]:
+    """
+    Turn scored points into candidate rows, preserving similarity order.
+
+    Points whose payload carries the listing are served directly. Points
+    without it (legacy payloads, QDRANT_PAYLOAD_MODE=ids) are read from the
+    listing cache, and the remaining misses are fetched from Supabase in a
+    single batched query (and cached). A sampled fraction of payload rows
+    can be re-checked against Supabase by data_hash; stale rows are replaced
+    with the Supabase copy (Supabase remains the source of truth).
+
+    Returns:
+        List of rows: {listing_id, user_id, data, data_hash, source}
+        (listings missing from both stores are dropped)
+    """
+    listing_ids = _extract_listing_ids(points, sql_filtered_ids)
+    payloads = {
+        (p.payload or {}).get("listing_id"): (p.payload or {}) for p in points
+    }
+
+    rows: Dict[str, Dict[str, Any]] = {}
+    to_fetch: List[str] = []
+    to_verify: List[str] = []
+
+    for listing_id in listing_ids:
+        row = _row_from_payload(payloads.get(listing_id, {}))
+        if row is None or not row["user_id"]:
+            cached = cache.get(listing_id) if cache is not None else None
+            if cached is not None:
+                rows[listing_id] = dict(cached, data_hash=None, source="cache")
+            else:
+                to_fetch.append(listing_id)
+            continue
+        rows[listing_id] = row
+        if consistency_sample_rate > 0 and random.random() < consistency_sample_rate:
+            to_verify.append(listing_id)
+
+    if to_fetch or to_verify:
+        fetched = fetch_listing_rows(supabase, intent, to_fetch + to_verify)
+        if cache is not None:
+            for db_row in fetched.values():
+                cache.put(db_row)
+
+        for listing_id in to_fetch:
+            db_row = fetched.get(listing_id)
+            if db_row:
+                rows[listing_id] = {
+                    "listing_id": listing_id,
+                    "user_id": db_row.get("user_id"),
+                    "data": db_row.get("data"),
+                    "data_hash": None,
+                    "source": "supabase",
+                }
+
+        for listing_id in to_verify:
+            db_row = fetched.get(listing_id)
+            if db_row is None:
+                # Deleted in Supabase but still indexed in Qdrant
+                rows.pop(listing_id, None)
+            elif listing_content_hash(db_row.get("data") or {}) != rows[listing_id]["data_hash"]:
+                rows[listing_id].update(
+                    user_id=db_row.get("user_id"),
+                    data=db_row.get("data"),
+                    source="supabase",
+                )
+
+    return [rows[listing_id] for listing_id in listing_ids if listing_id in rows]
 
 
 # ============================================================================
@@ -484,6 +634,76 @@ def retrieve_candidates(
     return candidate_ids
 
 
+def retrieve_candidate_rows(
+    clients: RetrievalClients,
+    query_listing: Dict[str, Any],
+    limit: int = DEFAULT_LIMIT,
+    use_sql_filter: bool = True,
+    verbose: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Retrieve candidate rows (listing_id, user_id, data) for a query listing.
+
+    Same pipeline as retrieve_candidates(), but the listing data is served
+    from the Qdrant payload so the matching loop needs no per-candidate
+    Supabase round trip. See build_candidate_rows() for the fallback path.
+
+    Args:
+        clients: Initialized RetrievalClients
+        query_listing: Normalized query listing
+        limit: Number of candidates to return
+        use_sql_filter: Whether to apply SQL filtering first
+        verbose: Print progress messages
+
+    Returns:
+        List of candidate rows (ordered by vector similarity)
+
+    Raises:
+        ValueError: If intent unknown or retrieval fails
+    """
+    intent = query_listing.get("intent")
+    if not intent:
+        raise ValueError("Query listing missing 'intent' field")
+    if intent not in COLLECTIONS:
+        raise ValueError(f"Unknown intent: {intent}")
+
+    if verbose:
+        print(f"Retrieving candidate rows for intent: {intent}")
+
+    sql_filtered_ids = None
+    if use_sql_filter:
+        if intent == "product" or intent == "service":
+            sql_filtered_ids = sql_filter_product_service(
+                clients.supabase, query_listing, limit=limit * 10
+            )
+        else:
+            sql_filtered_ids = sql_filter_mutual(
+                clients.supabase, query_listing, limit=limit * 10
+            )
+
+    points = qdrant_search_points(
+        clients.qdrant,
+        clients.embedding_model,
+        query_listing,
+        limit=limit
+    )
+    cache = get_listing_cache()
+    rows = build_candidate_rows(
+        clients.supabase,
+        intent,
+        points,
+        sql_filtered_ids=sql_filtered_ids,
+        cache=cache if cache.enabled else None
+    )
+
+    if verbose:
+        served = sum(1 for r in rows if r["source"] == "payload")
+        print(f"        ✓ Retrieved {len(rows)} candidates ({served} from payload)")
+        print()
+
+    return rows
+
+
 # ============================================================================
 # MAIN (FOR TESTING)
 # ============================================================================
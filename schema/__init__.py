@@ -1 +1 @@
-from schema.schema_normalizer_v2 import normalize_and_validate_v2
+from schema.schema_normalizer_v2 import normalize_and_validate_v2, normalize_and_validate_compact_v2
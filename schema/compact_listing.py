@@ -0,0 +1,258 @@
+"""
+COMPACT LISTINGS: Slotted, read-only form of the OLD schema for matching
+
+normalize_and_validate_v2 returns nested dicts; a large candidate set
+then costs one dict per item / constraint object, duplicated key strings
+and per-comparison re-extraction (M-30 ranges, Flatten for M-12).
+
+compact_listing(old) builds, once per listing:
+- __slots__ objects (CompactListing, CompactItem, CompactOther, CompactSelf)
+- Interned keys and categorical values; ranges as tuples
+- One shared empty dict for every empty constraint object
+- Precomputed per item: numeric_ranges (M-30) and flat_values (M-12)
+
+The classes are read-only Mappings with the OLD schema keys, so
+listing_matches_v2, MatchPlan and the matcher primitives consume them
+directly (A["items"], item.get("categorical", {}), ...); the hot paths
+use the precomputed fields. Use to_dict() (or plain_listing) for JSON /
+storage.
+
+ListingCache keeps its listings in this form, so candidates served from
+the cache are built once and matched without re-extraction.
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, FrozenSet, List, Tuple
+
+from matching.item_array_matchers import flatten_item_values
+from matching.item_matchers import _extract_candidate_ranges
+
+# Shared by every empty constraint object (never mutate compact listings)
+_EMPTY: Dict[str, Any] = {}
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _compact_categorical(categorical: Any) -> Any:
+    if not isinstance(categorical, dict):
+        return categorical
+    if not categorical:
+        return _EMPTY
+    return {sys.intern(k): _intern(v) for k, v in categorical.items()}
+
+
+def _compact_numeric(values: Any) -> Any:
+    if not isinstance(values, dict):
+        return values
+    if not values:
+        return _EMPTY
+    return {sys.intern(k): v for k, v in values.items()}
+
+
+def _compact_ranges(ranges: Any) -> Any:
+    if not isinstance(ranges, dict):
+        return ranges
+    if not ranges:
+        return _EMPTY
+    return {
+        sys.intern(k): tuple(v) if isinstance(v, list) else v
+        for k, v in ranges.items()
+    }
+
+
+def _compact_strings(values: Any) -> Any:
+    if not isinstance(values, list):
+        return values
+    return [_intern(v) for v in values]
+
+
+def _plain(value: Any) -> Any:
+    """Compact value → JSON-ready value (tuples back to lists)."""
+    if isinstance(value, _CompactMapping):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+# ============================================================================
+# MAPPING BASE
+# ============================================================================
+
+class _CompactMapping(Mapping):
+    """
+    Read-only Mapping over __slots__; _SLOTS maps OLD-schema key → slot.
+
+    __getitem__ / get call the slot descriptors directly (_GETTERS) rather
+    than going through the Mapping mixins, which would cost the matchers
+    more per lookup than the dicts they replace.
+    """
+
+    __slots__ = ()
+    _SLOTS: Dict[str, str] = {}
+    _GETTERS: Dict[str, Callable[[Any], Any]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._GETTERS = {
+            key: getattr(cls, slot).__get__ for key, slot in cls._SLOTS.items()
+        }
+
+    def __getitem__(self, key: str) -> Any:
+        return self._GETTERS[key](self)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        getter = self._GETTERS.get(key)
+        return default if getter is None else getter(self)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._SLOTS
+
+    def __iter__(self):
+        return iter(self._SLOTS)
+
+    def __len__(self) -> int:
+        return len(self._SLOTS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: _plain(getattr(self, slot)) for key, slot in self._SLOTS.items()}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class CompactItem(_CompactMapping):
+    """One item of A.items / B.items."""
+
+    __slots__ = ("type", "categorical", "min", "max", "range", "itemexclusions",
+                 "numeric_ranges", "flat_values")
+    _SLOTS = {"type": "type", "categorical": "categorical", "min": "min",
+              "max": "max", "range": "range", "itemexclusions": "itemexclusions"}
+
+    def __init__(self, item: Dict[str, Any]):
+        self.type = _intern(item.get("type"))
+        self.categorical = _compact_categorical(item.get("categorical", _EMPTY))
+        self.min = _compact_numeric(item.get("min", _EMPTY))
+        self.max = _compact_numeric(item.get("max", _EMPTY))
+        self.range = _compact_ranges(item.get("range", _EMPTY))
+        self.itemexclusions = _compact_strings(item.get("itemexclusions"))
+        self.numeric_ranges: Dict[str, Tuple[float, float]] = _extract_candidate_ranges(self)
+        self.flat_values: FrozenSet[str] = frozenset(flatten_item_values(self))
+
+    # Keys the source item did not have stay absent ("type" missing is
+    # still a programmer error the matchers raise KeyError for)
+    _OPTIONAL = frozenset({"type", "itemexclusions"})
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._GETTERS[key](self)
+        if value is None and key in self._OPTIONAL:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        getter = self._GETTERS.get(key)
+        value = None if getter is None else getter(self)
+        return default if value is None and (getter is None or key in self._OPTIONAL) else value
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._OPTIONAL:
+            return getattr(self, key) is not None
+        return key in self._SLOTS
+
+    def __iter__(self):
+        return (key for key in self._SLOTS if key in self)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: _plain(self[key]) for key in self}
+
+
+class _CompactConstraints(_CompactMapping):
+    __slots__ = ("categorical", "min", "max", "range", "exclusions")
+    EXCLUSIONS_KEY = ""
+
+    def __init__(self, obj: Dict[str, Any]):
+        self.categorical = _compact_categorical(obj.get("categorical", _EMPTY))
+        self.min = _compact_numeric(obj.get("min", _EMPTY))
+        self.max = _compact_numeric(obj.get("max", _EMPTY))
+        self.range = _compact_ranges(obj.get("range", _EMPTY))
+        self.exclusions = _compact_strings(obj.get(self.EXCLUSIONS_KEY, []))
+
+
+class CompactOther(_CompactConstraints):
+    """A.other (requirements on the other party)."""
+
+    __slots__ = ()
+    EXCLUSIONS_KEY = "otherexclusions"
+    _SLOTS = {"categorical": "categorical", "min": "min", "max": "max",
+              "range": "range", "otherexclusions": "exclusions"}
+
+
+class CompactSelf(_CompactConstraints):
+    """B.self (what the party offers about itself)."""
+
+    __slots__ = ()
+    EXCLUSIONS_KEY = "selfexclusions"
+    _SLOTS = {"categorical": "categorical", "min": "min", "max": "max",
+              "range": "range", "selfexclusions": "exclusions"}
+
+
+class CompactListing(_CompactMapping):
+    """
+    Whole listing in OLD schema (see schema_normalizer_v2).
+
+    Slots with a trailing underscore avoid clashing with Mapping.items()
+    and the method receiver: listing["items"] / listing["self"].
+    """
+
+    __slots__ = ("intent", "subintent", "reasoning", "domain", "category", "items_",
+                 "itemexclusions", "locationexclusions", "other", "self_", "location",
+                 "locationmode")
+    _SLOTS = {"intent": "intent", "subintent": "subintent", "reasoning": "reasoning",
+              "domain": "domain", "category": "category", "items": "items_",
+              "itemexclusions": "itemexclusions", "locationexclusions": "locationexclusions",
+              "other": "other", "self": "self_", "location": "location",
+              "locationmode": "locationmode"}
+
+    def __init__(self, listing: Dict[str, Any]):
+        self.intent = _intern(listing["intent"])
+        self.subintent = _intern(listing["subintent"])
+        self.reasoning = listing.get("reasoning", "")
+        self.domain = _compact_strings(listing.get("domain", []))
+        self.category = _compact_strings(listing.get("category", []))
+        items = listing.get("items", [])
+        self.items_: List[CompactItem] = (
+            [CompactItem(item) if isinstance(item, dict) else item for item in items]
+            if isinstance(items, list) else items
+        )
+        self.itemexclusions = _compact_strings(listing.get("itemexclusions", []))
+        self.locationexclusions = _compact_strings(listing.get("locationexclusions", []))
+        self.other = CompactOther(listing.get("other", _EMPTY))
+        self.self_ = CompactSelf(listing.get("self", _EMPTY))
+        self.location = _intern(listing.get("location", ""))
+        self.locationmode = _intern(listing.get("locationmode", "near_me"))
+
+
+def compact_listing(listing: Dict[str, Any]) -> CompactListing:
+    """
+    Build the compact form of a normalized (OLD schema) listing.
+
+    Already-compact listings are returned unchanged.
+    """
+    if isinstance(listing, CompactListing):
+        return listing
+    return CompactListing(listing)
+
+
+def plain_listing(listing: Any) -> Any:
+    """JSON-ready form of a listing that may be compact."""
+    if isinstance(listing, CompactListing):
+        return listing.to_dict()
+    return listing
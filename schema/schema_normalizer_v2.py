@@ -771,3 +771,24 @@ def normalize_and_validate_v2(listing: Dict) -> Dict:
 
     # Step 3: Return OLD format
     return old_listing
+
+
+def normalize_and_validate_compact_v2(listing: Dict):
+    """
+    normalize_and_validate_v2 + compact matcher form (schema/compact_listing.py).
+
+    Use for candidate sets held in memory for matching; the result is a
+    read-only Mapping with the OLD schema keys (to_dict() for storage).
+
+    Args:
+        listing: Listing in NEW schema format
+
+    Returns:
+        CompactListing
+
+    Raises:
+        SchemaValidationError: If validation fails
+    """
+    from schema.compact_listing import compact_listing
+
+    return compact_listing(normalize_and_validate_v2(listing))
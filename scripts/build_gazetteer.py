@@ -0,0 +1,45 @@
+"""
+Build the Offline Gazetteer Index
+
+Loads a GeoNames dump into the SQLite index that GeocodingService
+consults before Nominatim (services/external/gazetteer.py).
+
+Dumps: https://download.geonames.org/export/dump/
+    cities15000.zip  (~26K places, pop > 15000)  — recommended
+    cities500.zip    (~200K places)
+    IN.zip           (one country, all feature classes)
+
+Output: gazetteer.db (or $GAZETTEER_PATH)
+
+Usage:
+    python3 scripts/build_gazetteer.py cities15000.txt
+    python3 scripts/build_gazetteer.py cities500.txt --min-population 1000 --output /data/gazetteer.db
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.external.gazetteer import GAZETTEER_PATH, build_gazetteer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer from a GeoNames dump")
+    parser.add_argument("dump", help="GeoNames .txt dump (tab-separated)")
+    parser.add_argument("--output", default=GAZETTEER_PATH)
+    parser.add_argument("--min-population", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"🔄 Indexing {args.dump}...")
+    start = time.time()
+    stats = build_gazetteer(args.dump, args.output, args.min_population)
+    size_mb = os.path.getsize(args.output) / 1e6
+    print(f"✅ {stats['places']:,} places, {stats['names']:,} names → {args.output} "
+          f"({size_mb:.1f} MB, {time.time() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
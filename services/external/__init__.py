@@ -9,6 +9,7 @@ from .quantulum_wrapper import extract_quantities
 from .pint_wrapper import normalize_unit, normalize_to_base, are_compatible
 from .currency_service import CurrencyService, get_currency_service
 from .geocoding_service import GeocodingService, get_geocoding_service
+from .gazetteer import Gazetteer, get_gazetteer
 from .datamuse_wrapper import DatamuseClient, get_datamuse_client
 from .wordsapi_wrapper import WordsAPIClient, get_wordsapi_client
 
@@ -31,4 +32,6 @@ __all__ = [
     "get_currency_service",
     "GeocodingService",
     "get_geocoding_service",
+    "Gazetteer",
+    "get_gazetteer",
 ]
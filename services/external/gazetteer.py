@@ -0,0 +1,308 @@
+"""
+Offline Gazetteer: Place Name to Coordinates without Network.
+
+Local index of a GeoNames dump (cities500.txt / cities15000.txt /
+allCountries.txt format: tab-separated, no header), consulted by
+GeocodingService before Nominatim.
+
+Index (SQLite, built once by scripts/build_gazetteer.py):
+    places(geonameid, name, lat, lng, country, feature_class, feature_code, population)
+    names(name, geonameid) — normalized primary, ASCII and alternate names
+
+Lookup normalizes the query the same way (case, accents, punctuation),
+so "Bangalore", "BENGALURU" and "Bengalūru" resolve to the same place.
+A rebuilt index (build_gazetteer replaces the file) is picked up by
+running processes: the file's identity is re-checked at most every
+GAZETTEER_RELOAD_CHECK_SECONDS and the connection reopened when it changed.
+
+A name shared by several places is answered only when they are all of
+one feature class and the most populous one dominates (a region and a
+town of the same name, or comparable namesakes, are left to Nominatim);
+"Name, CC" restricts to a country code.
+
+Usage:
+    from services.external.gazetteer import get_gazetteer
+
+    gazetteer = get_gazetteer()  # None when no index is present
+    if gazetteer:
+        coords = gazetteer.lookup("Bangalore")
+        # -> {"lat": 12.97, "lng": 77.59, "canonical_name": "Bengaluru", ...}
+"""
+
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Consult the local gazetteer before Nominatim (1=enabled)
+ENABLE_GAZETTEER = os.environ.get("ENABLE_GAZETTEER", "1") == "1"
+
+GAZETTEER_PATH = os.environ.get("GAZETTEER_PATH", "gazetteer.db")
+
+# GeoNames feature classes indexed: A = country / region, P = populated place
+INDEXED_FEATURE_CLASSES = frozenset({"A", "P"})
+
+# A name shared by several places resolves to the most populous one only
+# when it has at least this many times the runner-up's population
+GAZETTEER_AMBIGUITY_RATIO = float(os.environ.get("GAZETTEER_AMBIGUITY_RATIO", "10"))
+
+# Min seconds between checks for a rebuilt index file
+GAZETTEER_RELOAD_CHECK_SECONDS = 5.0
+
+# Nominatim-style class for each indexed feature class
+_FEATURE_CLASS_NAMES = {"A": "boundary", "P": "place"}
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_place_name(name: str) -> str:
+    """Lowercase, strip accents, collapse punctuation / whitespace."""
+    decomposed = unicodedata.normalize("NFKD", name.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", stripped).strip()
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def _read_geonames(dump_path: str, min_population: int) -> Iterator[Tuple[tuple, set]]:
+    """Yield (place row, normalized names) per indexed GeoNames line."""
+    with open(dump_path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 15 or fields[6] not in INDEXED_FEATURE_CLASSES:
+                continue
+            population = int(fields[14] or 0)
+            if population < min_population:
+                continue
+
+            names = {normalize_place_name(fields[1]), normalize_place_name(fields[2])}
+            for alias in fields[3].split(",") if fields[3] else ():
+                # Alternate names include airport codes (BLR, VOBL) and URLs
+                if alias.startswith("http") or (alias.isupper() and len(alias) <= 4):
+                    continue
+                normalized = normalize_place_name(alias)
+                if len(normalized) > 1 and not normalized.isdigit():
+                    names.add(normalized)
+            names.discard("")
+
+            yield (
+                int(fields[0]), fields[1], float(fields[4]), float(fields[5]),
+                fields[8], fields[6], fields[7], population
+            ), names
+
+
+def build_gazetteer(dump_path: str, db_path: str = GAZETTEER_PATH, min_population: int = 0) -> Dict:
+    """
+    Build the index from a GeoNames dump.
+
+    Written to a temporary file and moved into place, so running services
+    keep reading the previous index until the build completes, then
+    switch to the new one (Gazetteer re-checks the file).
+    """
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript("""
+        CREATE TABLE places (
+            geonameid INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            lat REAL NOT NULL,
+            lng REAL NOT NULL,
+            country TEXT NOT NULL,
+            feature_class TEXT NOT NULL,
+            feature_code TEXT NOT NULL,
+            population INTEGER NOT NULL
+        );
+        CREATE TABLE names (
+            name TEXT NOT NULL,
+            geonameid INTEGER NOT NULL,
+            PRIMARY KEY (name, geonameid)
+        ) WITHOUT ROWID;
+    """)
+
+    places = 0
+    names = 0
+    place_batch, name_batch = [], []
+    for place, place_names in _read_geonames(dump_path, min_population):
+        place_batch.append(place)
+        name_batch.extend((name, place[0]) for name in place_names)
+        if len(place_batch) >= 5000:
+            conn.executemany("INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?, ?, ?, ?, ?)", place_batch)
+            conn.executemany("INSERT OR IGNORE INTO names VALUES (?, ?)", name_batch)
+            places += len(place_batch)
+            names += len(name_batch)
+            place_batch, name_batch = [], []
+    conn.executemany("INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?, ?, ?, ?, ?)", place_batch)
+    conn.executemany("INSERT OR IGNORE INTO names VALUES (?, ?)", name_batch)
+    places += len(place_batch)
+    names += len(name_batch)
+
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, db_path)
+
+    return {"places": places, "names": names, "path": db_path}
+
+
+# ============================================================================
+# LOOKUP
+# ============================================================================
+
+class Gazetteer:
+    """Read-only lookups against a built gazetteer index."""
+
+    def __init__(self, db_path: str = GAZETTEER_PATH, ambiguity_ratio: float = GAZETTEER_AMBIGUITY_RATIO):
+        self.db_path = db_path
+        self.ambiguity_ratio = ambiguity_ratio
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._open()
+
+        # Stats
+        self._hits = 0
+        self._misses = 0
+        self._ambiguous = 0
+        self._reloads = 0
+
+    def _open(self) -> None:
+        # stat before connecting: a replace in between only causes one extra reopen
+        stat = os.stat(self.db_path)
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        previous, self._conn = self._conn, conn
+        self._file_id = (stat.st_ino, stat.st_mtime_ns)
+        self._checked_at = time.monotonic()
+        if previous is not None:
+            previous.close()
+
+    def _refresh(self) -> None:
+        """Reopen if the index file was replaced (call with the lock held)."""
+        if time.monotonic() - self._checked_at < GAZETTEER_RELOAD_CHECK_SECONDS:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return  # removed: keep serving the open index
+        if (stat.st_ino, stat.st_mtime_ns) != self._file_id:
+            self._open()
+            self._reloads += 1
+
+    def _candidates(self, name: str, country: Optional[str] = None) -> List[tuple]:
+        """Every place with this name, most populous first."""
+        sql = (
+            "SELECT p.geonameid, p.name, p.lat, p.lng, p.country, p.feature_class, p.feature_code, "
+            "p.population FROM names n JOIN places p ON p.geonameid = n.geonameid WHERE n.name = ?"
+        )
+        params = [name]
+        if country:
+            sql += " AND p.country = ?"
+            params.append(country)
+        sql += " ORDER BY p.population DESC"
+        return self._conn.execute(sql, params).fetchall()
+
+    def _unambiguous(self, rows: List[tuple]) -> bool:
+        """One place, or one feature class with a clearly most populous place."""
+        best = rows[0]
+        if any(row[5] != best[5] for row in rows[1:]):
+            return False  # region vs town of the same name
+        return len(rows) == 1 or best[7] >= self.ambiguity_ratio * rows[1][7]
+
+    def lookup(self, location_name: str) -> Optional[Dict]:
+        """
+        Coordinates for a place name, in GeocodingService.geocode() shape.
+
+        Returns None when the name is not in the index or is ambiguous
+        (the caller should ask Nominatim).
+        """
+        normalized = normalize_place_name(location_name or "")
+        if not normalized:
+            return None
+
+        with self._lock:
+            self._refresh()
+            rows = self._candidates(normalized)
+            if not rows and "," in location_name:
+                # "Name, CC" / "Name, Region, Country": retry the leading part
+                head, _, tail = location_name.partition(",")
+                country = tail.strip().split(",")[-1].strip()
+                head = normalize_place_name(head)
+                if head:
+                    if len(country) == 2:
+                        rows = self._candidates(head, country.upper())
+                    if not rows:
+                        rows = self._candidates(head)
+
+        if not rows:
+            self._misses += 1
+            return None
+        if not self._unambiguous(rows):
+            self._ambiguous += 1
+            return None
+
+        self._hits += 1
+        geonameid, name, lat, lng, country, feature_class, feature_code, _ = rows[0]
+        return {
+            "lat": lat,
+            "lng": lng,
+            "canonical_name": name,
+            "display_name": f"{name}, {country}",
+            "type": feature_code.lower(),
+            "class": _FEATURE_CLASS_NAMES.get(feature_class, feature_class),
+            "geonameid": geonameid,
+        }
+
+    def get_stats(self) -> Dict:
+        """Get index and lookup statistics."""
+        with self._lock:
+            places = self._conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+            names = self._conn.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+        return {
+            "places": places,
+            "names": names,
+            "hits": self._hits,
+            "misses": self._misses,
+            "ambiguous": self._ambiguous,
+            "reloads": self._reloads,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Singleton
+# ═══════════════════════════════════════════════════════════════════
+
+_gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Get singleton Gazetteer (None when disabled or no index is built)."""
+    global _gazetteer
+    if not ENABLE_GAZETTEER:
+        return None
+    if _gazetteer is None and os.path.exists(GAZETTEER_PATH):
+        _gazetteer = Gazetteer(GAZETTEER_PATH)
+    return _gazetteer
+
+
+def _reset_after_fork() -> None:
+    """Forked children open their own read-only connection."""
+    global _gazetteer
+    _gazetteer = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
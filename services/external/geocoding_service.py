@@ -5,9 +5,15 @@ Uses OpenStreetMap Nominatim API for free geocoding.
 Includes caching to avoid repeated API calls.
 
 Features:
-- Nominatim geocoding (free, no API key)
-- File-based caching (like ontology_cache.json)
-- Rate limiting (1 request/second)
+- Offline gazetteer lookup first (services.external.gazetteer, GeoNames)
+- Nominatim geocoding (free, no API key) for names missing from the
+  gazetteer or ambiguous in it
+- SQLite cache (WAL, shared by every worker) behind an in-memory LRU;
+  new entries are written in batches, "not found" entries expire
+- Rate limiting (1 request/second): token bucket shared by every thread,
+  optionally by every worker on the host (GEOCODING_RATE_LIMIT_FILE)
+- Single-flight: concurrent lookups of one unseen name make one request
+- geocode_async() for async callers, geocode_many() for batches
 - Haversine distance calculation
 - Alias resolution ("Bangalore" -> coordinates for "Bengaluru")
 
@@ -27,14 +33,222 @@ Usage:
     # Check if within range
     is_near = service.is_within_distance("Bangalore", "Bengaluru", max_km=50)
     # -> True
+
+    # Batch (bulk ingestion)
+    coords_by_name = service.geocode_many(["Pune", "Goa", "pune"])
 """
 
+import asyncio
+import atexit
 import json
 import math
 import os
+import sqlite3
 import time
-from typing import Dict, Optional, Tuple
-from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
+
+from services.external.gazetteer import get_gazetteer
+from services.external.rate_limiter import TokenBucket
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+GEOCODING_CACHE_PATH = os.environ.get("GEOCODING_CACHE_PATH", "geocoding_cache.db")
+
+# Entries kept in memory in front of SQLite
+GEOCODING_LRU_SIZE = int(os.environ.get("GEOCODING_LRU_SIZE", "10000"))
+
+# "Not found" results are retried after this long (seconds, default 7 days)
+GEOCODING_NEGATIVE_TTL = float(os.environ.get("GEOCODING_NEGATIVE_TTL", str(7 * 24 * 3600)))
+
+# Pending writes are flushed at this many entries or after this many seconds
+GEOCODING_FLUSH_SIZE = int(os.environ.get("GEOCODING_FLUSH_SIZE", "50"))
+GEOCODING_FLUSH_SECONDS = float(os.environ.get("GEOCODING_FLUSH_SECONDS", "5"))
+
+# Share the Nominatim rate limit with every worker on the host through this
+# lock file (empty: per process)
+GEOCODING_RATE_LIMIT_FILE = os.environ.get("GEOCODING_RATE_LIMIT_FILE", "")
+
+# Concurrent Nominatim lookups in geocode_many (all share the rate limit)
+GEOCODING_MAX_CONCURRENCY = int(os.environ.get("GEOCODING_MAX_CONCURRENCY", "4"))
+
+_MISSING = object()
+
+
+class GeocodingCache:
+    """
+    Geocoding results keyed by normalized location name.
+
+    Table:
+        geocodes(key, value, fetched_at) — value is the coordinates dict as
+        JSON, NULL for "not found"
+
+    Reads go through an in-memory LRU, then SQLite (so entries flushed by
+    other workers are picked up). Writes land in the LRU immediately and are
+    written to SQLite in one transaction per batch; pending writes are
+    flushed at exit. A legacy geocoding_cache.json next to the database is
+    imported when the database is created.
+    """
+
+    def __init__(
+        self,
+        db_path: str = GEOCODING_CACHE_PATH,
+        lru_size: int = GEOCODING_LRU_SIZE,
+        negative_ttl: float = GEOCODING_NEGATIVE_TTL,
+        flush_size: int = GEOCODING_FLUSH_SIZE,
+        flush_seconds: float = GEOCODING_FLUSH_SECONDS
+    ):
+        self.db_path = db_path
+        self.lru_size = lru_size
+        self.negative_ttl = negative_ttl
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+
+        self._lock = Lock()
+        self._lru: "OrderedDict[str, Tuple[Optional[Dict], float]]" = OrderedDict()
+        self._pending: Dict[str, Tuple[Optional[Dict], float]] = {}
+        self._last_flush = time.time()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        created = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='geocodes'"
+        ).fetchone() is None
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocodes (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        if created:
+            self._import_json(os.path.splitext(db_path)[0] + ".json")
+
+        atexit.register(self.flush)
+
+        # Stats
+        self._memory_hits = 0
+        self._db_hits = 0
+        self._misses = 0
+        self._flushes = 0
+
+    def _import_json(self, json_path: str) -> None:
+        """One-time import of the legacy JSON cache."""
+        if not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            print(f"Warning: Failed to import geocoding cache {json_path}: {e}")
+            return
+        now = time.time()
+        self._conn.execute("BEGIN")
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO geocodes (key, value, fetched_at) VALUES (?, ?, ?)",
+            [(key, None if value is None else json.dumps(value, ensure_ascii=False), now)
+             for key, value in legacy.items()]
+        )
+        self._conn.execute("COMMIT")
+
+    def _expired(self, value: Optional[Dict], fetched_at: float) -> bool:
+        return value is None and time.time() - fetched_at > self.negative_ttl
+
+    def _remember(self, key: str, entry: Tuple[Optional[Dict], float]) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str):
+        """Cached value (None = "not found"), or _MISSING if absent or expired."""
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and not self._expired(*entry):
+                self._lru.move_to_end(key)
+                self._memory_hits += 1
+                return entry[0]
+
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM geocodes WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                entry = (None if row[0] is None else json.loads(row[0]), row[1])
+                if not self._expired(*entry):
+                    self._remember(key, entry)
+                    self._db_hits += 1
+                    return entry[0]
+
+            self._misses += 1
+            return _MISSING
+
+    def put(self, key: str, value: Optional[Dict]) -> None:
+        """Cache a result; written to SQLite with the next batch."""
+        with self._lock:
+            entry = (value, time.time())
+            self._remember(key, entry)
+            self._pending[key] = entry
+            due = (len(self._pending) >= self.flush_size
+                   or entry[1] - self._last_flush >= self.flush_seconds)
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write pending entries in one transaction. Returns the number written."""
+        with self._lock:
+            self._last_flush = time.time()
+            if not self._pending:
+                return 0
+            rows = [
+                (key, None if value is None else json.dumps(value, ensure_ascii=False), fetched_at)
+                for key, (value, fetched_at) in self._pending.items()
+            ]
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO geocodes (key, value, fetched_at) VALUES (?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                print(f"Warning: Failed to save geocoding cache: {e}")
+                return 0
+            self._pending.clear()
+            self._flushes += 1
+            return len(rows)
+
+    def clear(self) -> None:
+        """Drop every entry (memory, pending and stored)."""
+        with self._lock:
+            self._lru.clear()
+            self._pending.clear()
+            self._conn.execute("DELETE FROM geocodes")
+
+    def get_stats(self) -> Dict:
+        """Entry counts (stored + pending) and lookup statistics."""
+        self.flush()
+        with self._lock:
+            total, found = self._conn.execute(
+                "SELECT COUNT(*), COUNT(value) FROM geocodes"
+            ).fetchone()
+            lookups = self._memory_hits + self._db_hits + self._misses
+            return {
+                "total_entries": total,
+                "found": found,
+                "not_found": total - found,
+                "memory_entries": len(self._lru),
+                "memory_hits": self._memory_hits,
+                "db_hits": self._db_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._memory_hits + self._db_hits) / lookups, 3) if lookups else 0.0,
+                "flushes": self._flushes,
+            }
 
 
 class GeocodingService:
@@ -44,8 +258,11 @@ class GeocodingService:
     Provides:
     - Location name -> coordinates conversion
     - Distance calculation between locations
-    - File-based caching for efficiency
-    - Rate limiting to respect Nominatim usage policy
+    - Persistent caching (GeocodingCache) for efficiency
+    - Rate limiting to respect Nominatim usage policy (one token bucket
+      per process, or per host with GEOCODING_RATE_LIMIT_FILE)
+    - Single-flight: concurrent lookups of the same unseen name share
+      one Nominatim request
     """
 
     NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
@@ -54,41 +271,59 @@ class GeocodingService:
     def __init__(
         self,
         cache_file: Optional[str] = None,
-        user_agent: str = "SingletapMatchingEngine/1.0 (singletap@example.com)"
+        user_agent: str = "SingletapMatchingEngine/1.0 (singletap@example.com)",
+        use_gazetteer: bool = True,
+        rate_limiter: Optional[TokenBucket] = None
     ):
         if cache_file is None:
-            cache_file = "geocoding_cache.json"
+            cache_file = GEOCODING_CACHE_PATH
+        if cache_file.endswith(".json"):
+            # Legacy JSON path: cache in the .db beside it (imported on creation)
+            cache_file = os.path.splitext(cache_file)[0] + ".db"
 
         self.cache_file = cache_file
         self.user_agent = user_agent
-        self.cache = self._load_cache()
-        self._last_request_time = 0
+        self.cache = GeocodingCache(cache_file)
+        self.gazetteer = get_gazetteer() if use_gazetteer else None
+        self.rate_limiter = rate_limiter
 
-    def _load_cache(self) -> Dict:
-        """Load cache from JSON file."""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Warning: Failed to load geocoding cache: {e}")
-                return {}
-        return {}
-
-    def _save_cache(self):
-        """Save cache to JSON file."""
-        try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Warning: Failed to save geocoding cache: {e}")
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = Lock()
+
+        # Stats
+        self._requests = 0
+        self._deduplicated = 0
 
     def _rate_limit(self):
-        """Enforce rate limit (1 request per second)."""
-        elapsed = time.time() - self._last_request_time
-        if elapsed < self.RATE_LIMIT_SECONDS:
-            time.sleep(self.RATE_LIMIT_SECONDS - elapsed)
-        self._last_request_time = time.time()
+        """Enforce rate limit (1 request per RATE_LIMIT_SECONDS, shared token bucket)."""
+        if self.RATE_LIMIT_SECONDS <= 0:
+            return
+        (self.rate_limiter or get_nominatim_rate_limiter()).acquire()
+
+    def _cached(self, cache_key: str):
+        """cache.get(), ignoring gazetteer answers cached by earlier versions."""
+        cached = self.cache.get(cache_key)
+        if isinstance(cached, dict) and "geonameid" in cached:
+            return _MISSING
+        return cached
+
+    def _lookup_local(self, location_name: str, cache_key: str):
+        """
+        Cache, then gazetteer; _MISSING when Nominatim has to be asked.
+
+        Gazetteer answers are not cached: the index is local already, and
+        a rebuilt index takes effect without stale copies.
+        """
+        cached = self._cached(cache_key)
+        if cached is not _MISSING and cached is not None:
+            return cached
+
+        if self.gazetteer is not None:
+            coords = self.gazetteer.lookup(location_name)
+            if coords:
+                return coords
+
+        return cached
 
     def geocode(self, location_name: str) -> Optional[Dict]:
         """
@@ -101,14 +336,94 @@ class GeocodingService:
             return None
 
         cache_key = location_name.lower().strip()
+        cached = self._lookup_local(location_name, cache_key)
+        if cached is not _MISSING:
+            return cached
+        return self._single_flight(location_name, cache_key)
 
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+    async def geocode_async(self, location_name: str) -> Optional[Dict]:
+        """
+        geocode() for async callers: local hits are answered inline,
+        Nominatim lookups (and their rate-limit wait) run in a worker
+        thread, so the event loop is never blocked.
+        """
+        if not location_name:
+            return None
 
+        cache_key = location_name.lower().strip()
+        cached = self._lookup_local(location_name, cache_key)
+        if cached is not _MISSING:
+            return cached
+        return await asyncio.to_thread(self._single_flight, location_name, cache_key)
+
+    def geocode_many(
+        self,
+        location_names: Iterable[str],
+        max_workers: int = GEOCODING_MAX_CONCURRENCY
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        Geocode a batch: {name: coords or None}.
+
+        Names are deduplicated by cache key, local hits answered first, and
+        the remaining names fetched by up to max_workers threads sharing
+        the rate limit.
+        """
+        results: Dict[str, Optional[Dict]] = {}
+        misses: Dict[str, str] = {}  # cache key -> first spelling
+        keys: Dict[str, str] = {}
+        for name in location_names:
+            if not name or name in results or name in keys:
+                continue
+            cache_key = name.lower().strip()
+            cached = self._lookup_local(name, cache_key)
+            if cached is _MISSING:
+                keys[name] = cache_key
+                misses.setdefault(cache_key, name)
+            else:
+                results[name] = cached
+
+        if misses:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(misses)))) as executor:
+                fetched = dict(zip(misses, executor.map(
+                    lambda item: self._single_flight(item[1], item[0]), misses.items()
+                )))
+            for name, cache_key in keys.items():
+                results[name] = fetched[cache_key]
+        return results
+
+    def _single_flight(self, location_name: str, cache_key: str) -> Optional[Dict]:
+        """One Nominatim request per cache key at a time; followers wait for its result."""
+        with self._inflight_lock:
+            future = self._inflight.get(cache_key)
+            leader = future is None
+            if leader:
+                future = self._inflight[cache_key] = Future()
+            else:
+                self._deduplicated += 1
+        if not leader:
+            return future.result()
+
+        try:
+            # A previous leader may have finished between the cache miss and here
+            coords = self._cached(cache_key)
+            if coords is _MISSING:
+                coords = self._fetch(location_name, cache_key)
+            future.set_result(coords)
+            return coords
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(cache_key, None)
+
+    def _fetch(self, location_name: str, cache_key: str) -> Optional[Dict]:
+        """Nominatim lookup; the result (or "not found") is cached."""
         try:
             import requests
 
             self._rate_limit()
+            self._requests += 1
 
             params = {
                 "q": location_name,
@@ -139,8 +454,7 @@ class GeocodingService:
                     "class": result.get("class", "")
                 }
 
-                self.cache[cache_key] = coords
-                self._save_cache()
+                self.cache.put(cache_key, coords)
 
                 return coords
 
@@ -149,8 +463,7 @@ class GeocodingService:
         except Exception as e:
             print(f"Geocoding error for '{location_name}': {e}")
 
-        self.cache[cache_key] = None
-        self._save_cache()
+        self.cache.put(cache_key, None)
 
         return None
 
@@ -230,20 +543,31 @@ class GeocodingService:
 
     def clear_cache(self):
         """Clear the geocoding cache."""
-        self.cache = {}
-        self._save_cache()
+        self.cache.clear()
 
     def get_cache_stats(self) -> Dict:
         """Get cache statistics."""
-        total = len(self.cache)
-        found = sum(1 for v in self.cache.values() if v is not None)
-        not_found = total - found
+        stats = self.cache.get_stats()
+        stats["nominatim_requests"] = self._requests
+        stats["deduplicated_lookups"] = self._deduplicated
+        return stats
+
+
+_nominatim_rate_limiter: Optional[TokenBucket] = None
+_nominatim_rate_limiter_lock = Lock()
+
 
-        return {
-            "total_entries": total,
-            "found": found,
-            "not_found": not_found
-        }
+def get_nominatim_rate_limiter() -> TokenBucket:
+    """Get the process-wide Nominatim token bucket (host-wide with GEOCODING_RATE_LIMIT_FILE)."""
+    global _nominatim_rate_limiter
+    with _nominatim_rate_limiter_lock:
+        if _nominatim_rate_limiter is None:
+            _nominatim_rate_limiter = TokenBucket(
+                rate=1.0 / GeocodingService.RATE_LIMIT_SECONDS,
+                capacity=1,
+                state_file=GEOCODING_RATE_LIMIT_FILE or None
+            )
+    return _nominatim_rate_limiter
 
 
 # Singleton instance
@@ -255,7 +579,23 @@ def get_geocoding_service() -> GeocodingService:
     global _geocoding_service_instance
     if _geocoding_service_instance is None:
         _geocoding_service_instance = GeocodingService(
-            cache_file="geocoding_cache.json",
+            cache_file=GEOCODING_CACHE_PATH,
             user_agent="SingletapMatchingEngine/1.0"
         )
     return _geocoding_service_instance
+
+
+def _reset_after_fork() -> None:
+    """
+    Forked children (gunicorn --preload, fork-started pools) drop the
+    parent's instances: SQLite connections, locks and the flush thread
+    must not be shared across processes. The child opens its own.
+    """
+    global _geocoding_service_instance, _nominatim_rate_limiter, _nominatim_rate_limiter_lock
+    _geocoding_service_instance = None
+    _nominatim_rate_limiter = None
+    _nominatim_rate_limiter_lock = Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
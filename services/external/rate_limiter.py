@@ -0,0 +1,123 @@
+"""
+Token Bucket Rate Limiter for External APIs.
+
+One bucket per API, shared by every thread of the process; optionally
+shared by every worker process on the host through a state file guarded
+by an exclusive file lock (fcntl.flock, POSIX only - elsewhere the
+bucket stays process-wide).
+
+Callers reserve a token and wait for it outside any lock, so concurrent
+callers queue up in arrival order (the token count may go negative:
+each negative token is a reservation further in the future) instead of
+all sleeping the same interval and firing together.
+
+Usage:
+    from services.external.rate_limiter import TokenBucket
+
+    bucket = TokenBucket(rate=1.0, capacity=1)          # 1 request/second
+    bucket.acquire()                                     # blocks the thread
+    await bucket.acquire_async()                         # yields to the loop
+
+    # Shared across gunicorn / uvicorn workers on one host
+    bucket = TokenBucket(rate=1.0, state_file="/tmp/nominatim.bucket")
+"""
+
+import asyncio
+import os
+import time
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: process-wide bucket only
+    fcntl = None
+
+
+class TokenBucket:
+    """
+    rate tokens per second, up to capacity tokens of burst.
+
+    acquire() returns the seconds waited.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, state_file: Optional[str] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.state_file = state_file if fcntl is not None else None
+        self._lock = Lock()
+        self._tokens = capacity
+        self._updated = time.time()
+
+        # Stats
+        self._acquired = 0
+        self._waited = 0.0
+
+    # ------------------------------------------------------------------
+    # Reservation
+    # ------------------------------------------------------------------
+
+    def _take(self, tokens: float, updated: float, now: float) -> Tuple[float, float, float]:
+        """(tokens left, timestamp, seconds until the reserved token is available)."""
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate) - 1
+        return tokens, now, max(0.0, -tokens / self.rate)
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.time()
+            if self.state_file is None:
+                self._tokens, self._updated, wait = self._take(self._tokens, self._updated, now)
+            else:
+                wait = self._reserve_shared(now)
+            self._acquired += 1
+            self._waited += wait
+            return wait
+
+    def _reserve_shared(self, now: float) -> float:
+        """Read-modify-write the bucket state file under an exclusive lock."""
+        fd = os.open(self.state_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.read(fd, 64).decode("ascii", "ignore").split()
+            try:
+                tokens, updated = float(raw[0]), float(raw[1])
+            except (IndexError, ValueError):
+                tokens, updated = self.capacity, now
+            tokens, updated, wait = self._take(tokens, updated, now)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{tokens!r} {updated!r}".encode("ascii"))
+            return wait
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    # ------------------------------------------------------------------
+    # Acquire
+    # ------------------------------------------------------------------
+
+    def acquire(self) -> float:
+        """Take one token, sleeping (this thread only) until it is available."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Take one token without blocking the event loop."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def get_stats(self) -> Dict:
+        """Get limiter statistics."""
+        return {
+            "rate_per_second": self.rate,
+            "capacity": self.capacity,
+            "shared_file": self.state_file,
+            "acquired": self._acquired,
+            "total_wait_seconds": round(self._waited, 3),
+        }
@@ -0,0 +1,752 @@
+"""
+VRIDDHI LOAD TESTING - Offline End-to-End Harness
+
+Purpose: Throughput and latency of the FastAPI app under concurrent
+traffic, without Supabase, Qdrant Cloud or OpenAI. testing/run_tests.py
+drives a live deployment and checks correctness; this harness boots
+main.app in-process against local stand-ins and measures it.
+
+Stand-ins:
+- LocalSupabase: SQLite (in memory) behind the subset of the supabase-py
+  query builder the app uses (select / insert / upsert / update /
+  delete, eq / in_ / range filters, order, limit, range)
+- Qdrant: QdrantClient(":memory:") local mode, collections created here
+- HashingEmbedder: deterministic token-hashing vectors in place of the
+  SentenceTransformer (same .encode() interface and dimension)
+- FakeExtractionClient: OpenAI-compatible chat.completions client that
+  returns the recorded stage3 extraction of testing/test_data queries
+  (optionally after --extract-ms of simulated GPT latency)
+- Outbound HTTP (Datamuse / Wikidata lookups during canonicalization,
+  geocoding) fails fast with a ConnectionError, exercising the same
+  fallbacks as a network outage; --allow-network keeps it
+- The key canonicalizer and geocoding cache files are copied to a
+  temporary directory, so a run never rewrites the repo's copies
+
+Traffic: --requests requests over --concurrency concurrent clients, with
+endpoints drawn from --mix (e.g. "search-and-match=6,store-listing=2,match=2").
+Requests go through httpx's ASGI transport (no sockets, no server).
+
+Report: throughput, and p50 / p95 / p99 latency per endpoint and per
+pipeline stage (extraction, canonicalize, normalize, retrieval, ingest,
+percolation, supabase, matching; "other" is the rest of the handler:
+the candidate match loop, similar scoring and response building).
+Stages nest: time inside a stage is attributed to the outermost one.
+
+The endpoints are async handlers doing synchronous work, so requests
+interleave on one event loop as under a single uvicorn worker;
+--concurrency models queueing, not parallel CPU.
+
+Usage:
+    python -m testing.load_test
+    python -m testing.load_test --requests 500 --concurrency 16 --seed-copies 5
+    python -m testing.load_test --mix search-and-match=1 --extract-ms 800 --output report.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import copy
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add parent to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# The content-addressed embedding store would persist stand-in vectors
+os.environ.setdefault("ENABLE_EMBEDDING_STORE", "0")
+
+import httpx
+import numpy as np
+import requests
+
+# Configuration
+TEST_DATA_DIR = Path(__file__).parent / "test_data"
+PAIR_FILES = ["product_pairs.json", "service_pairs.json", "mutual_pairs.json"]
+
+DEFAULT_MIX = "search-and-match=6,store-listing=2,match=2"
+ENDPOINTS = {
+    "search-and-match": "/search-and-match",
+    "store-listing": "/store-listing",
+    "match": "/match",
+}
+
+# Tables whose primary key is not "id"
+PRIMARY_KEYS = {
+    "matches": "match_id",
+    "stored_queries": "query_id",
+    "listing_changes": "change_id",
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+# ============================================================================
+# SUPABASE STAND-IN (SQLITE)
+# ============================================================================
+
+class _Response:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class _TableQuery:
+    """One supabase-py style query on a LocalSupabase table."""
+
+    def __init__(self, db: "LocalSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._action = "select"
+        self._columns: Optional[List[str]] = None
+        self._count: Optional[str] = None
+        self._payload: List[Dict[str, Any]] = []
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._order: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+
+    # Actions
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "_TableQuery":
+        self._columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        self._count = count
+        return self
+
+    def insert(self, rows) -> "_TableQuery":
+        self._action, self._payload = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None) -> "_TableQuery":
+        self._action, self._payload = "upsert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "_TableQuery":
+        self._action, self._payload = "update", [values]
+        return self
+
+    def delete(self) -> "_TableQuery":
+        self._action = "delete"
+        return self
+
+    # Filters
+    def _filter(self, column: str, op: str, value: Any) -> "_TableQuery":
+        self._filters.append((column, op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "=", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "<=", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "IN", list(values))
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False) -> "_TableQuery":
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, n: int) -> "_TableQuery":
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int) -> "_TableQuery":
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def execute(self) -> _Response:
+        return _timed_stage("supabase", self._db.execute, self)
+
+
+class LocalSupabase:
+    """
+    In-memory SQLite stand-in for the Supabase client.
+
+    Each table is (pk, doc JSON); filters and ordering run in SQL on
+    json_extract(doc, '$.column'). Missing primary keys get a UUID and
+    rows get created_at, as the Postgres defaults would.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._tables = set()
+
+    def table(self, name: str) -> _TableQuery:
+        return _TableQuery(self, name)
+
+    def _ensure(self, table: str) -> None:
+        if table not in self._tables:
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}" '
+                f"(seq INTEGER PRIMARY KEY AUTOINCREMENT, pk TEXT UNIQUE, doc TEXT)"
+            )
+            self._tables.add(table)
+
+    @staticmethod
+    def _where(query: _TableQuery) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for column, op, value in query._filters:
+            field = f"json_extract(doc, '$.{column}')"
+            if op == "IN":
+                if not value:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{field} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{field} {op} ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _select_docs(self, query: _TableQuery, paged: bool = True) -> List[Tuple[str, Dict[str, Any]]]:
+        where, params = self._where(query)
+        sql = f'SELECT pk, doc FROM "{query._table}"{where}'
+        if query._order:
+            sql += " ORDER BY " + ", ".join(
+                f"json_extract(doc, '$.{column}'){' DESC' if desc else ''}" for column, desc in query._order
+            )
+        else:
+            sql += " ORDER BY seq"
+        if paged and query._limit is not None:
+            sql += f" LIMIT {int(query._limit)} OFFSET {int(query._offset)}"
+        return [(pk, json.loads(doc)) for pk, doc in self._conn.execute(sql, params)]
+
+    def _with_defaults(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(row)
+        key = PRIMARY_KEYS.get(table, "id")
+        if row.get(key) is None:
+            row[key] = str(uuid.uuid4())
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        return row
+
+    def execute(self, query: _TableQuery) -> _Response:
+        table = query._table
+        key = PRIMARY_KEYS.get(table, "id")
+        with self._lock:
+            self._ensure(table)
+            if query._action == "select":
+                docs = [doc for _, doc in self._select_docs(query)]
+                if query._columns:
+                    docs = [{c: doc.get(c) for c in query._columns} for doc in docs]
+                count = len(self._select_docs(query, paged=False)) if query._count else None
+                return _Response(docs, count)
+
+            if query._action in ("insert", "upsert"):
+                rows = [self._with_defaults(table, row) for row in query._payload]
+                for row in rows:
+                    pk = str(row[key])
+                    if query._action == "upsert":
+                        existing = self._conn.execute(
+                            f'SELECT doc FROM "{table}" WHERE pk = ?', (pk,)
+                        ).fetchone()
+                        if existing:
+                            row.update({k: v for k, v in json.loads(existing[0]).items() if k not in row})
+                        self._conn.execute(
+                            f'INSERT INTO "{table}" (pk, doc) VALUES (?, ?) '
+                            f"ON CONFLICT(pk) DO UPDATE SET doc = excluded.doc",
+                            (pk, json.dumps(row)),
+                        )
+                    else:
+                        self._conn.execute(f'INSERT INTO "{table}" (pk, doc) VALUES (?, ?)', (pk, json.dumps(row)))
+                self._conn.commit()
+                return _Response(rows)
+
+            matched = self._select_docs(query, paged=False)
+            if query._action == "update":
+                for pk, doc in matched:
+                    doc.update(query._payload[0])
+                    self._conn.execute(f'UPDATE "{table}" SET doc = ? WHERE pk = ?', (json.dumps(doc), pk))
+                self._conn.commit()
+                return _Response([doc for _, doc in matched])
+
+            for pk, _ in matched:  # delete
+                self._conn.execute(f'DELETE FROM "{table}" WHERE pk = ?', (pk,))
+            self._conn.commit()
+            return _Response([doc for _, doc in matched])
+
+    def row_count(self, table: str) -> int:
+        with self._lock:
+            self._ensure(table)
+            return self._conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+
+# ============================================================================
+# EMBEDDING / EXTRACTION / QDRANT STAND-INS
+# ============================================================================
+
+class HashingEmbedder:
+    """Deterministic bag-of-tokens vectors (SentenceTransformer.encode interface)."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            vector[0], norm = 1.0, 1.0
+        return vector / norm
+
+    def encode(self, sentences, convert_to_tensor: bool = False, **kwargs):
+        if isinstance(sentences, str):
+            return self._vector(sentences)
+        return np.stack([self._vector(s) for s in sentences])
+
+
+class FakeExtractionClient:
+    """
+    OpenAI-compatible client for extract_from_query: returns the recorded
+    extraction of a known query (unknown queries map to a recorded one
+    by hash), after latency_ms of simulated model latency.
+    """
+
+    def __init__(self, extractions: Dict[str, Dict[str, Any]], latency_ms: float = 0.0):
+        self._extractions = extractions
+        self._queries = sorted(extractions)
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def extract(self, query: str) -> Dict[str, Any]:
+        extraction = self._extractions.get(query)
+        if extraction is None:
+            extraction = self._extractions[self._queries[zlib.crc32(query.encode("utf-8")) % len(self._queries)]]
+        return copy.deepcopy(extraction)
+
+    def _create(self, model: str, messages: List[Dict[str, str]], **kwargs):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1e3)
+        content = json.dumps(self.extract(messages[-1]["content"]))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _offline_send(self, request, **kwargs):
+    raise requests.exceptions.ConnectionError(f"offline load test: {request.url}")
+
+
+def make_local_qdrant(dim: int):
+    """QdrantClient in local in-memory mode with the listing collections."""
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, VectorParams
+    from pipeline.retrieval_service import COLLECTIONS
+
+    client = QdrantClient(":memory:")
+    for collection_name in COLLECTIONS.values():
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+        )
+    return client
+
+
+# ============================================================================
+# STAGE TIMING
+# ============================================================================
+
+class _RequestStages:
+    __slots__ = ("ns", "depth")
+
+    def __init__(self):
+        self.ns: Counter = Counter()
+        self.depth = 0
+
+
+_current_stages: ContextVar[Optional[_RequestStages]] = ContextVar("load_test_stages", default=None)
+
+
+def _timed_stage(stage: str, fn: Callable, *args, **kwargs):
+    """Call fn, attributing its time to stage unless inside another stage."""
+    stages = _current_stages.get()
+    if stages is None or stages.depth:
+        return fn(*args, **kwargs)
+    stages.depth += 1
+    start = time.perf_counter_ns()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        stages.ns[stage] += time.perf_counter_ns() - start
+        stages.depth -= 1
+
+
+# main.py module globals timed as pipeline stages
+STAGE_FUNCTIONS = {
+    "extract_from_query": "extraction",
+    "canonicalize_listing": "canonicalize",
+    "normalize_and_validate_v2": "normalize",
+    "retrieve_candidate_rows": "retrieval",
+    "ingest_listing": "ingest",
+    "generate_embedding": "ingest",
+    "insert_to_qdrant": "ingest",
+    "percolate_new_listing": "percolation",
+    "store_query": "percolation",
+    "listing_matches_v2": "matching",
+}
+
+
+# main.py globals set by initialize_services (restored by LocalStack.shutdown)
+MAIN_STATE = ("openai_client", "extraction_prompt", "hybrid_extractor", "init_error", "is_initialized")
+
+
+def _wrap_stage(fn: Callable, stage: str) -> Callable:
+    def timed(*args, **kwargs):
+        return _timed_stage(stage, fn, *args, **kwargs)
+    timed.__wrapped__ = fn
+    return timed
+
+
+# ============================================================================
+# LOCAL STACK
+# ============================================================================
+
+def load_recorded_extractions() -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Recorded stage3 extractions of the test pairs.
+
+    Returns:
+        (query text → extraction, pairs as {"seed": entry, "query": entry})
+    """
+    extractions, pairs = {}, []
+    for name in PAIR_FILES:
+        with open(TEST_DATA_DIR / name, "r", encoding="utf-8") as f:
+            for pair in json.load(f):
+                seed, query = pair["seed_entry"], pair["query_entry"]
+                extractions[seed["query"]] = seed["stage3"]
+                extractions[query["query"]] = query["stage3"]
+                pairs.append({"seed": seed, "query": query})
+    return extractions, pairs
+
+
+class LocalStack:
+    """main.app wired to the stand-ins (replaces initialize_services)."""
+
+    def __init__(self, extract_ms: float = 0.0, allow_network: bool = False):
+        import main
+        from pipeline.ingestion_pipeline import EMBEDDING_DIM
+
+        self.main = main
+        self.extractions, self.pairs = load_recorded_extractions()
+        self.supabase = LocalSupabase()
+        self.qdrant = make_local_qdrant(EMBEDDING_DIM)
+        self.embedder = HashingEmbedder(EMBEDDING_DIM)
+        self.extraction_client = FakeExtractionClient(self.extractions, latency_ms=extract_ms)
+        self.allow_network = allow_network
+        self._originals: Dict[str, Callable] = {}
+        self._adapter_send: Optional[Callable] = None
+        self._saved: Optional[Dict[str, Any]] = None
+        self._tmpdir: Optional[str] = None
+
+    def boot(self) -> None:
+        main = self.main
+        self._saved = {
+            "clients": [
+                (clients, clients.supabase, clients.qdrant, clients.embedding_model)
+                for clients in (main.ingestion_clients, main.retrieval_clients)
+            ],
+            "globals": {name: getattr(main, name) for name in MAIN_STATE},
+        }
+        for clients in (main.ingestion_clients, main.retrieval_clients):
+            clients.supabase = self.supabase
+            clients.qdrant = self.qdrant
+            clients.embedding_model = self.embedder
+        main.openai_client = self.extraction_client
+        main.extraction_prompt = main.extraction_prompt or "offline load test"
+        main.hybrid_extractor = None
+        main.init_error = None
+        main.is_initialized = True
+        for name, stage in STAGE_FUNCTIONS.items():
+            self._originals[name] = getattr(main, name)
+            setattr(main, name, _wrap_stage(self._originals[name], stage))
+        if not self.allow_network:
+            self._adapter_send = requests.adapters.HTTPAdapter.send
+            requests.adapters.HTTPAdapter.send = _offline_send
+        self._isolate_persistence()
+
+    def _isolate_persistence(self) -> None:
+        """Key canonicalizer / geocoder singletons on temporary copies of their files."""
+        import canonicalization.orchestrator as orchestrator
+        import services.external.geocoding_service as geocoding_service
+        from canonicalization.key_canonicalizer import KeyCanonicalizer
+
+        self._tmpdir = tempfile.mkdtemp(prefix="vriddhi-load-test-")
+        for name in ("key_canonicals.json", "geocoding_cache.json"):
+            if os.path.exists(name):
+                shutil.copy(name, self._tmpdir)
+        if os.path.exists(geocoding_service.GEOCODING_CACHE_PATH):
+            source = sqlite3.connect(geocoding_service.GEOCODING_CACHE_PATH)
+            with sqlite3.connect(os.path.join(self._tmpdir, "geocoding_cache.db")) as copy:
+                source.backup(copy)
+            source.close()
+        self._saved["singletons"] = [
+            (orchestrator, "_key_canonicalizer", orchestrator._key_canonicalizer),
+            (geocoding_service, "_geocoding_service_instance", geocoding_service._geocoding_service_instance),
+        ]
+        orchestrator._key_canonicalizer = KeyCanonicalizer(
+            persistence_file=os.path.join(self._tmpdir, "key_canonicals.json")
+        )
+        geocoding_service._geocoding_service_instance = geocoding_service.GeocodingService(
+            cache_file=os.path.join(self._tmpdir, "geocoding_cache.db")
+        )
+
+    def shutdown(self) -> None:
+        """Restore main's clients, globals and functions."""
+        for name, fn in self._originals.items():
+            setattr(self.main, name, fn)
+        self._originals.clear()
+        if self._adapter_send is not None:
+            requests.adapters.HTTPAdapter.send = self._adapter_send
+            self._adapter_send = None
+        if self._saved:
+            for clients, supabase, qdrant, embedding_model in self._saved["clients"]:
+                clients.supabase, clients.qdrant, clients.embedding_model = supabase, qdrant, embedding_model
+            for name, value in self._saved["globals"].items():
+                setattr(self.main, name, value)
+            for module, name, value in self._saved.get("singletons", []):
+                setattr(module, name, value)
+            self._saved = None
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def seed(self, copies: int = 1) -> int:
+        """Ingest the seed side of every pair copies times (distinct users)."""
+        from pipeline.ingestion_pipeline import ingest_listing
+
+        seeded = 0
+        for copy_index in range(copies):
+            for position, pair in enumerate(self.pairs):
+                listing = self.main.normalize_and_validate_v2(
+                    self.main.canonicalize_listing(copy.deepcopy(pair["seed"]["stage3"]))
+                )
+                ingest_listing(self.main.ingestion_clients, listing,
+                               user_id=f"seed-user-{copy_index}-{position}", verbose=False)
+                seeded += 1
+        return seeded
+
+
+# ============================================================================
+# TRAFFIC
+# ============================================================================
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """"search-and-match=6,match=2" → {"search-and-match": 6.0, "match": 2.0}."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name} (expected one of {sorted(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def build_request(endpoint: str, pair: Dict[str, Any], index: int) -> Dict[str, Any]:
+    user_id = f"load-user-{index}"
+    if endpoint == "search-and-match":
+        return {"query": pair["query"]["query"], "user_id": user_id}
+    if endpoint == "store-listing":
+        return {"query": pair["seed"]["query"], "user_id": user_id}
+    return {"listing_a": pair["query"]["stage3"], "listing_b": pair["seed"]["stage3"]}
+
+
+async def run_load(stack: LocalStack, mix: Dict[str, float], requests: int,
+                   concurrency: int, seed: int = 42) -> Dict[str, Any]:
+    """Send requests over concurrency clients; returns per-request samples."""
+    rng = random.Random(seed)
+    names = list(mix)
+    schedule = [
+        (name, build_request(name, rng.choice(stack.pairs), index))
+        for index, name in enumerate(rng.choices(names, [mix[n] for n in names], k=requests))
+    ]
+    samples: List[Dict[str, Any]] = []
+    next_index = iter(range(len(schedule)))
+
+    transport = httpx.ASGITransport(app=stack.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        async def worker():
+            for index in next_index:
+                name, payload = schedule[index]
+                stages = _RequestStages()
+                token = _current_stages.set(stages)
+                start = time.perf_counter_ns()
+                try:
+                    response = await client.post(ENDPOINTS[name], json=payload)
+                    status = response.status_code
+                except Exception:
+                    status = 0
+                finally:
+                    elapsed = time.perf_counter_ns() - start
+                    _current_stages.reset(token)
+                stage_ns = dict(stages.ns)
+                stage_ns["other"] = max(0, elapsed - sum(stage_ns.values()))
+                samples.append({"endpoint": name, "status": status, "ns": elapsed, "stages": stage_ns})
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        wall = time.perf_counter() - start
+
+    return {"wall_s": wall, "samples": samples}
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile (0 for no values)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def _latency(values_ns: List[int]) -> Dict[str, float]:
+    ms = [v / 1e6 for v in values_ns]
+    summary = {f"p{p}_ms": round(percentile(ms, p), 3) for p in PERCENTILES}
+    summary["mean_ms"] = round(sum(ms) / len(ms), 3) if ms else 0.0
+    return summary
+
+
+def summarize(run: Dict[str, Any]) -> Dict[str, Any]:
+    """Throughput and latency percentiles per endpoint and stage."""
+    samples, wall = run["samples"], run["wall_s"]
+    by_endpoint: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample["endpoint"]].append(sample)
+
+    endpoints = {}
+    for name, rows in sorted(by_endpoint.items()):
+        stage_names = sorted({stage for row in rows for stage in row["stages"]})
+        endpoints[name] = {
+            "requests": len(rows),
+            "errors": sum(1 for row in rows if not 200 <= row["status"] < 300),
+            "status": dict(Counter(row["status"] for row in rows)),
+            "throughput_rps": round(len(rows) / wall, 2) if wall else 0.0,
+            "latency": _latency([row["ns"] for row in rows]),
+            "stages": {
+                stage: _latency([row["stages"].get(stage, 0) for row in rows])
+                for stage in stage_names
+            },
+        }
+    return {
+        "requests": len(samples),
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "latency": _latency([s["ns"] for s in samples]),
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{'=' * 78}")
+    print(f"Load test: {report['requests']} requests in {report['wall_s']:.2f}s "
+          f"({report['throughput_rps']:.1f} req/s, {report['errors']} errors)")
+    print(f"{'=' * 78}")
+    header = f"  {'':26s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'mean':>9s}"
+    for name, endpoint in report["endpoints"].items():
+        print(f"\n/{name}: {endpoint['requests']} requests, {endpoint['throughput_rps']:.1f} req/s, "
+              f"{endpoint['errors']} errors {endpoint['status']}")
+        print(header + "   (ms)")
+        rows = [("total", endpoint["latency"])] + [(f"  {s}", l) for s, l in endpoint["stages"].items()]
+        for label, latency in rows:
+            print(f"  {label:26s} {latency['p50_ms']:9.2f} {latency['p95_ms']:9.2f} "
+                  f"{latency['p99_ms']:9.2f} {latency['mean_ms']:9.2f}")
+
+
+@contextlib.contextmanager
+def _quiet(enabled: bool):
+    """Silence the app's progress prints and INFO logs."""
+    if not enabled:
+        yield
+        return
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.WARNING)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        root.setLevel(level)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"endpoint=weight list (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed-copies", type=int, default=1,
+                        help="times the seed listings are ingested before the run")
+    parser.add_argument("--extract-ms", type=float, default=0.0,
+                        help="simulated extraction (GPT) latency per call")
+    parser.add_argument("--warmup", type=int, default=10, help="requests sent before measuring")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--allow-network", action="store_true",
+                        help="let canonicalization / geocoding reach external APIs")
+    parser.add_argument("--verbose", action="store_true", help="show the app's logs")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    stack = LocalStack(extract_ms=args.extract_ms, allow_network=args.allow_network)
+    stack.boot()
+    try:
+        with _quiet(not args.verbose):
+            seeded = stack.seed(args.seed_copies)
+            if args.warmup:
+                asyncio.run(run_load(stack, mix, args.warmup, 1, seed=args.seed + 1))
+            run = asyncio.run(run_load(stack, mix, args.requests, args.concurrency, seed=args.seed))
+    finally:
+        stack.shutdown()
+
+    report = summarize(run)
+    report["config"] = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "seeded_listings": seeded,
+        "extract_ms": args.extract_ms,
+        "allow_network": args.allow_network,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
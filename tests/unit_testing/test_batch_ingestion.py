@@ -0,0 +1,117 @@
+"""
+Unit tests for batched ingestion (ingest_batch)
+
+In-memory Qdrant, a recording Supabase stand-in and a deterministic
+embedder: checks one bulk insert per table, one encode() call, chunked
+upserts and per-item error reporting.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from embedding import embedding_store
+from pipeline import ingestion_pipeline
+from pipeline.ingestion_pipeline import IngestionClients, ingest_batch
+
+
+@pytest.fixture(autouse=True)
+def _no_embedding_store(monkeypatch):
+    """Keep unit tests off the on-disk embedding store."""
+    monkeypatch.setattr(embedding_store, "ENABLE_EMBEDDING_STORE", False)
+
+
+class _Table:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.payload = None
+
+    def insert(self, payload):
+        self.payload = payload
+        return self
+
+    def execute(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        self.db.insert_calls.append((self.name, len(rows)))
+        if any(r["data"].get("reject") for r in rows):
+            raise RuntimeError("insert rejected")
+        self.db.rows.setdefault(self.name, []).extend(rows)
+        return type("Response", (), {"data": rows})()
+
+
+class _FakeSupabase:
+    def __init__(self):
+        self.rows = {}
+        self.insert_calls = []
+
+    def table(self, name):
+        return _Table(self, name)
+
+
+class _FakeEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, batch_size=32, convert_to_tensor=False):
+        self.calls += 1
+        return np.array([[float(len(t) % 7), 1.0] + [0.0] * (ingestion_pipeline.EMBEDDING_DIM - 2) for t in texts])
+
+
+def _clients():
+    clients = IngestionClients()
+    clients.supabase = _FakeSupabase()
+    clients.embedding_model = _FakeEmbedder()
+    clients.qdrant = QdrantClient(":memory:")
+    for name in ("product_vectors", "service_vectors", "mutual_vectors"):
+        clients.qdrant.create_collection(
+            name, vectors_config=VectorParams(size=ingestion_pipeline.EMBEDDING_DIM, distance=Distance.COSINE)
+        )
+    return clients
+
+
+def _listing(intent, i, **extra):
+    listing = {"intent": intent, "subintent": "buy", "domain": ["d"], "category": ["c"],
+               "items": [{"type": f"item{i}"}]}
+    listing.update(extra)
+    return listing
+
+
+def test_batched_round_trips():
+    print("\n=== Test 1: One insert per table, one encode, chunked upserts ===")
+    clients = _clients()
+    listings = [_listing("product", i) for i in range(5)] + [_listing("mutual", i) for i in range(3)]
+
+    report = ingest_batch(clients, listings, user_ids=["u"] * 8, verbose=False, upsert_batch_size=2)
+
+    assert all(r["status"] == "success" for r in report)
+    assert sorted(clients.supabase.insert_calls) == [("mutual_listings", 3), ("product_listings", 5)]
+    assert clients.embedding_model.calls == 1
+    assert clients.qdrant.count("product_vectors").count == 5
+    assert clients.qdrant.count("mutual_vectors").count == 3
+    print("  ✅ PASS: 2 inserts, 1 encode, 8 points")
+
+
+def test_per_item_errors():
+    print("\n=== Test 2: Per-item error reporting ===")
+    clients = _clients()
+    listings = [_listing("product", 0), {"intent": "unknown"}, _listing("product", 2, reject=True)]
+
+    report = ingest_batch(clients, listings, verbose=False)
+
+    assert [r["status"] for r in report] == ["success", "failed", "failed"]
+    assert report[1]["stage"] == "validate"
+    assert report[2]["stage"] == "supabase"
+    assert clients.qdrant.count("product_vectors").count == 1
+    print("  ✅ PASS: invalid and rejected rows reported, rest ingested")
+
+
+if __name__ == "__main__":
+    test_batched_round_trips()
+    test_per_item_errors()
+    print("\nAll batch ingestion tests passed.")
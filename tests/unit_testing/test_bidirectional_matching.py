@@ -0,0 +1,85 @@
+"""
+Unit tests for bidirectional matching (forward + M-18 to M-22 in one pass)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from schema.schema_normalizer_v2 import normalize_and_validate_v2
+from matching.listing_matcher_v2 import (
+    listing_matches_bidirectional,
+    listing_matches_v2,
+    match_candidates_bidirectional,
+)
+
+
+def _roommate(self_attrs, wants, exclusions=None):
+    return normalize_and_validate_v2({
+        "intent": "mutual",
+        "subintent": "connect",
+        "domain": [],
+        "primary_mutual_category": ["roommate"],
+        "items": [],
+        "item_exclusions": [],
+        "other_party_preferences": {"categorical": wants},
+        "other_party_exclusions": exclusions or [],
+        "self_attributes": {"categorical": self_attrs},
+        "self_exclusions": [],
+        "target_location": {},
+        "location_match_mode": "global",
+        "location_exclusions": [],
+        "reasoning": ""
+    })
+
+
+def test_pair_directions():
+    print("\n=== Test 1: Forward and reverse for one pair ===")
+    A = _roommate({"diet": "vegetarian"}, {"smoking": "no"})
+    B = _roommate({"smoking": "no"}, {"diet": "vegetarian"})
+    C = _roommate({"smoking": "no"}, {"diet": "vegan"})
+    D = _roommate({"smoking": "no"}, {}, exclusions=["vegetarian"])
+
+    assert listing_matches_bidirectional(A, B) == (True, True)
+    assert listing_matches_bidirectional(A, C) == (True, False)
+    assert listing_matches_bidirectional(A, D) == (True, False)  # M-22
+    # Reverse agrees with running the search from the other side
+    assert listing_matches_v2(B, A) is True and listing_matches_v2(C, A) is False
+    print("  ✅ PASS: reciprocal, one-way and excluded pairs")
+
+
+def test_candidates_reciprocal_first():
+    print("\n=== Test 2: One pass, reciprocal first, shared implications ===")
+    A = _roommate({"diet": "vegetarian"}, {"smoking": "no"})
+    rows = [
+        {"listing_id": "one-way", "data": _roommate({"smoking": "no"}, {"diet": "vegan"})},
+        {"listing_id": "no-match", "data": _roommate({"smoking": "yes"}, {})},
+        {"listing_id": "mutual-1", "data": _roommate({"smoking": "no"}, {"diet": "vegetarian"})},
+        {"listing_id": "mutual-2", "data": _roommate({"smoking": "no"}, {"diet": "vegetarian"})},
+    ]
+    calls = []
+
+    def implies(candidate, required):
+        calls.append((candidate, required))
+        return candidate == required
+
+    result = match_candidates_bidirectional(A, rows, implies_fn=implies)
+
+    assert [r["listing_id"] for r in result] == ["mutual-1", "mutual-2", "one-way"]
+    assert [r["reciprocal"] for r in result] == [True, True, False]
+    assert len(calls) == len(set(calls))  # every implication evaluated once
+    reciprocal_only = match_candidates_bidirectional(A, rows, implies_fn=implies, require_reciprocal=True)
+    assert [r["listing_id"] for r in reciprocal_only] == ["mutual-1", "mutual-2"]
+
+    # A malformed candidate is skipped, the rest still match
+    broken = dict(rows[2]["data"], locationmode=42)
+    result = match_candidates_bidirectional(A, [{"listing_id": "broken", "data": broken}] + rows,
+                                            implies_fn=implies)
+    assert [r["listing_id"] for r in result] == ["mutual-1", "mutual-2", "one-way"]
+    print("  ✅ PASS: reciprocal matches ranked first")
+
+
+if __name__ == "__main__":
+    test_pair_directions()
+    test_candidates_reciprocal_first()
+    print("\nAll bidirectional matching tests passed.")
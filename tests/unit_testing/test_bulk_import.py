@@ -0,0 +1,144 @@
+"""
+Unit tests for the streaming, resumable bulk import
+
+Seed listings from testing/test_data are streamed through normalize →
+ingest_batch with stand-in clients (canonicalization skipped: no network).
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from embedding import embedding_store
+from pipeline import ingestion_pipeline
+from pipeline.ingestion_pipeline import IngestionClients
+from pipeline.bulk_import import run_import, load_checkpoint
+
+
+@pytest.fixture(autouse=True)
+def _no_embedding_store(monkeypatch):
+    """Keep unit tests off the on-disk embedding store."""
+    monkeypatch.setattr(embedding_store, "ENABLE_EMBEDDING_STORE", False)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SEED_FILE = os.path.join(PROJECT_ROOT, "testing", "test_data", "seed_listings.json")
+
+
+class _Table:
+    def __init__(self, db):
+        self.db, self.payload = db, None
+
+    def upsert(self, payload):
+        self.payload = payload
+        return self
+
+    insert = upsert
+
+    def execute(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        for r in rows:
+            self.db.rows[r["id"]] = r
+        return type("Response", (), {"data": rows})()
+
+
+class _FakeSupabase:
+    def __init__(self):
+        self.rows = {}
+
+    def table(self, name):
+        return _Table(self)
+
+
+class _FakeEmbedder:
+    def encode(self, texts, batch_size=32, convert_to_tensor=False):
+        return np.ones((len(texts), ingestion_pipeline.EMBEDDING_DIM))
+
+
+def _clients():
+    clients = IngestionClients()
+    clients.supabase = _FakeSupabase()
+    clients.embedding_model = _FakeEmbedder()
+    clients.qdrant = QdrantClient(":memory:")
+    for name in ("product_vectors", "service_vectors", "mutual_vectors"):
+        clients.qdrant.create_collection(
+            name, vectors_config=VectorParams(size=ingestion_pipeline.EMBEDDING_DIM, distance=Distance.COSINE)
+        )
+    return clients
+
+
+def _write_jsonl(path, n):
+    with open(SEED_FILE, "r", encoding="utf-8") as f:
+        seeds = json.load(f)[:n]
+    with open(path, "w", encoding="utf-8") as f:
+        for seed in seeds:
+            f.write(json.dumps(seed) + "\n")
+        f.write("{not json}\n")
+
+
+def test_import_resume_after_crash():
+    print("\n=== Test 1: Resume after interrupted import ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = os.path.join(tmpdir, "seed.jsonl")
+        checkpoint = os.path.join(tmpdir, "seed.checkpoint.json")
+        errors = os.path.join(tmpdir, "seed.errors.jsonl")
+        _write_jsonl(input_path, 20)
+        clients = _clients()
+
+        # "Crash" after 7 lines
+        first = run_import(input_path, clients, checkpoint_path=checkpoint, batch_size=5,
+                           workers=2, user_id="u", canonicalize=False, limit=7, verbose=False)
+        assert first["lines"] == 7 and load_checkpoint(checkpoint, input_path)["line"] == 7
+
+        second = run_import(input_path, clients, checkpoint_path=checkpoint, batch_size=5,
+                            workers=2, user_id="u", canonicalize=False, errors_path=errors, verbose=False)
+        assert second["resumed_from_line"] == 7
+        assert second["lines"] == 14  # 13 seeds + 1 malformed line
+        assert first["ingested"] + second["ingested"] == 20
+        assert len(clients.supabase.rows) == 20
+
+        with open(errors, "r", encoding="utf-8") as f:
+            failures = [json.loads(line) for line in f]
+        assert [e["line"] for e in failures] == [21]
+        assert set(second["stage_seconds"]) >= {"parse", "normalize", "ingest"}
+        print(f"  ✅ PASS: 20 listings, resumed at line 7, {second['listings_per_s']} listings/s")
+
+
+def test_rerun_is_idempotent():
+    print("\n=== Test 2: Re-import does not duplicate ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = os.path.join(tmpdir, "seed.jsonl")
+        _write_jsonl(input_path, 10)
+        clients = _clients()
+
+        run_import(input_path, clients, checkpoint_path=None, canonicalize=False, verbose=False)
+        run_import(input_path, clients, checkpoint_path=None, canonicalize=False, verbose=False)
+
+        assert len(clients.supabase.rows) == 10
+
+        # Another dump with the same file name: its listings are not overwritten
+        other_dir = os.path.join(tmpdir, "other")
+        os.mkdir(other_dir)
+        with open(SEED_FILE, "r", encoding="utf-8") as f:
+            seeds = json.load(f)[10:15]
+        with open(os.path.join(other_dir, "seed.jsonl"), "w", encoding="utf-8") as f:
+            for i, seed in enumerate(seeds):
+                seed["id"] = f"00000000-0000-0000-0000-{i:012d}" if i == 0 else seed["test_id"]
+                f.write(json.dumps(seed) + "\n")
+        run_import(os.path.join(other_dir, "seed.jsonl"), clients, checkpoint_path=None,
+                   canonicalize=False, verbose=False)
+        assert len(clients.supabase.rows) == 15
+        assert "00000000-0000-0000-0000-000000000000" in clients.supabase.rows  # record's own id
+        print("  ✅ PASS: deterministic listing ids, no collisions across dumps")
+
+
+if __name__ == "__main__":
+    test_import_resume_after_crash()
+    test_rerun_is_idempotent()
+    print("\nAll bulk import tests passed.")
@@ -0,0 +1,84 @@
+"""
+Unit tests for compact (slotted) listings (schema/compact_listing.py)
+"""
+
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from schema.compact_listing import CompactListing, compact_listing, plain_listing
+import matching.listing_matcher_v2 as listing_matcher_v2
+import matching.match_plan as match_plan
+from matching.match_plan import compile_match_plan
+from matching.similarity_scorer import SimilarTopK, compute_bonus_attributes, score_similarity
+from benchmarks.synthetic import make_candidates, make_queries
+from pipeline.listing_cache import ListingCache
+from tests.unit_testing.test_match_plan import _fake_location, _load_fixtures, _outcome, _substring_implies
+
+
+def test_round_trip():
+    print("\n=== Test 1: Compact form round-trips to the OLD schema ===")
+    for name, listing in _load_fixtures().items():
+        compact = compact_listing(listing)
+        assert isinstance(compact, CompactListing) and compact_listing(compact) is compact
+        assert json.loads(json.dumps(compact.to_dict())) == json.loads(json.dumps(listing)), name
+        assert not hasattr(compact, "__dict__") and not hasattr(compact["items"][0] if compact["items"] else compact["other"], "__dict__")
+        for item in compact["items"]:
+            assert all(isinstance(r, tuple) for r in item["range"].values())
+    print("  ✅ PASS: same keys and values, slotted, tuple ranges")
+
+
+def test_matchers_consume_compact():
+    print("\n=== Test 2: Matchers give identical results on compact listings ===")
+    listings = list(_load_fixtures().values())
+    compacts = [compact_listing(listing) for listing in listings]
+
+    original = (listing_matcher_v2.match_location_v2, match_plan.match_location_v2)
+    listing_matcher_v2.match_location_v2 = match_plan.match_location_v2 = _fake_location
+    try:
+        for implies_fn in (None, _substring_implies):
+            for A, compact_A in zip(listings, compacts):
+                plan = compile_match_plan(A, implies_fn=implies_fn)
+                compact_plan = compile_match_plan(compact_A, implies_fn=implies_fn)
+                expected = [_outcome(lambda: listing_matcher_v2.listing_matches_v2(A, B, implies_fn)) for B in listings]
+                assert [_outcome(lambda: listing_matcher_v2.listing_matches_v2(compact_A, B, implies_fn)) for B in compacts] == expected
+                assert [_outcome(lambda: compact_plan.matches(B)) for B in compacts] == expected
+                assert [_outcome(lambda: plan.matches(B)) for B in compacts] == expected
+                assert list(compact_plan.prune_mask(compacts)) == list(plan.prune_mask(listings))
+    finally:
+        listing_matcher_v2.match_location_v2, match_plan.match_location_v2 = original
+    print("  ✅ PASS: listing_matches_v2, MatchPlan and prune masks agree")
+
+
+def test_cache_serves_compact():
+    print("\n=== Test 3: ListingCache rows are compact; scoring agrees ===")
+    candidates = make_candidates(300)
+    cache = ListingCache(max_entries=1000, ttl_seconds=0, compact=True)
+    for i, B in enumerate(candidates):
+        cache.put({"id": str(i), "user_id": "u", "data": B, "updated_at": "2026-01-01T00:00:00+00:00"})
+    compacts = [cache.get(str(i))["data"] for i in range(len(candidates))]
+    assert all(isinstance(B, CompactListing) for B in compacts)
+    assert [plain_listing(B) for B in compacts] == candidates
+
+    for A in make_queries(3):
+        plain_top, compact_top = SimilarTopK(A, 5, 0.3), SimilarTopK(A, 5, 0.3)
+        for i, (B, compact) in enumerate(zip(candidates, compacts)):
+            assert listing_matcher_v2.listing_matches_v2(A, B) == listing_matcher_v2.listing_matches_v2(A, compact)
+            assert score_similarity(A, B).similarity_score == score_similarity(A, compact).similarity_score
+            assert compute_bonus_attributes(A, B) == compute_bonus_attributes(A, compact)
+            plain_top.offer(B, i)
+            compact_top.offer(compact, i)
+        assert [(s.similarity_score, i) for s, i in plain_top.results()] == \
+               [(s.similarity_score, i) for s, i in compact_top.results()]
+
+    cache.put({"id": "bad", "data": {"intent": "product"}})  # not normalized: kept as-is
+    assert cache.get("bad")["data"] == {"intent": "product"}
+    print(f"  ✅ PASS: {len(candidates)} cached candidates, same verdicts and scores")
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_matchers_consume_compact()
+    test_cache_serves_compact()
+    print("\nAll compact listing tests passed.")
@@ -0,0 +1,116 @@
+"""
+Unit tests for content-hash embedding dedup and skip-unchanged upserts
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from embedding import embedding_store
+from embedding.embedding_store import EmbeddingStore
+from pipeline import ingestion_pipeline
+from pipeline.ingestion_pipeline import filter_unchanged_points, insert_to_qdrant
+
+
+class _CountingEmbedder:
+    def __init__(self):
+        self.texts = []
+
+    def encode(self, texts, batch_size=32, convert_to_tensor=False):
+        self.texts.extend(texts)
+        return np.array([[float(len(t))] + [1.0] * (ingestion_pipeline.EMBEDDING_DIM - 1) for t in texts],
+                        dtype=np.float32)
+
+
+LISTING = {"intent": "product", "subintent": "sell", "domain": ["d"], "items": [{"type": "phone"}]}
+
+
+def test_store_encodes_each_text_once():
+    print("\n=== Test 1: Content-addressed reuse ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = EmbeddingStore(os.path.join(tmpdir, "store.db"))
+        model = _CountingEmbedder()
+
+        first = store.encode(model, "m", ["a", "bb", "a"])
+        second = store.encode(model, "m", ["bb", "ccc"])
+        other_model = store.encode(model, "m2", ["a"])
+
+        assert model.texts == ["a", "bb", "ccc", "a"]
+        assert first[0] == first[2] and second[0] == first[1]
+        assert other_model[0] == first[0]  # same text, separate key per model
+        assert store.get_stats()["hits"] == 1  # "bb" on the second call
+        print("  ✅ PASS: duplicates and repeats served from the store")
+
+
+def test_unchanged_upsert_skipped():
+    print("\n=== Test 2: Skip unchanged Qdrant upserts ===")
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        "product_vectors",
+        vectors_config=VectorParams(size=ingestion_pipeline.EMBEDDING_DIM, distance=Distance.COSINE)
+    )
+    listing_id = "00000000-0000-0000-0000-0000000000aa"
+    vector = [1.0] * ingestion_pipeline.EMBEDDING_DIM
+
+    assert insert_to_qdrant(client, listing_id, LISTING, vector, user_id="u") is True
+    assert insert_to_qdrant(client, listing_id, LISTING, vector, user_id="u") is False
+    assert insert_to_qdrant(client, listing_id, dict(LISTING, subintent="buy"), vector, user_id="u") is True
+
+    # Freshly generated ids are not looked up; the caller's points are not modified
+    retrieved = []
+    original_retrieve = client.retrieve
+    client.retrieve = lambda *args, **kwargs: retrieved.append(kwargs["ids"]) or original_retrieve(*args, **kwargs)
+    fresh = PointStruct(id="00000000-0000-0000-0000-0000000000bb", vector=vector, payload={"intent": "product"})
+    stored = PointStruct(id=listing_id, vector=vector, payload={"intent": "product"})
+    written = filter_unchanged_points(client, "product_vectors", [fresh, stored], new_ids=[fresh.id])
+    assert retrieved == [[listing_id]]
+    assert [p.id for p in written] == [fresh.id, listing_id]
+    assert "point_fingerprint" in written[0].payload and fresh.payload == {"intent": "product"}
+    assert insert_to_qdrant(client, fresh.id, LISTING, vector, is_new=True) is True
+    assert len(retrieved) == 1
+    print("  ✅ PASS: identical point skipped, changed payload written, new ids not read back")
+
+
+def test_generate_embedding_uses_store(monkeypatch):
+    print("\n=== Test 3: generate_embedding goes through the store ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        monkeypatch.setattr(embedding_store, "ENABLE_EMBEDDING_STORE", True)
+        monkeypatch.setattr(embedding_store, "_embedding_store", EmbeddingStore(os.path.join(tmpdir, "store.db")))
+        model = _CountingEmbedder()
+        a = ingestion_pipeline.generate_embedding(model, "same text")
+        b = ingestion_pipeline.generate_embedding(model, "same text")
+        assert a == b and model.texts == ["same text"]
+        print("  ✅ PASS: second call reused the stored vector")
+
+
+def test_least_recently_used_evicted():
+    print("\n=== Test 4: Bounded store evicts least recently used vectors ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = EmbeddingStore(os.path.join(tmpdir, "store.db"), max_entries=3)
+        model = _CountingEmbedder()
+        store.encode(model, "m", ["a", "bb", "ccc"])
+        time.sleep(0.01)
+        store.encode(model, "m", ["a", "ccc"])  # used again: "bb" is now the oldest
+        store.encode(model, "m", ["dddd"])
+
+        stats = store.get_stats()
+        assert stats["stored_vectors"] == 3 and stats["evicted"] == 1
+        store.encode(model, "m", ["a", "ccc", "dddd"])
+        assert model.texts == ["a", "bb", "ccc", "dddd"]  # none of those re-encoded
+        print("  ✅ PASS: 3 vectors kept, the unused one evicted")
+
+
+if __name__ == "__main__":
+    test_store_encodes_each_text_once()
+    test_unchanged_upsert_skipped()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_generate_embedding_uses_store(monkeypatch)
+    test_least_recently_used_evicted()
+    print("\nAll embedding store tests passed.")
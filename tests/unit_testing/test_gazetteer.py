@@ -0,0 +1,155 @@
+"""
+Unit tests for the offline gazetteer (GeoNames index) and its use by GeocodingService
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import pytest
+import requests
+
+import services.external.gazetteer as gazetteer_module
+from services.external.gazetteer import Gazetteer, build_gazetteer, normalize_place_name
+from services.external.geocoding_service import _MISSING, GeocodingService
+
+# geonameid, name, asciiname, alternatenames, lat, lng, feature class, feature code,
+# country, cc2, admin1, admin2, admin3, admin4, population, elevation, dem, timezone, modified
+GEONAMES_ROWS = [
+    ["1277333", "Bengaluru", "Bengaluru", "BLR,Bangalore,Bengalūru,Bangaluru,https://en.wikipedia.org/wiki/Bangalore",
+     "12.97194", "77.59369", "P", "PPLA", "IN", "", "19", "", "", "", "8443675", "", "920", "Asia/Kolkata", "2024-01-01"],
+    ["1275339", "Mumbai", "Mumbai", "Bombay,Bombaim", "19.07283", "72.88261", "P", "PPLA", "IN",
+     "", "16", "", "", "", "12691836", "", "8", "Asia/Kolkata", "2024-01-01"],
+    ["4684888", "Dallas", "Dallas", "", "32.78306", "-96.80667", "P", "PPLA2", "US",
+     "", "TX", "", "", "", "1300092", "", "139", "America/Chicago", "2024-01-01"],
+    ["5722064", "Dallas", "Dallas", "", "44.91928", "-123.31705", "P", "PPL", "US",
+     "", "OR", "", "", "", "16854", "", "99", "America/Los_Angeles", "2024-01-01"],
+    ["2646057", "Dallas", "Dallas", "", "57.55", "-3.41667", "P", "PPL", "GB",
+     "", "SCT", "", "", "", "200", "", "", "Europe/London", "2024-01-01"],
+    ["1269750", "India", "India", "Bharat", "22.0", "79.0", "A", "PCLI", "IN",
+     "", "00", "", "", "", "1352617328", "", "", "Asia/Kolkata", "2024-01-01"],
+    ["1271157", "Goa", "Goa", "", "15.33333", "74.08333", "A", "ADM1", "IN",
+     "", "33", "", "", "", "1457723", "", "", "Asia/Kolkata", "2024-01-01"],
+    ["1712961", "Goa", "Goa", "", "13.69722", "123.48889", "P", "PPL", "PH",
+     "", "05", "", "", "", "58503", "", "", "Asia/Manila", "2024-01-01"],
+    ["4951788", "Springfield", "Springfield", "", "42.10148", "-72.58981", "P", "PPLA2", "US",
+     "", "MA", "", "", "", "154341", "", "", "America/New_York", "2024-01-01"],
+    ["4409896", "Springfield", "Springfield", "", "37.21533", "-93.29824", "P", "PPLA2", "US",
+     "", "MO", "", "", "", "166305", "", "", "America/Chicago", "2024-01-01"],
+    ["1275000", "Some Lake", "Some Lake", "", "10.0", "10.0", "H", "LK", "IN",
+     "", "", "", "", "", "0", "", "", "Asia/Kolkata", "2024-01-01"],
+]
+
+
+def _build(tmpdir, min_population=0):
+    dump = os.path.join(tmpdir, "cities.txt")
+    with open(dump, "w", encoding="utf-8") as f:
+        for row in GEONAMES_ROWS:
+            f.write("\t".join(row) + "\n")
+    db_path = os.path.join(tmpdir, "gazetteer.db")
+    return build_gazetteer(dump, db_path, min_population), db_path
+
+
+def test_alias_lookup():
+    print("\n=== Test 1: Primary, alternate and accented names ===")
+    assert normalize_place_name("  Bengalūru! ") == "bengaluru"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stats, db_path = _build(tmpdir)
+        assert stats["places"] == 10  # the lake (feature class H) is skipped
+        gazetteer = Gazetteer(db_path)
+
+        for name in ("Bangalore", "BENGALURU", "Bengalūru", "bangaluru"):
+            coords = gazetteer.lookup(name)
+            assert coords["canonical_name"] == "Bengaluru", name
+            assert (coords["lat"], coords["lng"]) == (12.97194, 77.59369)
+        assert gazetteer.lookup("Bombay")["canonical_name"] == "Mumbai"
+        assert gazetteer.lookup("BLR") is None  # short codes are not indexed as aliases
+        assert gazetteer.lookup("Some Lake") is None
+        assert gazetteer.lookup("Atlantis") is None
+        assert gazetteer.get_stats()["misses"] == 3
+    print("  ✅ PASS: aliases resolved to one canonical place")
+
+
+def test_ambiguous_names():
+    print("\n=== Test 2: Ambiguous names and country qualifiers ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _, db_path = _build(tmpdir)
+        gazetteer = Gazetteer(db_path)
+        assert gazetteer.lookup("Dallas")["lat"] == 32.78306  # most populous
+        assert gazetteer.lookup("Dallas, GB")["lat"] == 57.55
+        assert gazetteer.lookup("Dallas, Texas, US")["lat"] == 32.78306
+        assert gazetteer.lookup("Bangalore, Karnataka, India")["canonical_name"] == "Bengaluru"
+        assert gazetteer.lookup("India")["class"] == "boundary"
+
+        # Region vs town, comparable namesakes: left to Nominatim
+        assert gazetteer.lookup("Goa") is None
+        assert gazetteer.lookup("Springfield") is None
+        assert gazetteer.lookup("Goa, IN")["class"] == "boundary"
+        assert gazetteer.get_stats()["ambiguous"] == 2
+
+        _, db_path = _build(tmpdir, min_population=1000)
+        assert Gazetteer(db_path).lookup("Dallas, GB")["lat"] == 32.78306  # GB Dallas filtered out
+    print("  ✅ PASS: population ranking, ambiguity, country filter")
+
+
+def test_geocoding_service_uses_gazetteer():
+    print("\n=== Test 3: GeocodingService answers from the gazetteer first ===")
+    calls = []
+    original_get = requests.get
+
+    def fake_get(url, params=None, headers=None, timeout=None):
+        calls.append(params["q"])
+        raise requests.ConnectionError("offline")
+
+    requests.get = fake_get
+    GeocodingService.RATE_LIMIT_SECONDS = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            _, db_path = _build(tmpdir)
+            service = GeocodingService(cache_file=os.path.join(tmpdir, "geo.db"), use_gazetteer=False)
+            assert service.geocode("Bangalore") is None  # network failure cached as not found
+            assert calls == ["Bangalore"]
+
+            service.gazetteer = Gazetteer(db_path)
+            assert service.geocode("Bangalore")["canonical_name"] == "Bengaluru"
+            assert round(service.distance("Bangalore", "Bombay")) == 845
+            assert service.geocode("Atlantis") is None
+            assert service.geocode("Goa") is None  # ambiguous in the gazetteer
+            assert calls == ["Bangalore", "Atlantis", "Goa"]
+            # Gazetteer answers are never written to the cache
+            assert service.cache.get("bombay") is _MISSING
+            service.cache.put("mumbai", service.gazetteer.lookup("Mumbai"))  # left by an older version
+            service.gazetteer = None
+            service.geocode("Mumbai")
+            assert calls[-1] == "Mumbai"
+    finally:
+        requests.get = original_get
+        GeocodingService.RATE_LIMIT_SECONDS = 1.1
+    print("  ✅ PASS: only the name missing from the gazetteer reached Nominatim")
+
+
+def test_rebuilt_index_is_picked_up(monkeypatch):
+    print("\n=== Test 4: A running Gazetteer switches to a rebuilt index ===")
+    monkeypatch.setattr(gazetteer_module, "GAZETTEER_RELOAD_CHECK_SECONDS", 0.0)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _, db_path = _build(tmpdir)
+        gazetteer = Gazetteer(db_path)
+        assert gazetteer.lookup("Mumbai")["lat"] == 19.07283
+
+        moved = [row[:4] + ["19.5"] + row[5:] if row[1] == "Mumbai" else row for row in GEONAMES_ROWS]
+        monkeypatch.setattr(sys.modules[__name__], "GEONAMES_ROWS", moved)
+        _build(tmpdir)
+
+        assert gazetteer.lookup("Mumbai")["lat"] == 19.5
+        assert gazetteer.get_stats()["reloads"] == 1
+    print("  ✅ PASS: lookups answered from the new file without a restart")
+
+
+if __name__ == "__main__":
+    test_alias_lookup()
+    test_ambiguous_names()
+    test_geocoding_service_uses_gazetteer()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_rebuilt_index_is_picked_up(monkeypatch)
+    print("\nAll gazetteer tests passed.")
@@ -0,0 +1,135 @@
+"""
+Unit tests for the SQLite-backed geocoding cache (LRU, negative TTL, batched flushes)
+"""
+
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import requests
+
+from services.external import geocoding_service
+from services.external.geocoding_service import _MISSING, GeocodingCache, GeocodingService
+
+BANGALORE = {"lat": 12.97, "lng": 77.59, "canonical_name": "Bengaluru"}
+
+
+class _FakeResponse:
+    def __init__(self, results):
+        self.ok = True
+        self._results = results
+
+    def json(self):
+        return self._results
+
+
+def _patched_nominatim(results_by_query, calls):
+    def fake_get(url, params=None, headers=None, timeout=None):
+        calls.append(params["q"])
+        return _FakeResponse(results_by_query.get(params["q"], []))
+    return fake_get
+
+
+def _stored_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute("SELECT key, value FROM geocodes").fetchall())
+
+
+def test_lookups_served_from_cache():
+    print("\n=== Test 1: Hits, misses and negatives cached across instances ===")
+    calls = []
+    original_get = requests.get
+    requests.get = _patched_nominatim(
+        {"Bangalore": [{"lat": "12.97", "lon": "77.59", "address": {"city": "Bengaluru"}}]}, calls
+    )
+    GeocodingService.RATE_LIMIT_SECONDS = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, "geo.db")
+            service = GeocodingService(cache_file=db_path)
+            assert service.geocode("Bangalore")["canonical_name"] == "Bengaluru"
+            assert service.geocode("Atlantis") is None
+            assert service.geocode(" bangalore ")["lat"] == 12.97
+            assert service.geocode("atlantis") is None
+            assert calls == ["Bangalore", "Atlantis"]
+
+            # Another worker on the same file sees the flushed entries
+            service.cache.flush()
+            other = GeocodingService(cache_file=db_path)
+            assert other.geocode("BANGALORE")["lng"] == 77.59
+            assert other.geocode("Atlantis") is None
+            assert calls == ["Bangalore", "Atlantis"]
+
+            stats = other.get_cache_stats()
+            assert (stats["total_entries"], stats["found"], stats["not_found"]) == (2, 1, 1)
+            assert stats["db_hits"] == 2
+    finally:
+        requests.get = original_get
+        GeocodingService.RATE_LIMIT_SECONDS = 1.1
+    print("  ✅ PASS: 2 Nominatim calls for 6 lookups over 2 instances")
+
+
+def test_batched_flush_and_lru():
+    print("\n=== Test 2: Writes batched, LRU bounded ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "geo.db")
+        cache = GeocodingCache(db_path, lru_size=2, flush_size=3, flush_seconds=3600)
+
+        cache.put("a", BANGALORE)
+        cache.put("b", None)
+        assert _stored_rows(db_path) == {}  # below the batch size
+        cache.put("c", BANGALORE)
+        assert set(_stored_rows(db_path)) == {"a", "b", "c"}
+        assert _stored_rows(db_path)["b"] is None
+
+        assert len(cache._lru) == 2 and "a" not in cache._lru
+        assert cache.get("a") == BANGALORE  # evicted from memory, read back from SQLite
+        stats = cache.get_stats()
+        assert stats["db_hits"] == 1 and stats["flushes"] == 1
+    print("  ✅ PASS: one transaction for 3 writes, evicted entry reloaded")
+
+
+def test_negative_ttl():
+    print("\n=== Test 3: Negative entries expire, positive entries do not ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = GeocodingCache(os.path.join(tmpdir, "geo.db"), negative_ttl=60)
+        cache.put("nowhere", None)
+        cache.put("bangalore", BANGALORE)
+        cache.flush()
+        assert cache.get("nowhere") is None
+
+        cache._lru["nowhere"] = (None, cache._lru["nowhere"][1] - 120)
+        cache._lru["bangalore"] = (BANGALORE, cache._lru["bangalore"][1] - 120)
+        cache._conn.execute("UPDATE geocodes SET fetched_at = fetched_at - 120")
+        assert cache.get("nowhere") is _MISSING
+        assert cache.get("bangalore") == BANGALORE
+    print("  ✅ PASS: expired 'not found' re-geocoded")
+
+
+def test_legacy_json_import():
+    print("\n=== Test 4: Legacy JSON cache imported once ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_path = os.path.join(tmpdir, "geocoding_cache.json")
+        with open(json_path, "w") as f:
+            json.dump({"bangalore": BANGALORE, "atlantis": None}, f)
+
+        service = GeocodingService(cache_file=json_path)
+        assert service.cache_file == os.path.join(tmpdir, "geocoding_cache.db")
+        assert service.geocode("Bangalore") == BANGALORE
+        assert service.geocode("Atlantis") is None
+
+        service.clear_cache()
+        reopened = GeocodingService(cache_file=json_path)
+        assert reopened.get_cache_stats()["total_entries"] == 0  # not re-imported
+    print("  ✅ PASS: JSON entries served from SQLite")
+
+
+if __name__ == "__main__":
+    test_lookups_served_from_cache()
+    test_batched_flush_and_lru()
+    test_negative_ttl()
+    test_legacy_json_import()
+    print("\nAll geocoding cache tests passed.")
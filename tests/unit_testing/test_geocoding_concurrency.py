@@ -0,0 +1,153 @@
+"""
+Unit tests for the shared token-bucket limiter, single-flight geocoding and batched lookups
+"""
+
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import requests
+
+from services.external.geocoding_service import GeocodingService
+from services.external.rate_limiter import TokenBucket
+from pipeline.bulk_import import StageTimer, prefetch_locations
+
+
+class _SlowNominatim:
+    """requests.get stand-in: counts calls per query, answers after a delay."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, url, params=None, headers=None, timeout=None):
+        with self._lock:
+            self.calls.append(params["q"])
+        time.sleep(self.delay)
+        response = requests.Response()
+        response.status_code = 200
+        if params["q"].lower() == "atlantis":
+            response._content = b"[]"
+        else:
+            response._content = json.dumps([{
+                "lat": "18.52", "lon": "73.85", "display_name": params["q"], "address": {"city": params["q"]}
+            }]).encode()
+        return response
+
+
+def _service(tmpdir, rate=1000.0):
+    return GeocodingService(cache_file=os.path.join(tmpdir, "geo.db"), use_gazetteer=False,
+                            rate_limiter=TokenBucket(rate=rate, capacity=1))
+
+
+def test_token_bucket_spacing():
+    print("\n=== Test 1: Token bucket spacing (threads, async, shared file) ===")
+    bucket = TokenBucket(rate=50.0, capacity=1)
+    start = time.perf_counter()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    assert 0.09 <= elapsed < 0.5, elapsed  # 1 immediate + 5 x 20 ms
+    assert bucket.get_stats()["acquired"] == 6
+
+    async def burst():
+        async_bucket = TokenBucket(rate=50.0, capacity=1)
+        started = time.perf_counter()
+        await asyncio.gather(*(async_bucket.acquire_async() for _ in range(6)))
+        return time.perf_counter() - started
+
+    assert 0.09 <= asyncio.run(burst()) < 0.5
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        state_file = os.path.join(tmpdir, "nominatim.bucket")
+        first = TokenBucket(rate=50.0, capacity=1, state_file=state_file)
+        second = TokenBucket(rate=50.0, capacity=1, state_file=state_file)
+        waits = [bucket.acquire() for bucket in (first, second, first, second)]
+        assert waits[0] == 0 and all(w > 0 for w in waits[1:])  # one budget for both
+    print(f"  ✅ PASS: 6 acquires in {elapsed * 1000:.0f} ms, file-shared budget")
+
+
+def test_single_flight():
+    print("\n=== Test 2: Concurrent lookups of one name → one request ===")
+    fake = _SlowNominatim(delay=0.1)
+    original_get = requests.get
+    requests.get = fake
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            service = _service(tmpdir)
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(service.geocode("Pune")))
+                       for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            assert fake.calls == ["Pune"]
+            assert len(results) == 8 and all(r["lat"] == 18.52 for r in results)
+            stats = service.get_cache_stats()
+            assert stats["nominatim_requests"] == 1
+            assert stats["deduplicated_lookups"] + 1 <= 8
+    finally:
+        requests.get = original_get
+    print(f"  ✅ PASS: 8 callers, {stats['deduplicated_lookups']} joined the in-flight request")
+
+
+def test_geocode_many_and_async():
+    print("\n=== Test 3: geocode_many / geocode_async ===")
+    fake = _SlowNominatim()
+    original_get = requests.get
+    requests.get = fake
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            service = _service(tmpdir)
+            service.geocode("Goa")
+            names = ["Pune", "pune ", "Goa", "Atlantis", "", "Nashik", "PUNE"]
+            results = service.geocode_many(names, max_workers=3)
+
+            assert set(results) == {"Pune", "pune ", "Goa", "Atlantis", "Nashik", "PUNE"}
+            assert results["Atlantis"] is None and results["PUNE"] == results["Pune"]
+            assert sorted(fake.calls) == ["Atlantis", "Goa", "Nashik", "Pune"]  # one per unseen key
+
+            async def lookups():
+                return await asyncio.gather(service.geocode_async("Pune"), service.geocode_async("Satara"))
+
+            pune, satara = asyncio.run(lookups())
+            assert pune["lat"] == 18.52 and satara["canonical_name"] == "Satara"
+            assert fake.calls.count("Satara") == 1 and fake.calls.count("Pune") == 1
+
+            # Bulk import: one batch-wide lookup before the listings are canonicalized
+            batch = [
+                (1, 10, json.dumps({"target_location": {"name": "Kolhapur"}})),
+                (2, 20, json.dumps({"listing": {"target_location": {"origin": "Pune", "destination": "Kolhapur"}}})),
+                (3, 30, "not json"),
+            ]
+            from services.external import geocoding_service
+            saved = geocoding_service._geocoding_service_instance
+            geocoding_service._geocoding_service_instance = service
+            try:
+                timer = StageTimer()
+                assert prefetch_locations(batch, None, timer) == 2
+                assert "geocode" in timer.seconds
+            finally:
+                geocoding_service._geocoding_service_instance = saved
+            assert fake.calls.count("Kolhapur") == 1
+    finally:
+        requests.get = original_get
+    print("  ✅ PASS: duplicates and cached names never re-requested")
+
+
+if __name__ == "__main__":
+    test_token_bucket_spacing()
+    test_single_flight()
+    test_geocode_many_and_async()
+    print("\nAll geocoding concurrency tests passed.")
@@ -0,0 +1,214 @@
+"""
+Unit tests for the durable asynchronous ingestion queue
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from embedding import embedding_store
+from pipeline import ingestion_pipeline
+from pipeline.ingestion_pipeline import IngestionClients
+from pipeline.ingestion_queue import IngestionQueue, QueueFullError
+
+
+@pytest.fixture(autouse=True)
+def _no_embedding_store(monkeypatch):
+    """Keep unit tests off the on-disk embedding store."""
+    monkeypatch.setattr(embedding_store, "ENABLE_EMBEDDING_STORE", False)
+
+
+class _Table:
+    def __init__(self, db, name):
+        self.db, self.name, self.payload = db, name, None
+
+    def upsert(self, payload):
+        self.payload = payload
+        return self
+
+    insert = upsert
+
+    def execute(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        if any(r["data"].get("reject") for r in rows):
+            raise RuntimeError("write rejected")
+        for r in rows:
+            self.db.rows[r["id"]] = r
+        return type("Response", (), {"data": rows})()
+
+
+class _FakeSupabase:
+    def __init__(self):
+        self.rows = {}
+
+    def table(self, name):
+        return _Table(self, name)
+
+
+class _FakeEmbedder:
+    def encode(self, texts, batch_size=32, convert_to_tensor=False):
+        return np.ones((len(texts), ingestion_pipeline.EMBEDDING_DIM))
+
+
+def _clients():
+    clients = IngestionClients()
+    clients.supabase = _FakeSupabase()
+    clients.embedding_model = _FakeEmbedder()
+    clients.qdrant = QdrantClient(":memory:")
+    clients.qdrant.create_collection(
+        "product_vectors",
+        vectors_config=VectorParams(size=ingestion_pipeline.EMBEDDING_DIM, distance=Distance.COSINE)
+    )
+    return clients
+
+
+def _listing(**extra):
+    listing = {"intent": "product", "subintent": "buy", "domain": ["d"], "items": [{"type": "phone"}]}
+    listing.update(extra)
+    return listing
+
+
+def _queue(tmpdir, **kwargs):
+    return IngestionQueue(os.path.join(tmpdir, "queue.db"), **kwargs)
+
+
+def test_enqueue_and_process():
+    print("\n=== Test 1: Enqueue → worker batch → done ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        queue = _queue(tmpdir, batch_size=10)
+        clients = _clients()
+        jobs = [queue.enqueue(_listing(), user_id="u") for _ in range(3)]
+        assert queue.get_status(jobs[0]["job_id"])["status"] == "queued"
+
+        assert queue.process_once(clients) == 3
+        assert all(queue.get_status(j["job_id"])["status"] == "done" for j in jobs)
+        assert set(clients.supabase.rows) == {j["listing_id"] for j in jobs}
+        print("  ✅ PASS: 3 jobs ingested in one batch with pre-assigned ids")
+
+
+def test_backpressure():
+    print("\n=== Test 2: Backpressure ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        queue = _queue(tmpdir, max_pending=2)
+        queue.enqueue(_listing())
+        queue.enqueue(_listing())
+        try:
+            queue.enqueue(_listing())
+            assert False, "third enqueue should be rejected"
+        except QueueFullError:
+            pass
+        print("  ✅ PASS: enqueue rejected above max_pending")
+
+
+def test_retries_then_failed():
+    print("\n=== Test 3: Retries with backoff, then failed ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        queue = _queue(tmpdir, max_attempts=2, retry_base_seconds=0.2)
+        clients = _clients()
+        job = queue.enqueue(_listing(reject=True))
+
+        queue.process_once(clients)
+        status = queue.get_status(job["job_id"])
+        assert status["status"] == "queued" and status["next_attempt_at"] > time.time()
+        assert queue.process_once(clients) == 0  # backing off
+        time.sleep(0.25)
+        assert queue.process_once(clients) == 1
+        status = queue.get_status(job["job_id"])
+        assert status["status"] == "failed" and status["attempts"] == 2
+        assert "[supabase]" in status["error"]
+        assert queue.retry_delay(1) == 0.2 and queue.retry_delay(3) == 0.8
+        print("  ✅ PASS: retried after the backoff, failed after max_attempts with stage recorded")
+
+
+def test_crash_recovery_and_workers():
+    print("\n=== Test 4: Lease-based crash recovery + worker threads ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        queue = _queue(tmpdir, lease_seconds=0.3)
+        job = queue.enqueue(_listing())
+        queue._claim_batch()  # simulate a crash mid-batch
+        assert queue.get_status(job["job_id"])["status"] == "processing"
+        queue._conn.close()
+
+        # Another process opening the queue does not steal the live job
+        reopened = _queue(tmpdir, lease_seconds=0.3)
+        assert reopened.get_status(job["job_id"])["status"] == "processing"
+        assert reopened._claim_batch() == []
+
+        time.sleep(0.35)  # lease expired
+        done = []
+        reopened.start(_clients(), workers=2, on_done=done.extend)
+        deadline = time.time() + 5
+        while not done and time.time() < deadline:
+            time.sleep(0.05)
+        reopened.stop()
+        assert done == [job["listing_id"]]
+        assert reopened.get_status(job["job_id"])["attempts"] == 2
+        print("  ✅ PASS: crashed job reclaimed after its lease and ingested by workers")
+
+
+def test_concurrent_claims_are_disjoint():
+    print("\n=== Test 5: Two queue instances on one file claim disjoint jobs ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        first = _queue(tmpdir, batch_size=7)
+        second = _queue(tmpdir, batch_size=7)
+        jobs = {first.enqueue(_listing())["job_id"] for _ in range(40)}
+
+        claimed = []
+        lock = threading.Lock()
+
+        def claim(queue):
+            while True:
+                batch = queue._claim_batch()
+                if not batch:
+                    return
+                with lock:
+                    claimed.extend(j["job_id"] for j in batch)
+
+        threads = [threading.Thread(target=claim, args=(q,)) for q in (first, second, first, second)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(claimed) == sorted(jobs)  # every job exactly once
+        print(f"  ✅ PASS: {len(claimed)} jobs, no double claims")
+
+
+def test_retention():
+    print("\n=== Test 6: Done jobs drop the listing, old jobs are purged ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        queue = _queue(tmpdir, max_attempts=1, retention_days=1)
+        clients = _clients()
+        done = queue.enqueue(_listing())
+        failed = queue.enqueue(_listing(reject=True))
+        queue.process_once(clients)
+        queue.process_once(clients)
+        queued = queue.enqueue(_listing())
+
+        bodies = dict(queue._conn.execute("SELECT job_id, listing FROM ingestion_jobs").fetchall())
+        assert bodies[done["job_id"]] == "" and "reject" in bodies[failed["job_id"]]
+        assert queue.get_status(failed["job_id"])["status"] == "failed"
+
+        assert queue.purge() == 0  # younger than the retention
+        assert queue.purge(now=time.time() + 2 * 86400) == 2
+        assert queue.get_status(done["job_id"]) is None and queue.get_status(failed["job_id"]) is None
+        assert queue.get_status(queued["job_id"])["status"] == "queued"
+        assert queue.get_stats()["purged_this_run"] == 2
+        print("  ✅ PASS: listing body dropped on done, done/failed purged after retention")
+
+
+if __name__ == "__main__":
+    test_enqueue_and_process()
+    test_backpressure()
+    test_retries_then_failed()
+    test_crash_recovery_and_workers()
+    test_concurrent_claims_are_disjoint()
+    test_retention()
+    print("\nAll ingestion queue tests passed.")
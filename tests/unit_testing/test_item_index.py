@@ -0,0 +1,123 @@
+"""
+Unit tests for type-indexed item matching (CandidateItemIndex)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import matching.item_array_matchers as item_array_matchers
+import matching.listing_matcher_v2 as listing_matcher_v2
+import matching.match_plan as match_plan
+from matching.item_array_matchers import (
+    CandidateItemIndex,
+    _scan_candidates,
+    all_required_items_match,
+    required_item_has_match,
+)
+from matching.match_plan import compile_match_plan
+from tests.unit_testing.test_match_plan import _fake_location, _load_fixtures, _outcome, _substring_implies
+
+
+def _bundle(count):
+    types = ["laptop", "phone", "charger", "mouse", "bag"]
+    return [
+        {"type": types[i % len(types)], "categorical": {"brand": f"brand{i}"},
+         "min": {}, "max": {}, "range": {"price": [i * 100, i * 100]}}
+        for i in range(count)
+    ]
+
+
+def test_same_results_as_scan():
+    print("\n=== Test 1: Indexed matching agrees with the linear scan ===")
+    listings = list(_load_fixtures().values())
+    for implies_fn in (None, _substring_implies):
+        for A in listings:
+            for B in listings:
+                if A["intent"] == "mutual" or B["intent"] == "mutual":
+                    continue
+                for required_item in A["items"]:
+                    expected = _outcome(lambda: _scan_candidates(required_item, B["items"], implies_fn))
+                    assert _outcome(lambda: required_item_has_match(required_item, B["items"], implies_fn)) == expected
+
+    original = (listing_matcher_v2.match_location_v2, match_plan.match_location_v2)
+    listing_matcher_v2.match_location_v2 = match_plan.match_location_v2 = _fake_location
+    saved_min = match_plan.ITEM_INDEX_MIN_ITEMS
+    match_plan.ITEM_INDEX_MIN_ITEMS = 1  # index every candidate
+    try:
+        for A in listings:
+            plan = compile_match_plan(A, implies_fn=_substring_implies, order="canonical")
+            for B in listings:
+                expected = _outcome(lambda: listing_matcher_v2.listing_matches_v2(A, B, _substring_implies))
+                assert _outcome(lambda: plan.matches(B)) == expected
+    finally:
+        listing_matcher_v2.match_location_v2, match_plan.match_location_v2 = original
+        match_plan.ITEM_INDEX_MIN_ITEMS = saved_min
+    print("  ✅ PASS: required_item_has_match and MatchPlan verdicts unchanged")
+
+
+def test_visits_same_type_only():
+    print("\n=== Test 2: Required items only visit same-type candidates ===")
+    candidates = _bundle(50)
+    visited = []
+    original = item_array_matchers.match_item_categorical
+
+    def counting(required_item, candidate_item, implies_fn=None):
+        visited.append(candidate_item["type"])
+        return original(required_item, candidate_item, implies_fn)
+
+    item_array_matchers.match_item_categorical = counting
+    try:
+        required = [{"type": "mouse", "categorical": {"brand": "brand48"}, "min": {}, "max": {}, "range": {}},
+                    {"type": "bag", "categorical": {}, "min": {}, "max": {"price": 500}, "range": {}}]
+        assert all_required_items_match(required, candidates)
+        assert set(visited) == {"mouse", "bag"}
+        assert len(visited) == 10 + 1  # all 10 mice (match is the last), first bag
+    finally:
+        item_array_matchers.match_item_categorical = original
+    print("  ✅ PASS: 11 candidate visits instead of 50+")
+
+
+def test_implies_once_per_type_pair():
+    print("\n=== Test 3: implies_fn runs once per distinct type pair ===")
+    candidates = _bundle(50)
+    calls = []
+
+    def implies(candidate, required):
+        calls.append((candidate, required))
+        return candidate == "laptop" and required == "computer"
+
+    index = CandidateItemIndex(candidates)
+    required = {"type": "computer", "categorical": {}, "min": {}, "max": {}, "range": {"price": [1000, 1000]}}
+    assert required_item_has_match(required, candidates, implies, index)
+    assert not required_item_has_match({**required, "range": {"price": [1, 2]}}, candidates, implies, index)
+    assert sorted(calls) == sorted((t, "computer") for t in ("laptop", "phone", "charger", "mouse", "bag"))
+
+    calls.clear()
+    assert required_item_has_match({"type": "phone", "categorical": {}, "min": {}, "max": {}, "range": {}},
+                                   candidates, implies, index)
+    assert calls == []  # a same-type candidate matched
+    print("  ✅ PASS: 5 implication calls for 50 candidates, none on same-type match")
+
+
+def test_untyped_falls_back():
+    print("\n=== Test 4: Untyped candidates use the linear scan ===")
+    candidates = _bundle(3) + [{"categorical": {}, "min": {}, "max": {}, "range": {}}]
+    index = CandidateItemIndex(candidates)
+    assert index.linear_only
+    required = {"type": "phone", "categorical": {}, "min": {}, "max": {}, "range": {}}
+    assert required_item_has_match(required, candidates, None, index)
+    try:
+        required_item_has_match({**required, "type": "tablet"}, candidates, None, index)
+        assert False, "missing candidate type must still raise"
+    except KeyError:
+        pass
+    print("  ✅ PASS: KeyError for the untyped candidate, as before")
+
+
+if __name__ == "__main__":
+    test_same_results_as_scan()
+    test_visits_same_type_only()
+    test_implies_once_per_type_pair()
+    test_untyped_falls_back()
+    print("\nAll item index tests passed.")
@@ -0,0 +1,214 @@
+"""
+Unit tests for the versioned in-process listing cache
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import pipeline.listing_cache as listing_cache
+from pipeline.listing_cache import ListingCache
+
+
+def _row(listing_id, version="2026-01-01T00:00:00+00:00"):
+    return {"id": listing_id, "user_id": "u", "data": {"intent": "product"}, "updated_at": version}
+
+
+class _FakeFeed:
+    """
+    Supabase stand-in: select(...).gt(...) / .or_(keyset) / .order(...).limit(...),
+    compared as timestamps; responses are capped at max_rows like PostgREST.
+    """
+
+    def __init__(self, rows, max_rows=1000):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.fail = False
+        self.queries = 0
+
+    def table(self, name):
+        feed = self
+        if feed.fail:
+            raise ConnectionError("database unavailable")
+
+        class _Query:
+            def __init__(self):
+                self.data = list(feed.rows.get(name, []))
+                self.keys = []
+                self.n = feed.max_rows
+
+            def select(self, *_):
+                return self
+
+            def gt(self, _column, since):
+                since = datetime.fromisoformat(since)
+                self.data = [r for r in self.data if datetime.fromisoformat(r["updated_at"]) > since]
+                return self
+
+            def or_(self, filters):
+                # updated_at.gt.T,and(updated_at.eq.T,id.gt.I)
+                match = re.fullmatch(r"updated_at\.gt\.(.+),and\(updated_at\.eq\.(.+),id\.gt\.(.+)\)", filters)
+                after = (datetime.fromisoformat(match.group(1)), match.group(3))
+                self.data = [r for r in self.data if (datetime.fromisoformat(r["updated_at"]), r["id"]) > after]
+                return self
+
+            def order(self, column, desc=False):
+                self.keys.append((column, desc))
+                return self
+
+            def limit(self, n):
+                self.n = min(n, feed.max_rows)
+                return self
+
+            def execute(self):
+                feed.queries += 1
+                data = self.data
+                for column, desc in reversed(self.keys):
+                    parse = datetime.fromisoformat if column == "updated_at" else str
+                    data = sorted(data, key=lambda r: parse(r[column]), reverse=desc)
+                return type("Response", (), {"data": data[:min(self.n, feed.max_rows)]})()
+
+        return _Query()
+
+
+def test_lru_eviction():
+    print("\n=== Test 1: LRU eviction ===")
+    cache = ListingCache(max_entries=2, ttl_seconds=0)
+    cache.put(_row("a"))
+    cache.put(_row("b"))
+    assert cache.get("a") is not None  # a becomes most recent
+    cache.put(_row("c"))               # evicts b
+
+    assert cache.get("b") is None
+    assert cache.get("a")["version"] == "2026-01-01T00:00:00+00:00"
+    assert cache.get_stats()["evictions"] == 1
+    print("  ✅ PASS: least recently used entry evicted")
+
+
+def test_local_invalidation():
+    print("\n=== Test 2: Local write invalidation ===")
+    cache = ListingCache(max_entries=10, ttl_seconds=0)
+    cache.put(_row("a"))
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    print("  ✅ PASS: invalidate() drops the row")
+
+
+def test_change_feed_poll():
+    print("\n=== Test 3: Change-feed poll ===")
+    cache = ListingCache(max_entries=10, ttl_seconds=0)
+    cache.put(_row("a", "2026-01-01T00:00:00.5+00:00"))
+    cache.put(_row("b", "2026-01-01T00:00:00+00:00"))
+    cache.put(_row("c", "2026-01-01T00:00:00+00:00"))
+
+    # The watermark comes from the database, whatever the local clock says
+    rows = [
+        {"id": "a", "updated_at": "2026-01-01T00:00:00.5+00:00"},
+        {"id": "b", "updated_at": "2026-01-01T00:00:00+00:00"},
+        {"id": "c", "updated_at": "2026-01-01T00:00:00+00:00"},
+    ]
+    feed = _FakeFeed({"product_listings": rows})
+    assert cache.poll_changes(feed) == 0
+    assert cache.get_stats()["watermark"] == "2026-01-01T00:00:00.5+00:00"
+
+    # Text order would put ".123456" before ".5"; timestamps are compared as such
+    rows[0]["updated_at"] = "2026-01-01T00:00:00.723456+00:00"
+    # Committed late with an earlier updated_at: inside the poll overlap
+    rows[1]["updated_at"] = "2026-01-01T00:00:00.25+00:00"
+    assert cache.poll_changes(feed) == 2
+    assert cache.get("a") is None and cache.get("b") is None and cache.get("c") is not None
+    assert cache.get_stats()["watermark"] == "2026-01-01T00:00:00.723456+00:00"
+
+    # A failed poll is logged, the cache keeps serving (TTL backstop)
+    feed.fail = True
+    assert cache.start_polling(feed, interval_seconds=60) is False
+    assert cache.get("c") is not None
+    print("  ✅ PASS: rows updated by other workers invalidated")
+
+
+def test_disabled_cache():
+    print("\n=== Test 4: Disabled cache ===")
+    cache = ListingCache(max_entries=0)
+    cache.put(_row("a"))
+    assert cache.get("a") is None and not cache.enabled
+    print("  ✅ PASS: size 0 disables caching")
+
+
+def test_candidate_loader_reads_cache():
+    print("\n=== Test 5: Candidate loader reads cache first ===")
+    from pipeline.retrieval_service import build_candidate_rows
+
+    point = type("Point", (), {"payload": {"listing_id": "a", "intent": "product"}})()
+
+    class _NoDB:
+        def table(self, name):
+            raise AssertionError("Supabase must not be queried on a cache hit")
+
+    cache = ListingCache(max_entries=10, ttl_seconds=0)
+    cache.put(_row("a"))
+    rows = build_candidate_rows(_NoDB(), "product", [point], consistency_sample_rate=0.0, cache=cache)
+
+    assert len(rows) == 1 and rows[0]["source"] == "cache"
+    print("  ✅ PASS: cached row served without a database query")
+
+
+def test_poll_pages_through_bulk_writes(monkeypatch):
+    print("\n=== Test 6: Change-feed poll pages past the response cap ===")
+    monkeypatch.setattr(listing_cache, "LISTING_CACHE_POLL_PAGE_SIZE", 3)
+    base = "2026-01-01T00:00:00+00:00"
+    cache = ListingCache(max_entries=100, ttl_seconds=0)
+    rows = [{"id": "seed", "updated_at": base}]
+    feed = _FakeFeed({"product_listings": rows}, max_rows=3)
+    cache.poll_changes(feed)
+
+    # One bulk transaction: ten rows share an updated_at, two more follow
+    bulk = "2026-01-01T00:01:00+00:00"
+    for i in range(12):
+        listing_id = f"id{i:02d}"
+        cache.put(_row(listing_id, base))
+        rows.append({"id": listing_id, "updated_at": bulk if i < 10 else f"2026-01-01T00:02:{i:02d}+00:00"})
+    feed.queries = 0
+
+    assert cache.poll_changes(feed) == 12
+    assert all(cache.get(f"id{i:02d}") is None for i in range(12))
+    assert cache.get_stats()["watermark"] == "2026-01-01T00:02:11+00:00"
+    # seed (inside the overlap) + 12 rows: 3 + 3 + 3 + 3 + 1, plus one empty page per other table
+    assert feed.queries == 5 + 2
+    print("  ✅ PASS: 12 rows over 5 capped pages, none missed")
+
+
+def test_write_through_survives_poll():
+    print("\n=== Test 7: Written-through entries survive the poll that sees their insert ===")
+    cache = ListingCache(max_entries=10, ttl_seconds=0)
+    rows = [{"id": "old", "updated_at": "2026-01-01T00:00:00+00:00"}]
+    feed = _FakeFeed({"product_listings": rows})
+    cache.poll_changes(feed)
+
+    inserted = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    cache.put({"listing_id": "new", "user_id": "u", "data": {"intent": "product"}})
+    rows.append({"id": "new", "updated_at": inserted})
+    assert cache.poll_changes(feed) == 0
+    assert cache.get("new")["version"] == inserted  # stamped with the row's version
+
+    time.sleep(0.01)
+    rows[-1]["updated_at"] = (datetime.now(timezone.utc) + timedelta(seconds=1)).isoformat()
+    assert cache.poll_changes(feed) == 1 and cache.get("new") is None
+    print("  ✅ PASS: insert kept and stamped, later update invalidated")
+
+
+if __name__ == "__main__":
+    test_lru_eviction()
+    test_local_invalidation()
+    test_change_feed_poll()
+    test_disabled_cache()
+    test_candidate_loader_reads_cache()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_poll_pages_through_bulk_writes(monkeypatch)
+    test_write_through_survives_poll()
+    print("\nAll listing cache tests passed.")
@@ -0,0 +1,95 @@
+"""
+Unit tests for the offline load-test harness (stand-ins + traffic report)
+"""
+
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import requests
+
+from testing.load_test import (
+    FakeExtractionClient,
+    HashingEmbedder,
+    LocalStack,
+    LocalSupabase,
+    parse_mix,
+    percentile,
+    run_load,
+    summarize,
+)
+
+
+def test_local_supabase():
+    print("\n=== Test 1: SQLite stand-in follows the supabase-py builder ===")
+    db = LocalSupabase()
+    inserted = db.table("matches").insert([{"listing_a_id": "a", "score": i} for i in range(5)]).execute().data
+    assert all(row["match_id"] and row["created_at"] for row in inserted)
+
+    rows = db.table("matches").select("match_id, score").gte("score", 2).order("score", desc=True).execute().data
+    assert [r["score"] for r in rows] == [4, 3, 2] and set(rows[0]) == {"match_id", "score"}
+    page = db.table("matches").select("score", count="exact").order("score").range(1, 2).execute()
+    assert [r["score"] for r in page.data] == [1, 2] and page.count == 5
+
+    ids = [row["match_id"] for row in inserted[:2]]
+    assert len(db.table("matches").select("*").in_("match_id", ids).execute().data) == 2
+    db.table("matches").update({"status": "retracted"}).in_("match_id", ids).execute()
+    assert len(db.table("matches").select("*").eq("status", "retracted").execute().data) == 2
+
+    db.table("stored_queries").upsert({"query_id": "q1", "intent": "product", "data": {"x": 1}}).execute()
+    db.table("stored_queries").upsert({"query_id": "q1", "data": {"x": 2}}).execute()
+    (row,) = db.table("stored_queries").select("*").execute().data
+    assert row["data"] == {"x": 2} and row["intent"] == "product"
+
+    db.table("matches").delete().lte("score", 1).execute()
+    assert db.row_count("matches") == 3
+    print("  ✅ PASS: insert defaults, filters, order, range, upsert merge, update, delete")
+
+
+def test_fakes_and_report_helpers():
+    print("\n=== Test 2: Embedder / extraction fakes are deterministic ===")
+    embedder = HashingEmbedder(384)
+    a, b = embedder.encode("used iphone 13"), embedder.encode(["used iphone 13", ""])
+    assert a.shape == (384,) and (a == b[0]).all() and abs(float((b[1] ** 2).sum()) - 1.0) < 1e-6
+
+    client = FakeExtractionClient({"need a plumber": {"intent": "service"}})
+    response = client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "anything"}])
+    assert response.choices[0].message.content == '{"intent": "service"}' and client.calls == 1
+
+    assert parse_mix("search-and-match=3,match") == {"search-and-match": 3.0, "match": 1.0}
+    assert percentile(list(range(1, 101)), 95) == 95 and percentile([], 50) == 0.0
+    print("  ✅ PASS")
+
+
+def test_end_to_end_run():
+    print("\n=== Test 3: Mixed traffic through main.app on the stand-ins ===")
+    stack = LocalStack()
+    stack.boot()
+    try:
+        seeded = stack.seed()
+        run = asyncio.run(run_load(stack, parse_mix("search-and-match=2,store-listing=1,match=1"), 24, 4))
+        try:
+            requests.get("http://example.invalid", timeout=1)
+            assert False, "outbound HTTP should be blocked"
+        except requests.exceptions.ConnectionError:
+            pass
+    finally:
+        stack.shutdown()
+    assert stack.main.extract_from_query.__name__ == "extract_from_query"  # unwrapped again
+    assert stack.main.ingestion_clients.supabase is not stack.supabase and not stack.main.is_initialized
+
+    report = summarize(run)
+    assert report["requests"] == 24 and report["errors"] == 0, report
+    search = report["endpoints"]["search-and-match"]
+    assert {"extraction", "retrieval", "ingest", "other"} <= set(search["stages"])
+    assert search["latency"]["p50_ms"] <= search["latency"]["p99_ms"]
+    assert stack.supabase.row_count("matches") > 0
+    print(f"  ✅ PASS: {seeded} seeded, {report['throughput_rps']} req/s")
+
+
+if __name__ == "__main__":
+    test_local_supabase()
+    test_fakes_and_report_helpers()
+    test_end_to_end_run()
+    print("\nAll load test harness tests passed.")
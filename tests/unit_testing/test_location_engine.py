@@ -0,0 +1,165 @@
+"""
+Unit tests for the vectorized location engine (grid + NumPy distances, same verdicts as match_location_v2)
+"""
+
+import sys
+import os
+import copy
+import random
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import requests
+
+import services.external.geocoding_service as geocoding_service
+from services.external.geocoding_service import GeocodingService
+from matching.listing_matcher_v2 import listing_matches_v2
+from matching.location_engine import MATCH, NO_MATCH, UNDECIDED, GeoGrid, LocationQuery, haversine_km
+from matching.location_matcher_v2 import match_location_v2
+from matching.match_plan import compile_match_plan
+from matching.numeric_columns import numeric_prune_mask
+from tests.unit_testing.test_match_plan import _load_fixtures
+
+BANGALORE = (12.9716, 77.5946)
+WHITEFIELD = (12.9698, 77.7500)
+
+
+class _OfflineGeocoder:
+    """Geocoding singleton on a temporary cache; unknown names never reach the network."""
+
+    def __enter__(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._saved = (geocoding_service._geocoding_service_instance, requests.get)
+
+        def offline(*args, **kwargs):
+            raise requests.ConnectionError("offline")
+
+        requests.get = offline
+        service = GeocodingService(cache_file=os.path.join(self._tmpdir.name, "geo.db"), use_gazetteer=False)
+        service.RATE_LIMIT_SECONDS = 0
+        service.cache.put("whitefield", {"lat": WHITEFIELD[0], "lng": WHITEFIELD[1], "canonical_name": "Whitefield"})
+        service.cache.put("bangalore", {"lat": BANGALORE[0], "lng": BANGALORE[1], "canonical_name": "Bengaluru"})
+        geocoding_service._geocoding_service_instance = service
+        return service
+
+    def __exit__(self, *exc):
+        geocoding_service._geocoding_service_instance, requests.get = self._saved
+        self._tmpdir.cleanup()
+
+
+def _point(lat, lng, name="somewhere", canonical=None):
+    location = {"name": name, "coordinates": {"lat": lat, "lng": lng}}
+    if canonical:
+        location["canonical_name"] = canonical
+    return location
+
+
+def _candidates(rng, n):
+    candidates = []
+    for i in range(n):
+        lat = BANGALORE[0] + rng.uniform(-1.2, 1.2)
+        lng = BANGALORE[1] + rng.uniform(-1.2, 1.2)
+        location = _point(lat, lng)
+        kind = i % 10
+        if kind == 0:
+            location = "bangalore"  # no coordinates: left to the scalar path
+        elif kind == 1:
+            location = _point(lat, lng, name="whitefield")
+        elif kind == 2:
+            location = _point(lat, lng, canonical="Whitefield")
+        candidates.append({
+            "location": location,
+            "locationmode": {3: "global", 4: "route", 5: "EXPLICIT "}.get(kind, "near_me"),
+            "locationexclusions": ["bangalore"] if kind == 6 else [],
+        })
+    return candidates
+
+
+def test_verdicts_agree_with_scalar():
+    print("\n=== Test 1: Decided verdicts == match_location_v2 ===")
+    rng = random.Random(7)
+    candidates = _candidates(rng, 1500)
+    queries = [
+        (_point(*BANGALORE, name="bangalore"), "near_me", ["whitefield", "atlantis"]),
+        (_point(*BANGALORE, name="bangalore"), "explicit", []),
+        ("bangalore", "near_me", ["whitefield"]),  # query point geocoded once
+        ("", "near_me", []),
+        (_point(*BANGALORE, name="bangalore"), "target_only", ["whitefield"]),
+        (_point(*BANGALORE, name="bangalore"), "route", []),
+    ]
+    with _OfflineGeocoder():
+        for location, mode, exclusions in queries:
+            verdicts = LocationQuery(location, mode, exclusions).verdicts(candidates)
+            decided = 0
+            for B, verdict in zip(candidates, verdicts):
+                if verdict == UNDECIDED:
+                    continue
+                expected = match_location_v2(location, mode, exclusions,
+                                             B["location"], B["locationmode"], B["locationexclusions"])
+                assert (verdict == MATCH) == expected, (mode, B)
+                decided += 1
+            counts = {v: int((verdicts == v).sum()) for v in (MATCH, NO_MATCH, UNDECIDED)}
+            if not location:
+                assert counts[UNDECIDED] == len(candidates) // 10  # route candidates
+            elif mode in ("near_me", "explicit"):
+                assert counts[MATCH] and counts[NO_MATCH]
+            else:
+                assert counts[UNDECIDED] == len(candidates) - counts[MATCH]  # only global decided
+            print(f"  {mode:12s} {str(location)[:40]:40s} decided {decided}/{len(candidates)}")
+    print("  ✅ PASS: no decided verdict differs from the scalar matcher")
+
+
+def test_grid_matches_exact_distances():
+    print("\n=== Test 2: Grid short-circuits == exact haversine ===")
+    rng = np.random.default_rng(3)
+    lat = rng.uniform(-60, 60, 20000)
+    lng = rng.uniform(-179.9, 179.9, 20000)
+    lat[:500] = BANGALORE[0] + rng.uniform(-1, 1, 500)
+    lng[:500] = BANGALORE[1] + rng.uniform(-1, 1, 500)
+    grid = GeoGrid(lat, lng, cell_deg=0.25)
+
+    for radius in (5.0, 50.0, 300.0):
+        state = grid.within(*BANGALORE, radius)
+        exact = haversine_km(*BANGALORE, lat, lng)
+        assert (state != UNDECIDED).all()
+        assert ((state == MATCH) == (exact <= radius)).all()
+
+    service = GeocodingService.__new__(GeocodingService)
+    for i in range(50):
+        assert abs(exact[i] - service._haversine_distance(*BANGALORE, lat[i], lng[i])) < 1e-9
+    print("  ✅ PASS: 20000 points, 3 radii")
+
+
+def test_plan_prune_mask_is_sound():
+    print("\n=== Test 3: MatchPlan.prune_mask with location pruning ===")
+    listings = list(_load_fixtures().values())
+    rng = random.Random(11)
+    placed = []
+    for listing in listings:
+        for _ in range(4):
+            B = copy.deepcopy(listing)
+            B["location"] = _point(BANGALORE[0] + rng.uniform(-1, 1), BANGALORE[1] + rng.uniform(-1, 1))
+            placed.append(B)
+
+    with _OfflineGeocoder():
+        pruned = out_of_range = 0
+        for A in placed[::4]:
+            plan = compile_match_plan(A)
+            mask = plan.prune_mask(placed)
+            out_of_range += int((numeric_prune_mask(A, placed) & ~mask).sum())
+            for B, keep in zip(placed, mask):
+                expected = listing_matches_v2(A, B)
+                if not keep:
+                    assert expected is False
+                    pruned += 1
+            assert plan.filter(placed) == [B for B in placed if listing_matches_v2(A, B)]
+    assert out_of_range > 0
+    print(f"  ✅ PASS: {pruned} candidates pruned ({out_of_range} by location), none of them a match")
+
+
+if __name__ == "__main__":
+    test_verdicts_agree_with_scalar()
+    test_grid_matches_exact_distances()
+    test_plan_prune_mask_is_sound()
+    print("\nAll location engine tests passed.")
@@ -0,0 +1,232 @@
+"""
+Unit tests for incremental match maintenance on listing update/delete
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from embedding import embedding_store
+from schema.schema_normalizer_v2 import normalize_and_validate_v2
+from matching.stored_query_index import StoredQueryIndex
+from pipeline.ingestion_pipeline import IngestionClients
+from pipeline.match_maintenance import MatchMaintainer
+
+
+@pytest.fixture(autouse=True)
+def _no_embedding_store(monkeypatch):
+    """Keep unit tests off the on-disk embedding store."""
+    monkeypatch.setattr(embedding_store, "ENABLE_EMBEDDING_STORE", False)
+
+
+def _listing(subintent, color):
+    return normalize_and_validate_v2({
+        "intent": "product",
+        "subintent": subintent,
+        "domain": ["electronics"],
+        "primary_mutual_category": [],
+        "items": [{"type": "smartphone", "categorical": {"color": color}, "min": {}, "max": {}, "range": {}}],
+        "item_exclusions": [],
+        "other_party_preferences": {},
+        "other_party_exclusions": [],
+        "self_attributes": {},
+        "self_exclusions": [],
+        "target_location": {},
+        "location_match_mode": "global",
+        "location_exclusions": [],
+        "reasoning": ""
+    })
+
+
+class _Query:
+    """Minimal PostgREST-style query over in-memory rows."""
+
+    def __init__(self, db, name):
+        self.db, self.name = db, name
+        self.filters = []
+        self.action, self.payload = "select", None
+        self.db.calls.append(name)
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        values = {str(v) for v in values}
+        self.filters.append(lambda r: str(r.get(column)) in values)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda r: r[column] <= value)
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def update(self, payload):
+        self.action, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def insert(self, payload):
+        self.action, self.payload = "insert", payload
+        return self
+
+    upsert = insert
+
+    def execute(self):
+        rows = self.db.tables.setdefault(self.name, [])
+        hit = [r for r in rows if all(f(r) for f in self.filters)]
+        if self.action == "update":
+            for r in hit:
+                r.update(self.payload)
+        elif self.action == "delete":
+            self.db.tables[self.name] = [r for r in rows if r not in hit]
+        elif self.action == "insert":
+            new = self.payload if isinstance(self.payload, list) else [self.payload]
+            for r in new:
+                rows.append(dict(r, match_id=f"m{len(rows)}"))
+            hit = new
+        return type("Response", (), {"data": hit})()
+
+
+class _FakeSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+        self.calls = []
+
+    def table(self, name):
+        return _Query(self, name)
+
+
+def _setup():
+    buyer, seller, other = _listing("buy", "black"), _listing("sell", "black"), _listing("sell", "white")
+    index = StoredQueryIndex()
+    index.add("q1", buyer, user_id="u1")
+    supabase = _FakeSupabase({
+        "product_listings": [
+            {"id": "q1", "user_id": "u1", "data": buyer},
+            {"id": "s1", "user_id": "u2", "data": seller},
+            {"id": "s2", "user_id": "u3", "data": other},
+        ],
+        "matches": [
+            {"match_id": "m-a", "listing_a_id": "q1", "listing_b_id": "s1", "match_type": "product", "status": "pending"},
+            {"match_id": "m-b", "listing_a_id": "x9", "listing_b_id": "y9", "match_type": "product", "status": "pending"},
+        ],
+        "stored_queries": [{"query_id": "q1", "user_id": "u1", "data": buyer}],
+    })
+    return supabase, index
+
+
+def test_update_retracts_and_creates():
+    print("\n=== Test 1: Update re-evaluates only affected pairs ===")
+    supabase, index = _setup()
+    # s1 turns white (no longer matches q1); s2 turns black (now matches q1)
+    supabase.tables["product_listings"][1]["data"] = _listing("sell", "white")
+    supabase.tables["product_listings"][2]["data"] = _listing("sell", "black")
+    supabase.tables["listing_changes"] = [
+        {"change_id": 1, "listing_id": "s1", "intent": "product", "op": "update"},
+        {"change_id": 2, "listing_id": "s2", "intent": "product", "op": "update"},
+    ]
+
+    stats = MatchMaintainer(index=index).poll_once(supabase)
+
+    matches = {m["match_id"]: m for m in supabase.tables["matches"]}
+    assert matches["m-a"]["status"] == "retracted"
+    assert matches["m-b"]["status"] == "pending"  # unrelated row untouched
+    assert stats["rows_checked"] == 1 and stats["retracted"] == 1 and stats["created"] == 1
+    new = [m for m in supabase.tables["matches"] if m.get("listing_b_id") == "s2"]
+    assert new and new[0]["listing_a_id"] == "q1"
+    assert supabase.tables["listing_changes"] == []
+    print("  ✅ PASS: stale match retracted, new match created, feed drained")
+
+
+def test_delete_stored_query():
+    print("\n=== Test 2: Deleting a stored query retracts its matches ===")
+    supabase, index = _setup()
+    supabase.tables["product_listings"] = supabase.tables["product_listings"][1:]
+    supabase.tables["listing_changes"] = [{"change_id": 7, "listing_id": "q1", "intent": "product", "op": "delete"}]
+
+    stats = MatchMaintainer(index=index).poll_once(supabase)
+
+    assert stats["deleted"] == 1 and stats["queries_removed"] == 1
+    assert "q1" not in index and supabase.tables["stored_queries"] == []
+    assert supabase.tables["matches"][0]["status"] == "retracted"
+    print("  ✅ PASS: query removed from index and table, match retracted")
+
+
+class _FakeModel:
+    def encode(self, texts, batch_size=32, convert_to_tensor=False):
+        if isinstance(texts, str):
+            return np.full(384, float(len(texts)))
+        return np.array([np.full(384, float(len(t))) for t in texts])
+
+
+def test_vectors_and_event_feed():
+    print("\n=== Test 3: Qdrant points follow updates / deletes; late events survive ===")
+    supabase, index = _setup()
+    s1, q1 = "00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002"
+    listings = supabase.tables["product_listings"]
+    listings[1]["id"] = s1
+    listings[0]["id"] = q1
+    listings.pop(0)  # q1 deleted
+    listings[0]["data"] = _listing("sell", "white")
+
+    clients = IngestionClients()
+    clients.embedding_model = _FakeModel()
+    clients.qdrant = QdrantClient(":memory:")
+    clients.qdrant.create_collection("product_vectors", vectors_config=VectorParams(size=384, distance=Distance.COSINE))
+    clients.qdrant.upsert("product_vectors", points=[
+        PointStruct(id=pid, vector=[1.0] * 384, payload={"data": {"stale": True}}) for pid in (s1, q1)
+    ])
+
+    supabase.tables["listing_changes"] = [
+        {"change_id": 1, "listing_id": s1, "intent": "product", "op": "update"},
+        {"change_id": 3, "listing_id": q1, "intent": "product", "op": "delete"},
+    ]
+    late = {"change_id": 2, "listing_id": s1, "intent": "product", "op": "update"}
+    maintainer = MatchMaintainer(index=index, clients=clients,
+                                 on_change=lambda ids: supabase.tables["listing_changes"].append(late))
+    stats = maintainer.poll_once(supabase)
+
+    assert stats["reindexed"] == 1 and stats["deleted"] == 1
+    points = clients.qdrant.retrieve("product_vectors", ids=[s1, q1])
+    assert [str(p.id) for p in points] == [s1]
+    assert points[0].payload["data"]["items"][0]["categorical"]["color"] == "white"
+    # Committed with a lower change_id after the fetch: still pending
+    assert supabase.tables["listing_changes"] == [late]
+
+    # Replaying an unchanged listing writes nothing
+    assert maintainer.poll_once(supabase)["reindexed"] == 0
+    print("  ✅ PASS: point re-upserted and deleted, late event kept for the next pass")
+
+
+def test_failed_reevaluation_keeps_match():
+    print("\n=== Test 4: A re-evaluation error leaves the match alone ===")
+    supabase, index = _setup()
+    supabase.tables["product_listings"][1]["data"] = dict(_listing("sell", "black"), locationmode=42)
+    supabase.tables["listing_changes"] = [{"change_id": 1, "listing_id": "s1", "intent": "product", "op": "update"}]
+
+    stats = MatchMaintainer(index=index).poll_once(supabase)
+
+    assert stats["undecided"] == 1 and stats["retracted"] == 0
+    assert supabase.tables["matches"][0]["status"] == "pending"
+    print("  ✅ PASS: match kept, counted as undecided")
+
+
+if __name__ == "__main__":
+    test_update_retracts_and_creates()
+    test_delete_stored_query()
+    test_vectors_and_event_feed()
+    test_failed_reevaluation_keeps_match()
+    print("\nAll match maintenance tests passed.")
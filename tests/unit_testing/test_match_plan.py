@@ -0,0 +1,131 @@
+"""
+Unit tests for compiled match plans (plan.matches(B) == listing_matches_v2(A, B))
+"""
+
+import sys
+import os
+import glob
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from schema.schema_normalizer_v2 import normalize_and_validate_v2
+import matching.listing_matcher_v2 as listing_matcher_v2
+import matching.match_plan as match_plan
+from matching.match_plan import compile_match_plan
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _fake_location(a_loc, a_mode, a_excl, b_loc, b_mode, b_excl):
+    """Deterministic stand-in for match_location_v2 (no geocoding)."""
+    if a_mode == "global" or b_mode == "global":
+        return True
+    return str(a_loc) == str(b_loc) and str(b_loc) not in a_excl
+
+
+def _load_fixtures():
+    listings = {}
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, "test_queries", "*.json"))):
+        with open(path) as f:
+            raw = json.load(f)
+        try:
+            listings[os.path.basename(path)] = normalize_and_validate_v2(raw)
+        except Exception:
+            continue  # query-text fixtures (no structured listing)
+    return listings
+
+
+def _substring_implies(candidate, required):
+    return isinstance(candidate, str) and isinstance(required, str) and required in candidate
+
+
+def _price(value):
+    return {"type": "price", "min": value, "max": value, "unit": "inr"}
+
+
+def _outcome(fn):
+    try:
+        return fn()
+    except Exception as e:
+        return type(e)
+
+
+def test_plan_matches_fixtures():
+    print("\n=== Test 1: Plan agrees with listing_matches_v2 on all fixture pairs ===")
+    listings = _load_fixtures()
+    assert len(listings) >= 10
+
+    original = (listing_matcher_v2.match_location_v2, match_plan.match_location_v2)
+    listing_matcher_v2.match_location_v2 = match_plan.match_location_v2 = _fake_location
+    try:
+        pairs = matched = 0
+        for implies_fn in (None, _substring_implies):
+            for A in listings.values():
+                plan = compile_match_plan(A, implies_fn=implies_fn)
+                for B in listings.values():
+                    expected = _outcome(lambda: listing_matcher_v2.listing_matches_v2(A, B, implies_fn=implies_fn))
+                    assert _outcome(lambda: plan.matches(B)) == expected
+                    pairs += 1
+                    matched += expected is True
+    finally:
+        listing_matcher_v2.match_location_v2, match_plan.match_location_v2 = original
+    assert matched > 0
+    print(f"  ✅ PASS: {pairs} pairs identical ({matched} matches)")
+
+
+def test_plan_numeric_and_exclusions():
+    print("\n=== Test 2: Numeric, exclusion and implication edge cases ===")
+
+    def listing(subintent, item, other=None, self_attrs=None):
+        return normalize_and_validate_v2({
+            "intent": "product",
+            "subintent": subintent,
+            "domain": ["electronics"],
+            "primary_mutual_category": [],
+            "items": [item],
+            "item_exclusions": [],
+            "other_party_preferences": other or {},
+            "other_party_exclusions": [],
+            "self_attributes": self_attrs or {},
+            "self_exclusions": [],
+            "target_location": {},
+            "location_match_mode": "global",
+            "location_exclusions": [],
+            "reasoning": ""
+        })
+
+    buyer = listing(
+        "buy",
+        {"type": "smartphone", "categorical": {"brand": "apple"}, "min": {}, "max": {"cost": [{"type": "price", "value": 60000, "unit": "inr"}]}, "range": {}},
+        other={"categorical": {"language": "hindi"}},
+    )
+    buyer["items"][0]["itemexclusions"] = ["used"]  # M-12 per required item
+    sellers = [
+        listing("sell", {"type": "smartphone", "categorical": {"brand": "apple"}, "min": {}, "max": {}, "range": {"cost": [_price(55000)]}},
+                self_attrs={"categorical": {"language": "hindi"}}),
+        listing("sell", {"type": "smartphone", "categorical": {"brand": "apple"}, "min": {}, "max": {}, "range": {"cost": [_price(65000)]}},
+                self_attrs={"categorical": {"language": "hindi"}}),
+        listing("sell", {"type": "smartphone", "categorical": {"brand": "apple", "condition": "used"}, "min": {}, "max": {}, "range": {"cost": [_price(50000)]}},
+                self_attrs={"categorical": {"language": "hindi"}}),
+        listing("sell", {"type": "smartphone", "categorical": {"brand": "apple"}, "min": {}, "max": {}, "range": {}},
+                self_attrs={"categorical": {"language": "hindi"}}),
+    ]
+    calls = []
+
+    def implies(candidate, required):
+        calls.append((candidate, required))
+        return candidate == required
+
+    plan = compile_match_plan(buyer, implies_fn=implies, order="canonical")
+    expected = [listing_matcher_v2.listing_matches_v2(buyer, s) for s in sellers]
+    assert [plan.matches(s) for s in sellers] == expected == [True, False, False, False]
+    assert plan.filter(sellers) == sellers[:1]
+    assert len(calls) == len(set(calls))  # implications memoized per plan
+    assert [name for name, _ in plan.stages] == ["intent", "scope", "items", "other_self"]
+    print("  ✅ PASS: max overlap, missing attribute, item exclusion")
+
+
+if __name__ == "__main__":
+    test_plan_matches_fixtures()
+    test_plan_numeric_and_exclusions()
+    print("\nAll match plan tests passed.")
@@ -0,0 +1,137 @@
+"""
+Unit tests for match explain / profile mode (rejecting rule + timings)
+"""
+
+import sys
+import os
+import copy
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import matching.listing_matcher_v2 as listing_matcher_v2
+from matching.listing_matcher_v2 import listing_matches_v2
+from matching.match_profiler import MatchProfile, current_profile, get_profile_totals
+from matching.similarity_scorer import SimilarTopK, score_similarity
+from benchmarks.synthetic import make_candidates, make_queries
+from tests.unit_testing.test_match_plan import _fake_location, _load_fixtures, _outcome
+
+
+def test_profiled_verdicts_match():
+    print("\n=== Test 1: Profiled verdicts == listing_matches_v2 on fixtures ===")
+    listings = list(_load_fixtures().values())
+    original = listing_matcher_v2.match_location_v2
+    listing_matcher_v2.match_location_v2 = _fake_location
+    try:
+        profile = MatchProfile()
+        pairs = 0
+        for A in listings:
+            for B in listings:
+                expected = _outcome(lambda: listing_matches_v2(A, B))
+                assert _outcome(lambda: listing_matches_v2(A, B, profiler=profile)) == expected
+                pairs += 1
+    finally:
+        listing_matcher_v2.match_location_v2 = original
+
+    stats = profile.to_dict()
+    assert stats["candidates"] == pairs
+    assert stats["matched"] + stats["errors"] + sum(stats["rejections"].values()) == pairs
+    assert stats["stages"]["intent"]["calls"] == pairs - stats["errors"]
+    assert len(stats["per_candidate"]) == min(pairs, profile.max_records)
+    print(f"  ✅ PASS: {pairs} pairs, rejections {stats['rejections']}")
+
+
+def _matching_pair():
+    """Synthetic buyer A and a seller B that satisfies it."""
+    A = make_queries(1)[0]
+    B = copy.deepcopy(make_candidates(1)[0])
+    required = A["items"][0]
+    B["domain"] = list(A["domain"])
+    B["items"] = [{
+        **required, "min": {}, "max": {},
+        "range": {"price": [required["max"]["price"]] * 2, "storage": [required["min"]["storage"]] * 2},
+    }]
+    B["self"]["categorical"] = dict(A["other"]["categorical"])
+    assert listing_matches_v2(A, B)
+    return A, B
+
+
+def test_rejecting_rule():
+    print("\n=== Test 2: Rejecting rule attributed per candidate ===")
+    A, B = _matching_pair()
+    short_storage = {**B["items"][0], "range": {**B["items"][0]["range"], "storage": [1, 1]}}
+
+    cases = [
+        ("M-01", {"intent": "service"}),
+        ("M-02", {"subintent": "buy"}),
+        ("M-05", {"domain": ["no such domain"]}),
+        ("M-09", {"items": [short_storage]}),  # storage below the required minimum
+        ("M-13", {"self": {**B["self"], "categorical": {"language": "none"}}}),
+    ]
+    profile = MatchProfile()
+    for position, (rule, changes) in enumerate(cases):
+        profile.candidate_id = position
+        assert listing_matches_v2(A, {**B, **changes}, profiler=profile) is False
+        assert profile.records[-1]["rule"] == rule, (rule, profile.records[-1])
+        assert profile.records[-1]["candidate"] == position
+    assert dict(profile.rejections) == {rule: 1 for rule, _ in cases}
+    print("  ✅ PASS: M-01, M-02, M-05, M-09, M-13 reported")
+
+
+def test_implies_strategy_timing():
+    print("\n=== Test 3: implies_fn reports to the active profile ===")
+    seen = []
+
+    def implies(candidate, required):
+        profile = current_profile()
+        seen.append(profile)
+        if profile is not None:
+            profile.record_implies("exact", 10, candidate == required)
+        return candidate == required
+
+    A, B = _matching_pair()
+    listing_matches_v2(A, B, implies)
+    assert seen and all(p is None for p in seen)
+
+    profile = MatchProfile()
+    seen.clear()
+    assert listing_matches_v2(A, B, implies, profiler=profile) is True
+    assert seen and all(p is profile for p in seen)
+    assert current_profile() is None  # reset after the candidate
+    assert profile.to_dict()["implies"]["exact"]["calls"] == len(seen)
+    assert profile.matched == 1 and set(profile.stage_ns) == {"intent", "scope", "items", "other_self", "location"}
+    print(f"  ✅ PASS: {len(seen)} implies calls recorded, none without a profile")
+
+
+def test_similarity_outcomes():
+    print("\n=== Test 4: Similarity outcomes counted, scores unchanged ===")
+    A = make_queries(1)[0]
+    candidates = make_candidates(300)
+    profile = MatchProfile()
+    plain, profiled = SimilarTopK(A, 5, 0.5), SimilarTopK(A, 5, 0.5, profiler=profile)
+    for i, B in enumerate(candidates):
+        plain.offer(B, i)
+        profiled.offer(B, i)
+        scored = score_similarity(A, B, min_score=0.5, profiler=profile)
+        assert scored.similarity_score == score_similarity(A, B, min_score=0.5).similarity_score
+
+    assert [(s.similarity_score, i) for s, i in plain.results()] == \
+           [(s.similarity_score, i) for s, i in profiled.results()]
+    outcomes = profile.to_dict()["similarity"]["outcomes"]
+    assert sum(outcomes.values()) == 2 * len(candidates)
+    assert outcomes.get("pruned", 0) == profiled.pruned
+    assert outcomes.get("tier1_rejected", 0) == sum(profile.similarity_rejections.values())
+
+    totals = get_profile_totals()
+    totals.reset()
+    profile.export("/test")
+    assert totals.get_stats()["profiles"] == 1
+    assert totals.get_stats()["similarity"]["outcomes"] == outcomes
+    totals.reset()
+    print(f"  ✅ PASS: {outcomes}")
+
+
+if __name__ == "__main__":
+    test_profiled_verdicts_match()
+    test_rejecting_rule()
+    test_implies_strategy_timing()
+    test_similarity_outcomes()
+    print("\nAll match profiler tests passed.")
@@ -0,0 +1,51 @@
+"""
+Unit tests for the matching benchmark suite (synthetic corpus + baseline comparison)
+"""
+
+import sys
+import os
+import copy
+from collections import Counter
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from benchmarks.matching_suite import IMPLIES_INDEPENDENT, compare, run
+from benchmarks.synthetic import make_corpus
+
+
+def test_corpus_mix():
+    print("\n=== Test 1: Corpus mixes intents, deterministic per seed ===")
+    corpus = make_corpus(900)
+    intents = Counter(listing["intent"] for listing in corpus)
+    assert set(intents) == {"product", "service", "mutual"}
+    assert intents["mutual"] > intents["product"]
+    assert make_corpus(50) == make_corpus(50) != make_corpus(50, seed=1)
+    queries = make_corpus(30, seed=7, side="query")
+    assert {q["subintent"] for q in queries} <= {"buy", "seek", "connect"}
+    assert all(not q["items"] for q in queries if q["intent"] == "mutual")
+    print(f"  ✅ PASS: {dict(intents)}")
+
+
+def test_run_and_compare():
+    print("\n=== Test 2: Suite results compared against a baseline ===")
+    report = run(sizes=[60], queries=2, repeat=1)
+    results = report["results"]["60"]
+    assert "listing_matches_v2/stubbed" in results
+    assert not any(key.startswith(name + "/stubbed") for key in results for name in IMPLIES_INDEPENDENT)
+    assert all(row["calls"] >= row["hits"] >= 0 for row in results.values())
+
+    rows = compare(report, report)
+    assert rows and {row["status"] for row in rows} == {"ok"}
+
+    slower = copy.deepcopy(report)
+    slower["results"]["60"]["listing_matches_v2/disabled"]["ns_per_call"] *= 2
+    slower["results"]["60"]["evaluate_similarity/disabled"]["hits"] += 1
+    status = {row["benchmark"]: row["status"] for row in compare(slower, report)}
+    assert status["listing_matches_v2/disabled"] == "regression"
+    assert status["evaluate_similarity/disabled"] == "changed"
+    print(f"  ✅ PASS: {len(rows)} benchmarks compared")
+
+
+if __name__ == "__main__":
+    test_corpus_mix()
+    test_run_and_compare()
+    print("\nAll matching suite tests passed.")
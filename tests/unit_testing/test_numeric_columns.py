@@ -0,0 +1,99 @@
+"""
+Unit tests for columnar numeric constraint evaluation (matching/numeric_columns.py)
+"""
+
+import sys
+import os
+import random
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from matching.numeric_constraints import (
+    NEGATIVE_INFINITY,
+    POSITIVE_INFINITY,
+    evaluate_max_constraints,
+    evaluate_min_constraints,
+    evaluate_range_constraints,
+    range_contains,
+)
+from matching.numeric_columns import (
+    NumericColumns,
+    evaluate_max_columns,
+    evaluate_min_columns,
+    evaluate_range_columns,
+    evaluate_range_contains_columns,
+    numeric_prune_mask,
+)
+from matching.listing_matcher_v2 import listing_matches_v2
+from tests.unit_testing.test_match_plan import _fake_location, _load_fixtures
+import matching.listing_matcher_v2 as listing_matcher_v2
+
+
+def _random_range(rng):
+    kind = rng.choice(["exact", "range", "min", "max"])
+    a, b = sorted(rng.randint(0, 100) for _ in range(2))
+    if kind == "exact":
+        return (a, a)
+    if kind == "min":
+        return (a, POSITIVE_INFINITY)
+    if kind == "max":
+        return (NEGATIVE_INFINITY, b)
+    return (a, b)
+
+
+def test_columns_match_scalar():
+    print("\n=== Test 1: Vectorized M-09/M-10/M-11/M-16 equal the scalar checks ===")
+    rng = random.Random(7)
+    attrs = ["price", "storage", "rating"]
+    rows = [
+        {attr: _random_range(rng) for attr in attrs if rng.random() < 0.7}
+        for _ in range(300)
+    ]
+    columns = NumericColumns(rows)
+
+    for _ in range(50):
+        required_min = {attr: rng.randint(0, 100) for attr in attrs if rng.random() < 0.4}
+        required_max = {attr: rng.randint(0, 100) for attr in attrs if rng.random() < 0.4}
+        required_range = {attr: tuple(sorted(rng.randint(0, 100) for _ in range(2))) for attr in attrs if rng.random() < 0.4}
+
+        assert list(evaluate_min_columns(required_min, columns)) == [evaluate_min_constraints(required_min, r) for r in rows]
+        assert list(evaluate_max_columns(required_max, columns)) == [evaluate_max_constraints(required_max, r) for r in rows]
+        assert list(evaluate_range_columns(required_range, columns)) == [evaluate_range_constraints(required_range, r) for r in rows]
+        contains = [
+            all(k in r and range_contains(r[k], v) for k, v in required_range.items())
+            for r in rows
+        ]
+        assert list(evaluate_range_contains_columns(required_range, columns)) == contains
+    print("  ✅ PASS: 300 rows x 50 requirement sets, ±inf bounds included")
+
+
+def test_invalid_rows_are_kept():
+    print("\n=== Test 2: Rows the scalar path rejects as invalid are never pruned ===")
+    columns = NumericColumns([{"price": (10, 5)}, {"price": ("a", 3)}, None, {"price": (1, 2)}, {}])
+    assert list(evaluate_min_columns({"price": 50}, columns)) == [True, True, True, False, False]
+    print("  ✅ PASS: invalid and unknown rows left to the scalar path")
+
+
+def test_prune_mask_is_sound():
+    print("\n=== Test 3: Pruned fixtures never match ===")
+    listings = list(_load_fixtures().values())
+    original = listing_matcher_v2.match_location_v2
+    listing_matcher_v2.match_location_v2 = _fake_location
+    try:
+        pruned = 0
+        for A in listings:
+            mask = numeric_prune_mask(A, listings)
+            for B, keep in zip(listings, mask):
+                if not keep:
+                    pruned += 1
+                    assert listing_matches_v2(A, B) is False
+    finally:
+        listing_matcher_v2.match_location_v2 = original
+    assert pruned > 0
+    print(f"  ✅ PASS: {pruned} pairs pruned, none of them a match")
+
+
+if __name__ == "__main__":
+    test_columns_match_scalar()
+    test_invalid_rows_are_kept()
+    test_prune_mask_is_sound()
+    print("\nAll numeric column tests passed.")
@@ -0,0 +1,98 @@
+"""
+Unit tests for the process-pool matching backend (matching/parallel_matcher.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from matching.listing_matcher_v2 import listing_matches_v2
+from matching.parallel_matcher import ParallelMatcher, _init_worker, ontology_snapshot
+from matching.similarity_scorer import SimilarTopK
+from benchmarks.synthetic import make_candidates, make_queries
+
+
+def _brand_implies(candidate, required):
+    """Module-level (picklable) implication: apple ⇒ samsung, for coverage."""
+    return candidate == required or (candidate, required) == ("apple", "samsung")
+
+
+def test_same_results_as_in_process():
+    print("\n=== Test 1: Pool results equal in-process results, in rank order ===")
+    candidates = make_candidates(300, seed=5)
+    candidates[17] = {**candidates[17], "items": "not-a-list"}  # raises in the matcher
+    matcher = ParallelMatcher(workers=2, min_candidates=0, chunk_size=40)
+    try:
+        for A in make_queries(3, seed=9):
+            expected = []
+            for B in candidates:
+                try:
+                    expected.append(listing_matches_v2(A, B, _brand_implies))
+                except Exception:
+                    expected.append(False)
+            assert matcher.match(A, candidates, _brand_implies) == expected
+            assert [position for position, _ in matcher.last_errors] == [17]
+
+            positions = [i for i, flag in enumerate(expected) if not flag and i != 17]
+            top_k = SimilarTopK(A, 10, 0.5, _brand_implies)
+            for i in positions:
+                top_k.offer(candidates[i], i)
+            pooled = matcher.top_similar(A, candidates, 10, 0.5, _brand_implies, positions=positions)
+            assert [(s.similarity_score, i) for s, i in pooled] == \
+                   [(s.similarity_score, i) for s, i in top_k.results()]
+            assert all(s.results for s, _ in pooled)  # explanations can still be materialized
+    finally:
+        matcher.shutdown()
+    print("  ✅ PASS: flags, errors and top-K identical across 8 chunks")
+
+
+def test_ontology_snapshot():
+    print("\n=== Test 2: Spawned workers load the ontology snapshot ===")
+    from canonicalization.orchestrator import _get_categorical_resolver
+    resolver = _get_categorical_resolver()
+    resolver._synonym_registry["test-synonym"] = "test_concept"
+    try:
+        snapshot = ontology_snapshot()
+        assert snapshot["synonym_registry"]["test-synonym"] == "test_concept"
+        del resolver._synonym_registry["test-synonym"]
+        _init_worker(snapshot)  # what the spawn initializer runs
+        assert resolver._synonym_registry["test-synonym"] == "test_concept"
+        assert ParallelMatcher(workers=4, min_candidates=300).should_parallelize(300)
+        assert not ParallelMatcher(workers=1, min_candidates=10).should_parallelize(10_000)
+        assert not ParallelMatcher(workers=4, min_candidates=0).should_parallelize(10_000)  # not measured
+    finally:
+        resolver._synonym_registry.pop("test-synonym", None)
+    print("  ✅ PASS: synonym registry restored from the snapshot")
+
+
+def test_workers_start_clean_and_eagerly():
+    print("\n=== Test 3: Workers started by start(), no fork-inherited state ===")
+    from services.external import geocoding_service
+    matcher = ParallelMatcher(workers=2, min_candidates=100)
+    assert matcher.start_method != "fork"
+    try:
+        pool = matcher.start()
+        assert len(pool._processes) == 2  # before any search was submitted
+    finally:
+        matcher.shutdown()
+
+    # Processes forked anyway (gunicorn --preload) reopen SQLite handles
+    saved = geocoding_service._geocoding_service_instance
+    geocoding_service._geocoding_service_instance = object()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if geocoding_service._geocoding_service_instance is None else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+        assert geocoding_service._geocoding_service_instance is not None  # parent keeps its own
+    finally:
+        geocoding_service._geocoding_service_instance = saved
+    print("  ✅ PASS: 2 workers up front, forked child drops the parent's geocoder")
+
+
+if __name__ == "__main__":
+    test_same_results_as_in_process()
+    test_ontology_snapshot()
+    test_workers_start_clean_and_eagerly()
+    print("\nAll parallel matcher tests passed.")
@@ -0,0 +1,145 @@
+"""
+Unit tests for Qdrant payload serving (candidate rows without Supabase hop)
+
+Uses an in-memory Qdrant instance and a minimal Supabase stand-in that
+records every query it receives.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams, PointStruct
+
+from pipeline.ingestion_pipeline import (
+    build_qdrant_payload,
+    build_match_features,
+    listing_content_hash,
+)
+from pipeline.retrieval_service import build_candidate_rows
+
+
+LISTING = {
+    "intent": "product",
+    "subintent": "buy",
+    "domain": ["technology & electronics"],
+    "reasoning": "user wants a laptop",
+    "items": [{"type": "laptop", "categorical": {"brand": "apple"}, "min": {}, "max": {}, "range": {}}],
+}
+
+
+class _FakeQuery:
+    def __init__(self, store, table):
+        self.store = store
+        self.table = table
+        self.ids = None
+
+    def select(self, *_):
+        return self
+
+    def in_(self, _column, ids):
+        self.ids = list(ids)
+        return self
+
+    def execute(self):
+        self.store.calls.append((self.table, self.ids))
+        rows = [r for r in self.store.rows.get(self.table, []) if r["id"] in self.ids]
+        return type("Response", (), {"data": rows})()
+
+
+class _FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def table(self, name):
+        return _FakeQuery(self, name)
+
+
+def _points(payloads):
+    client = QdrantClient(":memory:")
+    client.create_collection("product_vectors", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert("product_vectors", points=[
+        PointStruct(id=p["listing_id"], vector=[1.0, float(i)], payload=p) for i, p in enumerate(payloads)
+    ])
+    return client.query_points("product_vectors", query=[1.0, 0.0], limit=10).points
+
+
+def test_payload_modes():
+    """Payload carries listing / projection / nothing depending on mode."""
+    print("\n=== Test 1: Payload modes ===")
+
+    full = build_qdrant_payload("id-1", LISTING, user_id="u1", payload_mode="listing")
+    assert full["data"] == LISTING and full["user_id"] == "u1"
+    assert full["data_hash"] == listing_content_hash(LISTING)
+
+    compact = build_qdrant_payload("id-1", LISTING, user_id="u1", payload_mode="match_features")
+    assert "reasoning" not in compact["data"]
+    assert compact["data"] == build_match_features(LISTING)
+
+    legacy = build_qdrant_payload("id-1", LISTING, payload_mode="ids")
+    assert "data" not in legacy and legacy["domain"] == LISTING["domain"]
+    print("  ✅ PASS: listing / match_features / ids payloads")
+
+
+def test_rows_served_from_payload():
+    """Payload rows need no Supabase query at all."""
+    print("\n=== Test 2: Rows served from payload ===")
+
+    ids = ["00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002"]
+    points = _points([build_qdrant_payload(i, LISTING, user_id="u", payload_mode="listing") for i in ids])
+    supabase = _FakeSupabase({})
+
+    rows = build_candidate_rows(supabase, "product", points, consistency_sample_rate=0.0)
+
+    assert [r["listing_id"] for r in rows] == [p.payload["listing_id"] for p in points]
+    assert all(r["source"] == "payload" and r["data"] == LISTING for r in rows)
+    assert supabase.calls == []
+    print("  ✅ PASS: 0 Supabase queries for 2 candidates")
+
+
+def test_legacy_points_fetched_in_one_batch():
+    """Points without listing data fall back to ONE batched Supabase fetch."""
+    print("\n=== Test 3: Batched fallback ===")
+
+    ids = [f"00000000-0000-0000-0000-00000000000{i}" for i in range(1, 4)]
+    points = _points([build_qdrant_payload(i, LISTING, payload_mode="ids") for i in ids])
+    supabase = _FakeSupabase({
+        "product_listings": [{"id": i, "user_id": "owner", "data": LISTING} for i in ids[:2]]
+    })
+
+    rows = build_candidate_rows(supabase, "product", points, consistency_sample_rate=0.0)
+
+    assert len(supabase.calls) == 1
+    assert len(rows) == 2  # third listing missing from Supabase is dropped
+    assert all(r["source"] == "supabase" and r["user_id"] == "owner" for r in rows)
+    print("  ✅ PASS: 1 Supabase query, missing listing dropped")
+
+
+def test_consistency_check():
+    """Stale payload copies are reported and repaired by sampling."""
+    print("\n=== Test 4: Consistency check ===")
+
+    listing_id = "00000000-0000-0000-0000-000000000009"
+    points = _points([build_qdrant_payload(listing_id, LISTING, user_id="u", payload_mode="listing")])
+    updated = dict(LISTING, subintent="sell")
+    supabase = _FakeSupabase({"product_listings": [{"id": listing_id, "user_id": "u", "data": updated}]})
+
+    rows = build_candidate_rows(supabase, "product", points, consistency_sample_rate=0.0)
+    assert rows[0]["source"] == "payload" and rows[0]["data"] == LISTING and not supabase.calls
+
+    repaired = build_candidate_rows(supabase, "product", points, consistency_sample_rate=1.0)
+    assert repaired[0]["source"] == "supabase" and repaired[0]["data"] == updated
+
+    # Deleted in Supabase, still indexed in Qdrant
+    assert build_candidate_rows(_FakeSupabase({}), "product", points, consistency_sample_rate=1.0) == []
+    print("  ✅ PASS: stale payload replaced, deleted listing dropped when verified")
+
+
+if __name__ == "__main__":
+    test_payload_modes()
+    test_rows_served_from_payload()
+    test_legacy_points_fetched_in_one_batch()
+    test_consistency_check()
+    print("\nAll payload serving tests passed.")
@@ -0,0 +1,107 @@
+"""
+Unit tests for adaptive predicate ordering in compiled match plans
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import matching.listing_matcher_v2 as listing_matcher_v2
+import matching.match_plan as match_plan
+from matching.match_plan import PredicateStats, compile_match_plan, get_predicate_stats
+from tests.unit_testing.test_match_plan import _fake_location, _load_fixtures, _outcome
+
+
+def test_stats_order():
+    print("\n=== Test 1: Stages ranked by cost / rejection rate ===")
+    stats = PredicateStats(min_samples=10)
+    stages = ["scope", "items", "other_self", "location"]
+    for _ in range(20):
+        stats.record("product", [
+            ("scope", False, 100),        # never rejects → last among ranked
+            ("items", True, 4000),        # always rejects, expensive: 4000
+            ("other_self", True, 500),    # always rejects, cheap: 500
+        ])
+    for i in range(5):
+        stats.record("product", [("location", i % 2 == 0, 50)])  # below min_samples
+
+    assert stats.order("product", stages) == ["other_self", "items", "scope", "location"]
+    assert stats.order("service", stages) == stages  # no data → canon order
+    assert stats.get_stats()["stages"]["product"]["items"]["rejection_rate"] == 1.0
+    print("  ✅ PASS: selective cheap stage first, unranked stages keep canon order")
+
+
+def test_adaptive_plan_same_results():
+    print("\n=== Test 2: Adaptive order gives the canonical verdicts ===")
+    listings = list(_load_fixtures().values())
+    stats = get_predicate_stats()
+    stats.reset()
+    original = (listing_matcher_v2.match_location_v2, match_plan.match_location_v2)
+    listing_matcher_v2.match_location_v2 = match_plan.match_location_v2 = _fake_location
+    stats.min_samples, saved_min = 5, stats.min_samples
+    try:
+        for _ in range(2):  # second round compiles with learned order
+            for A in listings:
+                adaptive = compile_match_plan(A, order="adaptive")
+                adaptive._sample_every = 1  # profile every candidate
+                canonical = compile_match_plan(A, order="canonical")
+                assert adaptive.stages[0][0] == "intent"
+                assert canonical._stats is None
+                for B in listings:
+                    expected = _outcome(lambda: listing_matcher_v2.listing_matches_v2(A, B))
+                    assert _outcome(lambda: adaptive.matches(B)) == expected
+                    assert _outcome(lambda: canonical.matches(B)) == expected
+        recorded = stats.get_stats()["stages"]
+        assert "product" in recorded and recorded["product"]["scope"]["samples"] > 0
+        reordered = {
+            tuple(name for name, _ in compile_match_plan(A, order="adaptive").stages)
+            for A in listings
+        }
+        canon = {
+            tuple(name for name, _ in compile_match_plan(A, order="canonical").stages)
+            for A in listings
+        }
+        assert reordered != canon  # the learned order differs from canon somewhere
+    finally:
+        listing_matcher_v2.match_location_v2, match_plan.match_location_v2 = original
+        stats.min_samples = saved_min
+        stats.reset()
+    print("  ✅ PASS: verdicts identical, order learned from profiled candidates")
+
+
+def test_profiling_stops_at_first_rejection():
+    print("\n=== Test 3: Profiled candidates run no extra stages ===")
+    listings = list(_load_fixtures().values())
+    stats = get_predicate_stats()
+    stats.reset()
+    calls = {"plain": 0, "profiled": 0}
+    mode = ["plain"]
+
+    def counting_location(*args):
+        calls[mode[0]] += 1
+        return _fake_location(*args)
+
+    original = match_plan.match_location_v2
+    match_plan.match_location_v2 = counting_location
+    try:
+        for A in listings:
+            plan = compile_match_plan(A, order="adaptive")
+            profiled = compile_match_plan(A, order="adaptive")
+            profiled._sample_every = 1
+            for B in listings:
+                mode[0] = "plain"
+                expected = _outcome(lambda: all(predicate(B) for predicate in plan._predicates))
+                mode[0] = "profiled"
+                assert _outcome(lambda: profiled.matches(B)) == expected
+        assert calls["profiled"] == calls["plain"]  # location only where matches() reaches it
+    finally:
+        match_plan.match_location_v2 = original
+        stats.reset()
+    print(f"  ✅ PASS: {calls['profiled']} location checks with and without profiling")
+
+
+if __name__ == "__main__":
+    test_stats_order()
+    test_adaptive_plan_same_results()
+    test_profiling_stops_at_first_rejection()
+    print("\nAll predicate ordering tests passed.")
@@ -0,0 +1,170 @@
+"""
+Unit tests for the shadow-collection reindex job and alias swap
+"""
+
+import sys
+import os
+from datetime import datetime, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from embedding import embedding_store
+from pipeline.ingestion_pipeline import IngestionClients
+from pipeline.reindex import collection_metadata, reindex_intent, resolve_alias, stream_listing_rows
+
+
+@pytest.fixture(autouse=True)
+def _no_embedding_store(monkeypatch):
+    """Keep unit tests off the on-disk embedding store."""
+    monkeypatch.setattr(embedding_store, "ENABLE_EMBEDDING_STORE", False)
+
+
+class _Query:
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = None
+
+    def select(self, columns, count=None):
+        if count:
+            self.count = len(self.rows)
+        return self
+
+    def gte(self, column, value):
+        self.rows = [r for r in self.rows if r.get(column, "") >= value]
+        return self
+
+    def order(self, column):
+        self.rows = sorted(self.rows, key=lambda r: r[column])
+        return self
+
+    def range(self, start, end):
+        self.rows = self.rows[start:end + 1]
+        return self
+
+    def limit(self, n):
+        self.rows = self.rows[:n]
+        return self
+
+    def execute(self):
+        return type("Response", (), {"data": self.rows, "count": self.count})()
+
+
+class _FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        return _Query(list(self.rows.get(name, [])))
+
+
+class _FakeModel:
+    def __init__(self, dim):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, convert_to_tensor=False):
+        return np.ones((len(texts), self.dim))
+
+
+def _rows(n):
+    return [
+        {"id": f"00000000-0000-0000-0000-{i:012d}", "user_id": "u",
+         "created_at": "2000-01-01", "updated_at": "2000-01-01",
+         "data": {"intent": "product", "subintent": "buy", "domain": ["d"], "items": [{"type": f"item{i}"}]}}
+        for i in range(n)
+    ]
+
+
+def _clients(n):
+    clients = IngestionClients()
+    clients.supabase = _FakeSupabase({"product_listings": _rows(n)})
+    clients.qdrant = QdrantClient(":memory:")
+    clients.qdrant.create_collection(
+        "product_vectors", vectors_config=VectorParams(size=384, distance=Distance.COSINE)
+    )
+    return clients
+
+
+def test_stream_pages():
+    print("\n=== Test 1: Paginated streaming ===")
+    clients = _clients(7)
+    rows = list(stream_listing_rows(clients.supabase, "product", page_size=3))
+    assert len(rows) == 7 and len({r["id"] for r in rows}) == 7
+    print("  ✅ PASS: 7 rows over 3 pages")
+
+
+def test_reindex_swaps_alias():
+    print("\n=== Test 2: Build, legacy migration, then atomic swap ===")
+    clients = _clients(5)
+
+    # Swapping onto a physical collection needs the explicit one-time migration
+    try:
+        reindex_intent(clients, "product", _FakeModel(8), "org/new-model", swap=True, verbose=False)
+        assert False, "legacy collection replaced without --migrate-legacy"
+    except RuntimeError:
+        pass
+
+    built = reindex_intent(clients, "product", _FakeModel(8), "org/new-model", upsert_batch=2, verbose=False)
+    assert built["indexed"] == 5 and built["failed"] == 0 and not built["swapped"]
+    assert resolve_alias(clients.qdrant, "product_vectors") is None  # serving untouched
+    assert collection_metadata(clients.qdrant, built["collection"])["embedding_model"] == "org/new-model"
+
+    # Written / deleted between build and swap: picked up by the swap's catch-up
+    rows = clients.supabase.rows["product_listings"]
+    fresh = _rows(6)[5]
+    fresh["updated_at"] = datetime.now(timezone.utc).isoformat()
+    rows.append(fresh)
+    rows.pop(0)
+
+    first = reindex_intent(clients, "product", _FakeModel(8), "org/new-model", swap=True,
+                           migrate_legacy=True, shadow=built["collection"], verbose=False)
+    assert first["swapped"] and first["previous"] == "product_vectors"
+    assert first["indexed"] >= 1 and first["deleted"] == 1  # overlapping catch-ups may re-upsert
+    assert resolve_alias(clients.qdrant, "product_vectors") == built["collection"]
+    # Reads through the alias hit the new 8D collection
+    assert clients.qdrant.count("product_vectors").count == 5
+    hits = clients.qdrant.query_points("product_vectors", query=[1.0] * 8, limit=1).points
+    assert hits and hits[0].payload["user_id"] == "u"
+
+    second = reindex_intent(clients, "product", _FakeModel(4), "other-model", swap=True, drop_old=True,
+                            verbose=False)
+    assert second["previous"] == built["collection"]
+    assert resolve_alias(clients.qdrant, "product_vectors") == second["collection"]
+    assert not clients.qdrant.collection_exists(built["collection"])
+    print("  ✅ PASS: catch-up applied, alias repointed, old collection dropped")
+
+
+def test_failed_upsert_keeps_alias():
+    print("\n=== Test 3: Failed upsert → no swap ===")
+    clients = _clients(5)
+    first = reindex_intent(clients, "product", _FakeModel(8), "org/new-model", swap=True,
+                           migrate_legacy=True, verbose=False)
+
+    upsert = clients.qdrant.upsert
+
+    def flaky_upsert(collection_name, points, wait=True):
+        if len(points) == 1:
+            raise ConnectionError("qdrant unavailable")
+        return upsert(collection_name=collection_name, points=points, wait=wait)
+
+    clients.qdrant.upsert = flaky_upsert
+    failed = reindex_intent(clients, "product", _FakeModel(4), "other-model", upsert_batch=2, swap=True,
+                            drop_old=True, verbose=False)
+    assert failed["failed"] == 1 and not failed["swapped"] and failed["collection"] is None
+    assert resolve_alias(clients.qdrant, "product_vectors") == first["collection"]
+    assert clients.qdrant.count("product_vectors").count == 5
+    assert [c.name for c in clients.qdrant.get_collections().collections] == [first["collection"]]
+    print("  ✅ PASS: old alias kept, incomplete shadow deleted")
+
+
+if __name__ == "__main__":
+    test_stream_pages()
+    test_reindex_swaps_alias()
+    test_failed_upsert_keeps_alias()
+    print("\nAll reindex tests passed.")
@@ -0,0 +1,104 @@
+"""
+Unit tests for batch similarity scoring (score first, materialize top-K)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import matching.similarity_scorer as similarity_scorer
+from matching.similarity_scorer import (
+    evaluate_similarity,
+    evaluate_similarity_batch,
+    materialize_similarity,
+    score_similarity,
+    SimilarTopK,
+)
+from benchmarks.synthetic import make_candidates, make_queries
+from tests.unit_testing.test_match_plan import _load_fixtures
+
+
+def _reference_top_k(A, candidates, min_score, k):
+    """What the search endpoints did before: evaluate everything, sort, slice."""
+    similar = []
+    for i, B in enumerate(candidates):
+        result = evaluate_similarity(A, B, min_score=min_score)
+        if result.is_similar_match and not result.is_exact_match:
+            similar.append((i, result))
+    similar.sort(key=lambda pair: pair[1].similarity_score, reverse=True)
+    return similar[:k]
+
+
+def test_score_then_materialize():
+    print("\n=== Test 1: score + materialize == evaluate_similarity ===")
+    candidates = make_candidates(200)
+    for A in make_queries(5):
+        for B in candidates:
+            scored = score_similarity(A, B, min_score=0.5)
+            expected = evaluate_similarity(A, B, min_score=0.5)
+            assert not hasattr(scored, "__dict__")
+            assert scored.similarity_score == expected.similarity_score
+            assert scored.is_similar_match == expected.is_similar_match
+            assert materialize_similarity(A, B, scored) == expected
+    print("  ✅ PASS: identical SimilarityResult, slotted score objects")
+
+
+def test_batch_materializes_top_k_only():
+    print("\n=== Test 2: Batch returns the same top-K, explains only those ===")
+    candidates = make_candidates(500)
+    calls = {"bonus": 0, "message": 0}
+    original = (similarity_scorer.compute_bonus_attributes, similarity_scorer._generate_smart_message)
+
+    def bonus(A, B):
+        calls["bonus"] += 1
+        return original[0](A, B)
+
+    def message(unsatisfied, bonus=None):
+        calls["message"] += 1
+        return original[1](unsatisfied, bonus)
+
+    for A in make_queries(5):
+        expected = _reference_top_k(A, candidates, min_score=0.5, k=10)
+        similarity_scorer.compute_bonus_attributes = bonus
+        similarity_scorer._generate_smart_message = message
+        calls.update(bonus=0, message=0)
+        try:
+            batch = evaluate_similarity_batch(A, candidates, min_score=0.5, k=10)
+        finally:
+            similarity_scorer.compute_bonus_attributes, similarity_scorer._generate_smart_message = original
+        assert batch == expected
+        assert calls["bonus"] == calls["message"] == len(batch) <= 10
+    print("  ✅ PASS: same ranking, bonus/messages built for ≤ K candidates")
+
+
+def test_upper_bound_pruning():
+    print("\n=== Test 3: Bounded top-K keeps the exact top-K ===")
+    candidates = make_candidates(1000, seed=3)
+    pruned = 0
+    for A in make_queries(5, seed=11):
+        for k, min_score in ((1, 0.5), (5, 0.7), (10, 0.5), (50, 0.3)):
+            top_k = SimilarTopK(A, k, min_score)
+            for i, B in enumerate(candidates):
+                top_k.offer(B, i)
+            expected = _reference_top_k(A, candidates, min_score, k)
+            assert [(i, materialize_similarity(A, candidates[i], s)) for s, i in top_k.results()] == expected
+            assert top_k.scored == len(candidates)
+            pruned += top_k.pruned
+    assert pruned > 0
+
+    # Varied shapes: mutual, location exclusions, categorical-only items
+    listings = list(_load_fixtures().values())
+    for A in listings:
+        top_k = SimilarTopK(A, 3, 0.4)
+        for i, B in enumerate(listings):
+            top_k.offer(B, i)
+        expected = _reference_top_k(A, listings, 0.4, 3)
+        assert [(i, materialize_similarity(A, listings[i], s)) for s, i in top_k.results()] == expected
+    print(f"  ✅ PASS: same results, {pruned} candidates abandoned early")
+
+
+if __name__ == "__main__":
+    test_score_then_materialize()
+    test_batch_materializes_top_k_only()
+    test_upper_bound_pruning()
+    print("\nAll similarity batch tests passed.")
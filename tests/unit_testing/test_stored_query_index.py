@@ -0,0 +1,157 @@
+"""
+Unit tests for prospective matching (stored query index + percolator)
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from schema.schema_normalizer_v2 import normalize_and_validate_v2
+from matching.stored_query_index import StoredQueryIndex
+from pipeline.percolator import percolate_listing, store_query
+
+
+def _listing(subintent, domain, item_type, categorical=None, intent="product"):
+    return normalize_and_validate_v2({
+        "intent": intent,
+        "subintent": subintent,
+        "domain": [domain],
+        "primary_mutual_category": [],
+        "items": [{"type": item_type, "categorical": categorical or {}, "min": {}, "max": {}, "range": {}}],
+        "item_exclusions": [],
+        "other_party_preferences": {},
+        "other_party_exclusions": [],
+        "self_attributes": {},
+        "self_exclusions": [],
+        "target_location": {},
+        "location_match_mode": "global",
+        "location_exclusions": [],
+        "reasoning": ""
+    })
+
+
+class _Table:
+    def __init__(self, db, name):
+        self.db, self.name, self.payload = db, name, None
+
+    def insert(self, payload):
+        self.payload = payload
+        return self
+
+    upsert = insert
+
+    def execute(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        stored = self.db.rows.setdefault(self.name, [])
+        for r in rows:
+            stored.append(dict(r, match_id=f"m{len(stored)}"))
+        return type("Response", (), {"data": stored[-len(rows):]})()
+
+
+class _FakeSupabase:
+    def __init__(self):
+        self.rows = {}
+
+    def table(self, name):
+        return _Table(self, name)
+
+
+def test_candidates_use_postings():
+    print("\n=== Test 1: Lookup touches only matching postings ===")
+    index = StoredQueryIndex()
+    index.add("q-phone", _listing("buy", "electronics", "smartphone"), user_id="u1")
+    index.add("q-laptop", _listing("buy", "electronics", "laptop"), user_id="u2")
+    index.add("q-sofa", _listing("buy", "furniture", "sofa"), user_id="u3")
+    index.add("q-seller", _listing("sell", "electronics", "smartphone"), user_id="u4")
+
+    found = index.candidates(_listing("sell", "electronics", "smartphone"))
+    assert [e["query_id"] for e in found] == ["q-phone"]
+    assert index.get_stats()["candidates_checked"] == 1
+    print("  ✅ PASS: 1 of 4 stored queries considered")
+
+
+def test_implied_types():
+    print("\n=== Test 2: Type implication per indexed type ===")
+    index = StoredQueryIndex()
+    index.add("q-phone", _listing("buy", "electronics", "phone"))
+    calls = []
+
+    def implies(candidate, required):
+        calls.append((candidate, required))
+        return (candidate, required) == ("smartphone", "phone")
+
+    found = index.candidates(_listing("sell", "electronics", "smartphone"), implies_fn=implies)
+    assert [e["query_id"] for e in found] == ["q-phone"]
+    assert calls == [("smartphone", "phone")]
+    print("  ✅ PASS: implied type reached via one implies_fn call")
+
+
+def test_percolate_writes_matches():
+    print("\n=== Test 3: Percolate verifies and writes matches rows ===")
+    index = StoredQueryIndex()
+    supabase = _FakeSupabase()
+    store_query(supabase, "q-black", _listing("buy", "electronics", "smartphone", {"color": "black"}),
+                user_id="u1", index=index)
+    store_query(supabase, "q-white", _listing("buy", "electronics", "smartphone", {"color": "white"}),
+                user_id="u2", index=index)
+    assert len(supabase.rows["stored_queries"]) == 2
+
+    new_listing = _listing("sell", "electronics", "smartphone", {"color": "black"})
+    match_ids = percolate_listing(supabase, "l-new", new_listing, user_id="seller", index=index)
+
+    assert len(match_ids) == 1
+    row = supabase.rows["matches"][0]
+    assert row["listing_a_id"] == "q-black" and row["listing_b_id"] == "l-new"
+    assert row["user_a_id"] == "u1" and row["user_b_id"] == "seller"
+
+    index.remove("q-black")
+    assert percolate_listing(supabase, "l-new", new_listing, index=index) == []
+    print("  ✅ PASS: only the satisfied query produced a match row")
+
+
+def test_owner_expiry_and_failed_writes():
+    print("\n=== Test 4: Owner's own queries, expiry, cap, failed store ===")
+    supabase = _FakeSupabase()
+    index = StoredQueryIndex(ttl_seconds=3600, max_entries=2)
+    store_query(supabase, "q-own", _listing("buy", "electronics", "smartphone"), user_id="seller", index=index)
+    store_query(supabase, "q-other", _listing("buy", "electronics", "smartphone"), user_id="u1", index=index)
+
+    new_listing = _listing("sell", "electronics", "smartphone")
+    percolate_listing(supabase, "l-new", new_listing, user_id="seller", index=index)
+    assert [r["listing_a_id"] for r in supabase.rows["matches"]] == ["q-other"]
+
+    # Anonymous listing: user_b_id stays empty instead of borrowing the query's user
+    supabase.rows["matches"] = []
+    percolate_listing(supabase, "l-anon", new_listing, index=index)
+    assert {(r["user_a_id"], r["user_b_id"]) for r in supabase.rows["matches"]} == {("seller", None), ("u1", None)}
+
+    index.add("q-old", _listing("buy", "electronics", "smartphone"), created_at=time.time() - 7200)
+    assert "q-old" not in index
+    index.add("q-third", _listing("buy", "electronics", "smartphone"))
+    assert len(index) == 2 and "q-own" not in index  # oldest evicted
+
+    index.add("q-stale", _listing("buy", "electronics", "smartphone"), created_at=time.time() - 3500)
+    index.ttl_seconds = 60
+    assert "q-stale" not in [e["query_id"] for e in index.candidates(new_listing)]
+    assert "q-stale" not in index and index.get_stats()["expired"] == 1
+
+    class _FailingSupabase:
+        def table(self, name):
+            raise ConnectionError("supabase unavailable")
+
+    try:
+        store_query(_FailingSupabase(), "q-lost", _listing("buy", "electronics", "laptop"), index=index)
+        assert False, "write failure swallowed"
+    except ConnectionError:
+        pass
+    assert "q-lost" not in index
+    print("  ✅ PASS: owner skipped, TTL and cap enforced, failed store not indexed")
+
+
+if __name__ == "__main__":
+    test_candidates_use_postings()
+    test_implied_types()
+    test_percolate_writes_matches()
+    test_owner_expiry_and_failed_writes()
+    print("\nAll stored query index tests passed.")